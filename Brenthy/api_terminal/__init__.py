@@ -2,10 +2,33 @@
 
 # pylint: disable=unused-variable
 from .api_terminal import (
+    FAST_LANE,
+    SLOW_LANE,
+    REQUEST_LANES,
+    CLIENT_RATE_LIMIT,
+    CancellationToken,
+    RequestCancelledError,
+    brenthy_rpc,
+    update_routing_table,
     get_brenthy_version,
+    get_compression_stats,
+    get_publisher_stats,
+    get_request_stats,
+    get_reply_cache_stats,
+    get_coalescing_stats,
+    get_events_since,
+    batch_request,
+    stream_request,
+    stream_next,
+    stream_close,
     brenthy_request_handler,
     request_router,
+    route_request,
+    parse_request,
     handle_request,
+    handle_multipart_request,
+    classify_request,
+    busy_reply,
     publish_event,
     load_brenthy_api_protocols,
     start_listening_for_requests,
@@ -6,41 +6,678 @@ from applications, as well as for publishing events from Brenthy's blockchains
 to subscribed applications.
 """
 
+import itertools
 import json
 import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from inspect import signature
+from threading import Event, Lock
 from types import ModuleType
+from typing import Callable, Iterator
 
 import blockchain_manager
-from brenthy_tools_beta import log
+from brenthy_tools_beta import compression, log
+from brenthy_tools_beta.event_encoding import decode_value, encode_value
+from brenthy_tools_beta.bt_endpoints import REQUEST_TIMEOUT_S
+from brenthy_tools_beta.reply_cache import ReplyCache
 from brenthy_tools_beta.brenthy_api import (
     BLOCKCHAIN_RETURNED_NO_RESPONSE,
+    BRENTHY_BUSY,
+    NOT_UNDERSTOOD,
+    REQUEST_CANCELLED,
+    STREAM_END,
+    STREAM_FAILED,
+    STREAM_MORE,
+    STREAM_NOT_FOUND,
     UNKNOWN_BLOCKCHAIN_TYPE,
 )
 from brenthy_tools_beta.utils import (
+    decode_bytes_list,
+    encode_bytes_list,
     function_name,
     load_module_from_path,
 )
 from brenthy_tools_beta.version_utils import decode_version, encode_version
 from brenthy_tools_beta.versions import BRENTHY_CORE_VERSION
 
+from .worker_pool import get_pool_size_from_env
+
 # list of files and folders in the brenthy_api_protocols folder
 # which are not BrenthyAPI protocol modules
 BAP_EXCLUDED_MODULES = ["__init__.py", "__main__.py", "__pycache__", ".tmp"]
 bap_protocol_modules: list[ModuleType] = []
+ENCODED_CORE_VERSION = bytes(encode_version(BRENTHY_CORE_VERSION))
+# the starts of `handle_request`'s replies: our encoded version, a null byte
+# and the success (1) or failure (0) flag
+_SUCCESS_REPLY_PREFIX = ENCODED_CORE_VERSION + b"\x00\x01"
+_FAILURE_REPLY_PREFIX = ENCODED_CORE_VERSION + b"\x00\x00"
+
+# the lanes in which requests are processed, each with its own pool of
+# worker threads, so that slow requests can't hold up fast ones:
+# lane name: (minimum, maximum) number of worker threads,
+# set with BRENTHY_API_FAST_LANE_HANDLERS=MIN,MAX and
+# BRENTHY_API_SLOW_LANE_HANDLERS=MIN,MAX
+FAST_LANE = "fast"
+SLOW_LANE = "slow"
+REQUEST_LANES = {
+    FAST_LANE: get_pool_size_from_env(
+        "BRENTHY_API_FAST_LANE_HANDLERS", (2, 32)
+    ),
+    SLOW_LANE: get_pool_size_from_env(
+        "BRENTHY_API_SLOW_LANE_HANDLERS", (1, 32)
+    ),
+}
+# Brenthy RPCs which call blockchains' request handlers
+SLOW_BRENTHY_FUNCTIONS = {"batch_request", "stream_request", "stream_next"}
+# how many bytes at the start of a request contain at least the
+# brenthy_tools version, blockchain type and Brenthy RPC function name
+_MAX_REQUEST_HEADER_SIZE = 256
+
+
+def _get_client_rate_limit() -> tuple[float, float] | None:
+    """Get the rate limit set with BRENTHY_API_CLIENT_RATE_LIMIT.
+
+    Its value is the number of requests per second each application may
+    make, optionally followed by a comma and how many requests it may make
+    at once after having been idle, which defaults to one second's worth.
+    """
+    value = os.environ.get("BRENTHY_API_CLIENT_RATE_LIMIT", "")
+    if not value:
+        return None
+    try:
+        numbers = [float(number) for number in value.split(",")]
+        if len(numbers) == 1:
+            numbers.append(max(numbers[0], 1))
+        rate, burst = numbers
+    except ValueError:
+        error_message = (
+            "Invalid value for environment variable "
+            f"BRENTHY_API_CLIENT_RATE_LIMIT: {value}\n"
+            "Expected REQUESTS_PER_SECOND or REQUESTS_PER_SECOND,BURST"
+        )
+        log.error(error_message)
+        raise ValueError(error_message) from None
+    return (rate, burst)
+
+
+# the number of requests per second each application may make and how many
+# it may make at once after having been idle, None for no limit,
+# for BrenthyAPI protocols which can tell applications apart (BAP-5, BAP-6)
+CLIENT_RATE_LIMIT = _get_client_rate_limit()
+
+# maximum number of a batch request's requests to process in parallel
+BATCH_MAX_PARALLEL_HANDLERS = 8
+_batch_executor: ThreadPoolExecutor | None = None
+
+# maximum number of a streamed reply's chunks to send per reply
+STREAM_MAX_CHUNKS_PER_REPLY = 64
+# how long streamed replies are kept open without being read from
+STREAM_IDLE_TIMEOUT_S = 60
+# maximum number of streamed replies to keep open at once, as each holds
+# its blockchain type's iterator in memory until it is read or expires
+STREAM_MAX_OPEN = 256
+# after how many seconds to tell applications to retry stream requests
+# refused because STREAM_MAX_OPEN streams are open
+STREAM_BUSY_RETRY_AFTER_S = 1
+
+
+class _ReplyStream:
+    """A streamed reply being read by an application."""
+
+    def __init__(
+        self, chunks: Iterator[bytes], cancellation: "CancellationToken"
+    ):
+        self.chunks = chunks
+        self.cancellation = cancellation
+        self.lock = Lock()
+        self.last_used = time.monotonic()
+
+    def close(self) -> None:
+        """Stop the blockchain type's generator, if it is one."""
+        self.cancellation.cancel()
+        if hasattr(self.chunks, "close"):
+            self.chunks.close()
+
+
+_streams: dict[bytes, _ReplyStream] = {}
+_streams_lock = Lock()
+
+# how many of each blockchain type's most recent events to keep for
+# applications catching up on events they missed
+EVENT_REPLAY_BUFFER_SIZE = 10000
+# maximum number of events to send per reply to `get_events_since`
+EVENT_BACKFILL_MAX_EVENTS = 1000
+# Sequence numbers start from the time Brenthy Core was started at in
+# microseconds, so that they keep increasing across restarts.
+_EVENT_SEQUENCE_START = time.time_ns() // 1000
+# blockchain type -> the sequence number of its next event
+_event_sequences: dict[str, int] = {}
+# blockchain type -> its recent events: (sequence number, topic, payload)
+_event_buffers: dict[str, deque[tuple[int, str, dict]]] = {}
+_events_lock = Lock()
+
+# the maximum number of blockchain types' replies to cache, see
+# `route_request`
+REPLY_CACHE_MAX_ENTRIES = 4096
+_reply_cache = ReplyCache(max_entries=REPLY_CACHE_MAX_ENTRIES)
+# blockchain type -> number of events it has published, so that replies
+# computed before an event aren't cached after it invalidated the cache
+_reply_cache_generations: dict[str, int] = {}
+_reply_cache_lock = Lock()
+
+
+class _InFlightRequest:
+    """A blockchain request being processed for all who made it meanwhile.
+
+    See `_forward_coalesced`.
+    """
+
+    def __init__(self, cancellation: "CancellationToken", generation: int):
+        self.cancellation = cancellation
+        # the blockchain type's reply cache generation when it started
+        self.generation = generation
+        self.done = Event()
+        self.result: tuple[bool, bytes] | None = None
+        self.error: Exception | None = None
+
+
+# (blockchain type, request) -> its processing in progress
+_in_flight: dict[tuple[str, bytes], _InFlightRequest] = {}
+_in_flight_lock = Lock()
+# numbers of coalescable requests processed, and of those which instead
+# shared the processing of an identical request, requiring _in_flight_lock
+_coalescing_counts = {"executions": 0, "coalesced": 0}
+# how long requests without a deadline wait for the processing of an
+# identical request before processing it themselves, in case it hangs
+COALESCED_WAIT_TIMEOUT_S = REQUEST_TIMEOUT_S
 
+# requests are only considered expired this long after their deadline,
+# to tolerate small differences between applications' clocks and ours
+DEADLINE_GRACE_S = 1
 
+
+class RequestCancelledError(Exception):
+    """When a request handler stops processing a cancelled request."""
+
+    def __init__(self, message: str = "The request was cancelled."):
+        """Create a RequestCancelledError."""
+        Exception.__init__(self, message)
+
+
+class CancellationToken:
+    """Tells request handlers whether the application still needs a reply.
+
+    Applications give up on requests after a timeout, whose deadline
+    brenthy_api sends along with the request where the BrenthyAPI protocol
+    supports it.
+    Blockchain types' request handlers which accept a second parameter are
+    passed a CancellationToken with which they can check whether the request
+    they are processing has expired or been cancelled, so that they can
+    stop working on replies nobody will read.
+    """
+
+    def __init__(self, deadline: float | None = None):
+        """Create a CancellationToken.
+
+        Args:
+            deadline (float): the time (`time.time()`) at which the
+                application gives up on the request, None if unknown
+        """
+        self.deadline = deadline
+        self._cancelled = False
+
+    def cancel(self) -> None:
+        """Mark the request as cancelled."""
+        self._cancelled = True
+
+    def is_cancelled(self) -> bool:
+        """Check whether the request was cancelled or its deadline passed."""
+        if (
+            not self._cancelled and self.deadline is not None
+            and time.time() > self.deadline + DEADLINE_GRACE_S
+        ):
+            self._cancelled = True
+        return self._cancelled
+
+    def time_remaining(self) -> float | None:
+        """Get the number of seconds until the deadline, None if unknown."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline + DEADLINE_GRACE_S - time.time())
+
+    def raise_if_cancelled(self) -> None:
+        """Raise RequestCancelledError if the request is cancelled."""
+        if self.is_cancelled():
+            raise RequestCancelledError()
+
+
+def _accepts_cancellation(request_handler: Callable) -> bool:
+    """Check whether a request handler accepts a CancellationToken.
+
+    Request handlers accept one if they have a second parameter.
+    """
+    try:
+        return len(signature(request_handler).parameters) > 1
+    except (TypeError, ValueError):
+        return False
+
+
+# Brenthy RPC name -> (function, whether it accepts a CancellationToken)
+_brenthy_rpcs: dict[str, tuple[Callable, bool]] = {}
+
+
+def brenthy_rpc(function: Callable) -> Callable:
+    """Register a function as a Brenthy RPC, under its name.
+
+    Brenthy RPCs are passed the request's payload, and if they accept a
+    second parameter, the request's CancellationToken (which may be None),
+    and return the reply, see `brenthy_request_handler`.
+    """
+    _brenthy_rpcs[function.__name__] = (
+        function, _accepts_cancellation(function)
+    )
+    return function
+
+
+class _BlockchainRoute:
+    """How requests are forwarded to a blockchain type, see `_routes`."""
+
+    def __init__(self, api_request_handler: Callable, blockchain_module):
+        self.api_request_handler = api_request_handler
+        self.accepts_cancellation = _accepts_cancellation(api_request_handler)
+        self.api_request_cost: Callable | None = getattr(
+            blockchain_module, "api_request_cost", None
+        )
+        self.api_request_cache_ttl: Callable | None = getattr(
+            blockchain_module, "api_request_cache_ttl", None
+        )
+        self.api_request_is_pure: Callable | None = getattr(
+            blockchain_module, "api_request_is_pure", None
+        )
+        # whether the request handler accepts requests as memoryviews
+        self.zero_copy = bool(
+            getattr(blockchain_module, "api_request_zero_copy", False)
+        )
+
+
+# blockchain type -> how to forward requests to it, so that requests are
+# routed with a single lookup however many blockchain types are loaded
+_routes: dict[str, _BlockchainRoute] = {}
+
+
+def update_routing_table() -> None:
+    """Rebuild the table by which requests are routed to blockchain types.
+
+    Must be called whenever blockchain types are loaded or unloaded, which
+    blockchain_manager does.
+    Blockchain types added to blockchain_manager.blockchain_modules without
+    calling this function are added to the table on their first request.
+    """
+    global _routes  # pylint: disable=global-statement
+    routes = {}
+    for blockchain_module in blockchain_manager.blockchain_modules.values():
+        api_request_handler = getattr(
+            blockchain_module, "api_request_handler", None
+        )
+        if not api_request_handler:
+            log.error(
+                f"api_terminal.{function_name()}: blockchain type "
+                f"{blockchain_module.blockchain_type} has no "
+                "api_request_handler"
+            )
+            continue
+        routes[blockchain_module.blockchain_type] = _BlockchainRoute(
+            api_request_handler, blockchain_module
+        )
+    _routes = routes
+
+
+def _get_route(blockchain_type: str) -> _BlockchainRoute | None:
+    """Get how to forward requests to a blockchain type, None if unknown."""
+    route = _routes.get(blockchain_type)
+    if (
+        route is None
+        and blockchain_type in blockchain_manager.blockchain_modules
+    ):
+        update_routing_table()
+        route = _routes.get(blockchain_type)
+    return route
+
+
+@brenthy_rpc
 def get_brenthy_version(_: bytes) -> bytes:
     """(Brenthy RPC): Get Brenthy Core's version."""
     return json.dumps({"brenthy_core_version": BRENTHY_CORE_VERSION}).encode()
 
 
-def brenthy_request_handler(request: bytes) -> bytes:
-    """Process RPCs made to Brenthy."""
-    function = request[: request.index(bytearray([0]))].decode()
-    payload = request[request.index(bytearray([0])) + 1:]
-    if function == "get_brenthy_version":
-        return get_brenthy_version(payload)
+@brenthy_rpc
+def get_compression_stats(_: bytes) -> bytes:
+    """(Brenthy RPC): Get statistics on Brenthy Core's payload compression."""
+    return json.dumps(compression.get_stats()).encode()
+
+
+@brenthy_rpc
+def get_publisher_stats(_: bytes) -> bytes:
+    """(Brenthy RPC): Get statistics on the publishing of events.
+
+    The reply is a JSON dictionary of the statistics of each BrenthyAPI
+    protocol's publisher (see `ZmqPublisher.get_stats`), including the
+    numbers of subscriptions and of times subscribers' queues overflowed
+    because they weren't receiving events fast enough.
+    """
+    stats = {}
+    for protocol in bap_protocol_modules:
+        if not hasattr(protocol, "get_publisher_stats"):
+            continue
+        publisher_stats = protocol.get_publisher_stats()
+        if publisher_stats:
+            stats[f"BAP-{protocol.BAP_VERSION}"] = publisher_stats
+    return json.dumps(stats).encode()
+
+
+@brenthy_rpc
+def get_request_stats(_: bytes) -> bytes:
+    """(Brenthy RPC): Get statistics on the processing of requests.
+
+    The reply is a JSON dictionary of the statistics of each BrenthyAPI
+    protocol's pools of request handling threads, one for each lane (see
+    `ElasticWorkerPool.get_stats`), including the numbers of worker threads
+    and queued requests and how long requests waited for a thread.
+    """
+    # so that streams abandoned while no new ones are requested don't wait
+    # for the next stream_request to be closed
+    _close_idle_streams()
+    stats = {}
+    for protocol in bap_protocol_modules:
+        if not hasattr(protocol, "get_request_stats"):
+            continue
+        request_stats = protocol.get_request_stats()
+        if request_stats:
+            stats[f"BAP-{protocol.BAP_VERSION}"] = request_stats
+    return json.dumps(stats).encode()
+
+
+@brenthy_rpc
+def get_reply_cache_stats(_: bytes) -> bytes:
+    """(Brenthy RPC): Get statistics on the caching of blockchain replies.
+
+    The reply is a JSON dictionary of the reply cache's numbers of hits,
+    misses, evictions, invalidations and entries and its hit ratio
+    (see `ReplyCache.get_stats`).
+    """
+    return json.dumps(_reply_cache.get_stats()).encode()
+
+
+@brenthy_rpc
+def get_coalescing_stats(_: bytes) -> bytes:
+    """(Brenthy RPC): Get statistics on the coalescing of identical requests.
+
+    The reply is a JSON dictionary of the numbers of executions of
+    blockchain requests which may be coalesced, of requests which shared the
+    execution of an identical request instead of being executed themselves
+    (executions saved), and of executions in progress.
+    """
+    with _in_flight_lock:
+        return json.dumps({
+            "executions": _coalescing_counts["executions"],
+            "coalesced": _coalescing_counts["coalesced"],
+            "in_flight": len(_in_flight),
+        }).encode()
+
+
+@brenthy_rpc
+def get_events_since(payload: bytes) -> bytes:
+    """(Brenthy RPC): Get the recent events a blockchain type published.
+
+    For applications catching up on events they missed, for example while
+    they were restarting.
+    The payload is a dictionary encoded with `event_encoding.encode_value`:
+        {"blockchain_type": str, "topics": list[str], "sequence": int}
+    where topics are the full topics of the events to get (all topics if
+    empty), and sequence is that of the last event the application received.
+    The reply is a dictionary encoded the same way:
+        {"events": list[[sequence, topic, payload]], "complete": bool,
+        "more": bool}
+    where complete says whether none of the events published after the
+    given sequence number have been dropped from the replay buffer,
+    and more says whether there are more events than fit in this reply.
+    Sequence numbers we haven't reached yet, for example from before Brenthy
+    Core was restarted on a machine whose clock was set back, are reported
+    as incomplete too, as the application can't tell which events it missed.
+    """
+    request = decode_value(payload)
+    topics = set(request["topics"])
+    since = request["sequence"]
+    with _events_lock:
+        buffer = _event_buffers.get(request["blockchain_type"], deque())
+        next_sequence = _event_sequences.get(
+            request["blockchain_type"], _EVENT_SEQUENCE_START
+        )
+        first_sequence = buffer[0][0] if buffer else next_sequence
+        # sequence numbers in the buffer are consecutive
+        start = max(0, since + 1 - first_sequence)
+        events = [
+            [sequence, topic, event_payload]
+            for sequence, topic, event_payload in itertools.islice(
+                buffer, start, None
+            )
+            if not topics or topic in topics
+        ]
+    return encode_value({
+        "events": events[:EVENT_BACKFILL_MAX_EVENTS],
+        "complete": first_sequence <= since + 1 <= next_sequence,
+        "more": len(events) > EVENT_BACKFILL_MAX_EVENTS,
+    })
+
+
+@brenthy_rpc
+def batch_request(
+    payload: bytes, cancellation: CancellationToken | None = None
+) -> bytes:
+    """(Brenthy RPC): Process multiple requests to a blockchain type.
+
+    The payload is a list encoded with `encode_bytes_list` of the
+    destination blockchain type, a flag b"1" or b"0" whether or not the
+    requests may be processed in parallel, followed by the requests.
+    The reply is a list encoded with `encode_bytes_list` of the
+    replies to the requests in the same order, each of which starts with a
+    byte indicating success or failure like `request_router`'s replies.
+    Once the batch request is cancelled, its remaining requests are not
+    processed but answered with failure replies.
+    """
+    global _batch_executor  # pylint: disable=global-statement
+    blockchain_type, parallel, *requests = decode_bytes_list(payload)
+    blockchain_type = blockchain_type.decode()
+
+    def process(request: bytes) -> bytearray:
+        try:
+            return request_router(request, blockchain_type, cancellation)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            log.error(
+                f"Unhandled Exception in api_terminal.{function_name()}:\n"
+                f"{blockchain_type}\n{e}"
+            )
+            return bytearray([0]) + json.dumps({
+                "success": False,
+                "error": "Internal Brenthy error. Check Brenthy log to debug.",
+            }).encode()
+
+    # Brenthy's own requests are processed sequentially so that nested
+    # batch requests can't exhaust the batch executor's workers
+    if (
+        parallel == b"1" and len(requests) > 1
+        and blockchain_type != "Brenthy"
+    ):
+        if not _batch_executor:
+            _batch_executor = ThreadPoolExecutor(
+                max_workers=BATCH_MAX_PARALLEL_HANDLERS,
+                thread_name_prefix="api_terminal.batch_request"
+            )
+        replies = list(_batch_executor.map(process, requests))
     else:
+        replies = [process(request) for request in requests]
+    return encode_bytes_list(replies)
+
+
+@brenthy_rpc
+def stream_request(
+    payload: bytes, cancellation: CancellationToken | None = None
+) -> bytes:
+    """(Brenthy RPC): Make a request to a blockchain type, streaming its reply.
+
+    Blockchain types' request handlers can reply to requests with an
+    iterator of chunks instead of bytes, such as a generator, so that large
+    replies don't need to be held in memory all at once.
+    The reply is then read chunk by chunk, each time the application calls
+    the `stream_next` RPC, so that the application controls the flow.
+
+    The payload is a list encoded with `encode_bytes_list` of the
+    destination blockchain type, the request, and the maximum number of
+    chunks to include in the reply.
+    The reply is a list encoded with `encode_bytes_list` of the stream's ID,
+    STREAM_MORE, STREAM_END or STREAM_FAILED, followed by the first chunks
+    or, in the case of failure, the failure reply.
+    As the stream outlives this request, the blockchain type's request
+    handler is passed a CancellationToken which is only cancelled when the
+    stream is closed, not when this request's deadline passes.
+    While STREAM_MAX_OPEN streams are open, new ones are refused with a
+    BRENTHY_BUSY failure reply.
+    """
+    blockchain_type, request, n_chunks = decode_bytes_list(payload)
+    _close_idle_streams()
+    if cancellation and cancellation.is_cancelled():
+        return encode_bytes_list([b"", STREAM_FAILED, _cancelled_reply()])
+    with _streams_lock:
+        streams_full = len(_streams) >= STREAM_MAX_OPEN
+    if streams_full:
+        return encode_bytes_list([b"", STREAM_FAILED, _streams_full_reply()])
+    stream_cancellation = CancellationToken()
+    success, reply = route_request(
+        request, blockchain_type.decode(), allow_stream=True,
+        cancellation=stream_cancellation
+    )
+    if not success:
+        return encode_bytes_list([b"", STREAM_FAILED, reply])
+    if isinstance(reply, (bytes, bytearray, memoryview)):
+        # the request handler didn't stream its reply
+        return encode_bytes_list([b"", STREAM_END, reply])
+    # unguessable, so that applications can't read each other's streams
+    stream_id = os.urandom(16)
+    stream = _ReplyStream(iter(reply), stream_cancellation)
+    with _streams_lock:
+        # other streams may have been opened while the request was routed
+        streams_full = len(_streams) >= STREAM_MAX_OPEN
+        if not streams_full:
+            _streams[stream_id] = stream
+    if streams_full:
+        with stream.lock:
+            stream.close()
+        return encode_bytes_list([b"", STREAM_FAILED, _streams_full_reply()])
+    return _read_stream(stream_id, stream, int(n_chunks))
+
+
+@brenthy_rpc
+def stream_next(payload: bytes) -> bytes:
+    """(Brenthy RPC): Get the next chunks of a streamed reply.
+
+    The payload is a list encoded with `encode_bytes_list` of the stream's
+    ID and the maximum number of chunks to include in the reply.
+    The reply is formatted like stream_request's.
+    """
+    stream_id, n_chunks = decode_bytes_list(payload)
+    _close_idle_streams()
+    with _streams_lock:
+        stream = _streams.get(stream_id)
+    if not stream:
+        return encode_bytes_list([stream_id, STREAM_FAILED, json.dumps({
+            "success": False, "error": STREAM_NOT_FOUND
+        }).encode()])
+    return _read_stream(stream_id, stream, int(n_chunks))
+
+
+@brenthy_rpc
+def stream_close(payload: bytes) -> bytes:
+    """(Brenthy RPC): Stop a reply streamed by stream_request.
+
+    The payload is the stream's ID.
+    """
+    with _streams_lock:
+        stream = _streams.pop(payload, None)
+    if stream:
+        with stream.lock:
+            stream.close()
+    return json.dumps({"success": True}).encode()
+
+
+def _read_stream(
+    stream_id: bytes, stream: _ReplyStream, n_chunks: int
+) -> bytes:
+    """Get the next chunks of a streamed reply, encoded for stream_next."""
+    n_chunks = max(1, min(n_chunks, STREAM_MAX_CHUNKS_PER_REPLY))
+    with stream.lock:
+        stream.last_used = time.monotonic()
+        try:
+            chunks = list(itertools.islice(stream.chunks, n_chunks))
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            log.error(
+                f"Unhandled Exception in api_terminal.{function_name()}:\n"
+                f"{e}"
+            )
+            with _streams_lock:
+                _streams.pop(stream_id, None)
+            return encode_bytes_list([stream_id, STREAM_FAILED, json.dumps({
+                "success": False,
+                "error": "Internal Brenthy error. Check Brenthy log to debug.",
+            }).encode()])
+    if len(chunks) < n_chunks:
+        with _streams_lock:
+            _streams.pop(stream_id, None)
+        return encode_bytes_list([stream_id, STREAM_END] + chunks)
+    return encode_bytes_list([stream_id, STREAM_MORE] + chunks)
+
+
+def _streams_full_reply() -> bytes:
+    """Get the failure reply to a stream request refused for open streams."""
+    log.warning(
+        f"api_terminal.{function_name(1)}: refusing stream request, "
+        f"{STREAM_MAX_OPEN} streams are open"
+    )
+    return json.dumps({
+        "success": False,
+        "error": BRENTHY_BUSY,
+        "retry_after_s": STREAM_BUSY_RETRY_AFTER_S,
+    }).encode()
+
+
+def _close_idle_streams() -> None:
+    """Close streamed replies which haven't been read for too long."""
+    now = time.monotonic()
+    with _streams_lock:
+        idle = [
+            stream_id for stream_id, stream in _streams.items()
+            if now - stream.last_used > STREAM_IDLE_TIMEOUT_S
+        ]
+        idle_streams = [_streams.pop(stream_id) for stream_id in idle]
+    for stream in idle_streams:
+        with stream.lock:
+            stream.close()
+
+
+def brenthy_request_handler(
+    request: bytes, cancellation: CancellationToken | None = None
+) -> bytes:
+    """Process RPCs made to Brenthy.
+
+    The request consists of the name of a function registered with
+    `brenthy_rpc`, a null byte, and the payload to pass to it.
+    """
+    function_end = bytes(request[:_MAX_REQUEST_HEADER_SIZE]).index(0)
+    function = bytes(request[:function_end]).decode()
+    payload = bytes(request[function_end + 1:])
+    rpc = _brenthy_rpcs.get(function)
+    if rpc is None:
         log.warning(
             "api_terminal: Received request that was not understood: "
             + function
@@ -48,87 +685,491 @@ def brenthy_request_handler(request: bytes) -> bytes:
             + str(payload)
         )
         return json.dumps(
-            {"success": False, "error": "not understood"}
+            {"success": False, "error": NOT_UNDERSTOOD}
         ).encode()
+    rpc_function, accepts_cancellation = rpc
+    if accepts_cancellation:
+        return rpc_function(payload, cancellation)
+    return rpc_function(payload)
 
 
-def request_router(request: bytearray, blockchain_type: str) -> bytearray:
+def request_router(
+    request: bytearray | bytes | memoryview, blockchain_type: str,
+    cancellation: CancellationToken | None = None
+) -> bytearray:
     """Forward a BrenthyAPI RPC to the Brenthy or the correct blockchain.
 
     This function processes requests incoming from the apps,
     relaying them to the correct specialised task-specific handlers.
     """
+    success, reply = route_request(
+        request, blockchain_type, cancellation=cancellation
+    )
+    # bytearray([1]) signals success, bytearray([0]) failure
+    return bytearray([1 if success else 0]) + reply
+
+
+def route_request(
+    request: bytearray | bytes | memoryview, blockchain_type: str,
+    allow_stream: bool = False,
+    cancellation: CancellationToken | None = None
+) -> tuple[bool, bytes | Iterator[bytes]]:
+    """Forward a BrenthyAPI RPC to the Brenthy or the correct blockchain.
+
+    Like `request_router`, but returns the success flag separately from the
+    reply instead of prefixing the reply with it, saving copying the reply.
+
+    Args:
+        request (bytearray | bytes | memoryview): the request to forward,
+            which is only passed on as a memoryview to blockchain types
+            whose modules set `api_request_zero_copy = True`, saving
+            copying it, and converted to bytes for the others
+        blockchain_type (str): the blockchain type to forward it to
+        allow_stream (bool): whether or not to return the iterator of chunks
+            if the blockchain type's request handler streams its reply,
+            instead of joining them
+        cancellation (CancellationToken): tells whether the application
+            still needs a reply, requests that have already been cancelled
+            aren't forwarded
+    Returns:
+        tuple[bool, bytes | Iterator[bytes]]: whether or not the request was
+            processed successfully, and the reply
+    """
+    if cancellation and cancellation.is_cancelled():
+        log.info(
+            f"api_terminal: dropping expired request for {blockchain_type}."
+        )
+        return (False, _cancelled_reply())
     if blockchain_type == "Brenthy":
-        return bytearray([1]) + brenthy_request_handler(request)
-    for blockchain_module in blockchain_manager.blockchain_modules.values():
-        if blockchain_module.blockchain_type == blockchain_type:
-            reply = blockchain_module.api_request_handler(request)
-            if reply:
-                # bytearray([1]) signals success
-                return bytearray([1]) + reply
+        return (True, brenthy_request_handler(request, cancellation))
+    route = _get_route(blockchain_type)
+    if route is None:
+        return (False, json.dumps({
+            "success": False,
+            "error": UNKNOWN_BLOCKCHAIN_TYPE,
+            "blockchain_type": blockchain_type,
+        }).encode())
+    if isinstance(request, memoryview) and not route.zero_copy:
+        request = bytes(request)
+    # Blockchain types declare which of their requests are read-only and
+    # may be answered from the cache with an `api_request_cache_ttl`
+    # function in their module, which is passed the request like their
+    # request handler and returns the number of seconds for which the reply
+    # may be cached, or None if it may not.
+    # Cached replies are discarded when the blockchain type publishes an
+    # event, as its state may have changed.
+    cache_ttl = None
+    if route.api_request_cache_ttl:
+        cache_ttl = _call_route_hook(route.api_request_cache_ttl, request)
+        if cache_ttl:
+            cached_reply = _reply_cache.get(blockchain_type, request)
+            if cached_reply is not None:
+                return (True, cached_reply)
+    # Requests which may be cached, and those for which the blockchain
+    # type's `api_request_is_pure` function returns True, are coalesced.
+    if not allow_stream and (cache_ttl or (
+        route.api_request_is_pure
+        and _call_route_hook(route.api_request_is_pure, request)
+    )):
+        return _forward_coalesced(
+            route, blockchain_type, request, cancellation, cache_ttl
+        )
+    generation = _reply_cache_generations.get(blockchain_type, 0)
+    success, reply = _forward_request(
+        route, blockchain_type, request, cancellation, allow_stream
+    )
+    if cache_ttl and success:
+        _cache_reply(blockchain_type, request, reply, cache_ttl, generation)
+    return (success, reply)
+
+
+def _cache_reply(
+    blockchain_type: str,
+    request: bytearray | bytes | memoryview,
+    reply: bytes | Iterator[bytes],
+    cache_ttl: float,
+    generation: int,
+) -> None:
+    """Cache a reply computed during the given reply cache generation.
+
+    The reply isn't cached if the blockchain type has published an event
+    since the generation, as it may be stale.
+    """
+    if not isinstance(reply, (bytes, bytearray, memoryview)):
+        return
+    with _reply_cache_lock:
+        if generation == _reply_cache_generations.get(blockchain_type, 0):
+            _reply_cache.put(blockchain_type, request, reply, cache_ttl)
+
+
+def _call_route_hook(
+    hook: Callable, request: bytearray | bytes | memoryview
+) -> object:
+    """Call one of a blockchain module's optional request hooks.
+
+    Returns:
+        object: the hook's result, None if it raised an exception
+    """
+    try:
+        return hook(request)
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        log.error(f"api_terminal.{function_name()}: {e}")
+        return None
+
+
+def _forward_request(
+    route: _BlockchainRoute,
+    blockchain_type: str,
+    request: bytearray | bytes | memoryview,
+    cancellation: CancellationToken | None,
+    allow_stream: bool,
+) -> tuple[bool, bytes | Iterator[bytes]]:
+    """Pass a request to a blockchain type's request handler.
+
+    See `route_request` for the parameters and return value.
+    """
+    try:
+        reply = _call_request_handler(route, request, cancellation)
+    except RequestCancelledError:
+        return (False, _cancelled_reply())
+    if reply is not None and not isinstance(
+        reply, (bytes, bytearray, memoryview)
+    ):
+        # the request handler streamed its reply
+        if allow_stream:
+            return (True, reply)
+        reply = b"".join(reply)
+    if reply:
+        return (True, reply)
 
+    log.warning(
+        f"Blockchain type {blockchain_type} returned a null "
+        "response to a brenthy_api request."
+    )
+    return (False, json.dumps(
+        {"error": BLOCKCHAIN_RETURNED_NO_RESPONSE}
+    ).encode())
+
+
+def _forward_coalesced(
+    route: _BlockchainRoute,
+    blockchain_type: str,
+    request: bytearray | bytes | memoryview,
+    cancellation: CancellationToken | None,
+    cache_ttl: float | None,
+) -> tuple[bool, bytes]:
+    """Pass a request to a blockchain type, unless it is already processing it.
+
+    Identical requests which arrive while a request is being processed
+    wait for it to finish and get its reply, instead of being processed
+    again, so that when many applications make the same request at once,
+    for example in reaction to the same event, the blockchain type only
+    processes it once.
+    The request handler is passed a CancellationToken which is cancelled
+    only once the deadlines of all those waiting for the reply have passed.
+    Requests without a deadline wait for at most COALESCED_WAIT_TIMEOUT_S,
+    then process the request themselves, so that they don't all hang with
+    a request handler which hangs.
+    Requests only wait for the processing of identical requests which
+    started since the blockchain type last published an event, as the
+    replies of older ones may be stale, and only the request which was
+    processed caches its reply if `cache_ttl` is set.
+
+    See `route_request` for the other parameters and the return value.
+    """
+    key = (blockchain_type, bytes(request))
+    deadline = cancellation.deadline if cancellation else None
+    with _in_flight_lock:
+        generation = _reply_cache_generations.get(blockchain_type, 0)
+        in_flight = _in_flight.get(key)
+        if in_flight and in_flight.generation == generation:
+            is_executor = False
+            _coalescing_counts["coalesced"] += 1
+            shared_cancellation = in_flight.cancellation
+            if shared_cancellation.deadline is not None:
+                shared_cancellation.deadline = (
+                    None if deadline is None
+                    else max(deadline, shared_cancellation.deadline)
+                )
+        else:
+            _coalescing_counts["executions"] += 1
+            in_flight = _InFlightRequest(
+                CancellationToken(deadline), generation
+            )
+            # replaces any processing from before the last event
+            _in_flight[key] = in_flight
+            is_executor = True
+    if not is_executor:
+        time_remaining = (
+            cancellation.time_remaining() if cancellation else None
+        )
+        if time_remaining is not None:
+            if not in_flight.done.wait(time_remaining):
+                return (False, _cancelled_reply())
+        elif not in_flight.done.wait(COALESCED_WAIT_TIMEOUT_S):
             log.warning(
-                f"Blockchain type {blockchain_type} returned a null "
-                "response to a brenthy_api request."
+                f"api_terminal: {blockchain_type} has been processing an "
+                f"identical request for over {COALESCED_WAIT_TIMEOUT_S}s, "
+                "processing this one separately."
+            )
+            return _forward_request(
+                route, blockchain_type, request, cancellation, False
+            )
+        if in_flight.error:
+            raise in_flight.error
+        return in_flight.result
+
+    try:
+        in_flight.result = _forward_request(
+            route, blockchain_type, request, in_flight.cancellation, False
+        )
+        if cache_ttl and in_flight.result[0]:
+            _cache_reply(
+                blockchain_type, request, in_flight.result[1], cache_ttl,
+                generation
             )
-            # bytearray([0]) signals failure
-            return bytearray([0]) + json.dumps(
-                {"error": BLOCKCHAIN_RETURNED_NO_RESPONSE}
-            ).encode()
+        return in_flight.result
+    except Exception as error:
+        in_flight.error = error
+        raise
+    finally:
+        with _in_flight_lock:
+            if _in_flight.get(key) is in_flight:
+                del _in_flight[key]
+        in_flight.done.set()
+
+
+def _call_request_handler(
+    route: _BlockchainRoute,
+    request: bytearray | bytes | memoryview,
+    cancellation: CancellationToken | None
+) -> bytes | Iterator[bytes] | None:
+    """Call a blockchain type's request handler.
+
+    Passes it the CancellationToken if it accepts a second parameter.
+    """
+    if route.accepts_cancellation:
+        return route.api_request_handler(
+            request, cancellation or CancellationToken()
+        )
+    return route.api_request_handler(request)
+
+
+def _cancelled_reply() -> bytes:
+    """Get the failure reply to a request that was cancelled."""
+    return json.dumps({"success": False, "error": REQUEST_CANCELLED}).encode()
+
+
+def busy_reply(
+    frames: list[memoryview], retry_after_s: float
+) -> list[bytes]:
+    """Get the reply to a request refused because its client is throttled.
 
-    # bytearray([0]) signals failure
-    return bytearray([0]) + json.dumps({
+    Args:
+        frames (list[memoryview]): the request's frames, as passed to
+            `handle_multipart_request`, or the single frame passed to
+            `handle_request`
+        retry_after_s (float): after how many seconds the client may retry
+    Returns:
+        list[bytes]: the reply's frames, in the format of the replies of
+            `handle_multipart_request` or `handle_request` respectively
+    """
+    reply = json.dumps({
         "success": False,
-        "error": UNKNOWN_BLOCKCHAIN_TYPE,
-        "blockchain_type": blockchain_type,
+        "error": BRENTHY_BUSY,
+        "retry_after_s": retry_after_s,
     }).encode()
+    if len(frames) > 1:
+        return [ENCODED_CORE_VERSION, b"\x00", reply]
+    return [_FAILURE_REPLY_PREFIX + reply]
+
+
+def parse_request(
+    request: bytearray | bytes | memoryview
+) -> tuple[memoryview, str, memoryview]:
+    """Split a request in the format `handle_request` gets into its fields.
+
+    The fields' separators are found in a single pass over the start of the
+    request, and the version and payload are returned as memoryviews into
+    the request, so that the payload isn't copied.
+
+    Args:
+        request (bytearray | bytes | memoryview): the encoded brenthy_tools
+            version, the blockchain type and the payload, separated by null
+            bytes
+    Returns:
+        tuple[memoryview, str, memoryview]: the encoded version, the
+            blockchain type and the payload
+    Raises:
+        ValueError: if the separators aren't found within the
+            request's first _MAX_REQUEST_HEADER_SIZE bytes
+    """
+    view = memoryview(request)
+    header = bytes(view[:_MAX_REQUEST_HEADER_SIZE])
+    version_end = header.index(0)
+    blockchain_type_end = header.index(0, version_end + 1)
+    return (
+        view[:version_end],
+        header[version_end + 1:blockchain_type_end].decode(),
+        view[blockchain_type_end + 1:],
+    )
+
+
+def classify_request(frames: list[memoryview]) -> str:
+    """Choose the lane (FAST_LANE or SLOW_LANE) to process a request in.
+
+    Brenthy's own RPCs are processed in the fast lane, except for those in
+    SLOW_BRENTHY_FUNCTIONS.
+    Blockchain types' requests are processed in the slow lane, unless their
+    blockchain module has an `api_request_cost` function, which is passed
+    the request (as a memoryview) and returns the lane to process it in.
+    Compressed requests, which are large, are processed in the slow lane.
+
+    Args:
+        frames (list[memoryview]): the request's frames, as passed to
+            `handle_multipart_request`, or the single frame passed to
+            `handle_request`
+    Returns:
+        str: FAST_LANE or SLOW_LANE
+    """
+    try:
+        if len(frames) > 1:
+            blockchain_type = bytes(frames[1]).decode()
+            payload = frames[2]
+            if len(frames) > 3 and json.loads(bytes(frames[3])).get("codec"):
+                return SLOW_LANE
+        else:
+            _, blockchain_type, payload = parse_request(frames[0])
+
+        if blockchain_type == "Brenthy":
+            function = bytes(payload[:_MAX_REQUEST_HEADER_SIZE]).split(
+                b"\0", 1
+            )[0].decode()
+            if function in SLOW_BRENTHY_FUNCTIONS:
+                return SLOW_LANE
+            return FAST_LANE
+        route = _get_route(blockchain_type)
+        if (
+            route and route.api_request_cost
+            and route.api_request_cost(payload) == FAST_LANE
+        ):
+            return FAST_LANE
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        log.error(f"api_terminal.{function_name()}: {e}")
+    return SLOW_LANE
 
 
-def handle_request(request: bytearray) -> bytearray:
+def handle_request(request: bytearray | bytes | memoryview) -> bytes:
     """Handle RPC requests made via BrenthyAPI.
 
     Extract's encoded brenthy_tools.brenthy_api version from requests,
-    passes on the requests to request_router for processing,
+    passes on the requests to route_request for processing,
     and encode our Brenthy-Core version into the response.
+    The request is parsed without copying its payload, see `parse_request`.
     """
     # try to decapsulate request and pass it on to its destination
     try:
-        # extract brenthy_tools version
+        version, blockchain_type, payload = parse_request(request)
         brenthy_tools_version = decode_version(  # pylint: disable=unused-variable
-            request[: request.index(bytearray([0]))]
+            bytes(version)
         )
-        request = request[request.index(bytearray([0])) + 1:]
-
-        # extract blockchain type
-        blockchain_type = request[: request.index(bytearray([0]))].decode()
-        payload = request[request.index(bytearray([0])) + 1:]
-
         # forward request to its destination blockchain type or brenthy
-        reply = request_router(payload, blockchain_type)
+        success, reply = route_request(payload, blockchain_type)
 
-    except Exception as e:  # pylint: disable=broad-exception caught
+    except Exception as e:  # pylint: disable=broad-exception-caught
         log.error(
             f"Unhandled Exception in api_terminal.{function_name()}:\n"
-            f"{str(request)}\n{e}"
-        )
-        # bytearray([0]) signals failure
-        reply = (
-            bytearray([0])
-            + json.dumps({
-                "success": False,
-                "error": "Internal Brenthy error. Check Brenthy log to debug.",
-            }).encode()
+            f"{bytes(request[:100])}\n{e}"
         )
+        success = False
+        reply = json.dumps({
+            "success": False,
+            "error": "Internal Brenthy error. Check Brenthy log to debug.",
+        }).encode()
 
     # encapsulate reply in message with the Brenthy Core version
-    reply = encode_version(BRENTHY_CORE_VERSION) + bytearray([0]) + reply
-    return reply
+    if success:
+        return _SUCCESS_REPLY_PREFIX + reply
+    return _FAILURE_REPLY_PREFIX + reply
+
+
+def handle_multipart_request(frames: list[memoryview]) -> list[bytes]:
+    """Handle RPC requests made via BrenthyAPI in multiple message frames.
+
+    The equivalent of `handle_request` for BrenthyAPI protocols which
+    transmit the brenthy_tools version, blockchain type and payload as
+    separate message frames instead of concatenating them, so that they
+    don't need to be copied to be taken apart again.
+    The reply consists of the frames Brenthy-Core version,
+    success (b"\x01") or failure (b"\x00"), and the reply.
+
+    The request may include a fourth frame, a JSON-encoded header, in which
+    brenthy_api states the request's deadline, after which the request is
+    no longer processed, which codec the payload is compressed with and
+    which codecs it accepts (see brenthy_tools_beta.compression).
+    In that case, we reply with a header frame too, stating the codec we
+    compressed the reply with and which codecs we accept.
+    """
+    header: dict | None = None
+    try:
+        version, blockchain_type, payload = frames[:3]
+        # extract brenthy_tools version
+        brenthy_tools_version = decode_version(  # pylint: disable=unused-variable
+            bytes(version)
+        )
+        if len(frames) > 3:
+            header = json.loads(bytes(frames[3]))
+        cancellation = None
+        if header:
+            if header.get("deadline") is not None:
+                cancellation = CancellationToken(float(header["deadline"]))
+            if header.get("codec"):
+                payload = compression.decompress(header["codec"], payload)
+        # forward request to its destination blockchain type or brenthy
+        success, reply = route_request(
+            payload, bytes(blockchain_type).decode(),
+            cancellation=cancellation
+        )
+    except compression.DecompressedTooLargeError as e:
+        log.warning(f"api_terminal.{function_name()}: rejecting request: {e}")
+        success = False
+        reply = json.dumps(
+            {"success": False, "error": NOT_UNDERSTOOD}
+        ).encode()
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        log.error(
+            f"Unhandled Exception in api_terminal.{function_name()}:\n"
+            f"{[bytes(frame[:100]) for frame in frames]}\n{e}"
+        )
+        success = False
+        reply = json.dumps({
+            "success": False,
+            "error": "Internal Brenthy error. Check Brenthy log to debug.",
+        }).encode()
+    reply_frames = [
+        ENCODED_CORE_VERSION, b"\x01" if success else b"\x00", reply
+    ]
+    if header is not None:
+        codec, reply_frames[2] = compression.compress(
+            reply, header.get("accept_codecs", [])
+        )
+        reply_header = {"accept_codecs": compression.get_codec_names()}
+        if codec:
+            reply_header["codec"] = codec
+        reply_frames.append(json.dumps(reply_header).encode())
+    return reply_frames
 
 
 def publish_event(
     blockchain_type: str, payload: dict, topics: list[str] | None = None
 ) -> None:
-    """Publish a blockchain type's message to all subscribed applications."""
+    """Publish a blockchain type's message to all subscribed applications.
+
+    Each topic's message is stamped with the next of the blockchain type's
+    sequence numbers and kept in a replay buffer of its recent messages,
+    from which applications which missed some can get them with the
+    `get_events_since` Brenthy RPC.
+    """
     if not isinstance(blockchain_type, str):
         error_message = (
             "api_terminal.publish_event: Parameter blockchain_type must be of "
@@ -171,11 +1212,28 @@ def publish_event(
         log.error(error_message)
         raise ValueError(error_message)
 
+    # the blockchain type's state may have changed
+    with _reply_cache_lock:
+        _reply_cache_generations[blockchain_type] = (
+            _reply_cache_generations.get(blockchain_type, 0) + 1
+        )
+        _reply_cache.invalidate(blockchain_type)
+
     for topic in topics:
         data = {"topic": f"{blockchain_type}-{topic}"}
         data.update(payload)
         log.info("api_terminal.publish_event: " + f"{blockchain_type}-{topic}")
-        publish_on_all_endpoints(data)
+        # publish while holding the lock, so that events are published in
+        # the order of their sequence numbers
+        with _events_lock:
+            sequence = _event_sequences.get(
+                blockchain_type, _EVENT_SEQUENCE_START
+            )
+            _event_sequences[blockchain_type] = sequence + 1
+            _event_buffers.setdefault(
+                blockchain_type, deque(maxlen=EVENT_REPLAY_BUFFER_SIZE)
+            ).append((sequence, data["topic"], payload))
+            publish_on_all_endpoints(data, sequence)
 
 
 def load_brenthy_api_protocols() -> None:  # pylint: disable=unused-variable
@@ -211,13 +1269,22 @@ def start_listening_for_requests() -> None:
         protocol.initialise()
 
 
-def publish_on_all_endpoints(data: dict) -> None:
+def publish_on_all_endpoints(data: dict, sequence: int) -> None:
     """Publish a message using all BrenthyAPI modules."""
     for protocol in bap_protocol_modules:
-        protocol.publish(data)
+        protocol.publish(data, sequence)
 
 
 def terminate() -> None:  # pylint: disable=unused-variable
     """Shut down BrenthyAPI communications, cleaning up resources."""
+    global _batch_executor  # pylint: disable=global-statement
     for protocol in bap_protocol_modules:
         protocol.terminate()
+    with _streams_lock:
+        streams = list(_streams.values())
+        _streams.clear()
+    for stream in streams:
+        stream.close()
+    if _batch_executor:
+        _batch_executor.shutdown()
+        _batch_executor = None
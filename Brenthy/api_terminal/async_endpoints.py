@@ -0,0 +1,439 @@
+"""An asyncio-based server for BrenthyAPI's ZMQ and TCP RPC listeners.
+
+ZmqMultiRequestsReceiver and TcpMultiRequestsReceiver each run their own
+listener thread, and TcpMultiRequestsReceiver starts a thread for every
+connection.
+AsyncRequestsServer instead serves any number of ZMQ and TCP listeners from
+a single event loop thread, which watches the ZMQ sockets' file descriptors
+and serves TCP with asyncio.start_server, so that waiting for requests from
+thousands of clients costs no threads.
+Request handlers, which block, are run on the server's lanes' bounded
+ElasticWorkerPools, like those of ZmqMultiRequestsReceiver, shared by all
+its listeners, and their replies are sent from the event loop.
+
+BAP-3 and BAP-4 are served by the process-wide AsyncRequestsServer instead
+of their own receivers if the environment variable
+BRENTHY_API_ASYNCIO_SERVER is set to true.
+"""
+
+import asyncio
+import os
+from threading import Lock, Thread
+from typing import Any, Callable, Coroutine
+
+import zmq
+from brenthy_tools_beta import log
+from brenthy_tools_beta.bt_endpoints import (
+    get_zmq_address,
+    tcp_recv_counted_async,
+)
+from brenthy_tools_beta.utils import to_b255_no_0s
+
+from .bat_endpoints import (
+    DEFAULT_LANE,
+    HANDLER_IDLE_TIMEOUT_S,
+    MAX_MESSAGES_PER_POLL,
+    MAX_PARALLEL_HANDLERS,
+    MIN_PARALLEL_HANDLERS,
+    TCP_REQUEST_TIMEOUT_S,
+    classify_zmq_request,
+    process_zmq_request,
+)
+from .worker_pool import ElasticWorkerPool
+
+# pylint: disable=unused-variable
+
+ASYNCIO_SERVER_ENABLED = os.environ.get(
+    "BRENTHY_API_ASYNCIO_SERVER", ""
+).lower() in ["true", "1", "yes", "on"]
+# how many TCP connections may wait to be accepted, so that bursts of
+# clients don't have to retry connecting (limited by the OS's maximum)
+TCP_LISTEN_BACKLOG = 4096
+
+
+class AsyncListener:
+    """A ZMQ or TCP listener served by an AsyncRequestsServer."""
+
+    def __init__(
+        self,
+        server: "AsyncRequestsServer",
+        socket_address: tuple[str, int] | str,
+    ):
+        """Create an AsyncListener, which AsyncRequestsServer starts."""
+        self.server = server
+        self.socket_address = socket_address
+        # stops listening, set once the listener is started on the loop
+        self.close: Callable[[], None] | None = None
+
+    def get_stats(self) -> dict:
+        """Get the statistics of the server's lanes' worker pools.
+
+        These are shared by all of the server's listeners.
+        See ZmqMultiRequestsReceiver.get_stats.
+        """
+        return self.server.get_stats()
+
+    def terminate(self) -> None:
+        """Stop listening for requests.
+
+        Terminates the server if this was its last listener.
+        """
+        self.server.remove_listener(self)
+
+
+class AsyncRequestsServer:
+    """Serves ZMQ and TCP RPC listeners from a single event loop thread."""
+
+    def __init__(self, lanes: dict[str, tuple[int, int]] | None = None):
+        """Start the server's event loop thread.
+
+        Args:
+            lanes (dict[str, tuple[int, int]]): the names of the lanes to
+                process requests in and their minimum and maximum numbers of
+                worker threads, see ZmqMultiRequestsReceiver
+        """
+        if not lanes:
+            lanes = {
+                DEFAULT_LANE: (MIN_PARALLEL_HANDLERS, MAX_PARALLEL_HANDLERS)
+            }
+        self.worker_pools = {
+            lane: ElasticWorkerPool(
+                min_workers,
+                max_workers,
+                HANDLER_IDLE_TIMEOUT_S,
+                name=f"AsyncRequestsServer-{lane}-worker",
+            )
+            for lane, (min_workers, max_workers) in lanes.items()
+        }
+        self._default_pool = next(iter(self.worker_pools.values()))
+        self._listeners: list[AsyncListener] = []
+        self._lock = Lock()
+        self._terminate = False
+        self.zmq_context = zmq.Context()
+        # a selector event loop, as it can watch ZMQ sockets' file
+        # descriptors on all platforms
+        self.loop = asyncio.SelectorEventLoop()
+        self.loop_thread = Thread(
+            target=self.loop.run_forever, name="AsyncRequestsServer-loop"
+        )
+        self.loop_thread.start()
+
+    def listen_zmq(
+        self,
+        socket_address: tuple[str, int] | str,
+        handle_request: Callable[[bytes], bytes],
+        handle_multipart_request: (
+            Callable[[list[memoryview]], list[bytes]] | None
+        ) = None,
+        classify_request: Callable[[list[memoryview]], str] | None = None,
+    ) -> AsyncListener:
+        """Listen for RPC requests via ZMQ, like ZmqMultiRequestsReceiver.
+
+        Args:
+            socket_address (tuple[str,int] | str): IP address and port number
+                to listen on, or a ZMQ endpoint string such as `ipc://...`
+            handle_request (Callable): function which processes a request,
+                returning the reply
+            handle_multipart_request (Callable): optional function which
+                processes a request consisting of multiple frames,
+                returning the reply's frames
+            classify_request (Callable): optional function which gets a
+                request's frames after the envelope and returns the name of
+                the lane to process it in
+        Returns:
+            AsyncListener: the listener, to terminate it with
+        """
+        listener = AsyncListener(self, socket_address)
+        # created on the event loop, which it is used on
+        router_socket: zmq.Socket | None = None
+        # replies the workers have queued for the event loop to send, which
+        # they schedule sending when it is empty
+        replies: list[list] = []
+        replies_lock = Lock()
+
+        def handle_frames(frames: list[zmq.Frame]) -> None:
+            reply_frames = process_zmq_request(
+                frames, handle_request, handle_multipart_request
+            )
+            with replies_lock:
+                replies.append(reply_frames)
+                if len(replies) == 1:
+                    self._call_soon(send_replies)
+
+        def send_replies() -> None:
+            with replies_lock:
+                queued_replies = replies.copy()
+                replies.clear()
+            if router_socket.closed:
+                return
+            for reply_frames in queued_replies:
+                router_socket.send_multipart(reply_frames, copy=False)
+            # sending may have consumed the notification of new requests
+            receive_requests()
+
+        def receive_requests() -> None:
+            for _ in range(MAX_MESSAGES_PER_POLL):
+                try:
+                    frames = router_socket.recv_multipart(
+                        zmq.NOBLOCK, copy=False
+                    )
+                except zmq.Again:
+                    return
+                worker_pool = self._default_pool
+                if classify_request:
+                    worker_pool = self.worker_pools.get(
+                        classify_zmq_request(frames, classify_request),
+                        self._default_pool
+                    )
+                worker_pool.submit(handle_frames, frames)
+            # continue after giving other listeners a turn
+            self.loop.call_soon(receive_requests)
+
+        async def start() -> None:
+            nonlocal router_socket
+            router_socket = self.zmq_context.socket(zmq.ROUTER)
+            router_socket.setsockopt(zmq.LINGER, 0)
+            router_socket.bind(get_zmq_address(socket_address))
+            # ZMQ sockets' file descriptors signal that the socket's state
+            # has changed (edge-triggered), after which we receive requests
+            # until there are none left
+            socket_fd = router_socket.getsockopt(zmq.FD)
+            self.loop.add_reader(socket_fd, receive_requests)
+
+            def close() -> None:
+                self.loop.remove_reader(socket_fd)
+                router_socket.close()
+            listener.close = close
+
+        self._add_listener(listener, start())
+        return listener
+
+    def listen_tcp(
+        self,
+        socket_address: tuple[str, int],
+        handle_request: Callable[[bytes], bytes],
+        classify_request: Callable[[list[memoryview]], str] | None = None,
+    ) -> AsyncListener:
+        """Listen for RPC requests via TCP, like TcpMultiRequestsReceiver.
+
+        Args:
+            socket_address (tuple[str,int]): IP address and port number to
+                listen on
+            handle_request (Callable): function which processes a request,
+                returning the reply
+            classify_request (Callable): optional function which gets a
+                list containing the request and returns the name of the lane
+                to process it in
+        Returns:
+            AsyncListener: the listener, to terminate it with
+        """
+        listener = AsyncListener(self, socket_address)
+        connections: set[asyncio.Task] = set()
+
+        async def handle_connection(
+            reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+        ) -> None:
+            connections.add(asyncio.current_task())
+            try:
+                request = await _read_counted(reader, TCP_REQUEST_TIMEOUT_S)
+                if not request:
+                    log.warning(
+                        "API-Terminal.TCP-Listener: Received null data"
+                    )
+                    return
+                worker_pool = self._default_pool
+                if classify_request:
+                    worker_pool = self.worker_pools.get(
+                        _classify_tcp_request(request, classify_request),
+                        self._default_pool
+                    )
+                reply = await self._run_on(
+                    worker_pool, handle_request, request
+                )
+                writer.write(to_b255_no_0s(len(reply)) + bytearray([0]))
+                writer.write(reply)
+                await writer.drain()
+            except (
+                asyncio.TimeoutError,
+                asyncio.IncompleteReadError,
+                asyncio.LimitOverrunError,
+                ConnectionError,
+                ValueError,
+                MemoryError,
+            ) as e:
+                log.warning(
+                    "API-Terminal.TCP-Listener: "
+                    f"{writer.get_extra_info('peername')}: {e!r}"
+                )
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                log.error(f"API-Terminal.TCP-Listener: {e}")
+            finally:
+                writer.close()
+                connections.discard(asyncio.current_task())
+
+        async def start() -> None:
+            server = await asyncio.start_server(
+                handle_connection,
+                socket_address[0],
+                socket_address[1],
+                reuse_address=os.name != "nt",
+                backlog=TCP_LISTEN_BACKLOG,
+            )
+
+            def close() -> None:
+                server.close()
+                for connection in list(connections):
+                    connection.cancel()
+            listener.close = close
+
+        self._add_listener(listener, start())
+        return listener
+
+    def _add_listener(
+        self, listener: AsyncListener, start: Coroutine
+    ) -> None:
+        """Start a listener on the event loop and register it."""
+        with self._lock:
+            if self._terminate:
+                start.close()
+                error_message = "AsyncRequestsServer has been terminated."
+                log.error(error_message)
+                raise RuntimeError(error_message)
+            asyncio.run_coroutine_threadsafe(start, self.loop).result()
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: AsyncListener) -> None:
+        """Stop a listener, terminating the server if it was the last."""
+        with self._lock:
+            if listener not in self._listeners:
+                return
+            self._listeners.remove(listener)
+            last_listener = not self._listeners
+        asyncio.run_coroutine_threadsafe(
+            _close_listener(listener), self.loop
+        ).result()
+        if last_listener:
+            self.terminate()
+
+    async def _run_on(
+        self,
+        worker_pool: ElasticWorkerPool,
+        function: Callable,
+        *args: Any,
+    ) -> Any:
+        """Run a blocking function on a worker pool, awaiting its result."""
+        future = self.loop.create_future()
+
+        def run() -> None:
+            try:
+                result = function(*args)
+            except Exception as error:  # pylint:disable=broad-exception-caught
+                self._call_soon(_set_future_exception, future, error)
+            else:
+                self._call_soon(_set_future_result, future, result)
+        worker_pool.submit(run)
+        return await future
+
+    def _call_soon(self, callback: Callable, *args: Any) -> None:
+        """Call a function on the event loop, from a worker thread."""
+        try:
+            self.loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            # the event loop was closed while the worker was busy
+            pass
+
+    def get_stats(self) -> dict:
+        """Get each lane's numbers of worker threads, queued requests...
+
+        See ZmqMultiRequestsReceiver.get_stats.
+        """
+        return {
+            lane: worker_pool.get_stats()
+            for lane, worker_pool in self.worker_pools.items()
+        }
+
+    def terminate(self) -> None:
+        """Stop all listeners and the event loop."""
+        with self._lock:
+            if self._terminate:
+                return
+            self._terminate = True
+            listeners = self._listeners
+            self._listeners = []
+        for worker_pool in self.worker_pools.values():
+            worker_pool.terminate()
+        for listener in listeners:
+            asyncio.run_coroutine_threadsafe(
+                _close_listener(listener), self.loop
+            ).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.loop_thread.join()
+        self.loop.close()
+        self.zmq_context.term()
+
+
+async def _close_listener(listener: AsyncListener) -> None:
+    """Stop a listener, run on the event loop."""
+    if listener.close:
+        listener.close()
+
+
+def _set_future_result(future: asyncio.Future, result: Any) -> None:
+    if not future.done():
+        future.set_result(result)
+
+
+def _set_future_exception(future: asyncio.Future, error: Exception) -> None:
+    if not future.done():
+        future.set_exception(error)
+
+
+async def _read_counted(
+    reader: asyncio.StreamReader, timeout: float
+) -> bytearray:
+    """Receive a message sent with `bt_endpoints.tcp_send_counted`.
+
+    Uses `bt_endpoints.tcp_recv_counted_async`, which rejects messages
+    larger than TCP_MAX_MESSAGE_SIZE and grows its buffer as the data
+    arrives, with a single deadline for the whole message.
+
+    Args:
+        reader (asyncio.StreamReader): the connection to read from
+        timeout (float): how long receiving the whole message may take
+            before giving up
+    Returns:
+        bytearray: the received message
+    """
+    return await asyncio.wait_for(tcp_recv_counted_async(reader), timeout)
+
+
+def _classify_tcp_request(
+    request: bytearray,
+    classify_request: Callable[[list[memoryview]], str],
+) -> str | None:
+    """Get the lane to process a request received via TCP in."""
+    try:
+        return classify_request([memoryview(request)])
+    except Exception as error:  # pylint:disable=broad-exception-caught
+        log.error(f"API-Terminal: error in classify_request: {error}")
+        return None
+
+
+_server: AsyncRequestsServer | None = None
+_server_lock = Lock()
+
+
+def get_async_server(
+    lanes: dict[str, tuple[int, int]] | None = None
+) -> AsyncRequestsServer:
+    """Get the process-wide AsyncRequestsServer, starting it if necessary.
+
+    Args:
+        lanes (dict[str, tuple[int, int]]): the lanes to start the server
+            with if it isn't running yet
+    """
+    global _server  # pylint: disable=global-statement
+    with _server_lock:
+        if not _server or _server._terminate:
+            _server = AsyncRequestsServer(lanes)
+        return _server
@@ -5,101 +5,304 @@ multiple BrenthyAPI protocols on Brenthy Core's side of the communication.
 """
 
 import json
+import os
 import socket
-import time
-from threading import Thread
+import weakref
+from threading import Event, Lock, Thread
 from typing import Callable
 
 import zmq
 from brenthy_tools_beta import log
-from brenthy_tools_beta.utils import from_b255_no_0s, to_b255_no_0s
-from time import sleep
+from brenthy_tools_beta.bt_endpoints import (
+    get_zmq_address,
+    tcp_recv_counted,
+    tcp_send_counted,
+)
+
+from .rate_limiter import ClientRateLimiter
+from .worker_pool import (
+    ElasticWorkerPool,
+    get_idle_timeout_from_env,
+    get_pool_size_from_env,
+)
+
 BUFFER_SIZE = 4096  # the communication buffer size
+# how long a TCP connection has to send its whole request after it was
+# accepted
+TCP_REQUEST_TIMEOUT_S = 5
 
 TERMINATTION_CODE = b"close"
+# default maximum number of messages publishers queue for each subscriber,
+# above which further messages are dropped for that subscriber
+PUB_SNDHWM = 10000
+# how often publishers process the (un)subscriptions their XPUB sockets have
+# queued if they haven't published anything meanwhile
+SUBSCRIPTIONS_DRAIN_INTERVAL_S = 10
+
+# the default numbers of threads ZmqMultiRequestsReceivers process requests
+# on: they keep the minimum when idle, and start more when requests are
+# waiting for one, up to the maximum,
+# set with BRENTHY_API_PARALLEL_HANDLERS=MIN,MAX
+MIN_PARALLEL_HANDLERS, MAX_PARALLEL_HANDLERS = get_pool_size_from_env(
+    "BRENTHY_API_PARALLEL_HANDLERS", (2, 64)
+)
+# how long threads beyond the minimum wait for requests before stopping,
+# set with BRENTHY_API_HANDLER_IDLE_TIMEOUT_S
+HANDLER_IDLE_TIMEOUT_S = get_idle_timeout_from_env(
+    "BRENTHY_API_HANDLER_IDLE_TIMEOUT_S", 30
+)
+# the name of ZmqMultiRequestsReceivers' lane when they aren't given lanes
+DEFAULT_LANE = "default"
+# how many requests a listener thread receives before sending replies again
+MAX_MESSAGES_PER_POLL = 100
 
 # keep track of contexts to avoid problems caused by garbage collector
 CONTEXTS = []
 
 
 class ZmqMultiRequestsReceiver:
-    """Listen for RPC requests and respond with replies via ZMQ."""
+    """Listen for RPC requests and respond with replies via ZMQ.
+
+    Serves both REQ clients and DEALER clients which multiplex requests,
+    by returning all the frames preceding the request (the envelope)
+    unchanged together with the reply.
+
+    If `handle_multipart_request` is provided, requests consisting of
+    multiple frames after the envelope's empty delimiter frame are passed to
+    it without being copied, and the list of frames it returns is sent as the
+    reply, also without being copied.
+
+    Requests are processed on an ElasticWorkerPool, which starts more threads
+    when requests are waiting for one and stops them again when idle.
+    If `lanes` and `classify_request` are provided, each lane has its own
+    pool, and `classify_request` chooses the lane for each request, so that
+    requests in one lane don't have to wait for the threads of another lane
+    to become available.
+    The pools take turns between clients, identified by the ROUTER socket's
+    routing identity, so that a client with many queued requests can't
+    hold up other clients' requests.
+    If `client_rate_limit` and `make_busy_reply` are provided, each client
+    may make at most the given number of requests per second (see
+    ClientRateLimiter), and further requests are answered immediately with
+    the reply `make_busy_reply` builds, which tells the client when to
+    retry, instead of being queued.
+    A listener thread receives requests on the ROUTER socket and passes them
+    to the pool, and sends the replies the workers queue for it, as ZMQ
+    sockets mustn't be used by multiple threads.
+    """
 
     def __init__(
         self,
-        socket_address: tuple[str, int],
+        socket_address: tuple[str, int] | str,
         handle_request: Callable[[bytes], bytes],
-        max_parallel_handlers: int = 20
+        max_parallel_handlers: int | None = None,
+        handle_multipart_request: (
+            Callable[[list[memoryview]], list[bytes]] | None
+        ) = None,
+        min_parallel_handlers: int | None = None,
+        lanes: dict[str, tuple[int, int]] | None = None,
+        classify_request: (
+            Callable[[list[memoryview]], str] | None
+        ) = None,
+        client_rate_limit: tuple[float, float] | None = None,
+        make_busy_reply: (
+            Callable[[list[memoryview], float], list[bytes]] | None
+        ) = None,
     ):
-        """Listen to incoming RPC requests using the ZMQ protocol."""
+        """Listen to incoming RPC requests using the ZMQ protocol.
+
+        Args:
+            socket_address (tuple[str,int] | str): IP address and port number
+                to listen on, or a ZMQ endpoint string such as `ipc://...`
+            handle_request (Callable): function which processes a request,
+                returning the reply
+            max_parallel_handlers (int): maximum number of worker threads,
+                None to use MAX_PARALLEL_HANDLERS
+            handle_multipart_request (Callable): optional function which
+                processes a request consisting of multiple frames,
+                returning the reply's frames
+            min_parallel_handlers (int): number of worker threads to keep
+                when idle, None to use MIN_PARALLEL_HANDLERS
+            lanes (dict[str, tuple[int, int]]): the names of the lanes to
+                process requests in and their minimum and maximum numbers of
+                worker threads, which replace min_parallel_handlers and
+                max_parallel_handlers. By default there is a single lane,
+                DEFAULT_LANE.
+            classify_request (Callable): function which gets a request's
+                frames after the envelope and returns the name of the lane
+                to process it in, called on the listener thread so it must
+                be fast. Requests are processed in the first lane if it
+                returns an unknown lane.
+            client_rate_limit (tuple[float, float]): the number of requests
+                per second each client may make and how many it may make
+                at once after having been idle, None for no limit
+            make_busy_reply (Callable): function which gets a refused
+                request's frames after the envelope and the number of
+                seconds after which the client may retry, and returns the
+                reply's frames, required for client_rate_limit
+        """
+        if max_parallel_handlers is None:
+            max_parallel_handlers = MAX_PARALLEL_HANDLERS
+        if min_parallel_handlers is None:
+            min_parallel_handlers = min(
+                MIN_PARALLEL_HANDLERS, max_parallel_handlers
+            )
         self.zmq_context = zmq.Context()
         CONTEXTS.append(self.zmq_context)
         self.socket_address = socket_address
         self.handle_request = handle_request
+        self.handle_multipart_request = handle_multipart_request
         self.max_parallel_handlers = max_parallel_handlers
+        self.classify_request = classify_request
         self._terminate = False
-        self.dealer_socket: None | zmq.Socket = None
+        if not lanes:
+            lanes = {
+                DEFAULT_LANE: (min_parallel_handlers, max_parallel_handlers)
+            }
+        self.worker_pools = {
+            lane: ElasticWorkerPool(
+                min_workers,
+                max_workers,
+                HANDLER_IDLE_TIMEOUT_S,
+                name=f"ZmqMultiRequestsReceiver-{lane}-worker",
+            )
+            for lane, (min_workers, max_workers) in lanes.items()
+        }
+        self._default_pool = next(iter(self.worker_pools.values()))
+        self.make_busy_reply = make_busy_reply
+        self.rate_limiter: ClientRateLimiter | None = None
+        if client_rate_limit:
+            if not make_busy_reply:
+                error_message = (
+                    "ZmqMultiRequestsReceiver: make_busy_reply is required "
+                    "for client_rate_limit"
+                )
+                log.error(error_message)
+                raise ValueError(error_message)
+            self.rate_limiter = ClientRateLimiter(*client_rate_limit)
         self.router_socket: None | zmq.Socket = None
+        # replies the workers have queued for the listener thread to send,
+        # which they wake it up for via an inproc socket when it is empty
+        self._replies: list[list] = []
+        self._replies_lock = Lock()
+        wakeup_address = f"inproc://wakeup-{id(self)}"
+        self.wakeup_socket = self.zmq_context.socket(zmq.PULL)
+        self.wakeup_socket.bind(wakeup_address)
+        self._wakeup_sender = self.zmq_context.socket(zmq.PUSH)
+        self._wakeup_sender.connect(wakeup_address)
         self.listener_thread = Thread(
             target=self._listen, args=(),
             name="ZmqMultiRequestsReceiver-listener"
         )
         self.listener_thread.start()
-        self.workers: list[Thread] = []
-        self._start_workers()
-
-    def _start_workers(self) -> None:
-        """Start worker threads which will handle requests."""
-        for i in range(self.max_parallel_handlers):
-            worker = Thread(
-                target=self._worker_routine, args=(), daemon=True,
-                name=f"ZmqMultiRequestsReceiver-worker-{i}"
-            )
-            worker.start()
-            self.workers.append(worker)
 
     def _listen(self) -> None:
         try:
-
-            # log.debug("ZMQ creating router and dealer sockets...")
+            # log.debug("ZMQ creating router socket...")
             self.router_socket = self.zmq_context.socket(zmq.ROUTER)
-            self.router_socket.bind(
-                f"tcp://{self.socket_address[0]}:{self.socket_address[1]}"
-            )
-
-            self.dealer_socket = self.zmq_context.socket(zmq.DEALER)
-            self.dealer_socket.bind("inproc://workers")
-
-            # log.debug("ZMQ creating proxy...")
-            zmq.proxy(self.router_socket, self.dealer_socket)
-            # log.debug("ZMQ created proxy!")
+            self.router_socket.bind(get_zmq_address(self.socket_address))
 
+            poller = zmq.Poller()
+            poller.register(self.router_socket, zmq.POLLIN)
+            poller.register(self.wakeup_socket, zmq.POLLIN)
+            while not self._terminate:
+                events = dict(poller.poll())
+                if self.wakeup_socket in events:
+                    self.wakeup_socket.recv()
+                    self._send_replies()
+                if self.router_socket in events:
+                    self._receive_requests()
         except Exception as error:
             if not self._terminate:
                 log.error(str(error))
         finally:
-            # log.debug("ZMQ closing rouet & dealer sockets...")
+            # log.debug("ZMQ closing router & wakeup sockets...")
             if self.router_socket:
                 self.router_socket.close()
-            if self.dealer_socket:
-                self.dealer_socket.close()
-
-    def _worker_routine(self) -> None:
-        """Worker thread routine to handle requests."""
-        worker_socket = self.zmq_context.socket(zmq.DEALER)
-        worker_socket.connect("inproc://workers")
-
-        while not self._terminate:
-            identity, _, request = worker_socket.recv_multipart()
-            if request == TERMINATTION_CODE:
-                self._terminate = True
-            if self._terminate:
-                worker_socket.close()
+            self.wakeup_socket.close()
+
+    def _send_replies(self) -> None:
+        """Send the replies the workers have queued."""
+        with self._replies_lock:
+            replies = self._replies
+            self._replies = []
+        for reply_frames in replies:
+            self.router_socket.send_multipart(reply_frames, copy=False)
+
+    def _receive_requests(self) -> None:
+        """Pass the requests received on the ROUTER socket to the workers."""
+        # handle all requests that have arrived before polling again
+        for _ in range(MAX_MESSAGES_PER_POLL):
+            try:
+                frames = self.router_socket.recv_multipart(
+                    zmq.NOBLOCK, copy=False
+                )
+            except zmq.Again:
                 return
-            # log.debug("ZMQ worker processing request...")
-            reply = self.handle_request(request)
-            # log.debug("ZMQ worker sending reply...")
-            worker_socket.send_multipart([identity, b"", reply])
+            # the routing identity, which ROUTER sockets prepend
+            client = frames[0].bytes
+            if self.rate_limiter:
+                retry_after_s = self.rate_limiter.acquire(client)
+                if retry_after_s:
+                    self.router_socket.send_multipart(
+                        reject_zmq_request(
+                            frames, retry_after_s, self.make_busy_reply,
+                            bool(self.handle_multipart_request)
+                        ),
+                        copy=False
+                    )
+                    continue
+            worker_pool = self._default_pool
+            if self.classify_request:
+                worker_pool = self._choose_worker_pool(frames)
+            worker_pool.submit(self._process_request, frames, key=client)
+
+    def _choose_worker_pool(
+        self, frames: list[zmq.Frame]
+    ) -> ElasticWorkerPool:
+        """Get the worker pool of the lane to process a request in."""
+        lane = classify_zmq_request(frames, self.classify_request)
+        return self.worker_pools.get(lane, self._default_pool)
+
+    def _process_request(self, frames: list[zmq.Frame]) -> None:
+        """Process a request, run by the worker threads."""
+        if self._terminate:
+            return
+        # log.debug("ZMQ worker processing request...")
+        reply_frames = process_zmq_request(
+            frames, self.handle_request, self.handle_multipart_request
+        )
+        # log.debug("ZMQ worker sending reply...")
+        self._queue_reply(reply_frames)
+
+    def _queue_reply(self, frames: list) -> None:
+        """Queue a reply for the listener thread to send."""
+        with self._replies_lock:
+            self._replies.append(frames)
+            if len(self._replies) == 1:
+                self._wake_listener()
+
+    def _wake_listener(self) -> None:
+        """Wake up the listener thread. Requires self._replies_lock."""
+        if not self._wakeup_sender.closed:
+            self._wakeup_sender.send(b"")
+
+    def get_stats(self) -> dict:
+        """Get each lane's numbers of worker threads, queued requests...
+
+        Returns:
+            dict: the statistics of each lane's pool, by lane name, see
+                ElasticWorkerPool.get_stats, and if clients are rate
+                limited, those of the rate limiter under "rate_limit", see
+                ClientRateLimiter.get_stats
+        """
+        stats = {
+            lane: worker_pool.get_stats()
+            for lane, worker_pool in self.worker_pools.items()
+        }
+        if self.rate_limiter:
+            stats["rate_limit"] = self.rate_limiter.get_stats()
+        return stats
 
     def terminate(self) -> None:
         """Stop listening for requests and clean up resources."""
@@ -107,34 +310,14 @@ class ZmqMultiRequestsReceiver:
             return
         try:
             # log.debug("ZMQ shutting down ZmqMultiRequestsReceiver...")
-            # if not self.listener_thread.is_alive():
-            #     log.debug("ZMQ socket must already be shut down.")
-            #
-            #     return
             self._terminate = True
-            # log.debug("Waiting for workers to stop...")
-            while True:
-                all_workers_stopped = True
-                for worker in self.workers:
-                    if worker.is_alive():
-                        all_workers_stopped = False
-                        break
-                if all_workers_stopped:
-                    break
-                sock = self.zmq_context.socket(zmq.REQ)
-                sock.setsockopt(zmq.LINGER, 1)
-
-                sock.connect(
-                    f"tcp://{self.socket_address[0]}:{self.socket_address[1]}"
-                )
-                sock.send("close".encode())
-                sock.close()
-                sleep(0.1)
-            if self.router_socket:
-                self.router_socket.close()
-            if self.dealer_socket:
-                self.dealer_socket.close()
+            for worker_pool in self.worker_pools.values():
+                worker_pool.terminate()
+            with self._replies_lock:
+                self._wake_listener()
             self.listener_thread.join()
+            with self._replies_lock:
+                self._wakeup_sender.close()
         except Exception as error:
             log.error(
                 "error in API-Terminal.ZMQ-ZmqRequestsReceiver.terminate(): "
@@ -148,6 +331,97 @@ class ZmqMultiRequestsReceiver:
         self.terminate()
 
 
+def classify_zmq_request(
+    frames: list[zmq.Frame],
+    classify_request: Callable[[list[memoryview]], str],
+) -> str | None:
+    """Get the lane to process a request received by a ROUTER socket in.
+
+    Args:
+        frames (list[zmq.Frame]): the request, including its envelope
+        classify_request (Callable): function which gets the request's
+            frames after the envelope and returns the lane's name
+    Returns:
+        str | None: the lane's name, None if classify_request failed
+    """
+    _, request_frames = _split_envelope(frames)
+    try:
+        return classify_request([frame.buffer for frame in request_frames])
+    except Exception as error:  # pylint:disable=broad-exception-caught
+        log.error(f"API-Terminal: error in classify_request: {error}")
+        return None
+
+
+def process_zmq_request(
+    frames: list[zmq.Frame],
+    handle_request: Callable[[bytes], bytes],
+    handle_multipart_request: (
+        Callable[[list[memoryview]], list[bytes]] | None
+    ),
+) -> list:
+    """Process a request received by a ROUTER socket, getting the reply.
+
+    See ZmqMultiRequestsReceiver for how the request is passed to
+    handle_request or handle_multipart_request.
+
+    Returns:
+        list: the reply's frames, preceded by the request's envelope
+    """
+    # the envelope consists of the routing frames, i.e. the client's
+    # identity, followed by any frames the client sent before the
+    # empty delimiter frame, such as correlation IDs
+    envelope, request_frames = _split_envelope(frames)
+    if len(request_frames) > 1 and handle_multipart_request:
+        reply_frames = handle_multipart_request(
+            [frame.buffer for frame in request_frames]
+        )
+    else:
+        reply_frames = [handle_request(frames[-1].bytes)]
+        envelope = frames[:-1]
+    return envelope + reply_frames
+
+
+def reject_zmq_request(
+    frames: list[zmq.Frame],
+    retry_after_s: float,
+    make_busy_reply: Callable[[list[memoryview], float], list[bytes]],
+    multipart_supported: bool,
+) -> list:
+    """Get the reply to a request received by a ROUTER socket we refuse.
+
+    Args:
+        frames (list[zmq.Frame]): the request, including its envelope
+        retry_after_s (float): after how many seconds the client may retry
+        make_busy_reply (Callable): function which gets the request's frames
+            after the envelope and retry_after_s and returns the reply's
+            frames
+        multipart_supported (bool): whether requests consisting of multiple
+            frames are processed as such, see process_zmq_request
+    Returns:
+        list: the reply's frames, preceded by the request's envelope
+    """
+    envelope, request_frames = _split_envelope(frames)
+    if not (len(request_frames) > 1 and multipart_supported):
+        request_frames = frames[-1:]
+        envelope = frames[:-1]
+    return envelope + make_busy_reply(
+        [frame.buffer for frame in request_frames], retry_after_s
+    )
+
+
+def _split_envelope(frames: list) -> tuple[list, list]:
+    """Split a message received by a ROUTER socket into envelope & request.
+
+    Returns:
+        tuple[list, list]: the frames up to & including the first empty
+            (delimiter) frame, and the frames after it
+    """
+    for i, frame in enumerate(frames):
+        if not len(frame):
+            return frames[:i + 1], frames[i + 1:]
+    return frames[:-1], frames[-1:]
+
+
 class TcpMultiRequestsReceiver:
     """Listen for RPC requests and respond with replies via plain TCP."""
 
@@ -166,6 +440,13 @@ class TcpMultiRequestsReceiver:
     def _listen(self) -> None:
         try:
             tcp_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            # allow restarting without waiting for connections from the last
+            # run to leave the TIME_WAIT state (on Windows, SO_REUSEADDR
+            # would allow binding ports that are in use)
+            if os.name != "nt":
+                tcp_socket.setsockopt(
+                    socket.SOL_SOCKET, socket.SO_REUSEADDR, 1
+                )
             tcp_socket.bind((self.socket_address[0], self.socket_address[1]))
             tcp_socket.listen()
             while not self._terminate:
@@ -183,15 +464,21 @@ class TcpMultiRequestsReceiver:
         self, conn: socket.socket, addr: tuple[str, int]
     ) -> None:
         """Handle a freshly accepted TCP connection."""
-        request = _tcp_recv_counted(conn)
-        if request == TERMINATTION_CODE:
-            conn.close()
-            return
-        if request:
-            reply = self.handle_request(request)
-            _tcp_send_counted(conn, reply)
-        else:
-            log.warning("API-Terminal.TCP-Listener: Received null data")
+        try:
+            request = tcp_recv_counted(conn, timeout=TCP_REQUEST_TIMEOUT_S)
+            if request == TERMINATTION_CODE:
+                return
+            if request:
+                reply = self.handle_request(request)
+                tcp_send_counted(conn, reply)
+            else:
+                log.warning("API-Terminal.TCP-Listener: Received null data")
+        except (
+            TimeoutError, ConnectionError, ValueError, OverflowError,
+            MemoryError
+        ) as e:
+            log.warning(f"API-Terminal.TCP-Listener: {addr}: {e!r}")
+        finally:
             conn.close()
 
     def terminate(self) -> None:
@@ -202,7 +489,7 @@ class TcpMultiRequestsReceiver:
             self._terminate = True
             sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             sock.connect(self.socket_address)
-            _tcp_send_counted(sock, "close".encode())
+            tcp_send_counted(sock, "close".encode())
 
             sock.close()
             self.listener_thread.join()
@@ -218,91 +505,218 @@ class TcpMultiRequestsReceiver:
 
 
 class ZmqPublisher:
-    """Class for publishing data on a Publish-Subscribe socket."""
+    """Class for publishing data on a Publish-Subscribe socket.
+
+    Uses an XPUB socket, which works like a PUB socket but also receives its
+    subscribers' subscriptions, so that it can report how many subscribers
+    each topic has.
+    When a subscriber doesn't receive messages as fast as they are published,
+    its queue fills up to the send high-water mark (`sndhwm`), after which
+    further messages are dropped for it until it has caught up.
+    ZMQ doesn't tell how many messages it drops for which subscriber, but
+    ZmqPublisher counts for each topic how often a subscriber's queue
+    overflowed when publishing one of its messages, see `get_stats`.
+
+    A conflating publisher instead keeps only the latest message for each
+    subscriber, for publications of which only the latest matters.
+    ZMQ only supports conflation on PUB sockets and for messages consisting
+    of a single frame, so conflating publishers can't count subscribers or
+    dropped messages, and can't publish multipart messages.
+    """
 
-    def __init__(self, address: tuple[str, int]):
-        """Create an object for publishing data on a pubsub socket."""
+    def __init__(
+        self,
+        address: tuple[str, int] | str,
+        sndhwm: int = PUB_SNDHWM,
+        conflate: bool = False,
+    ):
+        """Create an object for publishing data on a pubsub socket.
+
+        Args:
+            address (tuple[str,int] | str): IP address and port number to
+                publish on, or a ZMQ endpoint string such as `ipc://...`
+            sndhwm (int): the maximum number of messages to queue for each
+                subscriber
+            conflate (bool): whether to keep only the latest message for
+                each subscriber
+        """
         self._terminated = False
+        self._lock = Lock()
+        self._stop_draining = Event()
         self.zmq_context = zmq.Context()
         CONTEXTS.append(self.zmq_context)
         self.address = address
-        self.pub_socket = self.zmq_context.socket(zmq.PUB)
+        self.sndhwm = sndhwm
+        self.conflate = conflate
+        # topic -> [number of messages published, number of overflows]
+        self._topic_counts: dict[str, list[int]] = {}
+        # subscribed prefix -> number of subscriptions to it
+        self._subscriptions: dict[bytes, int] = {}
+        if conflate:
+            self.pub_socket = self.zmq_context.socket(zmq.PUB)
+            self.pub_socket.setsockopt(zmq.CONFLATE, 1)
+        else:
+            self.pub_socket = self.zmq_context.socket(zmq.XPUB)
+            # receive all (un)subscriptions, to count subscribers per prefix
+            self.pub_socket.setsockopt(zmq.XPUB_VERBOSER, 1)
+            # refuse to send messages for which a subscriber's queue is full
+            # instead of silently dropping them, so that we can count them
+            self.pub_socket.setsockopt(zmq.XPUB_NODROP, 1)
+        self.pub_socket.setsockopt(zmq.SNDHWM, sndhwm)
         self.pub_socket.setsockopt(zmq.LINGER, 1)
 
         # Binds the socket to a predefined port on localhost
-        self.pub_socket.bind(f"tcp://{self.address[0]}:{self.address[1]}")
+        self.pub_socket.bind(get_zmq_address(self.address))
+
+        if not conflate:
+            # referencing self weakly, so that it can still be deleted
+            Thread(
+                target=self._drain_subscriptions,
+                args=(
+                    weakref.ref(self), self._stop_draining,
+                    SUBSCRIPTIONS_DRAIN_INTERVAL_S,
+                ),
+                name="API-Terminal.ZmqPublisher-subscriptions",
+                daemon=True,
+            ).start()
 
     def publish(self, data: dict) -> None:
         """Publish data on a Publish-Subscribe socket."""
-        if self._terminated:
-            log.error(
-                "Can't publish message as this ZmqPublisher has been "
-                "terminated."
+        self._send([json.dumps(data).encode()], data.get("topic", ""))
+
+    def publish_multipart(self, frames: list[bytes]) -> None:
+        """Publish a message consisting of multiple frames.
+
+        The first frame is counted as the message's topic.
+        """
+        if self.conflate:
+            error_message = (
+                "ZmqPublisher: conflating publishers can't publish "
+                "multipart messages."
             )
-            return
-        self.pub_socket.send_string(json.dumps(data))
+            log.error(error_message)
+            raise ValueError(error_message)
+        self._send(frames, bytes(frames[0]).decode(errors="replace"))
+
+    def _send(self, frames: list[bytes], topic: str) -> None:
+        """Send a message, counting whether a subscriber's queue was full.
+
+        Args:
+            frames (list[bytes]): the message's frames
+            topic (str): the topic under which to count the message
+        """
+        with self._lock:
+            if self._terminated:
+                log.error(
+                    "Can't publish message as this ZmqPublisher has been "
+                    "terminated."
+                )
+                return
+            counts = self._topic_counts.setdefault(topic, [0, 0])
+            counts[0] += 1
+            if self.conflate:
+                self.pub_socket.send_multipart(frames)
+                return
+            self._process_subscriptions()
+            try:
+                self.pub_socket.send_multipart(frames, flags=zmq.NOBLOCK)
+            except zmq.Again:
+                # a subscriber's queue is full: send the message to the
+                # other subscribers, dropping it and, until it has caught up,
+                # further messages for that one
+                counts[1] += 1
+                self.pub_socket.setsockopt(zmq.XPUB_NODROP, 0)
+                self.pub_socket.send_multipart(frames)
+                self.pub_socket.setsockopt(zmq.XPUB_NODROP, 1)
+
+    def _process_subscriptions(self) -> None:
+        """Count the (un)subscriptions received since the last call.
+
+        XPUB sockets queue received (un)subscriptions without limit, so they
+        are processed whenever a message is published, when the statistics
+        are read, and every SUBSCRIPTIONS_DRAIN_INTERVAL_S in between.
+        Requires self._lock.
+        """
+        while True:
+            try:
+                message = self.pub_socket.recv(flags=zmq.NOBLOCK)
+            except zmq.Again:
+                return
+            # the first byte is 1 for subscriptions, 0 for unsubscriptions
+            prefix = message[1:]
+            count = self._subscriptions.get(prefix, 0)
+            count += 1 if message[:1] == b"\x01" else -1
+            if count > 0:
+                self._subscriptions[prefix] = count
+            else:
+                self._subscriptions.pop(prefix, None)
+
+    @staticmethod
+    def _drain_subscriptions(
+        publisher_ref: "weakref.ref[ZmqPublisher]",
+        stop: Event,
+        interval_s: float,
+    ) -> None:
+        """Process a publisher's (un)subscriptions periodically until stopped.
+
+        Run on its own thread, which only references the publisher weakly.
+        """
+        while not stop.wait(interval_s):
+            publisher = publisher_ref()
+            if not publisher:
+                return
+            with publisher._lock:
+                if publisher._terminated:
+                    return
+                publisher._process_subscriptions()
+            del publisher
+
+    def get_stats(self) -> dict:
+        """Get the numbers of subscriptions, messages and queue overflows.
+
+        Returns:
+            dict: for example: {"address": "tcp://127.94.21.1:29202",
+                "sndhwm": 10000, "conflate": False, "published": 1500,
+                "overflows": 2, "subscriptions": {"Walytis_Beta-NewBlocks": 2},
+                "topics": {"Walytis_Beta-NewBlocks":
+                {"published": 1500, "overflows": 2}}}
+                where overflows counts how often a subscriber's queue was
+                full, after which it missed messages until it caught up
+        """
+        with self._lock:
+            if not self.conflate and not self._terminated:
+                self._process_subscriptions()
+            return {
+                "address": get_zmq_address(self.address),
+                "sndhwm": self.sndhwm,
+                "conflate": self.conflate,
+                "published": sum(
+                    counts[0] for counts in self._topic_counts.values()
+                ),
+                "overflows": sum(
+                    counts[1] for counts in self._topic_counts.values()
+                ),
+                "subscriptions": {
+                    prefix.decode(errors="replace"): count
+                    for prefix, count in self._subscriptions.items()
+                },
+                "topics": {
+                    topic: {"published": published, "overflows": overflows}
+                    for topic, (published, overflows)
+                    in self._topic_counts.items()
+                },
+            }
 
     def terminate(self) -> None:
         """Clean up resources."""
-        if not self._terminated:
-            # log.debug("Shutting down ZMQ resources.")
-            self.pub_socket.close()
-            self.zmq_context.term()
-            self._terminated = True
+        with self._lock:
+            if not self._terminated:
+                # log.debug("Shutting down ZMQ resources.")
+                self._stop_draining.set()
+                self.pub_socket.close()
+                self.zmq_context.term()
+                self._terminated = True
 
     def __del__(self):
         """Clean up resources."""
         self.terminate()
-
-
-def _tcp_recv_counted(sock: socket.socket, timeout: int = 5) -> bytes:
-    # make socket non blocking
-    sock.setblocking(False)
-
-    # total data partwise in an array
-    total_data = bytes()
-    data = bytes()
-    length = 0
-    # beginning time
-    begin = time.time()
-    while True:
-        # if you got some data, then break after timeout
-        if len(total_data) > 0 and time.time() - begin > timeout:
-            break
-
-        # if you got no data at all, wait a little longer, twice the timeout
-        elif time.time() - begin > timeout * 2:
-            break
-
-        # recv something
-        try:
-            data = sock.recv(BUFFER_SIZE)
-            if data:
-                if not length:
-                    if data.index(0):
-                        total_data += data[: data.index(0)]
-                        length = from_b255_no_0s(total_data)
-                        total_data = data[data.index(0) + 1:]
-                    else:
-                        total_data += data
-                else:
-                    total_data += data
-
-                if length:
-                    if len(total_data) == length:
-                        return total_data
-                    if len(total_data) > length:
-                        raise OverflowError(
-                            "Received more data than expected!"
-                        )
-                    # change the beginning time for measurement
-                    begin = time.time()
-        except:
-            pass
-    return total_data
-
-
-def _tcp_send_counted(sock: socket.socket, data: bytearray | bytes) -> None:
-    length = len(data)
-    sock.send(to_b255_no_0s(length) + bytearray([0]))
-    sock.send(data)
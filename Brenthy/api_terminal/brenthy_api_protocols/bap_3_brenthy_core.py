@@ -7,6 +7,11 @@ This module's counterpart, which contain's brenthy tool's machinery, is at
 """
 
 import api_terminal
+from api_terminal.async_endpoints import (
+    ASYNCIO_SERVER_ENABLED,
+    AsyncListener,
+    get_async_server,
+)
 from api_terminal.bat_endpoints import TcpMultiRequestsReceiver
 from brenthy_tools_beta.brenthy_api_addresses import (
     BRENTHY_API_IP_LISTEN_ADDRESS, BAP_3_RPC_PORT,
@@ -16,17 +21,24 @@ from brenthy_tools_beta import log
 BAP_VERSION = 3  # pylint: disable=unused-variable
 
 
-tcp_listener: TcpMultiRequestsReceiver | None = None
+tcp_listener: TcpMultiRequestsReceiver | AsyncListener | None = None
 
 
 def initialise() -> None:  # pylint: disable=unused-variable
     """Start listening for RPC requests."""
     global tcp_listener  # pylint: disable=global-statement
 
-    tcp_listener = TcpMultiRequestsReceiver(
-        (BRENTHY_API_IP_LISTEN_ADDRESS, BAP_3_RPC_PORT),
-        api_terminal.handle_request,
-    )
+    if ASYNCIO_SERVER_ENABLED:
+        tcp_listener = get_async_server(api_terminal.REQUEST_LANES).listen_tcp(
+            (BRENTHY_API_IP_LISTEN_ADDRESS, BAP_3_RPC_PORT),
+            api_terminal.handle_request,
+            classify_request=api_terminal.classify_request,
+        )
+    else:
+        tcp_listener = TcpMultiRequestsReceiver(
+            (BRENTHY_API_IP_LISTEN_ADDRESS, BAP_3_RPC_PORT),
+            api_terminal.handle_request,
+        )
     log.important(f"API listening on {tcp_listener.socket_address}")
 
 
@@ -36,5 +48,5 @@ def terminate() -> None:  # pylint: disable=unused-variable
         tcp_listener.terminate()
 
 
-def publish(data: dict) -> None:  # pylint: disable=unused-variable,unused-argument
+def publish(data: dict, sequence: int) -> None:  # pylint: disable=unused-variable,unused-argument
     """NOT IMPLEMENTED: publish data via pubsub."""
@@ -7,6 +7,11 @@ This module's counterpart, which contain's brenthy tool's machinery, is at
 """
 
 import api_terminal
+from api_terminal.async_endpoints import (
+    ASYNCIO_SERVER_ENABLED,
+    AsyncListener,
+    get_async_server,
+)
 from api_terminal.bat_endpoints import ZmqMultiRequestsReceiver, ZmqPublisher
 from brenthy_tools_beta import log
 from brenthy_tools_beta.brenthy_api_addresses import (
@@ -15,7 +20,7 @@ from brenthy_tools_beta.brenthy_api_addresses import (
 
 BAP_VERSION = 4  # pylint: disable=unused-variable
 
-zmq_listener: ZmqMultiRequestsReceiver | None = None
+zmq_listener: ZmqMultiRequestsReceiver | AsyncListener | None = None
 pub_socket: ZmqPublisher | None = None
 
 
@@ -29,10 +34,19 @@ def initialise() -> None:  # pylint: disable=unused-variable
     # its result to the requester, so that this RequestsReceiver doesn't get
     # blockced waiting for the RPC to complete.
     log.info("BAP-4 ZMQ creating listener...")
-    zmq_listener = ZmqMultiRequestsReceiver(
-        (BRENTHY_API_IP_LISTEN_ADDRESS, BAP_4_RPC_PORT),
-        api_terminal.handle_request,
-    )
+    if ASYNCIO_SERVER_ENABLED:
+        zmq_listener = get_async_server(api_terminal.REQUEST_LANES).listen_zmq(
+            (BRENTHY_API_IP_LISTEN_ADDRESS, BAP_4_RPC_PORT),
+            api_terminal.handle_request,
+            classify_request=api_terminal.classify_request,
+        )
+    else:
+        zmq_listener = ZmqMultiRequestsReceiver(
+            (BRENTHY_API_IP_LISTEN_ADDRESS, BAP_4_RPC_PORT),
+            api_terminal.handle_request,
+            lanes=api_terminal.REQUEST_LANES,
+            classify_request=api_terminal.classify_request,
+        )
     pub_socket = ZmqPublisher((BRENTHY_API_IP_LISTEN_ADDRESS, BAP_4_PUB_PORT))
     log.important(f"API listening on {zmq_listener.socket_address}")
     log.important(f"API publishing on {pub_socket.address}")
@@ -48,8 +62,22 @@ def terminate() -> None:  # pylint: disable=unused-variable
         pub_socket.terminate()
 
 
-def publish(data: dict) -> None:  # pylint: disable=unused-variable
-    """Publish data via pubsub."""
+def get_request_stats() -> dict | None:  # pylint: disable=unused-variable
+    """Get the statistics of our RPC listener's lanes' worker pools."""
+    return zmq_listener.get_stats() if zmq_listener else None
+
+
+def get_publisher_stats() -> dict | None:  # pylint: disable=unused-variable
+    """Get the statistics of our pubsub socket, see ZmqPublisher.get_stats."""
+    return pub_socket.get_stats() if pub_socket else None
+
+
+def publish(data: dict, sequence: int) -> None:  # pylint: disable=unused-variable,unused-argument
+    """Publish data via pubsub.
+
+    BAP-4's JSON events don't include their sequence number, so as not to
+    change the data older brenthy_tools pass to eventhandlers.
+    """
     if not pub_socket:
         error_message = (
             "bap_4_brenthy_core.publish(): socket hasn't been initialised"
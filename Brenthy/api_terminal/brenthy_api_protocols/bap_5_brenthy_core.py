@@ -0,0 +1,74 @@
+"""Brenthy API Protocol version 5, on Brenthy-Core's side.
+
+This module contains the machinery used by Brenthy Core for BrenthyAPI
+communication, using the version 5 BrenthyAPI Protocol.
+BAP-5 clients multiplex their requests over a single long-lived ZMQ DEALER
+connection, tagging each with a correlation ID which is returned unchanged
+with the reply.
+Requests and replies consist of separate frames for the version, blockchain
+type or success flag, and payload, so that the payload doesn't need to be
+copied to concatenate and take them apart again.
+Events are published in a binary format with the topic as a separate frame,
+see brenthy_tools_beta/event_encoding.py.
+This module's counterpart, which contain's brenthy tool's machinery, is at
+../../brenthy_tools_beta/brenthy_api_protocols/bap_5_brenthy_tools.py
+"""
+
+import api_terminal
+from api_terminal.bat_endpoints import ZmqMultiRequestsReceiver, ZmqPublisher
+from brenthy_tools_beta import log
+from brenthy_tools_beta.brenthy_api_addresses import (
+    BRENTHY_API_IP_LISTEN_ADDRESS, BAP_5_PUB_PORT, BAP_5_RPC_PORT,
+)
+from brenthy_tools_beta.event_encoding import encode_event
+
+BAP_VERSION = 5  # pylint: disable=unused-variable
+
+zmq_listener: ZmqMultiRequestsReceiver | None = None
+pub_socket: ZmqPublisher | None = None
+
+
+def initialise() -> None:  # pylint: disable=unused-variable
+    """Start listening for RPC requests."""
+    global pub_socket  # pylint: disable=global-statement
+    global zmq_listener  # pylint: disable=global-statement
+
+    log.info("BAP-5 ZMQ creating listener...")
+    zmq_listener = ZmqMultiRequestsReceiver(
+        (BRENTHY_API_IP_LISTEN_ADDRESS, BAP_5_RPC_PORT),
+        api_terminal.handle_request,
+        handle_multipart_request=api_terminal.handle_multipart_request,
+        lanes=api_terminal.REQUEST_LANES,
+        classify_request=api_terminal.classify_request,
+        client_rate_limit=api_terminal.CLIENT_RATE_LIMIT,
+        make_busy_reply=api_terminal.busy_reply,
+    )
+    pub_socket = ZmqPublisher((BRENTHY_API_IP_LISTEN_ADDRESS, BAP_5_PUB_PORT))
+    log.important(f"API listening on {zmq_listener.socket_address}")
+    log.important(f"API publishing on {pub_socket.address}")
+
+
+def terminate() -> None:  # pylint: disable=unused-variable
+    """Stop listening for RPC requests and clean up resources."""
+    if zmq_listener:
+        log.info("BAP-5 ZMQ terminating listener socket.")
+        zmq_listener.terminate()
+    if pub_socket:
+        log.info("BAP-5 ZMQ terminating PubSub socket..")
+        pub_socket.terminate()
+
+
+def get_request_stats() -> dict | None:  # pylint: disable=unused-variable
+    """Get the statistics of our RPC listener's lanes' worker pools."""
+    return zmq_listener.get_stats() if zmq_listener else None
+
+
+def get_publisher_stats() -> dict | None:  # pylint: disable=unused-variable
+    """Get the statistics of our pubsub socket, see ZmqPublisher.get_stats."""
+    return pub_socket.get_stats() if pub_socket else None
+
+
+def publish(data: dict, sequence: int) -> None:  # pylint: disable=unused-variable
+    """Publish data via pubsub."""
+    if pub_socket:
+        pub_socket.publish_multipart(encode_event(data, sequence))
@@ -0,0 +1,151 @@
+"""Brenthy API Protocol version 6, on Brenthy-Core's side.
+
+This module contains the machinery used by Brenthy Core for BrenthyAPI
+communication, using the version 6 BrenthyAPI Protocol.
+BAP-6 serves the same RPC (multiplexed) and pub/sub (binary events)
+communication as BAP-5 does, but over ZMQ's `ipc://` transport,
+i.e. via Unix domain sockets in a runtime directory, for applications on the
+same machine as Brenthy Core.
+Access to it is controlled by the sockets' filesystem permissions.
+This module's counterpart, which contain's brenthy tool's machinery, is at
+../../brenthy_tools_beta/brenthy_api_protocols/bap_6_brenthy_tools.py
+"""
+
+import os
+import time
+
+import api_terminal
+import zmq
+from api_terminal.bat_endpoints import ZmqMultiRequestsReceiver, ZmqPublisher
+from brenthy_tools_beta import log
+from brenthy_tools_beta.brenthy_api_addresses import (
+    BAP_6_PUB_IPC_PATH,
+    BAP_6_RPC_IPC_PATH,
+    BRENTHY_API_IPC_DIR,
+    BRENTHY_API_IPC_PERMISSIONS,
+)
+from brenthy_tools_beta.event_encoding import encode_event
+
+BAP_VERSION = 6  # pylint: disable=unused-variable
+
+# how long to wait for the listener thread to create the RPC socket file
+SOCKET_CREATION_TIMEOUT_S = 5
+
+zmq_listener: ZmqMultiRequestsReceiver | None = None
+pub_socket: ZmqPublisher | None = None
+
+
+def initialise() -> None:  # pylint: disable=unused-variable
+    """Start listening for RPC requests."""
+    global pub_socket  # pylint: disable=global-statement
+    global zmq_listener  # pylint: disable=global-statement
+
+    if not zmq.has("ipc"):
+        log.info("BAP-6: ZMQ IPC isn't supported on this system.")
+        return
+    if not _prepare_ipc_dir():
+        return
+
+    log.info("BAP-6 ZMQ creating listener...")
+    # The sockets are created with permissions determined by the umask, so
+    # they are bound while the directory is accessible only to us, and only
+    # then given their permissions, after which the directory is opened up.
+    zmq_listener = ZmqMultiRequestsReceiver(
+        f"ipc://{BAP_6_RPC_IPC_PATH}",
+        api_terminal.handle_request,
+        handle_multipart_request=api_terminal.handle_multipart_request,
+        lanes=api_terminal.REQUEST_LANES,
+        classify_request=api_terminal.classify_request,
+        client_rate_limit=api_terminal.CLIENT_RATE_LIMIT,
+        make_busy_reply=api_terminal.busy_reply,
+    )
+    pub_socket = ZmqPublisher(f"ipc://{BAP_6_PUB_IPC_PATH}")
+
+    # the RPC socket is bound by the listener thread
+    start_time = time.time()
+    while not os.path.exists(BAP_6_RPC_IPC_PATH):
+        if time.time() - start_time > SOCKET_CREATION_TIMEOUT_S:
+            log.error("BAP-6: timed out waiting for the RPC socket.")
+            break
+        time.sleep(0.01)
+    for path in [BAP_6_RPC_IPC_PATH, BAP_6_PUB_IPC_PATH]:
+        if os.path.exists(path):
+            os.chmod(path, BRENTHY_API_IPC_PERMISSIONS)
+    os.chmod(BRENTHY_API_IPC_DIR, _get_ipc_dir_permissions())
+    log.important(f"API listening on {zmq_listener.socket_address}")
+    log.important(f"API publishing on {pub_socket.address}")
+
+
+def _prepare_ipc_dir() -> bool:
+    """Create the IPC directory, removing stale sockets from it.
+
+    Returns:
+        bool: whether or not the directory can be safely used
+    """
+    # accessible only to us until the sockets have their permissions
+    os.makedirs(BRENTHY_API_IPC_DIR, mode=0o700, exist_ok=True)
+    # refuse to use a directory other users could have planted sockets in
+    if (
+        hasattr(os, "getuid")
+        and os.stat(BRENTHY_API_IPC_DIR).st_uid != os.getuid()
+    ):
+        log.error(
+            f"BAP-6: not using IPC directory {BRENTHY_API_IPC_DIR} "
+            "as it is owned by another user."
+        )
+        return False
+
+    # it may exist with other permissions from before
+    os.chmod(BRENTHY_API_IPC_DIR, 0o700)
+
+    # remove sockets left behind if Brenthy didn't shut down cleanly
+    for path in [BAP_6_RPC_IPC_PATH, BAP_6_PUB_IPC_PATH]:
+        if os.path.exists(path):
+            os.remove(path)
+    return True
+
+
+def _get_ipc_dir_permissions() -> int:
+    """Get the permissions for the IPC directory once the sockets are ready.
+
+    The directory's group & others get access if they have access to the
+    sockets, but can't create or delete files in it.
+    """
+    dir_permissions = 0o700
+    if BRENTHY_API_IPC_PERMISSIONS & 0o070:
+        dir_permissions |= 0o050
+    if BRENTHY_API_IPC_PERMISSIONS & 0o007:
+        dir_permissions |= 0o005
+    return dir_permissions
+
+
+def terminate() -> None:  # pylint: disable=unused-variable
+    """Stop listening for RPC requests and clean up resources."""
+    if zmq_listener:
+        log.info("BAP-6 ZMQ terminating listener socket.")
+        zmq_listener.terminate()
+    if pub_socket:
+        log.info("BAP-6 ZMQ terminating PubSub socket..")
+        pub_socket.terminate()
+    # so that clients immediately know they can't use BAP-6
+    for path in [BAP_6_RPC_IPC_PATH, BAP_6_PUB_IPC_PATH]:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def get_request_stats() -> dict | None:  # pylint: disable=unused-variable
+    """Get the statistics of our RPC listener's lanes' worker pools."""
+    return zmq_listener.get_stats() if zmq_listener else None
+
+
+def get_publisher_stats() -> dict | None:  # pylint: disable=unused-variable
+    """Get the statistics of our pubsub socket, see ZmqPublisher.get_stats."""
+    return pub_socket.get_stats() if pub_socket else None
+
+
+def publish(data: dict, sequence: int) -> None:  # pylint: disable=unused-variable
+    """Publish data via pubsub."""
+    if not pub_socket:
+        # BAP-6 isn't supported on this system
+        return
+    pub_socket.publish_multipart(encode_event(data, sequence))
@@ -0,0 +1,103 @@
+"""Per-client token-bucket rate limiting of BrenthyAPI requests.
+
+Each client has a bucket of up to `burst` tokens, which refills at `rate`
+tokens per second.
+Every request takes a token from its client's bucket, and requests arriving
+while the bucket is empty are refused, telling the client how long to wait
+until its next token is available, so that a client flooding Brenthy with
+requests is slowed down to `rate` without affecting other clients.
+"""
+
+import time
+from threading import Lock
+
+from brenthy_tools_beta import log
+
+# pylint: disable=unused-variable
+
+# number of clients to keep buckets for, above which the buckets of clients
+# which haven't made requests for long enough to have refilled are removed
+MAX_TRACKED_CLIENTS = 10000
+
+
+class ClientRateLimiter:
+    """Limits how many requests per second each client may make."""
+
+    def __init__(self, rate: float, burst: float):
+        """Create a ClientRateLimiter.
+
+        Args:
+            rate (float): the number of requests per second each client may
+                make in the long run
+            burst (float): the number of requests each client may make at
+                once after having been idle
+        """
+        if rate <= 0 or burst < 1:
+            error_message = (
+                "ClientRateLimiter: rate must be positive and burst at least "
+                f"1, not {rate} and {burst}"
+            )
+            log.error(error_message)
+            raise ValueError(error_message)
+        self.rate = rate
+        self.burst = burst
+        self._lock = Lock()
+        # client -> [number of tokens, time they were last updated]
+        self._buckets: dict[bytes, list[float]] = {}
+
+        # statistics
+        self.allowed = 0
+        self.throttled = 0
+
+    def acquire(self, client: bytes) -> float:
+        """Take a token from the client's bucket if it has one.
+
+        Args:
+            client (bytes): the client's identity
+        Returns:
+            float: 0 if the request may be processed, otherwise the number
+                of seconds until the client's next token is available
+        """
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                if len(self._buckets) >= MAX_TRACKED_CLIENTS:
+                    self._remove_full_buckets(now)
+                bucket = [self.burst, now]
+                self._buckets[client] = bucket
+            else:
+                bucket[0] = min(
+                    self.burst, bucket[0] + (now - bucket[1]) * self.rate
+                )
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                self.allowed += 1
+                return 0
+            self.throttled += 1
+            return (1 - bucket[0]) / self.rate
+
+    def _remove_full_buckets(self, now: float) -> None:
+        """Forget clients whose buckets have refilled. Requires self._lock."""
+        refill_s = self.burst / self.rate
+        self._buckets = {
+            client: bucket for client, bucket in self._buckets.items()
+            if now - bucket[1] < refill_s
+        }
+
+    def get_stats(self) -> dict:
+        """Get the rate limits and the numbers of allowed & refused requests.
+
+        Returns:
+            dict: for example: {"rate": 100, "burst": 200, "clients": 3,
+                "allowed": 5000, "throttled": 20}
+        """
+        with self._lock:
+            return {
+                "rate": self.rate,
+                "burst": self.burst,
+                "clients": len(self._buckets),
+                "allowed": self.allowed,
+                "throttled": self.throttled,
+            }
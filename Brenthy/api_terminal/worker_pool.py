@@ -0,0 +1,286 @@
+"""An elastic pool of threads for processing BrenthyAPI requests.
+
+ElasticWorkerPool keeps `min_workers` threads running, starts further
+threads up to `max_workers` whenever a task is queued while all threads are
+busy, and lets threads beyond `min_workers` exit after they have been idle
+for `idle_timeout_s`, so that it adapts to the load instead of having a
+fixed number of threads which are either too many at idle or too few under
+load.
+Tasks may be submitted with a key, such as the identity of the client that
+requested them: tasks with the same key are processed in the order in which
+they were submitted, but the pool takes turns between keys, so that a key
+with many queued tasks can't hold up the tasks of other keys.
+
+Operators can set the sizes of Brenthy Core's pools with environment
+variables, which `get_pool_size_from_env` and `get_idle_timeout_from_env`
+read.
+"""
+
+import os
+import time
+from collections import deque
+from threading import Condition, Lock, Thread
+from typing import Any, Callable
+
+from brenthy_tools_beta import log
+
+# pylint: disable=unused-variable
+
+
+def get_pool_size_from_env(
+    variable: str, default: tuple[int, int]
+) -> tuple[int, int]:
+    """Get the numbers of worker threads set with an environment variable.
+
+    Its value is the minimum number of threads, followed by a comma and the
+    maximum number of threads, e.g. `2,64`.
+
+    Args:
+        variable (str): the name of the environment variable
+        default (tuple[int, int]): the minimum and maximum numbers of
+            threads to use if the environment variable isn't set
+    Returns:
+        tuple[int, int]: the minimum and maximum numbers of threads
+    """
+    value = os.environ.get(variable, "")
+    if not value:
+        return default
+    try:
+        min_workers, max_workers = [int(number) for number in value.split(",")]
+    except ValueError:
+        min_workers, max_workers = (-1, 0)
+    if min_workers < 0 or max_workers < max(min_workers, 1):
+        error_message = (
+            f"Invalid value for environment variable {variable}: {value}\n"
+            "Expected MIN_THREADS,MAX_THREADS, with MAX_THREADS positive and "
+            "at least MIN_THREADS"
+        )
+        log.error(error_message)
+        raise ValueError(error_message)
+    return (min_workers, max_workers)
+
+
+def get_idle_timeout_from_env(variable: str, default: float) -> float:
+    """Get the idle timeout of worker threads set with an environment variable.
+
+    Args:
+        variable (str): the name of the environment variable, whose value is
+            the number of seconds threads beyond the minimum wait for tasks
+        default (float): the idle timeout to use if the environment variable
+            isn't set
+    Returns:
+        float: the number of seconds
+    """
+    value = os.environ.get(variable, "")
+    if not value:
+        return default
+    try:
+        idle_timeout_s = float(value)
+    except ValueError:
+        idle_timeout_s = -1
+    if idle_timeout_s <= 0:
+        error_message = (
+            f"Invalid value for environment variable {variable}: {value}\n"
+            "Expected a positive number of seconds"
+        )
+        log.error(error_message)
+        raise ValueError(error_message)
+    return idle_timeout_s
+
+
+class ElasticWorkerPool:
+    """A pool of threads which grows under load and shrinks when idle."""
+
+    def __init__(
+        self,
+        min_workers: int,
+        max_workers: int,
+        idle_timeout_s: float,
+        name: str = "ElasticWorkerPool",
+    ):
+        """Create an ElasticWorkerPool, starting its minimum of threads.
+
+        Args:
+            min_workers (int): the number of threads to keep even when idle
+            max_workers (int): the maximum number of threads to run tasks on
+                in parallel, further tasks are queued
+            idle_timeout_s (float): how long threads beyond min_workers wait
+                for tasks before exiting
+            name (str): the name of the worker threads
+        """
+        if min_workers < 0 or max_workers < max(min_workers, 1):
+            error_message = (
+                "ElasticWorkerPool: min_workers must not be negative and "
+                "max_workers must be positive and at least min_workers, not "
+                f"{min_workers} and {max_workers}"
+            )
+            log.error(error_message)
+            raise ValueError(error_message)
+        self.min_workers = min_workers
+        self.max_workers = max_workers
+        self.idle_timeout_s = idle_timeout_s
+        self.name = name
+
+        self._lock = Lock()
+        self._work_available = Condition(self._lock)
+        # key -> its queued tasks: (submission time, function, args)
+        self._queues: dict[Any, deque[tuple[float, Callable, tuple]]] = {}
+        # the keys which have queued tasks, in the order they take turns
+        self._queued_keys: deque = deque()
+        self._n_queued = 0
+        self._n_workers = 0
+        self._n_idle = 0
+        self._worker_ids = 0
+        self._terminate = False
+
+        # statistics
+        self.max_queued = 0
+        self.max_workers_used = 0
+        self.handled = 0
+        self.errors = 0
+        self.total_wait_s = 0.0
+        self.max_wait_s = 0.0
+        self.total_handler_s = 0.0
+        self.max_handler_s = 0.0
+
+        with self._lock:
+            for _ in range(min_workers):
+                self._start_worker()
+
+    def submit(self, function: Callable, *args: Any, key: Any = None) -> None:
+        """Call `function(*args)` on one of the pool's threads.
+
+        Args:
+            function (Callable): the task
+            args: the task's arguments
+            key: the key to queue the task under, see ElasticWorkerPool
+        """
+        with self._lock:
+            if self._terminate:
+                return
+            queue = self._queues.get(key)
+            if queue is None:
+                queue = deque()
+                self._queues[key] = queue
+                self._queued_keys.append(key)
+            queue.append((time.perf_counter(), function, args))
+            self._n_queued += 1
+            self.max_queued = max(self.max_queued, self._n_queued)
+            # start another worker if the idle ones can't take all tasks
+            if (
+                self._n_queued > self._n_idle
+                and self._n_workers < self.max_workers
+            ):
+                self._start_worker()
+            else:
+                self._work_available.notify()
+
+    def _start_worker(self) -> None:
+        """Start a worker thread. Requires self._lock."""
+        self._n_workers += 1
+        self._worker_ids += 1
+        self.max_workers_used = max(self.max_workers_used, self._n_workers)
+        Thread(
+            target=self._work, daemon=True,
+            name=f"{self.name}-{self._worker_ids}"
+        ).start()
+
+    def _work(self) -> None:
+        """Process tasks until idle for too long or terminated."""
+        while True:
+            with self._lock:
+                self._n_idle += 1
+                while not self._n_queued and not self._terminate:
+                    timed_out = not self._work_available.wait(
+                        self.idle_timeout_s
+                    )
+                    if (
+                        timed_out and not self._n_queued
+                        and self._n_workers > self.min_workers
+                    ):
+                        self._n_idle -= 1
+                        self._n_workers -= 1
+                        return
+                self._n_idle -= 1
+                if self._terminate:
+                    self._n_workers -= 1
+                    return
+                submit_time, function, args = self._pop_task()
+
+            start_time = time.perf_counter()
+            try:
+                function(*args)
+            except Exception as error:  # pylint:disable=broad-exception-caught
+                log.error(f"{self.name}: error processing request: {error}")
+                error_raised = True
+            else:
+                error_raised = False
+            end_time = time.perf_counter()
+
+            with self._lock:
+                self.handled += 1
+                self.errors += error_raised
+                wait_s = start_time - submit_time
+                handler_s = end_time - start_time
+                self.total_wait_s += wait_s
+                self.max_wait_s = max(self.max_wait_s, wait_s)
+                self.total_handler_s += handler_s
+                self.max_handler_s = max(self.max_handler_s, handler_s)
+
+    def _pop_task(self) -> tuple[float, Callable, tuple]:
+        """Take the next key's oldest task. Requires self._lock."""
+        key = self._queued_keys.popleft()
+        queue = self._queues[key]
+        task = queue.popleft()
+        if queue:
+            self._queued_keys.append(key)
+        else:
+            del self._queues[key]
+        self._n_queued -= 1
+        return task
+
+    def get_stats(self) -> dict:
+        """Get the pool's numbers of threads & queued tasks and other stats.
+
+        Returns:
+            dict: for example: {"workers": 3, "active_workers": 1,
+                "min_workers": 2, "max_workers": 64, "max_workers_used": 12,
+                "queued": 0, "queued_keys": 0, "max_queued": 40,
+                "handled": 1000, "errors": 0,
+                "mean_wait_s": 0.0001, "max_wait_s": 0.02,
+                "mean_handler_s": 0.003, "max_handler_s": 0.5}
+        """
+        with self._lock:
+            return {
+                "workers": self._n_workers,
+                "active_workers": self._n_workers - self._n_idle,
+                "min_workers": self.min_workers,
+                "max_workers": self.max_workers,
+                "max_workers_used": self.max_workers_used,
+                "queued": self._n_queued,
+                "queued_keys": len(self._queues),
+                "max_queued": self.max_queued,
+                "handled": self.handled,
+                "errors": self.errors,
+                "mean_wait_s": (
+                    self.total_wait_s / self.handled if self.handled else None
+                ),
+                "max_wait_s": self.max_wait_s,
+                "mean_handler_s": (
+                    self.total_handler_s / self.handled
+                    if self.handled else None
+                ),
+                "max_handler_s": self.max_handler_s,
+            }
+
+    def terminate(self) -> None:
+        """Stop the worker threads once they finish their current tasks.
+
+        Tasks still queued are discarded.
+        """
+        with self._lock:
+            self._terminate = True
+            self._queues.clear()
+            self._queued_keys.clear()
+            self._n_queued = 0
+            self._work_available.notify_all()
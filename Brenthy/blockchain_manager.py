@@ -93,6 +93,7 @@ def load_blockchain_modules() -> dict[str, ModuleType]:
         "Loaded blockchain modules: "
         f"{blockchain_modules.keys()}"
     )
+    api_terminal.update_routing_table()
     return blockchain_modules
 
 
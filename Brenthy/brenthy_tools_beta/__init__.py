@@ -12,5 +12,6 @@ from .brenthy_api import (
     BrenthyNotRunningError,
     BrenthyReplyDecodeError,
     BrenthyError,
+    BrenthyBusyError,
     UnknownBlockchainTypeError,
 )
@@ -0,0 +1,208 @@
+"""Tracking of which BrenthyAPI protocols work, for choosing between them.
+
+`brenthy_api` can communicate with Brenthy Core via multiple BrenthyAPI
+protocols (BAP modules).
+Instead of trying all of them newest-first on every request, `brenthy_api`
+uses a BapHealthTracker to remember which protocol last worked for each
+Brenthy Core endpoint and to go straight to it.
+Protocols which fail are put into exponential backoff, during which they are
+only tried as a last resort, and are retried in the background until they
+work again.
+"""
+
+import time
+from threading import Lock, Timer
+from types import ModuleType
+from typing import Callable
+
+from brenthy_tools_beta import log
+
+# pylint: disable=unused-variable
+
+BACKOFF_BASE_S = 1
+BACKOFF_MAX_S = 60
+# stop retrying failed protocols in the background if no requests have been
+# made for this long, they'll be retried on the next request instead
+PROBE_IDLE_STOP_S = 300
+
+
+class ProtocolHealth:
+    """Statistics and availability of a BAP module for one endpoint."""
+
+    def __init__(self) -> None:
+        """Create a record for a protocol that hasn't been used yet."""
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.total_latency = 0.0
+        self.last_latency: float | None = None
+        # time.monotonic() before which this protocol is in backoff
+        self.retry_at = 0.0
+        # whether or not a background retry has been scheduled
+        self.probing = False
+
+    def is_available(self, now: float) -> bool:
+        """Check whether or not this protocol is not in backoff."""
+        return now >= self.retry_at
+
+    def to_dict(self, now: float) -> dict:
+        """Get this protocol's statistics in a dictionary."""
+        return {
+            "successes": self.successes,
+            "failures": self.failures,
+            "mean_latency_s": (
+                self.total_latency / self.successes
+                if self.successes else None
+            ),
+            "last_latency_s": self.last_latency,
+            "available": self.is_available(now),
+            "retry_in_s": max(0.0, self.retry_at - now),
+        }
+
+
+class BapHealthTracker:
+    """Tracks which BrenthyAPI protocols work for which endpoints."""
+
+    def __init__(self, probe: Callable[[ModuleType], None]):
+        """Create a BapHealthTracker.
+
+        Args:
+            probe (Callable): function which sends a cheap request to
+                Brenthy Core using the given BAP module, raising an exception
+                if it fails, used to retry failed protocols in the background
+        """
+        self.probe = probe
+        self._lock = Lock()
+        # endpoint -> BAP version -> ProtocolHealth
+        self._health: dict[str, dict[int, ProtocolHealth]] = {}
+        # endpoint -> the protocol to try first
+        self._preferred: dict[str, ModuleType] = {}
+        self._last_used = time.monotonic()
+
+    def _get_health(
+        self, endpoint: str, protocol: ModuleType
+    ) -> ProtocolHealth:
+        """Get the ProtocolHealth record, assuming self._lock is held."""
+        endpoint_health = self._health.setdefault(endpoint, {})
+        health = endpoint_health.get(protocol.BAP_VERSION)
+        if not health:
+            health = ProtocolHealth()
+            endpoint_health[protocol.BAP_VERSION] = health
+        return health
+
+    def order_protocols(
+        self, endpoint: str, protocols: list[ModuleType]
+    ) -> list[ModuleType]:
+        """Get the order in which to try the given protocols.
+
+        The preferred protocol comes first, followed by the other available
+        protocols in the given order, followed by the protocols in backoff,
+        soonest retry first.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._last_used = now
+            available = []
+            in_backoff = []
+            for protocol in protocols:
+                health = self._get_health(endpoint, protocol)
+                if health.is_available(now):
+                    available.append(protocol)
+                else:
+                    in_backoff.append((health.retry_at, protocol))
+            preferred = self._preferred.get(endpoint)
+        if preferred in available:
+            available.remove(preferred)
+            available.insert(0, preferred)
+        in_backoff.sort(key=lambda item: item[0])
+        return available + [protocol for _, protocol in in_backoff]
+
+    def record_success(
+        self,
+        endpoint: str,
+        protocol: ModuleType,
+        latency: float,
+        probed: bool = False,
+    ) -> None:
+        """Record that a protocol successfully completed a request.
+
+        Args:
+            endpoint (str): the Brenthy Core endpoint the request was sent to
+            protocol (ModuleType): the BAP module used
+            latency (float): how long the request took in seconds
+            probed (bool): whether or not this was a background retry
+        """
+        with self._lock:
+            health = self._get_health(endpoint, protocol)
+            health.successes += 1
+            health.consecutive_failures = 0
+            health.total_latency += latency
+            health.last_latency = latency
+            health.retry_at = 0.0
+            preferred = self._preferred.get(endpoint)
+            # after a background retry, only switch to newer protocols
+            if (
+                not probed or not preferred
+                or protocol.BAP_VERSION > preferred.BAP_VERSION
+            ):
+                self._preferred[endpoint] = protocol
+
+    def record_failure(self, endpoint: str, protocol: ModuleType) -> None:
+        """Record that a protocol failed, putting it into backoff."""
+        with self._lock:
+            health = self._get_health(endpoint, protocol)
+            health.failures += 1
+            health.consecutive_failures += 1
+            backoff = min(
+                BACKOFF_BASE_S * 2 ** (health.consecutive_failures - 1),
+                BACKOFF_MAX_S
+            )
+            health.retry_at = time.monotonic() + backoff
+            if self._preferred.get(endpoint) is protocol:
+                self._preferred.pop(endpoint)
+            if health.probing:
+                return
+            health.probing = True
+        timer = Timer(backoff, self._retry, args=(endpoint, protocol))
+        timer.daemon = True
+        timer.start()
+
+    def _retry(self, endpoint: str, protocol: ModuleType) -> None:
+        """Retry a failed protocol in the background."""
+        with self._lock:
+            health = self._get_health(endpoint, protocol)
+            health.probing = False
+            if time.monotonic() - self._last_used > PROBE_IDLE_STOP_S:
+                return
+        start = time.monotonic()
+        try:
+            self.probe(protocol)
+        except Exception:  # pylint: disable=broad-exception-caught
+            self.record_failure(endpoint, protocol)
+            return
+        log.info(f"BrenthyAPI: BAP-{protocol.BAP_VERSION} works again.")
+        self.record_success(
+            endpoint, protocol, time.monotonic() - start, probed=True
+        )
+
+    def get_stats(self) -> dict[str, dict[int, dict]]:
+        """Get the statistics of all protocols for all endpoints.
+
+        Returns:
+            dict: endpoint -> BAP version -> statistics
+        """
+        now = time.monotonic()
+        with self._lock:
+            return {
+                endpoint: {
+                    bap_version: health.to_dict(now)
+                    for bap_version, health in endpoint_health.items()
+                }
+                for endpoint, endpoint_health in self._health.items()
+            }
+
+    def reset(self) -> None:
+        """Forget all statistics and preferences."""
+        with self._lock:
+            self._health = {}
+            self._preferred = {}
@@ -3,156 +3,817 @@
 import importlib
 import json
 import os
-from inspect import signature
+import time
+from threading import Lock
 from types import FunctionType, ModuleType
+from typing import Any, AsyncIterator, Iterator
 
-from brenthy_tools_beta import bt_endpoints, log
+from brenthy_tools_beta import bt_endpoints, compression, log
+from brenthy_tools_beta.bap_health import BapHealthTracker
 from brenthy_tools_beta.bt_endpoints import CantConnectToSocketError
-from brenthy_tools_beta.utils import function_name, load_module_from_path
+from brenthy_tools_beta.event_encoding import decode_value, encode_value
+from brenthy_tools_beta.event_executor import (
+    EventExecutor,
+    get_default_executor,
+)
+from brenthy_tools_beta.reply_cache import ReplyCache
+from brenthy_tools_beta.utils import (
+    decode_bytes_list,
+    encode_bytes_list,
+    function_name,
+)
 from brenthy_tools_beta.version_utils import (
     decode_version,
     encode_version,
     version_to_string,
 )
 from brenthy_tools_beta.versions import BRENTHY_TOOLS_VERSION
-from environs import Env
 
 from . import brenthy_api_addresses
 from .brenthy_api_protocols import BAP_MODULES_REGISTRY
 
 BLOCKCHAIN_RETURNED_NO_RESPONSE = "blockchain returned no response"
 UNKNOWN_BLOCKCHAIN_TYPE = "unknown blockchain type"
+NOT_UNDERSTOOD = "not understood"
+STREAM_NOT_FOUND = "stream not found"
+REQUEST_CANCELLED = "request cancelled"
+BRENTHY_BUSY = "brenthy busy"
+
+# states of streamed replies, see api_terminal.stream_request
+STREAM_MORE = b"1"
+STREAM_END = b"0"
+STREAM_FAILED = b"2"
+# how many chunks of a streamed reply to request at once
+STREAM_CHUNKS_PER_REQUEST = 4
+
+ENCODED_TOOLS_VERSION = bytes(encode_version(BRENTHY_TOOLS_VERSION))
 
+# timeout for requests retrying failed BrenthyAPI protocols in the background
+PROBE_TIMEOUT_S = 5
 
-# list of files and folders in the brenthy_api_protocols folder
-# which are not BrenthyAPI protocol modules
-BAP_EXCLUDED_MODULES = ["__init__.py", "__main__.py", "__pycache__", ".tmp"]
 
+# the BAP modules, newest first, loaded from BAP_MODULES_REGISTRY on first use
 bap_protocol_modules: list[ModuleType] = []
+_bap_modules_loaded = False
+_bap_modules_lock = Lock()
 
 log.LOG_FILENAME = ".brenthy_api.log"
 log.LOG_ARCHIVE_DIRNAME = ".brenthy_api_log_archive"
 
 
-env = Env()
+def _get_env_bool(name: str, default: bool) -> bool:
+    """Get the value of a boolean environment variable."""
+    value = os.environ.get(name, "").lower()
+    if not value:
+        return default
+    if value in ["true", "1", "yes", "on"]:
+        return True
+    if value in ["false", "0", "no", "off"]:
+        return False
+    error_message = (
+        f"Invalid value for environment variable {name}: {value}\n"
+        "Valid values: 0, false, False, 1, true, True"
+    )
+    log.error(error_message)
+    raise ValueError(error_message)
+
 
+def _load_brenthy_api_protocols() -> None:
+    """Import the BAP modules listed in BAP_MODULES_REGISTRY.
 
-def _load_brenthy_api_protocols_from_files() -> None:
-    # files in the current directory which don't define bap_protocol_modules
+    Skips BAP modules disabled with environment variables such as
+    BRENTHY_API_PROTOCOL_3=false.
+    """
     global bap_protocol_modules  # pylint: disable=global-statement
-    bap_protocol_modules = []
-    protocols_path = os.path.join(
-        os.path.dirname(__file__), "brenthy_api_protocols"
-    )
-    for filename in os.listdir(protocols_path):
-        if filename in BAP_EXCLUDED_MODULES:
-            continue
+    global _bap_modules_loaded  # pylint: disable=global-statement
+    modules = []
+    for module_name in BAP_MODULES_REGISTRY:
         try:
-            bap_module = load_module_from_path(
-                os.path.join(protocols_path, filename)
+            bap_module = importlib.import_module(
+                f".brenthy_api_protocols.{module_name}", package=__package__
             )
-            if not env.bool(
-                f"BRENTHY_API_PROTOCOL_{bap_module.BAP_VERSION}", default=True
-            ):
-                log.info(
-                    f"Skipping BAP-{bap_module.BAP_VERSION} because of Env Var"
-                )
-                continue
-
-            bap_protocol_modules.append(
-                bap_module
-            )
-        except:
-            error_message = (
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            log.error(
                 "BrenthyAPI: Failed to load Brenthy API Protocol module "
-                f"{filename}"
+                f"{module_name}: {error}"
             )
-            log.error(error_message)
-            # raise ImportError(error_message)
+            continue
+        if not _get_env_bool(
+            f"BRENTHY_API_PROTOCOL_{bap_module.BAP_VERSION}", default=True
+        ):
+            log.info(
+                f"Skipping BAP-{bap_module.BAP_VERSION} because of Env Var"
+            )
+            continue
+        modules.append(bap_module)
     # sort bap modules in order of BAP version, newest to oldest
-    bap_protocol_modules.sort(key=lambda x: x.BAP_VERSION, reverse=True)
+    modules.sort(key=lambda x: x.BAP_VERSION, reverse=True)
+    bap_protocol_modules = modules
+    _bap_modules_loaded = True
 
 
-def _load_brenthy_api_protocols_from_registry() -> None:
+def _get_bap_protocol_modules() -> list[ModuleType]:
+    """Get the BAP modules, loading them on first use.
 
-    bap_protocol_modules = []
-    for module_name in BAP_MODULES_REGISTRY:
-        if module_name in BAP_EXCLUDED_MODULES:
-            continue
-        module = importlib.import_module(
-            f"..brenthy_api_protocols.{module_name}", package=__name__
+    Loading them lazily keeps importing brenthy_api fast for applications
+    which don't end up communicating with Brenthy Core.
+    """
+    if not _bap_modules_loaded and AUTO_LOAD_BAP_MODULES:
+        with _bap_modules_lock:
+            if not _bap_modules_loaded:
+                _load_brenthy_api_protocols()
+    return bap_protocol_modules
+
+
+def send_request(
+    blockchain_type: str, payload: bytearray | bytes,
+    timeout: int | None = None, cache_ttl: float | None = None
+) -> bytearray:
+    """Send a request to Brenthy or one of its installed blockchain types.
+
+    Args:
+        blockchain_type(str): the blockchain type to forward the payload to
+            use 'Brenthy' if the request is to Brenthy itself
+        payload(bytearray): the message to send to Brenthy or the blockchain
+        timeout (int): how long to wait before giving up, None to use default
+        cache_ttl (float): for requests which don't change any state,
+            for how many seconds the reply may be cached and reused for
+            identical requests, None to not cache it; cached replies are
+            discarded early when an EventListener of this process receives
+            an event from the blockchain type, otherwise only the TTL
+            bounds how stale they may be
+    Returns:
+        bytearray: the reply from Brenthy or the blockchain.
+    """
+    request_frames = _encapsulate_request_frames(blockchain_type, payload)
+    generation = None
+    if cache_ttl:
+        reply = reply_cache.get(blockchain_type, payload)
+        if reply is not None:
+            return reply
+        generation = reply_cache.get_generation(blockchain_type)
+
+    start_time = time.monotonic()
+    while True:
+        try:
+            reply = _send_request_frames(request_frames, timeout)
+            break
+        except BrenthyBusyError as error:
+            time.sleep(_get_busy_backoff(error, start_time, timeout))
+    if cache_ttl:
+        reply_cache.put(
+            blockchain_type, payload, reply, cache_ttl, generation
         )
-        bap_protocol_modules.append(module)
-    bap_protocol_modules.sort(key=lambda x: x.BAP_VERSION, reverse=True)
+    return reply
 
 
-def _load_brenthy_api_protocols() -> None:
-    _load_brenthy_api_protocols_from_files()
+def _send_request_frames(
+    request_frames: list[bytes | bytearray], timeout: int | None
+) -> bytearray:
+    """Send a request via the first BrenthyAPI protocol that works.
 
+    Args:
+        request_frames (list): the output of `_encapsulate_request_frames`
+        timeout (int): how long to wait before giving up, None to use default
+    Returns:
+        bytearray: the reply from Brenthy or the blockchain.
+    """
+    endpoint = brenthy_api_addresses.BRENTHY_IP_ADDRESS
+    decapsulated_reply: tuple[bool, bytearray] | None = None
+    # whether or not we've managed to establish communication with Brenthy-Core
+    communicated = False
+    # try sending request via different protocols, starting with the one
+    # that last worked
+    for protocol in bap_health.order_protocols(
+        endpoint, _get_bap_protocol_modules()
+    ):
+        start = time.monotonic()
+        try:
+            decapsulated_reply = _send_via_protocol(
+                protocol, request_frames, timeout
+            )
+        except CantConnectToSocketError:
+            bap_health.record_failure(endpoint, protocol)
+            # try next BrenthyAPI protocol
+            continue
+        communicated = True
+        if decapsulated_reply:
+            bap_health.record_success(
+                endpoint, protocol, time.monotonic() - start
+            )
+            break  # request sent, got reply,so move on
+        bap_health.record_failure(endpoint, protocol)
+    return _evaluate_reply(decapsulated_reply, communicated)
 
-def send_request(
+
+async def send_request_async(
     blockchain_type: str, payload: bytearray | bytes,
-    timeout: int | None = None
+    timeout: int | None = None, cache_ttl: float | None = None
 ) -> bytearray:
     """Send a request to Brenthy or one of its installed blockchain types.
 
+    The asyncio equivalent of `send_request`, which doesn't occupy a thread
+    while waiting for the reply.
+
     Args:
         blockchain_type(str): the blockchain type to forward the payload to
             use 'Brenthy' if the request is to Brenthy itself
         payload(bytearray): the message to send to Brenthy or the blockchain
         timeout (int): how long to wait before giving up, None to use default
+        cache_ttl (float): for requests which don't change any state,
+            for how many seconds the reply may be cached and reused for
+            identical requests, None to not cache it; cached replies are
+            discarded early when an EventListener of this process receives
+            an event from the blockchain type, otherwise only the TTL
+            bounds how stale they may be
     Returns:
         bytearray: the reply from Brenthy or the blockchain.
     """
-    if isinstance(payload, bytes):
-        payload = bytearray(payload)
+    import asyncio  # pylint: disable=import-outside-toplevel
+
+    request_frames = _encapsulate_request_frames(blockchain_type, payload)
+    generation = None
+    if cache_ttl:
+        reply = reply_cache.get(blockchain_type, payload)
+        if reply is not None:
+            return reply
+        generation = reply_cache.get_generation(blockchain_type)
+
+    start_time = time.monotonic()
+    while True:
+        try:
+            reply = await _send_request_frames_async(request_frames, timeout)
+            break
+        except BrenthyBusyError as error:
+            await asyncio.sleep(
+                _get_busy_backoff(error, start_time, timeout)
+            )
+    if cache_ttl:
+        reply_cache.put(
+            blockchain_type, payload, reply, cache_ttl, generation
+        )
+    return reply
+
+
+async def _send_request_frames_async(
+    request_frames: list[bytes | bytearray], timeout: int | None
+) -> bytearray:
+    """The asyncio equivalent of `_send_request_frames`."""
+    endpoint = brenthy_api_addresses.BRENTHY_IP_ADDRESS
+    decapsulated_reply: tuple[bool, bytearray] | None = None
+    communicated = False
+    for protocol in bap_health.order_protocols(
+        endpoint, _get_bap_protocol_modules()
+    ):
+        start = time.monotonic()
+        try:
+            decapsulated_reply = await _send_via_protocol_async(
+                protocol, request_frames, timeout
+            )
+        except CantConnectToSocketError:
+            bap_health.record_failure(endpoint, protocol)
+            continue
+        communicated = True
+        if decapsulated_reply:
+            bap_health.record_success(
+                endpoint, protocol, time.monotonic() - start
+            )
+            break
+        bap_health.record_failure(endpoint, protocol)
+    return _evaluate_reply(decapsulated_reply, communicated)
+
+
+def _get_busy_backoff(
+    error: "BrenthyBusyError", start_time: float, timeout: int | None
+) -> float:
+    """Get how long to wait before retrying a request Brenthy was busy for.
+
+    Args:
+        error (BrenthyBusyError): the error Brenthy's reply was raised as
+        start_time (float): when we started sending the request
+            (`time.monotonic()`)
+        timeout (int): how long to wait before giving up, None to use default
+    Returns:
+        float: the number of seconds to wait before retrying
+    Raises:
+        BrenthyBusyError: if retrying would exceed the timeout
+    """
+    if timeout is None:
+        timeout = bt_endpoints.REQUEST_TIMEOUT_S
+    if time.monotonic() + error.retry_after_s > start_time + timeout:
+        raise error
+    return error.retry_after_s
+
+
+def send_request_batch(
+    blockchain_type: str, payloads: list[bytearray | bytes],
+    parallel: bool = False, timeout: int | None = None
+) -> list[bytearray | Exception]:
+    """Send multiple requests to Brenthy or a blockchain type at once.
+
+    All requests are sent in a single message, saving the round trips of
+    sending them one by one with `send_request`.
+    If the Brenthy Core we're talking to doesn't support batch requests yet,
+    the requests are sent one by one instead.
+
+    Args:
+        blockchain_type(str): the blockchain type to forward the payloads to
+            use 'Brenthy' if the requests are to Brenthy itself
+        payloads(list[bytearray]): the messages to send to Brenthy or the
+            blockchain
+        parallel (bool): whether or not Brenthy may process the requests in
+            parallel instead of one after the other
+        timeout (int): how long to wait before giving up, None to use default
+    Returns:
+        list[bytearray | Exception]: the replies from Brenthy or the
+            blockchain in the same order as the payloads, or for each request
+            which Brenthy or the blockchain failed to process, the exception
+            `send_request` would have raised for it
+    """
+    reply = send_brenthy_request(
+        "batch_request",
+        _encode_batch_request(blockchain_type, payloads, parallel),
+        timeout=timeout
+    )
+    replies = _decode_batch_reply(reply, len(payloads))
+    if replies is not None:
+        return replies
+    return [
+        _send_batch_item_sequentially(blockchain_type, payload, timeout)
+        for payload in payloads
+    ]
+
+
+async def send_request_batch_async(
+    blockchain_type: str, payloads: list[bytearray | bytes],
+    parallel: bool = False, timeout: int | None = None
+) -> list[bytearray | Exception]:
+    """Send multiple requests to Brenthy or a blockchain type at once.
+
+    The asyncio equivalent of `send_request_batch`.
+
+    Args:
+        blockchain_type(str): the blockchain type to forward the payloads to
+            use 'Brenthy' if the requests are to Brenthy itself
+        payloads(list[bytearray]): the messages to send to Brenthy or the
+            blockchain
+        parallel (bool): whether or not Brenthy may process the requests in
+            parallel instead of one after the other
+        timeout (int): how long to wait before giving up, None to use default
+    Returns:
+        list[bytearray | Exception]: the replies from Brenthy or the
+            blockchain in the same order as the payloads, or for each request
+            which Brenthy or the blockchain failed to process, the exception
+            `send_request` would have raised for it
+    """
+    reply = await send_brenthy_request_async(
+        "batch_request",
+        _encode_batch_request(blockchain_type, payloads, parallel),
+        timeout=timeout
+    )
+    replies = _decode_batch_reply(reply, len(payloads))
+    if replies is not None:
+        return replies
+    results: list[bytearray | Exception] = []
+    for payload in payloads:
+        try:
+            results.append(await send_request_async(
+                blockchain_type, payload, timeout=timeout
+            ))
+        except _BATCH_ITEM_ERRORS as error:
+            results.append(error)
+    return results
+
+
+def _encode_batch_request(
+    blockchain_type: str, payloads: list[bytearray | bytes], parallel: bool
+) -> bytearray:
+    """Encode the payload of a batch_request RPC to Brenthy."""
     if not isinstance(blockchain_type, str):
         error_message = (
             "blockchain_type must be of type str, not "
             f"{type(blockchain_type)}"
         )
-        log.error(f"BrenthyAPI: {function_name()}: {error_message}")
+        log.error(f"BrenthyAPI: {function_name(1)}: {error_message}")
         raise TypeError(error_message)
-    if not isinstance(payload, bytearray):
+    for payload in payloads:
+        if not isinstance(payload, (bytearray, bytes)):
+            error_message = (
+                "payloads must be of type bytearray, not " f"{type(payload)}"
+            )
+            log.error(f"BrenthyAPI: {function_name(1)}: {error_message}")
+            raise TypeError(error_message)
+    return encode_bytes_list(
+        [blockchain_type.encode(), b"1" if parallel else b"0"] + payloads
+    )
+
+
+def _decode_batch_reply(
+    reply: bytearray, n_requests: int
+) -> list[bytearray | Exception] | None:
+    """Decode Brenthy's reply to a batch_request RPC.
+
+    Returns:
+        list[bytearray | Exception] | None: the replies to the individual
+            requests, or None if Brenthy doesn't support batch requests
+    """
+    try:
+        data = json.loads(reply.decode())
+        if isinstance(data, dict) and data.get("error") == NOT_UNDERSTOOD:
+            return None
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        pass
+    try:
+        replies = decode_bytes_list(reply)
+    except ValueError:
+        raise BrenthyReplyDecodeError(
+            "Failed to decode Brenthy's reply to a batch request.",
+            reply=reply
+        ) from None
+    if len(replies) != n_requests:
+        raise BrenthyReplyDecodeError(
+            f"Expected {n_requests} replies to batch request, "
+            f"got {len(replies)}.",
+            reply=reply
+        )
+    results: list[bytearray | Exception] = []
+    for item in replies:
+        if not item:
+            results.append(BrenthyReplyDecodeError(
+                "Received empty reply to batch request item.", reply=item
+            ))
+        elif item[0] == 1:
+            results.append(item[1:])
+        else:
+            results.append(_analyse_no_success_reply(item[1:]))
+    return results
+
+
+def _send_batch_item_sequentially(
+    blockchain_type: str, payload: bytearray | bytes, timeout: int | None
+) -> bytearray | Exception:
+    """Send a batch request's item on its own, for old Brenthy Cores."""
+    try:
+        return send_request(blockchain_type, payload, timeout=timeout)
+    except _BATCH_ITEM_ERRORS as error:
+        return error
+
+
+def send_request_stream(
+    blockchain_type: str, payload: bytearray | bytes,
+    timeout: int | None = None,
+    chunks_per_request: int = STREAM_CHUNKS_PER_REQUEST,
+) -> Iterator[bytearray]:
+    """Send a request to a blockchain type, receiving its reply in chunks.
+
+    For requests whose replies are too large to comfortably hold in memory
+    all at once, which the blockchain type streams in chunks.
+    The chunks are fetched from Brenthy as they are consumed,
+    `chunks_per_request` chunks at a time, so that neither Brenthy nor the
+    application holds more than that many chunks in memory.
+    If the blockchain type doesn't stream its reply or Brenthy doesn't
+    support streaming yet, the whole reply is yielded as a single chunk.
+
+    Args:
+        blockchain_type(str): the blockchain type to forward the payload to
+        payload(bytearray): the message to send to the blockchain
+        timeout (int): how long to wait for each batch of chunks before
+            giving up, None to use default
+        chunks_per_request (int): how many chunks to fetch at once
+    Returns:
+        Iterator[bytearray]: the chunks of the reply
+    """
+    reply = send_brenthy_request(
+        "stream_request",
+        _encode_stream_request(blockchain_type, payload, chunks_per_request),
+        timeout=timeout
+    )
+    decoded_reply = _decode_stream_reply(reply)
+    if decoded_reply is None:
+        yield send_request(blockchain_type, payload, timeout=timeout)
+        return
+    stream_id, more, chunks = decoded_reply
+    try:
+        while True:
+            yield from chunks
+            if not more:
+                return
+            stream_id, more, chunks = _decode_stream_reply(
+                send_brenthy_request(
+                    "stream_next",
+                    encode_bytes_list(
+                        [stream_id, str(chunks_per_request).encode()]
+                    ),
+                    timeout=timeout
+                )
+            )
+    finally:
+        if more:
+            # the application stopped reading the stream before its end,
+            # if we fail to close it, Brenthy closes it when it expires
+            try:
+                send_brenthy_request(
+                    "stream_close", stream_id, timeout=timeout
+                )
+            except Exception:  # pylint: disable=broad-exception-caught
+                pass
+
+
+async def send_request_stream_async(
+    blockchain_type: str, payload: bytearray | bytes,
+    timeout: int | None = None,
+    chunks_per_request: int = STREAM_CHUNKS_PER_REQUEST,
+) -> AsyncIterator[bytearray]:
+    """Send a request to a blockchain type, receiving its reply in chunks.
+
+    The asyncio equivalent of `send_request_stream`.
+
+    Args:
+        blockchain_type(str): the blockchain type to forward the payload to
+        payload(bytearray): the message to send to the blockchain
+        timeout (int): how long to wait for each batch of chunks before
+            giving up, None to use default
+        chunks_per_request (int): how many chunks to fetch at once
+    Returns:
+        AsyncIterator[bytearray]: the chunks of the reply
+    """
+    reply = await send_brenthy_request_async(
+        "stream_request",
+        _encode_stream_request(blockchain_type, payload, chunks_per_request),
+        timeout=timeout
+    )
+    decoded_reply = _decode_stream_reply(reply)
+    if decoded_reply is None:
+        yield await send_request_async(
+            blockchain_type, payload, timeout=timeout
+        )
+        return
+    stream_id, more, chunks = decoded_reply
+    try:
+        while True:
+            for chunk in chunks:
+                yield chunk
+            if not more:
+                return
+            stream_id, more, chunks = _decode_stream_reply(
+                await send_brenthy_request_async(
+                    "stream_next",
+                    encode_bytes_list(
+                        [stream_id, str(chunks_per_request).encode()]
+                    ),
+                    timeout=timeout
+                )
+            )
+    finally:
+        if more:
+            # the application stopped reading the stream before its end,
+            # if we fail to close it, Brenthy closes it when it expires
+            try:
+                await send_brenthy_request_async(
+                    "stream_close", stream_id, timeout=timeout
+                )
+            except Exception:  # pylint: disable=broad-exception-caught
+                pass
+
+
+def _encode_stream_request(
+    blockchain_type: str, payload: bytearray | bytes, chunks_per_request: int
+) -> bytearray:
+    """Encode the payload of a stream_request RPC to Brenthy."""
+    if not isinstance(blockchain_type, str):
+        error_message = (
+            "blockchain_type must be of type str, not "
+            f"{type(blockchain_type)}"
+        )
+        log.error(f"BrenthyAPI: {function_name(1)}: {error_message}")
+        raise TypeError(error_message)
+    if not isinstance(payload, (bytearray, bytes)):
         error_message = (
             "payload must be of type bytearray, not " f"{type(payload)}"
         )
-        log.error(f"BrenthyAPI: {function_name()}: {error_message}")
+        log.error(f"BrenthyAPI: {function_name(1)}: {error_message}")
         raise TypeError(error_message)
+    return encode_bytes_list([
+        blockchain_type.encode(), payload, str(chunks_per_request).encode()
+    ])
 
-    # encapsulate the request together with the blockchain type
-    # and brenthy_tools version
-    request = blockchain_type.encode() + bytearray([0]) + payload
-    request = encode_version(BRENTHY_TOOLS_VERSION) + bytearray([0]) + request
 
-    reply: bytearray = bytearray()
-    # whether or not we've managed to establish communication with Brenthy-Core
-    communicated = False
-    # try sending request via different protocols
-    for protocol in bap_protocol_modules:
-        try:
-            reply = protocol.send_request(request, timeout=timeout)
-        except CantConnectToSocketError:
-            # try next BrenthyAPI protocol
-            continue
-        communicated = True
+def _decode_stream_reply(
+    reply: bytearray
+) -> tuple[bytes, bool, list[bytearray]] | None:
+    """Decode Brenthy's reply to a stream_request or stream_next RPC.
 
-        # decapsulate the reply
-        try:
-            brenthy_core_version = decode_version(
-                reply[: reply.index(bytearray([0]))]
-            )
-            reply = reply[reply.index(bytearray([0])) + 1:]
-            if not reply:
-                continue
-            # Request was processed successfully by Brenthy.
-            success = reply[0] == 1
-            reply = reply[1:]
+    Returns:
+        tuple[bytes, bool, list[bytearray]] | None: the stream's ID, whether
+            or not there are more chunks to come, and the received chunks,
+            or None if Brenthy doesn't support streaming
+    """
+    try:
+        data = json.loads(reply.decode())
+        if isinstance(data, dict) and data.get("error") == NOT_UNDERSTOOD:
+            return None
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        pass
+    try:
+        stream_id, state, *chunks = decode_bytes_list(reply)
+    except ValueError:
+        raise BrenthyReplyDecodeError(
+            "Failed to decode Brenthy's reply to a stream request.",
+            reply=reply
+        ) from None
+    if state == STREAM_FAILED:
+        raise _analyse_no_success_reply(chunks[0])
+    return (stream_id, state == STREAM_MORE, chunks)
+
+
+def _encapsulate_request_frames(
+    blockchain_type: str, payload: bytearray | bytes
+) -> list[bytes | bytearray]:
+    """Get the frames of a request for BAP modules which send multipart.
 
-            break  # request sent, got reply,so move on
-        except:
-            continue
-    if not reply:
+    Returns:
+        list[bytes | bytearray]: our encoded brenthy_tools version,
+            the encoded blockchain type and the (uncopied) payload
+    """
+    if not isinstance(blockchain_type, str):
+        error_message = (
+            "blockchain_type must be of type str, not "
+            f"{type(blockchain_type)}"
+        )
+        log.error(f"BrenthyAPI: {function_name(1)}: {error_message}")
+        raise TypeError(error_message)
+    if not isinstance(payload, (bytearray, bytes)):
+        error_message = (
+            "payload must be of type bytearray, not " f"{type(payload)}"
+        )
+        log.error(f"BrenthyAPI: {function_name(1)}: {error_message}")
+        raise TypeError(error_message)
+    return [ENCODED_TOOLS_VERSION, blockchain_type.encode(), payload]
+
+
+def _decapsulate_reply(
+    reply: bytearray | bytes
+) -> tuple[bool, bytearray] | None:
+    """Decapsulate a reply from Brenthy Core.
+
+    Returns:
+        tuple[bool, bytearray] | None: whether or not Brenthy processed the
+            request successfully and the reply to the request,
+            or None if the reply couldn't be decoded
+    """
+    try:
+        brenthy_core_version = decode_version(  # pylint: disable=unused-variable
+            reply[: reply.index(bytearray([0]))]
+        )
+        reply = reply[reply.index(bytearray([0])) + 1:]
+        if not reply:
+            return None
+        # Request was processed successfully by Brenthy.
+        success = reply[0] == 1
+        return (success, reply[1:])
+    except:  # pylint: disable=bare-except
+        return None
+
+
+def _decapsulate_reply_frames(
+    reply_frames: list[memoryview], endpoint: str | None = None
+) -> tuple[bool, bytearray] | None:
+    """Decapsulate a reply from Brenthy Core consisting of multiple frames.
+
+    If the reply includes a header frame, the reply is decompressed if
+    necessary and the codecs which Brenthy Core accepts are remembered.
+
+    Args:
+        reply_frames (list[memoryview]): the frames of the reply
+        endpoint (str): the Brenthy Core endpoint the reply came from
+    Returns:
+        tuple[bool, bytearray] | None: whether or not Brenthy processed the
+            request successfully and the reply to the request,
+            or None if the reply couldn't be decoded
+    """
+    try:
+        version, success, reply = reply_frames[:3]
+        brenthy_core_version = decode_version(  # pylint: disable=unused-variable
+            bytes(version)
+        )
+        if len(success) != 1:
+            return None
+        if len(reply_frames) > 3:
+            header = json.loads(bytes(reply_frames[3]))
+            if endpoint:
+                _core_codecs[endpoint] = header.get("accept_codecs", [])
+            if header.get("codec"):
+                # Brenthy Core's replies may be larger than the requests it
+                # accepts
+                reply = compression.decompress(
+                    header["codec"], reply, max_length=None
+                )
+        return (success[0] == 1, bytearray(reply))
+    except:  # pylint: disable=bare-except
+        return None
+
+
+def _add_request_header(
+    protocol: ModuleType,
+    request_frames: list[bytes | bytearray],
+    endpoint: str,
+    timeout: int | None
+) -> list[bytes | bytearray]:
+    """Add a header frame to a request's frames.
+
+    The header tells Brenthy Core the request's deadline, after which we no
+    longer need a reply, so that Brenthy Core doesn't waste resources on it.
+    If the BAP module compresses payloads, the payload is compressed if it's
+    large enough and we already know which codecs Brenthy Core accepts from a
+    previous reply, and the header tells Brenthy Core which codec we used and
+    which codecs we accept for compressing the reply.
+
+    Args:
+        protocol (ModuleType): the BAP module the request is sent with
+        request_frames (list): the output of `_encapsulate_request_frames`
+        endpoint (str): the Brenthy Core endpoint the request is for
+        timeout (int): how long to wait before giving up, None to use default
+    Returns:
+        list[bytes | bytearray]: the request frames with the header frame
+    """
+    version, blockchain_type, payload = request_frames
+    if timeout is None:
+        timeout = bt_endpoints.REQUEST_TIMEOUT_S
+    header: dict[str, Any] = {"deadline": time.time() + timeout}
+    if getattr(protocol, "COMPRESS_PAYLOADS", False):
+        codec, payload = compression.compress(
+            payload, _core_codecs.get(endpoint, [])
+        )
+        header["accept_codecs"] = compression.get_codec_names()
+        if codec:
+            header["codec"] = codec
+    return [version, blockchain_type, payload, json.dumps(header).encode()]
+
+
+def _send_via_protocol(
+    protocol: ModuleType,
+    request_frames: list[bytes | bytearray],
+    timeout: int | None
+) -> tuple[bool, bytearray] | None:
+    """Send a request using the given BAP module, decapsulating the reply.
+
+    Args:
+        protocol (ModuleType): the BAP module to use
+        request_frames (list): the output of `_encapsulate_request_frames`
+        timeout (int): how long to wait before giving up, None to use default
+    Returns:
+        tuple[bool, bytearray] | None: the output of `_decapsulate_reply`
+    """
+    if hasattr(protocol, "send_request_multipart"):
+        endpoint = brenthy_api_addresses.BRENTHY_IP_ADDRESS
+        request_frames = _add_request_header(
+            protocol, request_frames, endpoint, timeout
+        )
+        return _decapsulate_reply_frames(
+            protocol.send_request_multipart(request_frames, timeout=timeout),
+            endpoint
+        )
+    return _decapsulate_reply(protocol.send_request(
+        bytearray([0]).join(request_frames), timeout=timeout
+    ))
+
+
+async def _send_via_protocol_async(
+    protocol: ModuleType,
+    request_frames: list[bytes | bytearray],
+    timeout: int | None
+) -> tuple[bool, bytearray] | None:
+    """The asyncio equivalent of `_send_via_protocol`."""
+    if hasattr(protocol, "send_request_multipart_async"):
+        endpoint = brenthy_api_addresses.BRENTHY_IP_ADDRESS
+        request_frames = _add_request_header(
+            protocol, request_frames, endpoint, timeout
+        )
+        return _decapsulate_reply_frames(
+            await protocol.send_request_multipart_async(
+                request_frames, timeout=timeout
+            ),
+            endpoint
+        )
+    return _decapsulate_reply(await protocol.send_request_async(
+        bytearray([0]).join(request_frames), timeout=timeout
+    ))
+
+
+def _evaluate_reply(
+    decapsulated_reply: tuple[bool, bytearray] | None, communicated: bool
+) -> bytearray:
+    """Get the result of a request from its decapsulated reply.
+
+    Args:
+        decapsulated_reply (tuple[bool, bytearray] | None): the output of
+            `_decapsulate_reply`
+        communicated (bool): whether or not we managed to establish
+            communication with Brenthy Core
+    Returns:
+        bytearray: the reply from Brenthy or the blockchain.
+    """
+    if not decapsulated_reply:
         if communicated:
             raise BrenthyReplyDecodeError(
                 BrenthyReplyDecodeError.def_message
@@ -160,6 +821,7 @@ def send_request(
             )
         else:
             raise BrenthyNotRunningError()
+    success, reply = decapsulated_reply
     if success:
         return reply
 
@@ -167,6 +829,211 @@ def send_request(
     raise _analyse_no_success_reply(reply)
 
 
+def _probe_protocol(protocol: ModuleType) -> None:
+    """Check if the given BAP module works, raising an exception if not."""
+    request_frames = _encapsulate_request_frames(
+        "Brenthy", "get_brenthy_version".encode() + bytearray([0])
+    )
+    if not _send_via_protocol(protocol, request_frames, PROBE_TIMEOUT_S):
+        raise BrenthyReplyDecodeError()
+
+
+bap_health = BapHealthTracker(_probe_protocol)
+# replies to requests made with a cache_ttl
+reply_cache = ReplyCache()
+# endpoint -> the compression codecs Brenthy Core accepts, learnt from replies
+_core_codecs: dict[str, list[str]] = {}
+
+
+def get_protocol_stats() -> dict[str, dict[int, dict]]:
+    """Get statistics on the BrenthyAPI protocols used to send requests.
+
+    Shows which BrenthyAPI protocol (BAP) our requests take to reach each
+    Brenthy Core endpoint (IP address), how often each protocol succeeded or
+    failed, how long requests took and whether or not failed protocols are
+    currently in backoff.
+
+    Returns:
+        dict: endpoint -> BAP version -> statistics, for example:
+            {"127.94.21.1": {5: {
+                "successes": 10, "failures": 0,
+                "mean_latency_s": 0.0002, "last_latency_s": 0.0002,
+                "available": True, "retry_in_s": 0.0,
+            }}}
+    """
+    return bap_health.get_stats()
+
+
+def get_reply_cache_stats() -> dict:
+    """Get the hit & miss counters of the cache of replies to requests.
+
+    Only requests made with a `cache_ttl` use the cache.
+    See `ReplyCache.get_stats` for the format of the returned dictionary.
+    """
+    return reply_cache.get_stats()
+
+
+def clear_reply_cache() -> None:
+    """Remove all cached replies to requests."""
+    reply_cache.invalidate()
+
+
+def get_compression_stats() -> dict:
+    """Get statistics on the compression of our requests & Brenthy's replies.
+
+    Shows how many payloads were compressed and decompressed with which
+    codec, the compression ratio achieved and the CPU time it cost.
+    See `compression.get_stats` for the format of the returned dictionary.
+    Use `get_brenthy_compression_stats` to get Brenthy Core's statistics.
+    """
+    return compression.get_stats()
+
+
+def get_brenthy_compression_stats(timeout: int | None = None) -> dict:
+    """Get statistics on Brenthy Core's compression of payloads.
+
+    Like `get_compression_stats`, but for all of Brenthy Core's BrenthyAPI
+    traffic.
+    """
+    return json.loads(send_brenthy_request(
+        "get_compression_stats", bytearray(), timeout=timeout
+    ))
+
+
+def get_brenthy_publisher_stats(timeout: int | None = None) -> dict:
+    """Get statistics on Brenthy Core's publishing of events.
+
+    For each BrenthyAPI protocol's publisher, shows the number of
+    subscriptions to each topic, and how often a subscriber's queue
+    overflowed when publishing each topic's events, because it wasn't
+    receiving them fast enough, so that it missed events.
+    See `ZmqPublisher.get_stats` in api_terminal/bat_endpoints.py for the
+    format of each publisher's statistics.
+    Use `EventListener.get_stats` to get an EventListener's own backlog.
+    """
+    return json.loads(send_brenthy_request(
+        "get_publisher_stats", bytearray(), timeout=timeout
+    ))
+
+
+def get_brenthy_request_stats(timeout: int | None = None) -> dict:
+    """Get statistics on Brenthy Core's processing of requests.
+
+    For each BrenthyAPI protocol, shows how many threads Brenthy Core is
+    processing its requests on, how many requests are waiting for one and
+    how long they waited.
+    See `ElasticWorkerPool.get_stats` in api_terminal/worker_pool.py for the
+    format of each protocol's statistics.
+    """
+    return json.loads(send_brenthy_request(
+        "get_request_stats", bytearray(), timeout=timeout
+    ))
+
+
+def get_brenthy_reply_cache_stats(timeout: int | None = None) -> dict:
+    """Get statistics on Brenthy Core's caching of blockchain replies.
+
+    Shows how many of the requests which blockchain types declared
+    cacheable were answered from Brenthy Core's reply cache (hits) and how
+    many were forwarded to the blockchain type (misses).
+    See `ReplyCache.get_stats` in brenthy_tools_beta/reply_cache.py for the
+    format of the statistics.
+    Not to be confused with `get_reply_cache_stats`, which gets those of
+    brenthy_api's own reply cache.
+    """
+    return json.loads(send_brenthy_request(
+        "get_reply_cache_stats", bytearray(), timeout=timeout
+    ))
+
+
+def get_brenthy_coalescing_stats(timeout: int | None = None) -> dict:
+    """Get statistics on Brenthy Core's coalescing of identical requests.
+
+    Shows how many times Brenthy Core executed blockchain requests which may
+    be coalesced (executions), how many identical requests shared those
+    executions' replies instead of being executed themselves (coalesced,
+    the number of executions saved), and how many are in progress
+    (in_flight).
+    """
+    return json.loads(send_brenthy_request(
+        "get_coalescing_stats", bytearray(), timeout=timeout
+    ))
+
+
+def get_events_since(
+    blockchain_type: str,
+    sequence: int,
+    topics: str | list[str] | None = None,
+    timeout: int | None = None,
+) -> tuple[list[tuple[int, str, dict]], bool]:
+    """Get the events a blockchain type published after the given one.
+
+    Brenthy Core keeps each blockchain type's most recent events in a replay
+    buffer, so that applications which missed events, for example while they
+    were restarting, can catch up on them instead of rescanning the
+    blockchain. EventListener can do this for you, see its `resume_from`
+    parameter.
+
+    Args:
+        blockchain_type (str): the blockchain type whose events to get
+        sequence (int): the sequence number of the last event received,
+            see EventListener.last_sequence
+        topics (list[str] | str): the topics of the events to get,
+            None to get all topics'
+        timeout (int): how long to wait before giving up, None to use default
+    Returns:
+        list[tuple[int, str, dict]]: the events' sequence numbers, topics
+            and data, in the order in which they were published
+        bool: whether or not the events are complete, i.e. none of the events
+            published after the given one have been dropped from Brenthy
+            Core's replay buffer or lost while it was restarting, and the
+            given sequence number isn't ahead of Brenthy Core's
+    """
+    if isinstance(topics, str):
+        topics = [topics]
+    events, complete = _get_events_since(
+        blockchain_type,
+        sequence,
+        [f"{blockchain_type}-{topic}" for topic in topics or []],
+        timeout,
+    )
+    return (
+        [
+            (event_sequence, _strip_blockchain_type(blockchain_type, topic),
+             data)
+            for event_sequence, topic, data in events
+        ],
+        complete,
+    )
+
+
+def _get_events_since(
+    blockchain_type: str,
+    sequence: int,
+    brenthy_topics: list[str],
+    timeout: int | None = None,
+) -> tuple[list[tuple[int, str, dict]], bool]:
+    """Like `get_events_since`, but with the topics' full names."""
+    events: list[tuple[int, str, dict]] = []
+    complete = True
+    while True:
+        reply = decode_value(send_brenthy_request(
+            "get_events_since",
+            bytearray(encode_value({
+                "blockchain_type": blockchain_type,
+                "topics": brenthy_topics,
+                "sequence": sequence,
+            })),
+            timeout=timeout,
+        ))
+        complete = complete and reply["complete"]
+        events += [tuple(event) for event in reply["events"]]
+        if not reply["more"]:
+            return (events, complete)
+        # get the rest of the events in the next reply
+        sequence = events[-1][0]
+
+
 def _analyse_no_success_reply(reply: bytearray) -> Exception:
     """Get the appropriate Exception for the given reply from Brenthy.
 
@@ -196,6 +1063,22 @@ def _analyse_no_success_reply(reply: bytearray) -> Exception:
             error_message = "Blockchain returned no response to request."
             log.error(f"BrenthyAPI: {function_name()}: {error_message}")
             return BrenthyError("Blockchain returned no response to request.")
+        if data["error"] == REQUEST_CANCELLED:
+            error_message = (
+                "Brenthy cancelled the request as its deadline passed."
+            )
+            log.error(f"BrenthyAPI: {function_name()}: {error_message}")
+            return BrenthyError(error_message)
+        if data["error"] == BRENTHY_BUSY:
+            return BrenthyBusyError(
+                retry_after_s=float(data.get("retry_after_s", 0))
+            )
+        if data["error"] == STREAM_NOT_FOUND:
+            error_message = (
+                "Streamed reply not found, it may have expired."
+            )
+            log.error(f"BrenthyAPI: {function_name()}: {error_message}")
+            return BrenthyError(error_message)
         if data["error"] == UNKNOWN_BLOCKCHAIN_TYPE:
             error_message = "Unknown blockchain type."
             log.error(f"BrenthyAPI: {function_name()}: {error_message}")
@@ -210,32 +1093,87 @@ def _analyse_no_success_reply(reply: bytearray) -> Exception:
 
 
 def send_brenthy_request(
-    function_name: str, payload: bytearray, timeout: int | None = None
+    function_name: str, payload: bytearray, timeout: int | None = None,
+    cache_ttl: float | None = None
+) -> bytearray:
+    """Make a request to Brenthy (NOT a Brenthy blockchain).
+
+    Args:
+        function_name (str): the name of the function in api_terminal
+                                which we want to call
+        payload (bytearray): the data the function in api_terminal
+                                needs to process our request, its arguments
+        timeout (int): how long to wait before giving up, None to use default
+        cache_ttl (float): how long the reply may be cached, see `send_request`
+    Returns:
+        bytearray: the reply from the function we called in
+                                api_terminal
+    """
+    request = function_name.encode() + bytearray([0]) + payload
+    return send_request(
+        "Brenthy", request, timeout=timeout, cache_ttl=cache_ttl
+    )
+
+
+async def send_brenthy_request_async(
+    function_name: str, payload: bytearray, timeout: int | None = None,
+    cache_ttl: float | None = None
 ) -> bytearray:
     """Make a request to Brenthy (NOT a Brenthy blockchain).
 
+    The asyncio equivalent of `send_brenthy_request`.
+
     Args:
         function_name (str): the name of the function in api_terminal
                                 which we want to call
         payload (bytearray): the data the function in api_terminal
                                 needs to process our request, its arguments
         timeout (int): how long to wait before giving up, None to use default
+        cache_ttl (float): how long the reply may be cached, see `send_request`
     Returns:
         bytearray: the reply from the function we called in
                                 api_terminal
     """
     request = function_name.encode() + bytearray([0]) + payload
-    return send_request("Brenthy", request, timeout=timeout)
+    return await send_request_async(
+        "Brenthy", request, timeout=timeout, cache_ttl=cache_ttl
+    )
 
 
 class EventListener:
-    """Class for listening to the messages published by a blockchain type."""
+    """Class for listening to the messages published by a blockchain type.
+
+    The eventhandler is called on the worker threads of an EventExecutor,
+    which handles each topic's messages in the order they were published,
+    different topics' in parallel.
+    By default, all EventListeners share a process-wide EventExecutor.
+    To isolate an EventListener's eventhandler from others, or to configure
+    how many messages may be queued and what to do with further messages,
+    pass it an EventExecutor.
+
+    Brenthy Core numbers each blockchain type's messages with increasing
+    sequence numbers. An application can store the `last_sequence` of its
+    EventListener, and when it restarts, pass it as `resume_from` to its new
+    EventListener, which then first passes the eventhandler the messages
+    published in the meantime, as far as Brenthy Core's replay buffer
+    still holds them. If it didn't, `missed_events` is set to True, so that
+    the application knows it needs to rescan the blockchain after all.
+    Messages of different topics are handled in parallel, so one topic's
+    message may be handled before an earlier message of another topic.
+    To not miss any messages when resuming, listen to a single topic or use
+    an EventExecutor with a single worker thread.
+    The sequence numbers of messages received with BAP-4, which Brenthy Core
+    uses when it's too old for BAP-5, are unknown, so such EventListeners
+    can't resume without handling some messages twice.
+    """
 
     def __init__(
         self,
         blockchain_type: str,
         eventhandler: FunctionType,
         topics: str | list[str],
+        executor: EventExecutor | None = None,
+        resume_from: int | None = None,
     ):
         """Listen messages published by a blockchain type.
 
@@ -246,7 +1184,26 @@ class EventListener:
                                     message is received
             topics (list[str] | str): the topic or topic to filter the
                                     blockchain type's publication's by
+            executor (EventExecutor): the executor on which to call the
+                                    eventhandler, which may be shared with
+                                    other EventListeners, None to use the
+                                    process-wide default executor; while
+                                    the queue of an executor with the BLOCK
+                                    policy is full, no EventListener gets
+                                    any events
+            resume_from (int): the sequence number of the last message
+                                    received by a previous EventListener,
+                                    to first handle the messages published
+                                    after it, None to only handle new ones
         """
+        self.executor = executor or get_default_executor()
+        # the sequence number of the last message handled
+        self.last_sequence: int | None = resume_from
+        # whether messages were lost before they could be resumed from
+        self.missed_events = False
+        # topic -> the sequence number of its last message handled
+        self._topic_sequences: dict[str, int] = {}
+        self._sequences_lock = Lock()
         if not topics:
             topics = []
         if isinstance(topics, str):
@@ -264,14 +1221,23 @@ class EventListener:
             f"{self.blockchain_type}-{topic}" for topic in topics
         ]
         self.users_eventhandler = eventhandler
+        # imported here as it is slow to import
+        import inspect  # pylint: disable=import-outside-toplevel
+
+        self._n_params = len(inspect.signature(eventhandler).parameters)
 
+        # while resuming, hold back new messages until the missed ones have
+        # been passed to the executor
+        held_events = (
+            _HeldEvents(self.executor) if resume_from is not None else None
+        )
         eventlistener: bt_endpoints.EventListener
         # go through the different BrenthyAPI Protocols, newest version first,
         # until one succeeds at connecting an EventListener to Brenthy
-        for protocol in bap_protocol_modules:
+        for protocol in _get_bap_protocol_modules():
             try:
                 eventlistener = protocol.EventListener(
-                    self._handler, brenthy_topics
+                    self._handler, brenthy_topics, held_events or self.executor
                 )
             except (CantConnectToSocketError, NotImplementedError):
                 # try next BrenthyAPI protocol
@@ -282,25 +1248,74 @@ class EventListener:
             raise BrenthyNotRunningError
 
         self._eventlistener = eventlistener
+        if held_events:
+            try:
+                self._resume(resume_from, brenthy_topics, held_events)
+            except Exception:
+                self.terminate()
+                raise
 
-    def _handler(self, message: dict, topic: str) -> None:
-        """Process an event from Brenthy Core."""
-        if topic.startswith(f"{self.blockchain_type}-"):
-            topic = topic[len(f"{self.blockchain_type}-"):]
-        else:
+    def _resume(
+        self,
+        sequence: int,
+        brenthy_topics: list[str],
+        held_events: "_HeldEvents",
+    ) -> None:
+        """Handle the messages published after the given one.
+
+        Then releases the held back messages received meanwhile.
+        """
+        events, complete = _get_events_since(
+            self.blockchain_type, sequence, brenthy_topics
+        )
+        if not complete:
+            self.missed_events = True
             log.warning(
-                f"BrenthyAPI.EventListener topic `{topic}` "
-                f"didn't doesn't start with `{self.blockchain_type}-`"
+                f"BrenthyAPI: EventListener {self.blockchain_type}: "
+                f"can't resume from message {sequence}, some messages "
+                "after it are no longer available."
             )
+            # continue from the messages Brenthy Core has, whose sequence
+            # numbers may be lower than the one we resumed from
+            with self._sequences_lock:
+                self.last_sequence = None
+        held_events.release([
+            (topic, self._handler, (data, topic, event_sequence))
+            for event_sequence, topic, data in events
+        ])
+
+    def _handler(
+        self, message: dict, topic: str, sequence: int | None = None
+    ) -> None:
+        """Process an event from Brenthy Core."""
+        if sequence is not None:
+            with self._sequences_lock:
+                if sequence <= self._topic_sequences.get(topic, -1):
+                    # already handled from Brenthy Core's replay buffer
+                    return
+                self._topic_sequences[topic] = sequence
+                if self.last_sequence is None or sequence > self.last_sequence:
+                    self.last_sequence = sequence
+        # the blockchain type's state may have changed
+        reply_cache.invalidate(self.blockchain_type)
+        topic = _strip_blockchain_type(self.blockchain_type, topic)
         # call the eventhandler, passing it the data and topic
-        n_params = len(signature(self.users_eventhandler).parameters)
-        if n_params == 1:
+        if self._n_params == 1:
             self.users_eventhandler(
                 message,
             )
         else:
             self.users_eventhandler(message, topic)
 
+    def get_stats(self) -> dict:
+        """Get the queue depth and handler latency of the EventExecutor.
+
+        Unless this EventListener was given its own EventExecutor, these
+        statistics include those of other EventListeners.
+        See EventExecutor.get_stats.
+        """
+        return self.executor.get_stats()
+
     def terminate(self) -> None:
         """Stop listening to publications and clean up resources."""
         self._eventlistener.terminate()
@@ -310,23 +1325,187 @@ class EventListener:
         self.terminate()
 
 
+class _HeldEvents:
+    """Holds back an EventListener's events while it resumes.
+
+    Stands in for the EventListener's EventExecutor, passing events on to it
+    once the events missed before them have been passed to it.
+    """
+
+    def __init__(self, executor: EventExecutor):
+        """Hold back events for the given executor."""
+        self.executor = executor
+        self._held: list[tuple[str, FunctionType, tuple]] | None = []
+        self._lock = Lock()
+
+    def submit(
+        self, topic: str, handler: FunctionType, args: tuple[Any, ...]
+    ) -> None:
+        """Pass an event on to the executor, or hold it back."""
+        with self._lock:
+            if self._held is not None:
+                self._held.append((topic, handler, args))
+                return
+        self.executor.submit(topic, handler, args)
+
+    def release(self, events: list[tuple[str, FunctionType, tuple]]) -> None:
+        """Pass the given and held back events on to the executor."""
+        with self._lock:
+            for topic, handler, args in events + self._held:
+                self.executor.submit(topic, handler, args)
+            self._held = None
+
+
+class AsyncEventListener:
+    """Class for listening to a blockchain type's publications in asyncio.
+
+    The asyncio equivalent of EventListener.
+    Must be created in a running event loop, on which it delivers events
+    either by being iterated over or by calling the eventhandler, which can
+    be a coroutine function.
+
+    Examples:
+    ```python
+    async for data, topic in AsyncEventListener("Walytis_Beta", topics=...):
+        pass
+
+    async def _on_event(data: dict, topic:str):
+        pass
+    AsyncEventListener("Walytis_Beta", _on_event, topics=...)
+    ```
+    """
+
+    def __init__(
+        self,
+        blockchain_type: str,
+        eventhandler: FunctionType | None = None,
+        topics: str | list[str] | None = None,
+    ):
+        """Listen messages published by a blockchain type.
+
+        Args:
+            blockchain_type (str): the blockchain type whose messages to listen
+                                    to
+            eventhandler (FunctionType): optional function or coroutine
+                                    function to be called when a message is
+                                    received
+            topics (list[str] | str): the topic or topic to filter the
+                                    blockchain type's publication's by
+        """
+        if not topics:
+            topics = []
+        if isinstance(topics, str):
+            topics = [topics]
+        if not isinstance(topics, list):
+            error_message = (
+                f"BrenthyAPI: AsyncEventListener("
+                f"{topics}): Parameter topics must be of type list or str, "
+                f"not {type(topics)}"
+            )
+            log.error(error_message)
+            raise ValueError(error_message)
+        self.blockchain_type = blockchain_type
+        brenthy_topics = [
+            f"{self.blockchain_type}-{topic}" for topic in topics
+        ]
+        self.users_eventhandler = eventhandler
+        self._n_params = 0
+        if eventhandler:
+            # imported here as it is slow to import
+            import inspect  # pylint: disable=import-outside-toplevel
+
+            self._n_params = len(inspect.signature(eventhandler).parameters)
+
+        eventlistener: bt_endpoints.AsyncEventListener | None = None
+        for protocol in _get_bap_protocol_modules():
+            try:
+                eventlistener = protocol.AsyncEventListener(
+                    self._handler if eventhandler else None, brenthy_topics
+                )
+            except (CantConnectToSocketError, NotImplementedError):
+                continue
+            break  # AsyncEventListener connected
+
+        if not eventlistener:
+            raise BrenthyNotRunningError
+
+        self._eventlistener = eventlistener
+
+    def __aiter__(self) -> "AsyncEventListener":
+        """Iterate over received events as (data, topic) tuples."""
+        return self
+
+    async def __anext__(self) -> tuple[dict, str]:
+        """Wait for the next event."""
+        message, topic = await self._eventlistener.__anext__()
+        return message, _strip_blockchain_type(self.blockchain_type, topic)
+
+    def _handler(self, message: dict, topic: str) -> Any:
+        """Process an event from Brenthy Core."""
+        # the blockchain type's state may have changed
+        reply_cache.invalidate(self.blockchain_type)
+        topic = _strip_blockchain_type(self.blockchain_type, topic)
+        if self._n_params == 1:
+            return self.users_eventhandler(message)
+        return self.users_eventhandler(message, topic)
+
+    def terminate(self) -> None:
+        """Stop listening to publications and clean up resources."""
+        self._eventlistener.terminate()
+
+
+def _strip_blockchain_type(blockchain_type: str, topic: str) -> str:
+    """Remove the blockchain type from an event's topic."""
+    if topic.startswith(f"{blockchain_type}-"):
+        return topic[len(f"{blockchain_type}-"):]
+    log.warning(
+        f"BrenthyAPI.EventListener topic `{topic}` "
+        f"didn't doesn't start with `{blockchain_type}-`"
+    )
+    return topic
+
+
 # pylint: disable=unused-variable
 
 
-def get_brenthy_version(timeout: int | None = None) -> tuple:
+def get_brenthy_version(
+    timeout: int | None = None, cache_ttl: float | None = None
+) -> tuple:
     """Get the software version of the locally running Brenthy node.
 
+    Args:
+        timeout (int): how long to wait before giving up, None to use default
+        cache_ttl (float): for how many seconds the version may be cached
+            for subsequent calls, None to always ask Brenthy
     Returns:
         tuple: the software version of the locally running Brenthy node
     """
     return tuple(
         json.loads(
             send_brenthy_request("get_brenthy_version",
-                                 bytearray([]), timeout=timeout).decode()
+                                 bytearray([]), timeout=timeout,
+                                 cache_ttl=cache_ttl).decode()
         )["brenthy_core_version"]
     )
 
 
+async def get_brenthy_version_async(
+    timeout: int | None = None, cache_ttl: float | None = None
+) -> tuple:
+    """Get the software version of the locally running Brenthy node.
+
+    The asyncio equivalent of `get_brenthy_version`.
+
+    Returns:
+        tuple: the software version of the locally running Brenthy node
+    """
+    reply = await send_brenthy_request_async(
+        "get_brenthy_version", bytearray([]), timeout=timeout,
+        cache_ttl=cache_ttl
+    )
+    return tuple(json.loads(reply.decode())["brenthy_core_version"])
+
+
 def get_brenthy_version_string() -> str:
     """Get the software version of the locally running Brenthy node.
 
@@ -424,6 +1603,35 @@ class BrenthyError(Exception):
         return self.message
 
 
+class BrenthyBusyError(Exception):
+    """When Brenthy refuses a request as we are making too many requests.
+
+    `send_request` waits and retries such requests until its timeout is
+    reached, after which it raises this error.
+    """
+
+    def_message = (
+        "Brenthy is busy: we made too many requests in too short a time."
+    )
+
+    def __init__(
+        self, message: str = def_message, retry_after_s: float = 0
+    ):
+        """Raise a BrenthyBusyError exception.
+
+        Args:
+            message (str): the error message to store in this Exception
+            retry_after_s (float): after how many seconds Brenthy will accept
+                our requests again
+        """
+        self.message = message
+        self.retry_after_s = retry_after_s
+
+    def __str__(self):
+        """Get this exception's error message."""
+        return f"{self.message} Retry after {self.retry_after_s:.3f}s."
+
+
 class UnknownBlockchainTypeError(Exception):
     """When the provided blockchain type isn't installed on Brenthy."""
 
@@ -449,17 +1657,11 @@ class UnknownBlockchainTypeError(Exception):
         return self.message
 
 
-_AUTO_LOAD_BAP_MODULES = os.environ.get("AUTO_LOAD_BAP_MODULES", "").lower()
-if not _AUTO_LOAD_BAP_MODULES or _AUTO_LOAD_BAP_MODULES in ["true", "1"]:
-    AUTO_LOAD_BAP_MODULES = True
-elif _AUTO_LOAD_BAP_MODULES in ["false", "0"]:
-    AUTO_LOAD_BAP_MODULES = False
-else:
-    error_message = (
-        "Invalid value for environment variable AUTO_LOAD_BAP_MODULES: "
-        f"{_AUTO_LOAD_BAP_MODULES}\n"
-        "Valid values: 0, false, False, 1, true, True"
-    )
+# errors that only concern individual requests of a batch request
+_BATCH_ITEM_ERRORS = (
+    BrenthyError, BrenthyReplyDecodeError, UnknownBlockchainTypeError
+)
 
-if AUTO_LOAD_BAP_MODULES:
-    _load_brenthy_api_protocols()
+# whether or not to load the BAP modules from BAP_MODULES_REGISTRY on first
+# use, if not, they must be put into bap_protocol_modules manually
+AUTO_LOAD_BAP_MODULES = _get_env_bool("AUTO_LOAD_BAP_MODULES", default=True)
@@ -1,5 +1,6 @@
 """The network addresses via which Brenthy uses for BrenthyAPI."""
 import os
+import tempfile
 # pylint: disable=unused-variable
 DEF_BRENTHY_IP_ADDRESS = "127.94.21.1"
 DEF_BRENTHY_API_IP_LISTEN_ADDRESS = DEF_BRENTHY_IP_ADDRESS
@@ -16,3 +17,28 @@ BRENTHY_API_IP_LISTEN_ADDRESS = os.environ.get(
 BAP_3_RPC_PORT = 29200
 BAP_4_RPC_PORT = 29201
 BAP_4_PUB_PORT = 29202
+BAP_5_RPC_PORT = 29203
+BAP_5_PUB_PORT = 29204
+
+# the directory in which Brenthy Core creates the Unix domain sockets (ZMQ ipc)
+# via which applications on the same machine can communicate with it (BAP-6)
+DEF_BRENTHY_API_IPC_DIR = os.path.join(
+    tempfile.gettempdir(), "brenthy_api"
+)
+BRENTHY_API_IPC_DIR = os.environ.get(
+    "BRENTHY_API_IPC_DIR",
+    DEF_BRENTHY_API_IPC_DIR
+)
+# filesystem permissions of the IPC directory & sockets, which determine which
+# users can communicate with Brenthy Core via BAP-6 (connecting to a Unix
+# domain socket requires write permission on it)
+DEF_BRENTHY_API_IPC_PERMISSIONS = 0o666
+BRENTHY_API_IPC_PERMISSIONS = int(
+    os.environ.get(
+        "BRENTHY_API_IPC_PERMISSIONS",
+        oct(DEF_BRENTHY_API_IPC_PERMISSIONS)
+    ),
+    8
+)
+BAP_6_RPC_IPC_PATH = os.path.join(BRENTHY_API_IPC_DIR, "bap_6_rpc.ipc")
+BAP_6_PUB_IPC_PATH = os.path.join(BRENTHY_API_IPC_DIR, "bap_6_pub.ipc")
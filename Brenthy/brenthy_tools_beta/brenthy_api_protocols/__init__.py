@@ -1,4 +1,6 @@
 BAP_MODULES_REGISTRY = [
     "bap_3_brenthy_tools",
     "bap_4_brenthy_tools",
+    "bap_5_brenthy_tools",
+    "bap_6_brenthy_tools",
 ]
\ No newline at end of file
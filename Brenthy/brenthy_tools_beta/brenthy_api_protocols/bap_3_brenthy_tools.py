@@ -12,7 +12,10 @@ from brenthy_tools_beta.brenthy_api_addresses import (
     BAP_3_RPC_PORT,
     BRENTHY_IP_ADDRESS,
 )
-from brenthy_tools_beta.bt_endpoints import send_request_tcp
+from brenthy_tools_beta.bt_endpoints import (
+    send_request_tcp,
+    send_request_tcp_async,
+)
 
 BAP_VERSION = 3  # pylint: disable=unused-variable
 
@@ -35,9 +38,45 @@ def send_request(
     )
 
 
-class EventListener(bt_endpoints.EventListener):  # pylint: disable=unused-variable,too-few-public-methods
+async def send_request_async(
+    request: bytearray | bytes, timeout: int | None = None
+) -> bytes:  # pylint: disable=unused-variable
+    """Send a BrenthyAPI request to Brenthy-Core, awaiting its reply.
+
+    Args:
+        request (bytearray): the data to send to Brenthy-Core
+        timeout (int): how long to wait before giving up, None to use default
+    Returns:
+        bytearray: the response received from Brenthy-Core
+    """
+    return await send_request_tcp_async(
+        request,
+        (BRENTHY_IP_ADDRESS, BAP_3_RPC_PORT),
+        timeout=timeout
+    )
+
+
+class EventListener(bt_endpoints.EventListener):  # pylint: disable=unused-variable
     """NOT IMPLEMENTED: for listening to events published by Brenthy Core."""
 
     def __init__(self, *args):
         """NOT IMPLEMENTED: Listen for events from Brenthy Core."""
         raise NotImplementedError
+
+    def terminate(self) -> None:
+        """NOT IMPLEMENTED: Stop listening for events."""
+
+
+class AsyncEventListener(bt_endpoints.AsyncEventListener):  # pylint: disable=unused-variable
+    """NOT IMPLEMENTED: for listening to async events from Brenthy Core."""
+
+    def __init__(self, *args):
+        """NOT IMPLEMENTED: Listen for events from Brenthy Core."""
+        raise NotImplementedError
+
+    async def __anext__(self) -> tuple[dict, str]:
+        """NOT IMPLEMENTED: Wait for the next event."""
+        raise NotImplementedError
+
+    def terminate(self) -> None:
+        """NOT IMPLEMENTED: Stop listening for events."""
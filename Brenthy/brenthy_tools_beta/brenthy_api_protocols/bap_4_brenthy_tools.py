@@ -7,9 +7,9 @@ This module's counterpart, which contain's Brenthy Core's machinery, is at
 ../../api_terminal/brenthy_api_protocols/bap_4_brenthy_core.py
 """
 
+import asyncio
 import json
-from inspect import signature
-from threading import Thread
+from inspect import isawaitable, signature
 from types import FunctionType
 
 import zmq
@@ -20,16 +20,17 @@ from brenthy_tools_beta.brenthy_api_addresses import (
     BRENTHY_IP_ADDRESS,
 )
 from brenthy_tools_beta.bt_endpoints import (
-    CantConnectToSocketError,
     send_request_zmq,
+    send_request_zmq_async,
+)
+from brenthy_tools_beta.event_executor import (
+    EventExecutor,
+    get_default_executor,
 )
 from brenthy_tools_beta.utils import function_name
 
 BAP_VERSION = 4  # pylint: disable=unused-variable
 
-# keep track of contexts to avoid problems caused by garbage collector
-CONTEXTS = []
-
 
 def send_request(
     request: bytearray | bytes, timeout: int | None = None
@@ -48,6 +49,37 @@ def send_request(
     )
 
 
+async def send_request_async(
+    request: bytearray | bytes, timeout: int | None = None
+) -> bytes:  # pylint: disable=unused-variable
+    """Send a BrenthyAPI request to Brenthy-Core, awaiting its reply.
+
+    Args:
+        request (bytearray): the data to send to Brenthy-Core
+        timeout (int): how long to wait before giving up, None to use default
+    Returns:
+        bytearray: the response received from Brenthy-Core
+    """
+    return await send_request_zmq_async(
+        request, (BRENTHY_IP_ADDRESS, BAP_4_RPC_PORT), timeout=timeout
+    )
+
+
+def _get_subscription_prefix(topic: str) -> bytes:
+    """Get the prefix by which to filter the given topic's events.
+
+    BAP-4 events are JSON strings whose first key is the topic.
+    """
+    return (json.dumps({"topic": topic})[:-1] + ",").encode()
+
+
+def _decode_message(frames: list[bytes]) -> tuple[dict, str]:
+    """Decode a received event into its data and topic."""
+    data = json.loads(frames[0])
+    topic = data.pop("topic")  # remove topic from data
+    return data, topic
+
+
 class EventListener(bt_endpoints.EventListener):  # pylint: disable=unused-variable
     """Object for listening to events published by Brenthy Core.
 
@@ -63,12 +95,21 @@ class EventListener(bt_endpoints.EventListener):  # pylint: disable=unused-varia
     def _on_new_block_received(data: dict, topic:str):
        pass
     ```
+    All EventListeners of a process share a single subscription to Brenthy
+    Core's publishing socket: a ZmqSubscriptionHub, which passes them the
+    events of their topics.
+    The eventhandler is called on the threads of an EventExecutor, for each
+    topic in the order in which its events were published.
     """
 
+    # the ZMQ address of Brenthy Core's publishing socket
+    pub_address = f"tcp://{BRENTHY_IP_ADDRESS}:{BAP_4_PUB_PORT}"
+
     def __init__(
         self,
         eventhandler: FunctionType,
         topics: (list[str] | str | None) = None,
+        executor: EventExecutor | None = None,
     ):
         """Listen for events from Brenthy Core.
 
@@ -77,13 +118,12 @@ class EventListener(bt_endpoints.EventListener):  # pylint: disable=unused-varia
                 dict (event-data) and optionally a string (topic)
                 See class docstring for examples.
             topics (list[str] | str): the topics to filter messages by
+            executor (EventExecutor): the executor on which to call the
+                eventhandler, None to use the process-wide default executor
         """
         self._terminate = False
-        try:
-            self.zmq_context = zmq.Context()
-            CONTEXTS.append(self.zmq_context)
-        except:
-            raise CantConnectToSocketError(protocol="ZMQ") from None
+        self._subscription_ids: list[int] = []
+        self.executor = executor or get_default_executor()
         if not topics:
             topics = []
         if isinstance(topics, str):
@@ -98,8 +138,8 @@ class EventListener(bt_endpoints.EventListener):  # pylint: disable=unused-varia
             raise ValueError(error_message)
         self.eventhandler = eventhandler
         self.topics = topics
-        n_params = len(signature(self.eventhandler).parameters)
-        if n_params == 0:
+        self._n_params = len(signature(self.eventhandler).parameters)
+        if self._n_params == 0:
             error_message = (
                 f"BAP-4-BT.EventListener {topics}: "
                 "eventhandler must have 1 or 2 parameters: (data, topic)"
@@ -111,74 +151,184 @@ class EventListener(bt_endpoints.EventListener):  # pylint: disable=unused-varia
         if not self.topics:
             self.topics = [""]
 
-        self.listener_thread = Thread(
-            target=self._listen, args=(), name="BrenthyAPI-ListenToEvents"
-        )
-        self.listener_thread.start()
+        self._hub = bt_endpoints.get_subscription_hub(self.pub_address)
+        for topic in self.topics:
+            prefix = self._get_subscription_prefix(topic)
+            self._subscription_ids.append(
+                self._hub.subscribe(prefix, self._on_message)
+            )
+            log.info(f"BAP-4-BT.EventListener: subscribed to {prefix!r}")
+
+    def _on_message(self, frames: list[bytes]) -> None:
+        """Pass an event received by the ZmqSubscriptionHub to the executor.
+
+        Runs on the hub's IO thread.
+        """
+        event = self._decode_message(frames)
+        if event:
+            data, topic = event
+            self.executor.submit(
+                topic, self._call_eventhandler, (data, topic)
+            )
+
+    @staticmethod
+    def _get_subscription_prefix(topic: str) -> bytes:
+        """Get the prefix by which to filter the given topic's events."""
+        return _get_subscription_prefix(topic)
+
+    @staticmethod
+    def _decode_message(frames: list[bytes]) -> tuple[dict, str] | None:
+        """Decode a received event, None if it isn't for us."""
+        return _decode_message(frames)
+
+    def _call_eventhandler(self, data: dict, topic: str) -> None:
+        """Call the eventhandler, unless we've been terminated meanwhile."""
+        if self._terminate:
+            return
+        # call the eventhandler, passing it the data and topic
+        if self._n_params == 1:
+            self.eventhandler(data)
+        else:
+            self.eventhandler(data, topic)
+
+    def terminate(self) -> None:
+        """Stop listening for events and clean up resources."""
+        self._terminate = True
+        for subscription_id in self._subscription_ids:
+            self._hub.unsubscribe(subscription_id)
+        self._subscription_ids = []
+
+    def __del__(self):
+        """Stop listening for events and clean up resources."""
+        self.terminate()
 
-    def _listen(self) -> None:
-        """Listen for messages and call user's eventhandler when received."""
-        self.socket = self.zmq_context.socket(zmq.SUB)
+
+class AsyncEventListener(bt_endpoints.AsyncEventListener):  # pylint: disable=unused-variable
+    """Object for listening to events published by Brenthy Core in asyncio.
+
+    The asyncio equivalent of EventListener.
+    Must be created in a running event loop, on which it delivers events
+    either by being iterated over or by calling the eventhandler, which can
+    be a coroutine function.
+
+    Examples:
+    ```python
+    async for data, topic in AsyncEventListener(topics="NewBlocks"):
+        pass
+
+    async def _on_new_block_received(data: dict, topic:str):
+        pass
+    AsyncEventListener(_on_new_block_received, "NewBlocks")
+    ```
+    """
+
+    # the ZMQ address of Brenthy Core's publishing socket
+    pub_address = f"tcp://{BRENTHY_IP_ADDRESS}:{BAP_4_PUB_PORT}"
+
+    def __init__(
+        self,
+        eventhandler: FunctionType | None = None,
+        topics: (list[str] | str | None) = None,
+    ):
+        """Listen for events from Brenthy Core.
+
+        Args:
+            eventhandler (FuncType): optional function or coroutine function
+                that takes as input a dict (event-data) and optionally a
+                string (topic)
+            topics (list[str] | str): the topics to filter messages by
+        """
+        self._terminate = False
+        self._loop = asyncio.get_running_loop()
+        self.socket: "zmq.asyncio.Socket | None" = None
+        self._listener_task: asyncio.Task | None = None
+        if not topics:
+            topics = []
+        if isinstance(topics, str):
+            topics = [topics]
+        if not isinstance(topics, list):
+            error_message = (
+                f"BrenthyAPI: AsyncEventListener("
+                f"{topics}): Parameter topics must be of type list or str, "
+                f"not {type(topics)}"
+            )
+            log.error(error_message)
+            raise ValueError(error_message)
+        self.eventhandler = eventhandler
+        self.topics = topics if topics else [""]
+        self._n_params = 0
+        if self.eventhandler:
+            self._n_params = len(signature(self.eventhandler).parameters)
+            if self._n_params == 0:
+                error_message = (
+                    f"BAP-4-BT.AsyncEventListener {topics}: "
+                    "eventhandler must have 1 or 2 parameters: (data, topic)"
+                )
+                log.error(f"BrenthyAPI: {function_name()}: {error_message}")
+                raise TypeError(error_message)
+
+        self.socket = bt_endpoints.get_async_zmq_context().socket(zmq.SUB)
         self.socket.setsockopt(zmq.LINGER, 1)
-        # Connects to a bound self.socket
-        self.socket.connect(
-            f"tcp://{BRENTHY_IP_ADDRESS}:{BAP_4_PUB_PORT}"
-        )
+        self.socket.connect(self.pub_address)
         for topic in self.topics:
-            self.socket.subscribe(json.dumps({"topic": topic})[:-1] + ",")
+            self.socket.subscribe(self._get_subscription_prefix(topic))
 
-            log.info(
-                "BAP-4-BT.EventListener.listen: "
-                + str(json.dumps({"topic": topic})[:-1] + ", ")
-            )
+        # keep references to eventhandler tasks until they're done
+        self._tasks: set[asyncio.Task] = set()
+        if self.eventhandler:
+            self._listener_task = self._loop.create_task(self._listen())
+
+    async def __anext__(self) -> tuple[dict, str]:
+        """Wait for the next event, returning its data and topic."""
+        if self._terminate:
+            raise StopAsyncIteration
         try:
-            poller = zmq.Poller()
-            poller.register(self.socket, zmq.POLLIN)
             while True:
-                if self._terminate:
-                    break
-                events = dict(poller.poll(1000))
-                if events:
-                    if events.get(self.socket) == zmq.POLLIN:
-                        data = json.loads(
-                            self.socket.recv_string(flags=zmq.NOBLOCK)
-                        )
-                        topic = data["topic"]
-                        data.pop("topic")  # remove topic from data
-                        if self._terminate:
-                            break
-
-                        # extract the topic which the blockchain's api_terminal
-                        # provided to the brenthy api_terminal
-
-                        # call the eventhandler, passing it the data and topic
-                        n_params = len(signature(self.eventhandler).parameters)
-                        params: tuple
-                        if n_params == 1:
-                            params = (data,)
-                        else:
-                            params = (data, topic)
-                        # log.info(
-                        #     "BAP-4-BT.EventListener.listen: passing on "
-                        #     f"received block to eventhandler with {n_params}"
-                        #     f" parameters for topic {topic}"
-                        # )
-
-                        Thread(
-                            target=self.eventhandler,
-                            args=params,
-                            name="EventListener.eventhandler",
-                        ).start()
-        except Exception as e:  # pylint:disable=broad-exception-caught
-            log.error(f"BrenthyAPI.EventListener.listen: {e}")
+                event = self._decode_message(
+                    await self.socket.recv_multipart()
+                )
+                if event:
+                    return event
+        except zmq.ZMQError:
+            # socket was closed
+            raise StopAsyncIteration from None
 
-        # clean up resources
-        self.socket.close()
-        self.zmq_context.term()
+    @staticmethod
+    def _get_subscription_prefix(topic: str) -> bytes:
+        """Get the prefix by which to filter the given topic's events."""
+        return _get_subscription_prefix(topic)
+
+    @staticmethod
+    def _decode_message(frames: list[bytes]) -> tuple[dict, str] | None:
+        """Decode a received event, None if it isn't for us."""
+        return _decode_message(frames)
+
+    async def _listen(self) -> None:
+        """Call the eventhandler for every received event."""
+        try:
+            async for data, topic in self:
+                if self._n_params == 1:
+                    result = self.eventhandler(data)
+                else:
+                    result = self.eventhandler(data, topic)
+                if isawaitable(result):
+                    task = self._loop.create_task(result)
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:  # pylint:disable=broad-exception-caught
+            log.error(f"BrenthyAPI.AsyncEventListener.listen: {e}")
 
     def terminate(self) -> None:
         """Stop listening for events and clean up resources."""
+        if self._terminate:
+            return
         self._terminate = True
+        if self._listener_task:
+            self._listener_task.cancel()
+        if self.socket:
+            self.socket.close()
 
     def __del__(self):
         """Stop listening for events and clean up resources."""
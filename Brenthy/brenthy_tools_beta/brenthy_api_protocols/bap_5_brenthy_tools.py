@@ -0,0 +1,199 @@
+"""Brenthy API Protocol version 5, on Brenthy-Tool's side.
+
+This module contains the machinery used by brenthy_tools.brenthy_api for
+BrenthyAPI communication with Brenthy Core, using the version 5 BrenthyAPI
+Protocol.
+Unlike BAP-4, which opens a new ZMQ REQ socket for every request, BAP-5 sends
+all requests over a single long-lived ZMQ DEALER connection per process,
+tagging each request with a correlation ID so that many requests from many
+threads can be in flight at the same time.
+The brenthy_tools version, blockchain type and payload of a request are sent
+as separate frames instead of being concatenated, as are the Brenthy-Core
+version, success flag and reply of the reply, so that neither side has to
+copy payloads to put them together or take them apart.
+Large payloads are compressed, with brenthy_api and Brenthy Core negotiating
+the codec in a header frame appended to requests and replies.
+Events are published in a binary format with the topic as a separate frame,
+see event_encoding.py.
+This module's counterpart, which contain's Brenthy Core's machinery, is at
+../../api_terminal/brenthy_api_protocols/bap_5_brenthy_core.py
+"""
+
+from types import FunctionType
+
+from brenthy_tools_beta import bt_endpoints
+from brenthy_tools_beta.brenthy_api_addresses import (
+    BAP_5_PUB_PORT,
+    BAP_5_RPC_PORT,
+    BRENTHY_IP_ADDRESS,
+)
+from brenthy_tools_beta.brenthy_api_protocols import bap_4_brenthy_tools
+from brenthy_tools_beta.bt_endpoints import (
+    CONNECT_TIMEOUT_S,
+    CantConnectToSocketError,
+    send_request_zmq_multipart,
+    send_request_zmq_multipart_async,
+    send_request_zmq_multiplexed,
+    send_request_zmq_multiplexed_async,
+)
+from brenthy_tools_beta.event_encoding import LazyEventData, decode_event
+from brenthy_tools_beta.event_executor import EventExecutor
+
+BAP_VERSION = 5  # pylint: disable=unused-variable
+# whether or not brenthy_api should compress large payloads for this protocol
+COMPRESS_PAYLOADS = True  # pylint: disable=unused-variable
+
+
+def send_request(
+    request: bytearray | bytes, timeout: int | None = None
+) -> bytes:  # pylint: disable=unused-variable
+    """Send a BrenthyAPI request to Brenthy-Core, returning its reply.
+
+    Args:
+        request (bytearray): the data to send to Brenthy-Core
+        timeout (int): how long to wait before giving up, None to use default
+    Returns:
+        bytearray: the response received from Brenthy-Core
+    """
+    return send_request_zmq_multiplexed(
+        request, (BRENTHY_IP_ADDRESS, BAP_5_RPC_PORT), timeout=timeout
+    )
+
+
+async def send_request_async(
+    request: bytearray | bytes, timeout: int | None = None
+) -> bytes:  # pylint: disable=unused-variable
+    """Send a BrenthyAPI request to Brenthy-Core, awaiting its reply.
+
+    Args:
+        request (bytearray): the data to send to Brenthy-Core
+        timeout (int): how long to wait before giving up, None to use default
+    Returns:
+        bytearray: the response received from Brenthy-Core
+    """
+    return await send_request_zmq_multiplexed_async(
+        request, (BRENTHY_IP_ADDRESS, BAP_5_RPC_PORT), timeout=timeout
+    )
+
+
+
+def send_request_multipart(
+    request_frames: list[bytearray | bytes], timeout: int | None = None
+) -> list[memoryview]:  # pylint: disable=unused-variable
+    """Send a BrenthyAPI request to Brenthy-Core in separate frames.
+
+    Used by brenthy_api instead of `send_request` to avoid concatenating the
+    brenthy_tools version, blockchain type and payload into a single message,
+    and for the same reason, Brenthy-Core's reply also consists of frames.
+
+    Args:
+        request_frames (list[bytearray]): the brenthy_tools version,
+            blockchain type and payload
+        timeout (int): how long to wait before giving up, None to use default
+    Returns:
+        list[memoryview]: Brenthy-Core's version, success flag and reply
+    """
+    return send_request_zmq_multipart(
+        request_frames, (BRENTHY_IP_ADDRESS, BAP_5_RPC_PORT), timeout=timeout
+    )
+
+
+async def send_request_multipart_async(
+    request_frames: list[bytearray | bytes], timeout: int | None = None
+) -> list[memoryview]:  # pylint: disable=unused-variable
+    """Send a BrenthyAPI request to Brenthy-Core in separate frames.
+
+    The asyncio equivalent of `send_request_multipart`.
+
+    Args:
+        request_frames (list[bytearray]): the brenthy_tools version,
+            blockchain type and payload
+        timeout (int): how long to wait before giving up, None to use default
+    Returns:
+        list[memoryview]: Brenthy-Core's version, success flag and reply
+    """
+    return await send_request_zmq_multipart_async(
+        request_frames, (BRENTHY_IP_ADDRESS, BAP_5_RPC_PORT), timeout=timeout
+    )
+
+
+class EventListener(bap_4_brenthy_tools.EventListener):  # pylint: disable=unused-variable
+    """Object for listening to events published by Brenthy Core.
+
+    Works like BAP-4's EventListener, but receives events in BAP-5's binary
+    event format (see event_encoding.py), in which the topic is a separate
+    ZMQ frame, so that events can be filtered by topic exactly and their
+    payloads are only decoded when passed to the eventhandler.
+    Eventhandlers can take a third parameter, to which the event's sequence
+    number is passed (see api_terminal.publish_event).
+    """
+
+    pub_address = f"tcp://{BRENTHY_IP_ADDRESS}:{BAP_5_PUB_PORT}"
+
+    def __init__(
+        self,
+        eventhandler: FunctionType,
+        topics: (list[str] | str | None) = None,
+        executor: EventExecutor | None = None,
+    ):
+        """Listen for events from Brenthy Core.
+
+        Args:
+            eventhandler (FuncType): a function that takes as input a
+                dict (event-data) and optionally a string (topic) and an
+                integer (sequence number)
+            topics (list[str] | str): the topics to filter messages by
+            executor (EventExecutor): the executor on which to call the
+                eventhandler, None to use the process-wide default executor
+        """
+        super().__init__(eventhandler, topics, executor)
+        # Brenthy Core versions from before BAP-5 don't publish on its port
+        if not self._hub.wait_until_connected(CONNECT_TIMEOUT_S):
+            self.terminate()
+            raise CantConnectToSocketError(
+                protocol="ZMQ", address=self.pub_address
+            )
+
+    @staticmethod
+    def _get_subscription_prefix(topic: str) -> bytes:
+        """Get the prefix by which to filter the given topic's events."""
+        return topic.encode()
+
+    def _decode_message(
+        self, frames: list[bytes]
+    ) -> tuple[LazyEventData, str] | None:
+        """Decode a received event's topic, None if it isn't for us."""
+        topic, data = decode_event(frames)
+        # we get the events of all topics our topics are prefixes of
+        if topic not in self.topics:
+            return None
+        return data, topic
+
+    def _call_eventhandler(self, data: LazyEventData, topic: str) -> None:
+        """Decode the event & call the eventhandler, unless terminated."""
+        if self._terminate:
+            return
+        if self._n_params < 3:
+            super()._call_eventhandler(data.decode(), topic)
+        else:
+            self.eventhandler(data.decode(), topic, data.sequence)
+
+
+class AsyncEventListener(bt_endpoints.AsyncEventListener):  # pylint: disable=unused-variable
+    """NOT IMPLEMENTED: for listening to async events from Brenthy Core.
+
+    Unlike EventListener, AsyncEventListener can't check whether Brenthy Core
+    publishes BAP-5 events without blocking the event loop, so it uses BAP-4
+    for events over TCP.
+    """
+
+    def __init__(self, *args):
+        """NOT IMPLEMENTED: Listen for events from Brenthy Core."""
+        raise NotImplementedError
+
+    async def __anext__(self) -> tuple[dict, str]:
+        """NOT IMPLEMENTED: Wait for the next event."""
+        raise NotImplementedError
+
+    def terminate(self) -> None:
+        """NOT IMPLEMENTED: Stop listening for events."""
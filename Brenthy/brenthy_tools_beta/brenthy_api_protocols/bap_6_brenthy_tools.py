@@ -0,0 +1,210 @@
+"""Brenthy API Protocol version 6, on Brenthy-Tool's side.
+
+This module contains the machinery used by brenthy_tools.brenthy_api for
+BrenthyAPI communication with Brenthy Core, using the version 6 BrenthyAPI
+Protocol.
+BAP-6 communicates like BAP-5 does, but over ZMQ's `ipc://` transport,
+i.e. via Unix domain sockets, which Brenthy Core creates in its IPC
+directory if it runs on the same machine.
+It is only used if BRENTHY_IP_ADDRESS is a loopback address, as otherwise
+the application is configured to use a Brenthy Core elsewhere, and if those
+sockets exist. Otherwise this protocol fails immediately, so that
+brenthy_api falls back to the other protocols.
+This module's counterpart, which contain's Brenthy Core's machinery, is at
+../../api_terminal/brenthy_api_protocols/bap_6_brenthy_core.py
+"""
+
+import os
+from types import FunctionType
+
+from brenthy_tools_beta.brenthy_api_addresses import (
+    BAP_6_PUB_IPC_PATH,
+    BAP_6_RPC_IPC_PATH,
+    BRENTHY_IP_ADDRESS,
+)
+from brenthy_tools_beta.brenthy_api_protocols import (
+    bap_4_brenthy_tools,
+    bap_5_brenthy_tools,
+)
+from brenthy_tools_beta.bt_endpoints import (
+    CantConnectToSocketError,
+    send_request_zmq_multipart,
+    send_request_zmq_multipart_async,
+    send_request_zmq_multiplexed,
+    send_request_zmq_multiplexed_async,
+)
+from brenthy_tools_beta.event_encoding import decode_event
+from brenthy_tools_beta.event_executor import EventExecutor
+
+BAP_VERSION = 6  # pylint: disable=unused-variable
+# whether or not brenthy_api should compress large payloads for this protocol,
+# not worth the CPU time for a connection to the same machine
+COMPRESS_PAYLOADS = False  # pylint: disable=unused-variable
+
+RPC_ADDRESS = f"ipc://{BAP_6_RPC_IPC_PATH}"
+PUB_ADDRESS = f"ipc://{BAP_6_PUB_IPC_PATH}"
+
+
+def _is_loopback_address(address: str) -> bool:
+    """Check if an IP address or hostname refers to this machine."""
+    return address in ("localhost", "::1") or address.startswith("127.")
+
+
+# whether or not the application is configured to use the Brenthy Core on
+# this machine, the only one BAP-6 can reach
+USE_IPC = _is_loopback_address(BRENTHY_IP_ADDRESS)
+
+
+def _assert_socket_exists(path: str) -> None:
+    """Raise CantConnectToSocketError if we can't use Brenthy Core's socket.
+
+    That is if it is missing, or if BRENTHY_IP_ADDRESS points elsewhere.
+    """
+    if not USE_IPC or not os.path.exists(path):
+        raise CantConnectToSocketError(
+            protocol="ZMQ", address=f"ipc://{path}"
+        )
+
+
+def send_request(
+    request: bytearray | bytes, timeout: int | None = None
+) -> bytes:  # pylint: disable=unused-variable
+    """Send a BrenthyAPI request to Brenthy-Core, returning its reply.
+
+    Args:
+        request (bytearray): the data to send to Brenthy-Core
+        timeout (int): how long to wait before giving up, None to use default
+    Returns:
+        bytearray: the response received from Brenthy-Core
+    """
+    _assert_socket_exists(BAP_6_RPC_IPC_PATH)
+    return send_request_zmq_multiplexed(request, RPC_ADDRESS, timeout=timeout)
+
+
+async def send_request_async(
+    request: bytearray | bytes, timeout: int | None = None
+) -> bytes:  # pylint: disable=unused-variable
+    """Send a BrenthyAPI request to Brenthy-Core, awaiting its reply.
+
+    Args:
+        request (bytearray): the data to send to Brenthy-Core
+        timeout (int): how long to wait before giving up, None to use default
+    Returns:
+        bytearray: the response received from Brenthy-Core
+    """
+    _assert_socket_exists(BAP_6_RPC_IPC_PATH)
+    return await send_request_zmq_multiplexed_async(
+        request, RPC_ADDRESS, timeout=timeout
+    )
+
+
+def send_request_multipart(
+    request_frames: list[bytearray | bytes], timeout: int | None = None
+) -> list[memoryview]:  # pylint: disable=unused-variable
+    """Send a BrenthyAPI request to Brenthy-Core in separate frames.
+
+    Used by brenthy_api instead of `send_request` to avoid concatenating the
+    brenthy_tools version, blockchain type and payload into a single message,
+    and for the same reason, Brenthy-Core's reply also consists of frames.
+
+    Args:
+        request_frames (list[bytearray]): the brenthy_tools version,
+            blockchain type and payload
+        timeout (int): how long to wait before giving up, None to use default
+    Returns:
+        list[memoryview]: Brenthy-Core's version, success flag and reply
+    """
+    _assert_socket_exists(BAP_6_RPC_IPC_PATH)
+    return send_request_zmq_multipart(
+        request_frames, RPC_ADDRESS, timeout=timeout
+    )
+
+
+async def send_request_multipart_async(
+    request_frames: list[bytearray | bytes], timeout: int | None = None
+) -> list[memoryview]:  # pylint: disable=unused-variable
+    """Send a BrenthyAPI request to Brenthy-Core in separate frames.
+
+    The asyncio equivalent of `send_request_multipart`.
+
+    Args:
+        request_frames (list[bytearray]): the brenthy_tools version,
+            blockchain type and payload
+        timeout (int): how long to wait before giving up, None to use default
+    Returns:
+        list[memoryview]: Brenthy-Core's version, success flag and reply
+    """
+    _assert_socket_exists(BAP_6_RPC_IPC_PATH)
+    return await send_request_zmq_multipart_async(
+        request_frames, RPC_ADDRESS, timeout=timeout
+    )
+
+
+class EventListener(bap_5_brenthy_tools.EventListener):  # pylint: disable=unused-variable
+    """Object for listening to events published by Brenthy Core.
+
+    Works like BAP-5's EventListener, but over Brenthy Core's IPC socket.
+    """
+
+    pub_address = PUB_ADDRESS
+
+    def __init__(
+        self,
+        eventhandler: FunctionType,
+        topics: (list[str] | str | None) = None,
+        executor: EventExecutor | None = None,
+    ):
+        """Listen for events from Brenthy Core.
+
+        Args:
+            eventhandler (FuncType): a function that takes as input a
+                dict (event-data) and optionally a string (topic)
+            topics (list[str] | str): the topics to filter messages by
+            executor (EventExecutor): the executor on which to call the
+                eventhandler, None to use the process-wide default executor
+        """
+        # if the socket doesn't exist, there's nothing for __del__ to clean up
+        self._subscription_ids: list[int] = []
+        _assert_socket_exists(BAP_6_PUB_IPC_PATH)
+        super().__init__(eventhandler, topics, executor)
+
+
+class AsyncEventListener(bap_4_brenthy_tools.AsyncEventListener):  # pylint: disable=unused-variable
+    """Object for listening to events published by Brenthy Core in asyncio.
+
+    Works like BAP-4's AsyncEventListener, but over Brenthy Core's IPC socket
+    and using BAP-5's binary event format (see event_encoding.py).
+    """
+
+    pub_address = PUB_ADDRESS
+
+    def __init__(
+        self,
+        eventhandler: FunctionType | None = None,
+        topics: (list[str] | str | None) = None,
+    ):
+        """Listen for events from Brenthy Core.
+
+        Args:
+            eventhandler (FuncType): optional function or coroutine function
+                that takes as input a dict (event-data) and optionally a
+                string (topic)
+            topics (list[str] | str): the topics to filter messages by
+        """
+        # if the socket doesn't exist, there's nothing for __del__ to clean up
+        self._terminate = True
+        _assert_socket_exists(BAP_6_PUB_IPC_PATH)
+        super().__init__(eventhandler, topics)
+
+    @staticmethod
+    def _get_subscription_prefix(topic: str) -> bytes:
+        """Get the prefix by which to filter the given topic's events."""
+        return topic.encode()
+
+    def _decode_message(self, frames: list[bytes]) -> tuple[dict, str] | None:
+        """Decode a received event, None if it isn't for us."""
+        topic, data = decode_event(frames)
+        # we get the events of all topics our topics are prefixes of
+        if topic not in self.topics:
+            return None
+        return data.decode(), topic
@@ -9,31 +9,56 @@ This file has a counterpart under ../brenthy_tools_beta/bt_endpoints.py.
 file's name from bt_endpoints.py, where 'bat' stands for Brenthy API Terminal.
 """
 
+import itertools
+import os
+import selectors
 import socket
 import time
+import weakref
 from abc import ABC, abstractmethod
+from threading import Event, Lock, Thread
 from types import FunctionType
+from typing import Callable
 
 from brenthy_tools_beta import log
+from brenthy_tools_beta.event_executor import EventExecutor
 from brenthy_tools_beta.utils import from_b255_no_0s, to_b255_no_0s
 
 BUFFER_SIZE = 4096  # the TCP buffer size for processing reveived data
+# the length header of 8 bytes, plus its terminating 0, covers 255^8 bytes
+TCP_MAX_HEADER_LENGTH = 9
+# the largest TCP message we accept, larger ones' headers are invalid
+TCP_MAX_MESSAGE_SIZE = 2**30
+# the largest buffer allocated for a TCP message before its data arrives,
+# larger buffers are grown as the data arrives, so that a length header
+# alone can't make us allocate much memory
+TCP_MAX_PREALLOCATION = 2**20
 REQUEST_TIMEOUT_S = 180
 CONNECT_TIMEOUT_S = 2
+# how long ZMQ waits between attempts to reconnect a dropped connection
+RECONNECT_INTERVAL_MS = 100
+RECONNECT_INTERVAL_MAX_MS = 2000
+# maximum number of received events ZmqSubscriptionHub's SUB socket queues
+# before the publisher has to queue or drop further events for it
+SUBSCRIPTION_RCVHWM = 10000
 
+# ZMQ (and asyncio) are imported on first use, to keep importing brenthy_api
+# fast for applications which don't end up communicating with Brenthy Core
 _INITIALISED_ZMQ = False
-try:
-    import zmq
-    ZMQ_CONTEXT: zmq.sugar.context.Context | None
-except:
-    pass
+_INITIALISATION_LOCK = Lock()
+ZMQ_CONTEXT: "zmq.Context | None" = None
 
 
 CONTEXTS = []
+ASYNC_ZMQ_CONTEXT: "zmq.asyncio.Context | None" = None
 
 
 def initialise() -> None:
-    """Reinitialising them if they have been cleaned up."""
+    """Load ZMQ and create our ZMQ context.
+
+    Called on first use of ZMQ, reinitialising them if they have been
+    cleaned up.
+    """
     global zmq
     global ZMQ_CONTEXT
     global _INITIALISED_ZMQ
@@ -53,22 +78,47 @@ def initialise() -> None:
         ZMQ_CONTEXT = None
 
 
+def _load_zmq() -> None:
+    """Initialise ZMQ if this is the first time it is used."""
+    if not _INITIALISED_ZMQ:
+        # so that threads using ZMQ for the first time share one context
+        with _INITIALISATION_LOCK:
+            if not _INITIALISED_ZMQ:
+                initialise()
+
+
+def get_zmq_address(socket_address: tuple[str, int] | str) -> str:
+    """Get the ZMQ endpoint string for the given socket address.
+
+    Args:
+        socket_address (tuple[str,int] | str): IP address and port number of
+            a TCP socket, or a complete ZMQ endpoint such as `ipc://...`
+    Returns:
+        str: the ZMQ endpoint string
+    """
+    if isinstance(socket_address, str):
+        return socket_address
+    return f"tcp://{socket_address[0]}:{socket_address[1]}"
+
+
 def send_request_zmq(
     request: bytearray | bytes,
-    socket_address: tuple[str, int],
+    socket_address: tuple[str, int] | str,
     timeout: int | None = None,
 ) -> bytes:
     """Send a request to the given address, expecting a reply.
 
     Args:
         request (bytearray): the data to send
-        socket_address (tuple[str,int]): IP address and port number to send to
+        socket_address (tuple[str,int] | str): IP address and port number to
+            send to, or a ZMQ endpoint string
         timeout (int): how long to wait before giving up, None to use default
     Returns:
         bytearray: reply received from the endpoint after sending the request
     """
     if timeout is None:
         timeout = REQUEST_TIMEOUT_S
+    _load_zmq()
     if not ZMQ_CONTEXT:
         raise CantConnectToSocketError(protocol="ZMQ") from None
 
@@ -76,7 +126,7 @@ def send_request_zmq(
     zmq_socket.setsockopt(zmq.LINGER, 1)
 
     zmq_socket.connect(
-        f"tcp://{socket_address[0]}:{socket_address[1]}",
+        get_zmq_address(socket_address),
         # timeout=CONNECT_TIMEOUT_S*1000
     )
 
@@ -92,6 +142,636 @@ def send_request_zmq(
     return reply
 
 
+def send_request_zmq_multiplexed(
+    request: bytearray | bytes,
+    socket_address: tuple[str, int] | str,
+    timeout: int | None = None,
+) -> bytes:
+    """Send a request via this process' shared connection to the address.
+
+    Unlike `send_request_zmq`, this doesn't set up a new socket for every
+    request, but reuses a long-lived `ZmqMultiplexedClient`, over which any
+    number of threads can have requests in flight at the same time.
+
+    Args:
+        request (bytearray): the data to send
+        socket_address (tuple[str,int] | str): IP address and port number to
+            send to, or a ZMQ endpoint string
+        timeout (int): how long to wait before giving up, None to use default
+    Returns:
+        bytearray: reply received from the endpoint after sending the request
+    """
+    return get_multiplexed_client(socket_address).send_request(
+        request, timeout=timeout
+    )
+
+
+def send_request_zmq_multipart(
+    request_frames: list[bytearray | bytes],
+    socket_address: tuple[str, int] | str,
+    timeout: int | None = None,
+) -> list[memoryview]:
+    """Send a multipart request via this process' shared connection.
+
+    Like `send_request_zmq_multiplexed`, but the request and reply each
+    consist of multiple frames, which are sent and received without being
+    copied or concatenated.
+
+    Args:
+        request_frames (list[bytearray]): the data to send
+        socket_address (tuple[str,int] | str): IP address and port number to
+            send to, or a ZMQ endpoint string
+        timeout (int): how long to wait before giving up, None to use default
+    Returns:
+        list[memoryview]: the frames of the reply received from the endpoint
+    """
+    return get_multiplexed_client(socket_address).send_request_multipart(
+        request_frames, timeout=timeout
+    )
+
+
+_MULTIPLEXED_CLIENTS: dict[tuple[str, int], "ZmqMultiplexedClient"] = {}
+_MULTIPLEXED_CLIENTS_LOCK = Lock()
+
+
+def get_multiplexed_client(
+    socket_address: tuple[str, int] | str
+) -> "ZmqMultiplexedClient":
+    """Get this process' ZmqMultiplexedClient for the given address.
+
+    Creates a new client if there isn't one yet, or if the existing one
+    can no longer be used, e.g. because its ZMQ context was terminated or
+    because we are in a child process forked after the client was created.
+    """
+    with _MULTIPLEXED_CLIENTS_LOCK:
+        client = _MULTIPLEXED_CLIENTS.get(socket_address)
+        if client and client.is_usable():
+            return client
+        _load_zmq()
+        if not ZMQ_CONTEXT or ZMQ_CONTEXT.closed:
+            raise CantConnectToSocketError(
+                protocol="ZMQ", address=socket_address
+            ) from None
+        client = ZmqMultiplexedClient(socket_address, ZMQ_CONTEXT)
+        _MULTIPLEXED_CLIENTS[socket_address] = client
+        return client
+
+
+class _PendingRequest:
+    """A request sent by ZmqMultiplexedClient, awaiting its reply."""
+
+    def __init__(self, request_frames: list[bytearray | bytes]):
+        self.request_frames = request_frames
+        self.submitted = time.monotonic()
+        self.sent = False
+        self.reply: list["zmq.Frame"] | None = None
+        self.error: Exception | None = None
+        self.event = Event()
+
+    def resolve(
+        self,
+        reply: list["zmq.Frame"] | None = None,
+        error: Exception | None = None
+    ) -> None:
+        self.reply = reply
+        self.error = error
+        self.event.set()
+
+
+class ZmqMultiplexedClient:
+    """A long-lived ZMQ connection over which many requests can be in flight.
+
+    A single DEALER socket, owned by a background IO thread, is connected to
+    the remote ROUTER socket.
+    Each request is tagged with a correlation ID frame, which the remote
+    endpoint includes unchanged in its reply, so that replies, which can
+    arrive in any order, can be matched to their requests.
+    Any number of threads can call `send_request` concurrently.
+
+    ZMQ automatically reconnects the DEALER socket if the connection drops.
+    Requests which were in flight when the connection dropped fail
+    immediately with a CantConnectToSocketError instead of timing out,
+    and requests submitted while there is no connection are held back until
+    the connection is reestablished or CONNECT_TIMEOUT_S has passed.
+
+    Message frames sent to the remote endpoint: [correlation_id, b"", request]
+    Message frames expected from the endpoint: [correlation_id, b"", reply]
+    With `send_request_multipart`, the request and reply can each consist of
+    multiple frames, which are sent and received without copying them.
+    """
+
+    def __init__(
+        self,
+        socket_address: tuple[str, int] | str,
+        zmq_context: "zmq.Context",
+    ):
+        """Connect to a remote ZMQ ROUTER socket.
+
+        Args:
+            socket_address (tuple[str,int] | str): IP address and port
+                number, or a ZMQ endpoint string
+            zmq_context (zmq.Context): the ZMQ context to create sockets in
+        """
+        self.socket_address = socket_address
+        self.zmq_context = zmq_context
+        self._pid = os.getpid()
+        self._terminate = False
+        self._lock = Lock()
+        self._pending: dict[bytes, _PendingRequest] = {}
+        self._correlation_ids = itertools.count(1)
+
+        self.dealer_socket = zmq_context.socket(zmq.DEALER)
+        self.dealer_socket.setsockopt(zmq.LINGER, 0)
+        # only queue messages on completed connections, so that requests
+        # aren't silently lost in a queue to an endpoint that doesn't exist
+        self.dealer_socket.setsockopt(zmq.IMMEDIATE, 1)
+        self.dealer_socket.setsockopt(
+            zmq.RECONNECT_IVL, RECONNECT_INTERVAL_MS
+        )
+        self.dealer_socket.setsockopt(
+            zmq.RECONNECT_IVL_MAX, RECONNECT_INTERVAL_MAX_MS
+        )
+        self.monitor_socket = self.dealer_socket.get_monitor_socket(
+            zmq.EVENT_DISCONNECTED
+        )
+        self.dealer_socket.connect(get_zmq_address(socket_address))
+
+        # the socket via which other threads pass requests to the IO thread
+        inbox_address = f"inproc://bt-multiplexed-client-{id(self)}"
+        self.inbox_socket = zmq_context.socket(zmq.PULL)
+        self.inbox_socket.bind(inbox_address)
+        self._submit_socket = zmq_context.socket(zmq.PUSH)
+        self._submit_socket.setsockopt(zmq.LINGER, 0)
+        self._submit_socket.connect(inbox_address)
+
+        self.io_thread = Thread(
+            target=self._run_io, args=(), daemon=True,
+            name="BrenthyAPI-ZmqMultiplexedClient"
+        )
+        self.io_thread.start()
+
+    def is_usable(self) -> bool:
+        """Check whether this client can still be used to send requests."""
+        return (
+            not self._terminate
+            and self._pid == os.getpid()
+            and not self.zmq_context.closed
+            and self.io_thread.is_alive()
+        )
+
+    def send_request(
+        self, request: bytearray | bytes, timeout: int | None = None
+    ) -> bytes:
+        """Send a request to the remote endpoint, returning its reply.
+
+        Args:
+            request (bytearray): the data to send
+            timeout (int): how long to wait before giving up, None for default
+        Returns:
+            bytearray: reply received from the endpoint
+        """
+        return self._send([request], timeout)[-1].bytes
+
+    def send_request_multipart(
+        self,
+        request_frames: list[bytearray | bytes],
+        timeout: int | None = None
+    ) -> list[memoryview]:
+        """Send a multipart request, returning its reply.
+
+        The frames mustn't be modified until this function has returned.
+
+        Args:
+            request_frames (list[bytearray]): the data to send
+            timeout (int): how long to wait before giving up, None for default
+        Returns:
+            list[memoryview]: the frames of the reply
+        """
+        return [
+            frame.buffer for frame in self._send(request_frames, timeout)
+        ]
+
+    def _send(
+        self,
+        request_frames: list[bytearray | bytes],
+        timeout: int | None = None
+    ) -> list["zmq.Frame"]:
+        """Send the request frames, returning the reply's frames."""
+        if timeout is None:
+            timeout = REQUEST_TIMEOUT_S
+        correlation_id = next(self._correlation_ids).to_bytes(8, "big")
+        pending = _PendingRequest(request_frames)
+        with self._lock:
+            if self._terminate:
+                raise CantConnectToSocketError(
+                    protocol="ZMQ", address=self.socket_address
+                )
+            self._pending[correlation_id] = pending
+            self._submit_socket.send(correlation_id)
+        if not pending.event.wait(timeout):
+            with self._lock:
+                self._pending.pop(correlation_id, None)
+            raise CantConnectToSocketError(
+                "Timed out waiting for a reply",
+                protocol="ZMQ", address=self.socket_address
+            )
+        if pending.error:
+            raise pending.error
+        return pending.reply
+
+    def _run_io(self) -> None:
+        """Pass requests to the DEALER socket and dispatch replies."""
+        poller = zmq.Poller()
+        poller.register(self.inbox_socket, zmq.POLLIN)
+        poller.register(self.dealer_socket, zmq.POLLIN)
+        poller.register(self.monitor_socket, zmq.POLLIN)
+        # requests that couldn't be sent yet because we're not connected
+        unsent: list[bytes] = []
+        try:
+            while not self._terminate:
+                poller.modify(
+                    self.dealer_socket,
+                    zmq.POLLIN | zmq.POLLOUT if unsent else zmq.POLLIN
+                )
+                events = dict(poller.poll(100 if unsent else 1000))
+                if self._terminate:
+                    break
+                if self.inbox_socket in events:
+                    self._receive_submissions(unsent)
+                if self.dealer_socket in events:
+                    self._receive_replies()
+                if self.monitor_socket in events:
+                    self._process_monitor_events()
+                if unsent:
+                    unsent = self._send_requests(unsent)
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            if not self._terminate:
+                log.error(f"BrenthyAPI: ZmqMultiplexedClient: {error}")
+        finally:
+            self._terminate = True
+            self._fail_requests(list(self._pending.keys()))
+            self.dealer_socket.disable_monitor()
+            self.monitor_socket.close()
+            self.dealer_socket.close()
+            self.inbox_socket.close()
+
+    def _receive_submissions(self, unsent: list[bytes]) -> None:
+        while True:
+            try:
+                unsent.append(self.inbox_socket.recv(flags=zmq.NOBLOCK))
+            except zmq.error.Again:
+                return
+
+    def _receive_replies(self) -> None:
+        while True:
+            try:
+                frames = self.dealer_socket.recv_multipart(
+                    flags=zmq.NOBLOCK, copy=False
+                )
+            except zmq.error.Again:
+                return
+            with self._lock:
+                pending = self._pending.pop(frames[0].bytes, None)
+            # pending is None if the requester has already given up on it
+            if pending:
+                # skip the correlation ID and empty delimiter frames
+                pending.resolve(reply=frames[2:])
+
+    def _send_requests(self, unsent: list[bytes]) -> list[bytes]:
+        """Send the given requests, returning those that couldn't be sent."""
+        now = time.monotonic()
+        for i, correlation_id in enumerate(unsent):
+            with self._lock:
+                pending = self._pending.get(correlation_id)
+            if not pending:
+                continue  # requester has already given up on this request
+            try:
+                self.dealer_socket.send_multipart(
+                    [correlation_id, b""] + pending.request_frames,
+                    flags=zmq.NOBLOCK, copy=False
+                )
+                pending.sent = True
+            except zmq.error.Again:
+                # not connected, fail requests which have waited too long
+                still_unsent = unsent[i:]
+                expired = [
+                    correlation_id for correlation_id in still_unsent
+                    if correlation_id in self._pending
+                    and now - self._pending[correlation_id].submitted
+                    > CONNECT_TIMEOUT_S
+                ]
+                self._fail_requests(expired)
+                return [
+                    correlation_id for correlation_id in still_unsent
+                    if correlation_id not in expired
+                ]
+        return []
+
+    def _process_monitor_events(self) -> None:
+        while True:
+            try:
+                self.monitor_socket.recv_multipart(flags=zmq.NOBLOCK)
+            except zmq.error.Again:
+                break
+        # the connection dropped, so we won't get replies to requests that
+        # are currently in flight
+        with self._lock:
+            in_flight = [
+                correlation_id
+                for correlation_id, pending in self._pending.items()
+                if pending.sent
+            ]
+        self._fail_requests(in_flight)
+
+    def _fail_requests(self, correlation_ids: list[bytes]) -> None:
+        for correlation_id in correlation_ids:
+            with self._lock:
+                pending = self._pending.pop(correlation_id, None)
+            if pending:
+                pending.resolve(error=CantConnectToSocketError(
+                    protocol="ZMQ", address=self.socket_address
+                ))
+
+    def terminate(self) -> None:
+        """Fail all pending requests and clean up resources."""
+        with self._lock:
+            if self._terminate:
+                return
+            self._terminate = True
+            # wake up the IO thread
+            try:
+                self._submit_socket.send(b"", flags=zmq.NOBLOCK)
+            except zmq.ZMQError:
+                pass
+            self._submit_socket.close()
+        if self.io_thread.is_alive():
+            self.io_thread.join()
+
+    def __del__(self):
+        """Fail all pending requests and clean up resources."""
+        self.terminate()
+
+
+_SUBSCRIPTION_HUBS: dict[str, "ZmqSubscriptionHub"] = {}
+_SUBSCRIPTION_HUBS_LOCK = Lock()
+
+
+def get_subscription_hub(address: str) -> "ZmqSubscriptionHub":
+    """Get this process' ZmqSubscriptionHub for the given publisher address.
+
+    Creates a new hub if there isn't one yet, or if the existing one
+    can no longer be used, e.g. because its ZMQ context was terminated or
+    because we are in a child process forked after the hub was created.
+    """
+    with _SUBSCRIPTION_HUBS_LOCK:
+        hub = _SUBSCRIPTION_HUBS.get(address)
+        if hub and hub.is_usable():
+            return hub
+        _load_zmq()
+        if not ZMQ_CONTEXT or ZMQ_CONTEXT.closed:
+            raise CantConnectToSocketError(
+                protocol="ZMQ", address=address
+            ) from None
+        hub = ZmqSubscriptionHub(address, ZMQ_CONTEXT)
+        _SUBSCRIPTION_HUBS[address] = hub
+        return hub
+
+
+class ZmqSubscriptionHub:
+    """A single ZMQ subscription to a publisher, shared by many subscribers.
+
+    A single SUB socket, owned by a background IO thread, is connected to
+    the remote PUB socket.
+    Any number of subscribers can register callbacks for topic prefixes,
+    the hub adding and removing the SUB socket's subscriptions as needed.
+    Each received message is passed to the callbacks of all subscribers
+    whose prefix its first frame starts with.
+    Callbacks are run on the IO thread, so they must return quickly,
+    passing long-running work on to other threads.
+
+    Other threads pass subscription changes to the IO thread via an inproc
+    socket, as ZMQ sockets mustn't be used by multiple threads.
+    """
+
+    def __init__(self, address: str, zmq_context: "zmq.Context"):
+        """Connect to a remote ZMQ PUB socket.
+
+        Args:
+            address (str): the ZMQ endpoint string of the PUB socket
+            zmq_context (zmq.Context): the ZMQ context to create sockets in
+        """
+        self.address = address
+        self.zmq_context = zmq_context
+        self._pid = os.getpid()
+        self._terminate = False
+        self._lock = Lock()
+        self._subscription_ids = itertools.count(1)
+        # prefix -> {subscription ID: callback}
+        self._callbacks: dict[bytes, dict[int, Callable]] = {}
+        # subscription ID -> prefix
+        self._prefixes: dict[int, bytes] = {}
+        # the lengths of the subscribed prefixes, for looking up the
+        # prefixes a message starts with: length -> number of prefixes
+        self._prefix_lengths: dict[int, int] = {}
+        # whether the SUB socket is connected to the publisher
+        self._connected = Event()
+
+        self.sub_socket = zmq_context.socket(zmq.SUB)
+        self.sub_socket.setsockopt(zmq.LINGER, 0)
+        self.sub_socket.setsockopt(zmq.RCVHWM, SUBSCRIPTION_RCVHWM)
+        self.monitor_socket = self.sub_socket.get_monitor_socket(
+            zmq.EVENT_CONNECTED | zmq.EVENT_DISCONNECTED
+        )
+        self.sub_socket.connect(address)
+
+        # the socket via which other threads pass subscription changes
+        # to the IO thread
+        inbox_address = f"inproc://bt-subscription-hub-{id(self)}"
+        self.inbox_socket = zmq_context.socket(zmq.PULL)
+        self.inbox_socket.bind(inbox_address)
+        self._command_socket = zmq_context.socket(zmq.PUSH)
+        self._command_socket.setsockopt(zmq.LINGER, 0)
+        self._command_socket.connect(inbox_address)
+
+        self.io_thread = Thread(
+            target=self._run_io, args=(), daemon=True,
+            name="BrenthyAPI-ZmqSubscriptionHub"
+        )
+        self.io_thread.start()
+
+    def is_usable(self) -> bool:
+        """Check whether this hub can still be used to subscribe."""
+        return (
+            not self._terminate
+            and self._pid == os.getpid()
+            and not self.zmq_context.closed
+            and self.io_thread.is_alive()
+        )
+
+    def wait_until_connected(self, timeout: float) -> bool:
+        """Wait until the SUB socket is connected to the publisher.
+
+        Returns:
+            bool: whether or not the SUB socket is connected
+        """
+        return self._connected.wait(timeout)
+
+    def subscribe(
+        self, prefix: bytes, callback: Callable[[list[bytes]], None]
+    ) -> int:
+        """Call `callback` with every received message starting with prefix.
+
+        Args:
+            prefix (bytes): the topic prefix to subscribe to
+            callback (Callable): function to call with the frames of each
+                matching message
+        Returns:
+            int: the ID of this subscription, for unsubscribing
+        """
+        with self._lock:
+            if self._terminate:
+                raise CantConnectToSocketError(
+                    protocol="ZMQ", address=self.address
+                )
+            subscription_id = next(self._subscription_ids)
+            self._prefixes[subscription_id] = prefix
+            if prefix not in self._callbacks:
+                self._callbacks[prefix] = {}
+                self._prefix_lengths[len(prefix)] = (
+                    self._prefix_lengths.get(len(prefix), 0) + 1
+                )
+                self._command_socket.send_multipart([b"subscribe", prefix])
+            self._callbacks[prefix][subscription_id] = callback
+        return subscription_id
+
+    def unsubscribe(self, subscription_id: int) -> None:
+        """Stop calling the callback of the given subscription."""
+        with self._lock:
+            prefix = self._prefixes.pop(subscription_id, None)
+            if prefix is None:
+                return
+            callbacks = self._callbacks[prefix]
+            callbacks.pop(subscription_id)
+            if callbacks:
+                return
+            self._callbacks.pop(prefix)
+            self._prefix_lengths[len(prefix)] -= 1
+            if not self._prefix_lengths[len(prefix)]:
+                self._prefix_lengths.pop(len(prefix))
+            if not self._terminate:
+                self._command_socket.send_multipart([b"unsubscribe", prefix])
+
+    def get_n_subscriptions(self) -> int:
+        """Get the number of registered subscriptions."""
+        with self._lock:
+            return len(self._prefixes)
+
+    def _run_io(self) -> None:
+        """Apply subscription changes and dispatch received messages."""
+        poller = zmq.Poller()
+        poller.register(self.inbox_socket, zmq.POLLIN)
+        poller.register(self.sub_socket, zmq.POLLIN)
+        poller.register(self.monitor_socket, zmq.POLLIN)
+        try:
+            while not self._terminate:
+                events = dict(poller.poll(1000))
+                if self._terminate:
+                    break
+                if self.inbox_socket in events:
+                    self._process_commands()
+                if self.sub_socket in events:
+                    self._receive_messages()
+                if self.monitor_socket in events:
+                    self._process_monitor_events()
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            if not self._terminate:
+                log.error(f"BrenthyAPI: ZmqSubscriptionHub: {error}")
+        finally:
+            self._terminate = True
+            self.sub_socket.disable_monitor()
+            self.monitor_socket.close()
+            self.sub_socket.close()
+            self.inbox_socket.close()
+
+    def _process_commands(self) -> None:
+        while True:
+            try:
+                command, prefix = self.inbox_socket.recv_multipart(
+                    flags=zmq.NOBLOCK
+                )
+            except zmq.error.Again:
+                return
+            if command == b"subscribe":
+                self.sub_socket.subscribe(prefix)
+            elif command == b"unsubscribe":
+                self.sub_socket.unsubscribe(prefix)
+
+    def _process_monitor_events(self) -> None:
+        # pylint: disable=import-outside-toplevel
+        from zmq.utils.monitor import recv_monitor_message
+
+        while True:
+            try:
+                event = recv_monitor_message(
+                    self.monitor_socket, flags=zmq.NOBLOCK
+                )
+            except zmq.error.Again:
+                return
+            if event["event"] == zmq.EVENT_CONNECTED:
+                self._connected.set()
+            else:
+                self._connected.clear()
+
+    def _receive_messages(self) -> None:
+        while True:
+            try:
+                frames = self.sub_socket.recv_multipart(flags=zmq.NOBLOCK)
+            except zmq.error.Again:
+                return
+            self._dispatch(frames)
+
+    def _dispatch(self, frames: list[bytes]) -> None:
+        """Pass a received message to the callbacks subscribed to it."""
+        topic = frames[0]
+        with self._lock:
+            # look up the subscribed prefixes this message starts with
+            callbacks = [
+                callback
+                for length in self._prefix_lengths
+                # longer prefixes would be looked up as the whole topic again
+                if length <= len(topic)
+                for callback in self._callbacks.get(
+                    topic[:length], {}
+                ).values()
+            ]
+        for callback in callbacks:
+            try:
+                callback(frames)
+            except Exception as e:  # pylint:disable=broad-exception-caught
+                log.error(f"BrenthyAPI: ZmqSubscriptionHub callback: {e}")
+
+    def terminate(self) -> None:
+        """Stop receiving messages and clean up resources."""
+        with self._lock:
+            if self._terminate:
+                return
+            self._terminate = True
+            # wake up the IO thread
+            try:
+                self._command_socket.send_multipart(
+                    [b"", b""], flags=zmq.NOBLOCK
+                )
+            except zmq.ZMQError:
+                pass
+            self._command_socket.close()
+        if self.io_thread.is_alive():
+            self.io_thread.join()
+
+    def __del__(self):
+        """Stop receiving messages and clean up resources."""
+        self.terminate()
+
+
 def send_request_tcp(
     request: bytearray | bytes, socket_address: tuple[str, int],
     timeout: int | None = None
@@ -106,15 +786,451 @@ def send_request_tcp(
         bytearray: reply received from the endpoint after sending the request
     """
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.settimeout(CONNECT_TIMEOUT_S)
         try:
             s.connect((socket_address[0], socket_address[1]))
-        except ConnectionRefusedError:
+        except OSError:
             raise CantConnectToSocketError(
                 protocol="TCP", address=socket_address
             ) from None
-        _tcp_send_counted(s, request)
-        reply = _tcp_recv_counted(s, timeout=timeout)
-        return reply
+        try:
+            tcp_send_counted(s, request, timeout=timeout)
+            return tcp_recv_counted(s, timeout=timeout)
+        except (
+            TimeoutError, ConnectionError, ValueError, OverflowError,
+            MemoryError
+        ):
+            # including malformed replies
+            raise CantConnectToSocketError(
+                protocol="TCP", address=socket_address
+            ) from None
+
+
+def get_async_zmq_context() -> "zmq.asyncio.Context":
+    """Get the asyncio-compatible shadow of our ZMQ context."""
+    global ASYNC_ZMQ_CONTEXT  # pylint: disable=global-statement
+    _load_zmq()
+    if not ZMQ_CONTEXT or ZMQ_CONTEXT.closed:
+        raise CantConnectToSocketError(protocol="ZMQ") from None
+    if ASYNC_ZMQ_CONTEXT is None or ASYNC_ZMQ_CONTEXT.closed or (
+        ASYNC_ZMQ_CONTEXT.underlying != ZMQ_CONTEXT.underlying
+    ):
+        import zmq.asyncio  # pylint: disable=import-outside-toplevel
+
+        ASYNC_ZMQ_CONTEXT = zmq.asyncio.Context.shadow(ZMQ_CONTEXT.underlying)
+    return ASYNC_ZMQ_CONTEXT
+
+
+async def send_request_zmq_async(
+    request: bytearray | bytes,
+    socket_address: tuple[str, int] | str,
+    timeout: int | None = None,
+) -> bytes:
+    """Send a request to the given address, awaiting its reply.
+
+    The asyncio equivalent of `send_request_zmq`.
+
+    Args:
+        request (bytearray): the data to send
+        socket_address (tuple[str,int] | str): IP address and port number to
+            send to, or a ZMQ endpoint string
+        timeout (int): how long to wait before giving up, None to use default
+    Returns:
+        bytearray: reply received from the endpoint after sending the request
+    """
+    if timeout is None:
+        timeout = REQUEST_TIMEOUT_S
+    zmq_socket = get_async_zmq_context().socket(zmq.REQ)
+    zmq_socket.setsockopt(zmq.LINGER, 1)
+    zmq_socket.connect(get_zmq_address(socket_address))
+    try:
+        await zmq_socket.send(request)
+        if not await zmq_socket.poll(
+            timeout=timeout * 1000, flags=zmq.PollEvent.POLLIN
+        ):
+            raise CantConnectToSocketError(
+                protocol="ZMQ", address=socket_address
+            ) from None
+        return await zmq_socket.recv()
+    finally:
+        zmq_socket.close()
+
+
+# event loop -> address -> the loop's client for that address
+_ASYNC_MULTIPLEXED_CLIENTS: (
+    "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict]"
+) = weakref.WeakKeyDictionary()
+
+
+async def send_request_zmq_multiplexed_async(
+    request: bytearray | bytes,
+    socket_address: tuple[str, int] | str,
+    timeout: int | None = None,
+) -> bytes:
+    """Send a request via the event loop's shared connection to the address.
+
+    The asyncio equivalent of `send_request_zmq_multiplexed`.
+    Each event loop has its own `AsyncZmqMultiplexedClient` per address.
+
+    Args:
+        request (bytearray): the data to send
+        socket_address (tuple[str,int] | str): IP address and port number to
+            send to, or a ZMQ endpoint string
+        timeout (int): how long to wait before giving up, None to use default
+    Returns:
+        bytearray: reply received from the endpoint after sending the request
+    """
+    client = _get_async_multiplexed_client(socket_address)
+    return await client.send_request(request, timeout=timeout)
+
+
+async def send_request_zmq_multipart_async(
+    request_frames: list[bytearray | bytes],
+    socket_address: tuple[str, int] | str,
+    timeout: int | None = None,
+) -> list[memoryview]:
+    """Send a multipart request via the event loop's shared connection.
+
+    The asyncio equivalent of `send_request_zmq_multipart`.
+
+    Args:
+        request_frames (list[bytearray]): the data to send
+        socket_address (tuple[str,int] | str): IP address and port number to
+            send to, or a ZMQ endpoint string
+        timeout (int): how long to wait before giving up, None to use default
+    Returns:
+        list[memoryview]: the frames of the reply received from the endpoint
+    """
+    return await _get_async_multiplexed_client(
+        socket_address
+    ).send_request_multipart(request_frames, timeout=timeout)
+
+
+def _get_async_multiplexed_client(
+    socket_address: tuple[str, int] | str
+) -> "AsyncZmqMultiplexedClient":
+    """Get the running event loop's client for the given address."""
+    import asyncio  # pylint: disable=import-outside-toplevel
+
+    loop = asyncio.get_running_loop()
+    closed_clients = []
+    with _MULTIPLEXED_CLIENTS_LOCK:
+        # forget the clients of event loops which were closed without
+        # cancelling their tasks, as their tasks reference their loops
+        for closed_loop in [
+            other_loop for other_loop in _ASYNC_MULTIPLEXED_CLIENTS.keys()
+            if other_loop.is_closed()
+        ]:
+            closed_clients.extend(
+                _ASYNC_MULTIPLEXED_CLIENTS.pop(closed_loop).values()
+            )
+        clients = _ASYNC_MULTIPLEXED_CLIENTS.setdefault(loop, {})
+        client = clients.get(socket_address)
+        if not client or client.closed:
+            client = AsyncZmqMultiplexedClient(
+                socket_address, get_async_zmq_context()
+            )
+            clients[socket_address] = client
+    for closed_client in closed_clients:
+        closed_client.close()
+    return client
+
+
+def _forget_async_multiplexed_client(
+    client: "AsyncZmqMultiplexedClient"
+) -> None:
+    """Remove a closed client from _ASYNC_MULTIPLEXED_CLIENTS."""
+    with _MULTIPLEXED_CLIENTS_LOCK:
+        for loop, clients in list(_ASYNC_MULTIPLEXED_CLIENTS.items()):
+            if clients.get(client.socket_address) is client:
+                del clients[client.socket_address]
+                if not clients:
+                    del _ASYNC_MULTIPLEXED_CLIENTS[loop]
+
+
+class AsyncZmqMultiplexedClient:
+    """The asyncio equivalent of ZmqMultiplexedClient.
+
+    Uses the same wire format as ZmqMultiplexedClient, but instead of using
+    an IO thread, reads replies in a task on the event loop it is used in,
+    so that any number of concurrent requests cost coroutines, not threads.
+    Must only be used from a single event loop.
+    Closes itself when its tasks are cancelled, such as when `asyncio.run`
+    finishes, so that it doesn't keep its event loop alive.
+    """
+
+    def __init__(
+        self,
+        socket_address: tuple[str, int] | str,
+        zmq_context: "zmq.asyncio.Context",
+    ):
+        """Connect to a remote ZMQ ROUTER socket.
+
+        Args:
+            socket_address (tuple[str,int] | str): IP address and port
+                number, or a ZMQ endpoint string
+            zmq_context (zmq.asyncio.Context): the context to create sockets in
+        """
+        self.socket_address = socket_address
+        self.closed = False
+        self._pending: dict[bytes, asyncio.Future] = {}
+        self._in_flight: set[bytes] = set()
+        self._correlation_ids = itertools.count(1)
+        self._receive_task: asyncio.Task | None = None
+        self._monitor_task: asyncio.Task | None = None
+
+        self.dealer_socket = zmq_context.socket(zmq.DEALER)
+        self.dealer_socket.setsockopt(zmq.LINGER, 0)
+        self.dealer_socket.setsockopt(zmq.IMMEDIATE, 1)
+        self.dealer_socket.setsockopt(
+            zmq.RECONNECT_IVL, RECONNECT_INTERVAL_MS
+        )
+        self.dealer_socket.setsockopt(
+            zmq.RECONNECT_IVL_MAX, RECONNECT_INTERVAL_MAX_MS
+        )
+        self.monitor_socket = self.dealer_socket.get_monitor_socket(
+            zmq.EVENT_DISCONNECTED
+        )
+        self.dealer_socket.connect(get_zmq_address(socket_address))
+
+    async def send_request(
+        self, request: bytearray | bytes, timeout: int | None = None
+    ) -> bytes:
+        """Send a request to the remote endpoint, awaiting its reply.
+
+        Args:
+            request (bytearray): the data to send
+            timeout (int): how long to wait before giving up, None for default
+        Returns:
+            bytearray: reply received from the endpoint
+        """
+        return (await self._send([request], timeout))[-1].bytes
+
+    async def send_request_multipart(
+        self,
+        request_frames: list[bytearray | bytes],
+        timeout: int | None = None
+    ) -> list[memoryview]:
+        """Send a multipart request, awaiting its reply.
+
+        The frames mustn't be modified until this coroutine has returned.
+
+        Args:
+            request_frames (list[bytearray]): the data to send
+            timeout (int): how long to wait before giving up, None for default
+        Returns:
+            list[memoryview]: the frames of the reply
+        """
+        return [
+            frame.buffer
+            for frame in await self._send(request_frames, timeout)
+        ]
+
+    async def _send(
+        self,
+        request_frames: list[bytearray | bytes],
+        timeout: int | None = None
+    ) -> list["zmq.Frame"]:
+        """Send the request frames, returning the reply's frames."""
+        import asyncio  # pylint: disable=import-outside-toplevel
+
+        if timeout is None:
+            timeout = REQUEST_TIMEOUT_S
+        if self.closed:
+            raise CantConnectToSocketError(
+                protocol="ZMQ", address=self.socket_address
+            )
+        loop = asyncio.get_running_loop()
+        # (re)start the tasks, in case they have never run or died
+        if not self._receive_task or self._receive_task.done():
+            self._receive_task = loop.create_task(self._receive_replies())
+        if not self._monitor_task or self._monitor_task.done():
+            self._monitor_task = loop.create_task(
+                self._process_monitor_events()
+            )
+        correlation_id = next(self._correlation_ids).to_bytes(8, "big")
+        future = loop.create_future()
+        self._pending[correlation_id] = future
+        try:
+            try:
+                # with zmq.IMMEDIATE, this blocks until we're connected
+                await asyncio.wait_for(
+                    self.dealer_socket.send_multipart(
+                        [correlation_id, b""] + request_frames, copy=False
+                    ),
+                    CONNECT_TIMEOUT_S
+                )
+            except asyncio.TimeoutError:
+                raise CantConnectToSocketError(
+                    protocol="ZMQ", address=self.socket_address
+                ) from None
+            self._in_flight.add(correlation_id)
+            try:
+                return await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                raise CantConnectToSocketError(
+                    "Timed out waiting for a reply",
+                    protocol="ZMQ", address=self.socket_address
+                ) from None
+        finally:
+            self._pending.pop(correlation_id, None)
+            self._in_flight.discard(correlation_id)
+
+    async def _receive_replies(self) -> None:
+        import asyncio  # pylint: disable=import-outside-toplevel
+
+        try:
+            while not self.closed:
+                frames = await self.dealer_socket.recv_multipart(copy=False)
+                future = self._pending.get(frames[0].bytes)
+                # future is None if the requester has already given up on it
+                if future and not future.done():
+                    # skip the correlation ID and empty delimiter frames
+                    future.set_result(frames[2:])
+        except asyncio.CancelledError:
+            # the event loop is shutting down
+            self.close()
+            raise
+        except Exception as error:
+            log.error(f"AsyncZmqMultiplexedClient: {error}")
+            raise
+
+    async def _process_monitor_events(self) -> None:
+        import asyncio  # pylint: disable=import-outside-toplevel
+
+        try:
+            while not self.closed:
+                await self.monitor_socket.recv_multipart()
+                # the connection dropped, so we won't get replies to
+                # requests that are currently in flight
+                for correlation_id in list(self._in_flight):
+                    future = self._pending.get(correlation_id)
+                    if future and not future.done():
+                        future.set_exception(CantConnectToSocketError(
+                            protocol="ZMQ", address=self.socket_address
+                        ))
+        except asyncio.CancelledError:
+            # the event loop is shutting down
+            self.close()
+            raise
+        except Exception as error:
+            log.error(f"AsyncZmqMultiplexedClient: {error}")
+            raise
+
+    def close(self) -> None:
+        """Fail all pending requests and clean up resources."""
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            for task in (self._receive_task, self._monitor_task):
+                if task:
+                    task.cancel()
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(CantConnectToSocketError(
+                        protocol="ZMQ", address=self.socket_address
+                    ))
+        except RuntimeError:
+            # the event loop has already been closed
+            pass
+        self._receive_task = None
+        self._monitor_task = None
+        _forget_async_multiplexed_client(self)
+        self.dealer_socket.disable_monitor()
+        self.monitor_socket.close()
+        self.dealer_socket.close()
+
+
+async def send_request_tcp_async(
+    request: bytearray | bytes, socket_address: tuple[str, int],
+    timeout: int | None = None
+) -> bytes:
+    """Send a request to the given address, awaiting its reply.
+
+    The asyncio equivalent of `send_request_tcp`.
+
+    Args:
+        request (bytearray): the data to send
+        socket_address (tuple[str,int]): IP address and port number to send to
+        timeout (int): how long to wait before giving up, None to use default
+    Returns:
+        bytearray: reply received from the endpoint after sending the request
+    """
+    import asyncio  # pylint: disable=import-outside-toplevel
+
+    if timeout is None:
+        timeout = REQUEST_TIMEOUT_S
+    try:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(socket_address[0], socket_address[1]),
+            CONNECT_TIMEOUT_S
+        )
+    except (OSError, asyncio.TimeoutError):
+        raise CantConnectToSocketError(
+            protocol="TCP", address=socket_address
+        ) from None
+
+    async def exchange() -> bytearray:
+        writer.write(to_b255_no_0s(len(request)) + bytearray([0]))
+        writer.write(request)
+        await writer.drain()
+        return await tcp_recv_counted_async(reader)
+
+    try:
+        # one deadline for the whole exchange, like send_request_tcp
+        return await asyncio.wait_for(exchange(), timeout)
+    except (
+        asyncio.TimeoutError, asyncio.IncompleteReadError,
+        asyncio.LimitOverrunError, OSError, ValueError, OverflowError,
+        MemoryError
+    ):
+        # including malformed replies
+        raise CantConnectToSocketError(
+            protocol="TCP", address=socket_address
+        ) from None
+    finally:
+        writer.close()
+
+
+async def tcp_recv_counted_async(
+    reader: "asyncio.StreamReader",
+) -> bytearray:
+    """Receive a message sent with `tcp_send_counted`.
+
+    The asyncio equivalent of `tcp_recv_counted`: rejects messages larger
+    than TCP_MAX_MESSAGE_SIZE and only preallocates up to
+    TCP_MAX_PREALLOCATION bytes for the message, growing the buffer as the
+    data arrives. It has no timeout, wrap it in `asyncio.wait_for`.
+
+    Args:
+        reader (asyncio.StreamReader): the connection to read from
+    Returns:
+        bytearray: the received message
+    """
+    header = await reader.readuntil(b"\0")
+    if len(header) > TCP_MAX_HEADER_LENGTH:
+        raise ValueError("Received invalid TCP message header.")
+    length = from_b255_no_0s(header[:-1])
+    if length > TCP_MAX_MESSAGE_SIZE:
+        raise ValueError(
+            f"Received TCP message header announcing {length} bytes, "
+            f"more than the maximum of {TCP_MAX_MESSAGE_SIZE}."
+        )
+    data = bytearray(min(length, TCP_MAX_PREALLOCATION))
+    received = 0
+    while received < length:
+        if received == len(data):
+            # grow the buffer, doubling it to limit the copying
+            data.extend(bytes(min(len(data), length - len(data))))
+        part = await reader.read(min(len(data) - received, BUFFER_SIZE * 16))
+        if not part:
+            raise ConnectionError(
+                "Connection closed before the whole message was received."
+            )
+        data[received:received + len(part)] = part
+        received += len(part)
+    return data
 
 
 class CantConnectToSocketError(Exception):
@@ -128,7 +1244,7 @@ class CantConnectToSocketError(Exception):
         self,
         message: str = def_message,
         protocol: str = "",
-        address: tuple[str, int] | None = None,
+        address: tuple[str, int] | str | None = None,
     ):
         """Create a CantConnectToSocketError exception.
 
@@ -154,63 +1270,153 @@ class CantConnectToSocketError(Exception):
         return error_message
 
 
-def _tcp_send_counted(
-    sock: socket.socket, data: bytearray | bytes
+def tcp_send_counted(
+    sock: socket.socket,
+    data: bytearray | bytes,
+    timeout: int | None = None,
 ) -> None:
-    length = len(data)
-    sock.send(to_b255_no_0s(length) + bytearray([0]))
-    sock.send(data)
+    """Send a message over a TCP connection, prefixed by its length.
+
+    The length header and the message are written with a single system call
+    where possible, without concatenating them, and partial writes are
+    completed, waiting for the connection to become writable.
+
+    Args:
+        sock (socket.socket): the connection to send the message over
+        data (bytearray): the message to send
+        timeout (int): how long sending the whole message may take before
+            giving up, None to use default
+    """
+    if timeout is None:
+        timeout = REQUEST_TIMEOUT_S
+    deadline = time.monotonic() + timeout
+    header = to_b255_no_0s(len(data)) + bytearray([0])
+    buffers = [memoryview(header)]
+    if len(data):
+        buffers.append(memoryview(data))
+    sock.setblocking(False)
+    with selectors.DefaultSelector() as selector:
+        selector.register(sock, selectors.EVENT_WRITE)
+        while buffers:
+            try:
+                if hasattr(sock, "sendmsg"):
+                    sent = sock.sendmsg(buffers)
+                else:  # Windows
+                    sent = sock.send(buffers[0])
+            except BlockingIOError:
+                _wait_for_socket(selector, deadline)
+                continue
+            # drop what has been sent from the buffers
+            while sent:
+                if sent >= len(buffers[0]):
+                    sent -= len(buffers[0])
+                    buffers.pop(0)
+                else:
+                    buffers[0] = buffers[0][sent:]
+                    sent = 0
 
 
-def _tcp_recv_counted(
+def tcp_recv_counted(
     sock: socket.socket, timeout: int | None = None
-) -> bytes:
+) -> bytearray:
+    """Receive a message sent with `tcp_send_counted`.
+
+    The message is received directly into a buffer allocated according to
+    the length header, up to TCP_MAX_PREALLOCATION bytes, beyond which the
+    buffer is grown as the data arrives.
+
+    Args:
+        sock (socket.socket): the connection to receive the message from
+        timeout (int): how long receiving the whole message may take before
+            giving up, None to use default
+    Returns:
+        bytearray: the received message
+    Raises:
+        TimeoutError: if the timeout passed before the whole message was
+            received
+        ConnectionError: if the connection was closed before the whole
+            message was received
+        ValueError: if the length header is invalid or announces a message
+            larger than TCP_MAX_MESSAGE_SIZE
+        OverflowError: if more data than the header announced was received
+    """
     if timeout is None:
         timeout = REQUEST_TIMEOUT_S
-    # make socket non blocking
+    deadline = time.monotonic() + timeout
     sock.setblocking(False)
+    with selectors.DefaultSelector() as selector:
+        selector.register(sock, selectors.EVENT_READ)
+
+        # receive the header, probably together with (part of) the message
+        first_part = bytearray(BUFFER_SIZE)
+        first_part_view = memoryview(first_part)
+        first_part_length = 0
+        header_end = -1
+        while header_end < 0:
+            if first_part_length >= TCP_MAX_HEADER_LENGTH:
+                raise ValueError("Received invalid TCP message header.")
+            first_part_length += _recv_into(
+                sock, selector, first_part_view[first_part_length:], deadline
+            )
+            header_end = first_part.find(0, 0, first_part_length)
+        length = from_b255_no_0s(first_part[:header_end])
+        if length > TCP_MAX_MESSAGE_SIZE:
+            raise ValueError(
+                f"Received TCP message header announcing {length} bytes, "
+                f"more than the maximum of {TCP_MAX_MESSAGE_SIZE}."
+            )
+
+        received = first_part_length - header_end - 1
+        if received > length:
+            raise OverflowError("Received more data than expected!")
+        data = bytearray(min(length, max(received, TCP_MAX_PREALLOCATION)))
+        data[:received] = first_part_view[header_end + 1:first_part_length]
+        while received < length:
+            if received == len(data):
+                # grow the buffer, doubling it to limit the copying
+                data.extend(bytes(min(len(data), length - len(data))))
+            with memoryview(data) as data_view:
+                with data_view[received:] as free_view:
+                    received += _recv_into(
+                        sock, selector, free_view, deadline
+                    )
+        return data
 
-    # total data partwise in an array
-    total_data = bytes()
-    data = bytes()
-    length = 0
-    # beginning time
-    begin = time.time()
-    while True:
-        # if we got some data, wait a little longer, twice the timeout
-        if len(total_data) > 0 and time.time() - begin > timeout * 2:
-            break
 
-        # if we got no data, then break after timeout
-        if time.time() - begin > timeout * 2:
-            break
+def _recv_into(
+    sock: socket.socket,
+    selector: selectors.BaseSelector,
+    buffer: memoryview,
+    deadline: float
+) -> int:
+    """Receive data from a non-blocking socket into the buffer.
 
-        # recv something
+    Raises TimeoutError if nothing can be received before the deadline
+    (`time.monotonic()`).
+
+    Returns:
+        int: the number of bytes received, which is never 0
+    """
+    while True:
         try:
-            data = sock.recv(BUFFER_SIZE)
-            if data:
-                if not length:
-                    if data.index(0):
-                        total_data += data[: data.index(0)]
-                        length = from_b255_no_0s(total_data)
-                        total_data = data[data.index(0) + 1:]
-                    else:
-                        total_data += data
-                else:
-                    total_data += data
-
-                if length:
-                    if len(total_data) == length:
-                        return total_data
-                    if len(total_data) > length:
-                        raise OverflowError(
-                            "Received more data than expected!"
-                        )
-                    # change the beginning time for measurement
-                    begin = time.time()
-        except:  # pylint:disable=bare-except
-            pass
-    return total_data
+            n_bytes = sock.recv_into(buffer)
+        except BlockingIOError:
+            _wait_for_socket(selector, deadline)
+            continue
+        if not n_bytes:
+            raise ConnectionError(
+                "Connection closed before the whole message was received."
+            )
+        return n_bytes
+
+
+def _wait_for_socket(
+    selector: selectors.BaseSelector, deadline: float
+) -> None:
+    """Wait for a socket to be ready, raising TimeoutError at the deadline."""
+    remaining = deadline - time.monotonic()
+    if remaining <= 0 or not selector.select(remaining):
+        raise TimeoutError("Timed out waiting for TCP communication.")
 
 
 class EventListener(ABC):
@@ -220,6 +1426,7 @@ class EventListener(ABC):
         self,
         eventhandler: FunctionType,
         topics: (list[str] | str | None) = None,
+        executor: EventExecutor | None = None,
     ):
         """Create an EventListener."""
         pass
@@ -230,13 +1437,57 @@ class EventListener(ABC):
         pass
 
 
+class AsyncEventListener(ABC):
+    """Abstract class for AsyncEventListener, which all BAP modules implement.
+
+    Must be created in a running asyncio event loop, on which it delivers
+    events either by calling the eventhandler or by being iterated over.
+    """
+
+    def __init__(
+        self,
+        eventhandler: FunctionType | None = None,
+        topics: (list[str] | str | None) = None,
+    ):
+        """Create an AsyncEventListener."""
+        pass
+
+    def __aiter__(self) -> "AsyncEventListener":
+        """Iterate over received events as (data, topic) tuples."""
+        return self
+
+    @abstractmethod
+    async def __anext__(self) -> tuple[dict, str]:
+        """Wait for the next event."""
+
+    @abstractmethod
+    def terminate(self) -> None:
+        """Stop listening for events and clean up resources."""
+        pass
+
+
 def terminate() -> None:
     """Clean up all resources."""
+    with _SUBSCRIPTION_HUBS_LOCK:
+        for hub in _SUBSCRIPTION_HUBS.values():
+            hub.terminate()
+        _SUBSCRIPTION_HUBS.clear()
+    with _MULTIPLEXED_CLIENTS_LOCK:
+        for client in _MULTIPLEXED_CLIENTS.values():
+            client.terminate()
+        _MULTIPLEXED_CLIENTS.clear()
+        async_clients = [
+            async_client
+            for clients in _ASYNC_MULTIPLEXED_CLIENTS.values()
+            for async_client in clients.values()
+        ]
+        _ASYNC_MULTIPLEXED_CLIENTS.clear()
+    # closed after releasing the lock, as closing them takes it
+    for async_client in async_clients:
+        async_client.close()
     if ZMQ_CONTEXT:
         try:
             ZMQ_CONTEXT.term()
         except Exception as error:
             log.error(str(error))
 
-
-initialise()
@@ -0,0 +1,269 @@
+"""Compression of BrenthyAPI payloads, used by Brenthy Core and `brenthy_api`.
+
+BrenthyAPI protocols which transmit requests and replies as multiple message
+frames (BAP-5) can append a header frame to them, in which the sender states
+which codec it compressed the payload with (if any) and which codecs it can
+decompress.
+Each side only compresses payloads larger than COMPRESSION_THRESHOLD_BYTES
+with a codec the other side has said it accepts, so that Brenthy Core and
+`brenthy_api` agree on codecs without any extra round trips.
+
+Codecs are pluggable: further codecs can be added with `register_codec`.
+
+As a small compressed payload can decompress to a huge one, payloads are
+only decompressed up to MAX_DECOMPRESSED_BYTES, beyond which they are
+rejected.
+"""
+
+import lzma
+import time
+import zlib
+from threading import Lock
+from typing import Callable
+
+# pylint: disable=unused-variable
+
+# payloads smaller than this aren't worth the CPU time of compressing them
+COMPRESSION_THRESHOLD_BYTES = 4096
+# larger payloads are only compressed if a sample of this size compresses to
+# less than MAX_SAMPLE_RATIO of its size, to avoid wasting CPU time
+# on incompressible (e.g. encrypted or already compressed) data
+COMPRESSIBILITY_SAMPLE_BYTES = 65536
+MAX_SAMPLE_RATIO = 0.9
+ZLIB_LEVEL = 1
+LZMA_PRESET = 1
+# the largest payload we decompress, larger ones are rejected
+MAX_DECOMPRESSED_BYTES = 2**28
+
+
+class UnsupportedCodecError(Exception):
+    """When asked to decompress data using a codec we don't know."""
+
+    def __init__(self, codec: str):
+        """Create an UnsupportedCodecError for the given codec name."""
+        self.codec = codec
+        Exception.__init__(self, f"Unsupported compression codec: {codec}")
+
+
+class DecompressedTooLargeError(ValueError):
+    """When a payload decompresses to more than the allowed size."""
+
+    def __init__(self, max_length: int):
+        """Create a DecompressedTooLargeError for the given maximum size."""
+        self.max_length = max_length
+        ValueError.__init__(
+            self, f"Payload decompresses to more than {max_length} bytes."
+        )
+
+
+class Codec:
+    """A compression algorithm which can be used on BrenthyAPI payloads."""
+
+    def __init__(
+        self,
+        name: str,
+        compress: Callable[[bytes], bytes],
+        decompress: Callable[[bytes, int | None], bytes],
+    ):
+        """Create a Codec.
+
+        Args:
+            name (str): the name by which the codec is negotiated
+            compress (Callable): function that compresses bytes
+            decompress (Callable): function that decompresses bytes, see
+                `register_codec`
+        """
+        self.name = name
+        self.compress = compress
+        self.decompress = decompress
+        # statistics
+        self.compressions = 0
+        self.decompressions = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.compress_cpu_s = 0.0
+        self.decompress_cpu_s = 0.0
+
+    def to_dict(self) -> dict:
+        """Get this codec's statistics in a dictionary."""
+        return {
+            "compressions": self.compressions,
+            "decompressions": self.decompressions,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "ratio": (
+                self.bytes_out / self.bytes_in if self.bytes_in else None
+            ),
+            "compress_cpu_s": self.compress_cpu_s,
+            "decompress_cpu_s": self.decompress_cpu_s,
+        }
+
+
+# the codecs we support, in order of preference
+CODECS: dict[str, Codec] = {}
+_stats_lock = Lock()
+# how many payloads were sent uncompressed because compression didn't help
+_incompressible = 0
+
+
+def register_codec(
+    name: str,
+    compress: Callable[[bytes], bytes],
+    decompress: Callable[[bytes, int | None], bytes],
+) -> None:
+    """Add support for a compression codec.
+
+    Codecs registered later are less preferred than those registered earlier.
+
+    Args:
+        name (str): the name by which the codec is negotiated, which must be
+            the same in Brenthy Core and `brenthy_api`
+        compress (Callable): function that compresses bytes
+        decompress (Callable): function that decompresses bytes, given them
+            and the maximum size of the result (None for unlimited), which
+            must stop decompressing and raise DecompressedTooLargeError as
+            soon as that size is exceeded
+    """
+    if not isinstance(name, str) or not name:
+        raise ValueError("Codec name must be a non-empty string.")
+    CODECS[name] = Codec(name, compress, decompress)
+
+
+def _zlib_decompress(data: bytes, max_length: int | None) -> bytes:
+    if max_length is None:
+        return zlib.decompress(data)
+    decompressor = zlib.decompressobj()
+    decompressed = decompressor.decompress(data, max_length + 1)
+    if len(decompressed) > max_length:
+        raise DecompressedTooLargeError(max_length)
+    if not decompressor.eof:
+        raise zlib.error("Incomplete or truncated zlib stream.")
+    return decompressed
+
+
+def _lzma_decompress(data: bytes, max_length: int | None) -> bytes:
+    if max_length is None:
+        return lzma.decompress(data)
+    decompressor = lzma.LZMADecompressor()
+    decompressed = decompressor.decompress(data, max_length + 1)
+    if len(decompressed) > max_length:
+        raise DecompressedTooLargeError(max_length)
+    if not decompressor.eof:
+        raise lzma.LZMAError("Incomplete or truncated lzma stream.")
+    return decompressed
+
+
+register_codec(
+    "zlib",
+    lambda data: zlib.compress(data, ZLIB_LEVEL),
+    _zlib_decompress,
+)
+register_codec(
+    "lzma",
+    lambda data: lzma.compress(data, preset=LZMA_PRESET),
+    _lzma_decompress,
+)
+
+
+def get_codec_names() -> list[str]:
+    """Get the names of the codecs we support, in order of preference."""
+    return list(CODECS.keys())
+
+
+def compress(
+    data: bytes | bytearray | memoryview, accepted_codecs: list[str]
+) -> tuple[str | None, bytes | bytearray | memoryview]:
+    """Compress data if worthwhile, using a codec the recipient accepts.
+
+    Args:
+        data (bytes): the payload to compress
+        accepted_codecs (list[str]): the codecs the recipient can decompress,
+            in its order of preference
+    Returns:
+        tuple[str | None, bytes]: the name of the codec used, or None if the
+            data wasn't compressed, and the (possibly compressed) data
+    """
+    global _incompressible  # pylint: disable=global-statement
+    if len(data) < COMPRESSION_THRESHOLD_BYTES:
+        return (None, data)
+    codec = next(
+        (CODECS[name] for name in accepted_codecs if name in CODECS), None
+    )
+    if not codec:
+        return (None, data)
+
+    start = time.thread_time()
+    if len(data) > 2 * COMPRESSIBILITY_SAMPLE_BYTES:
+        sample = memoryview(data)[:COMPRESSIBILITY_SAMPLE_BYTES]
+        if len(codec.compress(sample)) > MAX_SAMPLE_RATIO * len(sample):
+            compressed = data
+        else:
+            compressed = codec.compress(data)
+    else:
+        compressed = codec.compress(data)
+    duration = time.thread_time() - start
+    with _stats_lock:
+        codec.compress_cpu_s += duration
+        if len(compressed) >= len(data):
+            _incompressible += 1
+            return (None, data)
+        codec.compressions += 1
+        codec.bytes_in += len(data)
+        codec.bytes_out += len(compressed)
+    return (codec.name, compressed)
+
+
+def decompress(
+    codec_name: str,
+    data: bytes | memoryview,
+    max_length: int | None = MAX_DECOMPRESSED_BYTES,
+) -> bytes:
+    """Decompress data compressed by the other side with the given codec.
+
+    Args:
+        codec_name (str): the codec the data was compressed with
+        data (bytes): the compressed data
+        max_length (int): the maximum size of the decompressed data, None
+            for unlimited, for data from trusted senders only
+    Raises:
+        UnsupportedCodecError: if we don't support the given codec
+        DecompressedTooLargeError: if the data decompresses to more than
+            `max_length` bytes
+    """
+    codec = CODECS.get(codec_name)
+    if not codec:
+        raise UnsupportedCodecError(codec_name)
+    start = time.thread_time()
+    decompressed = codec.decompress(data, max_length)
+    duration = time.thread_time() - start
+    if max_length is not None and len(decompressed) > max_length:
+        raise DecompressedTooLargeError(max_length)
+    with _stats_lock:
+        codec.decompressions += 1
+        codec.decompress_cpu_s += duration
+    return decompressed
+
+
+def get_stats() -> dict:
+    """Get statistics on the compression of BrenthyAPI payloads.
+
+    Returns:
+        dict: the number of payloads sent uncompressed because they were
+            incompressible and, for each codec, how many payloads were sent
+            compressed & were decompressed, their total size before and after
+            compression, the resulting compression ratio and the CPU time
+            spent compressing (including incompressible payloads) and
+            decompressing, for example:
+            {"incompressible": 0, "codecs": {"zlib": {
+                "compressions": 10, "decompressions": 10,
+                "bytes_in": 100000, "bytes_out": 20000, "ratio": 0.2,
+                "compress_cpu_s": 0.004, "decompress_cpu_s": 0.001,
+            }}}
+    """
+    with _stats_lock:
+        return {
+            "incompressible": _incompressible,
+            "codecs": {
+                name: codec.to_dict() for name, codec in CODECS.items()
+            },
+        }
@@ -0,0 +1,273 @@
+"""The binary encoding of events published by Brenthy Core via BAP-5 & BAP-6.
+
+BAP-4 publishes events as JSON strings, with the topic embedded as the first
+key, so that subscribers have to filter by a prefix of the JSON string and
+parse every message in full to get at its topic.
+BAP-5 and BAP-6 instead publish each event as four ZMQ frames:
+    [topic, sequence, codec, payload]
+- topic: the UTF-8 encoded topic, by which subscribers filter events
+- sequence: the event's sequence number as an 8-byte big-endian unsigned
+    integer, see api_terminal.publish_event
+- codec: the name of the compression codec the payload is compressed with,
+    empty if it isn't compressed
+- payload: the event's data, encoded as described below
+
+Payload encoding: each value is a type tag byte followed by its content:
+- NONE, FALSE, TRUE: no content
+- INT: varint length, followed by that many bytes of big-endian
+    two's complement integer
+- FLOAT: 8 bytes big-endian IEEE 754 double
+- STR: varint length, followed by that many bytes of UTF-8 text
+- BYTES: varint length, followed by that many bytes
+- LIST: varint number of items, followed by the items
+- DICT: varint number of items, followed by alternating keys and values
+Varints are unsigned LEB128: 7 bits per byte, least significant first,
+the highest bit set on all bytes but the last.
+
+Subscribers decode the topic of every event they receive, but only decode
+its payload when passing it to an eventhandler, using LazyEventData.
+"""
+
+import struct
+from typing import Any
+
+from . import compression
+
+# pylint: disable=unused-variable
+
+# the codecs events may be compressed with, which all subscribers support
+EVENT_CODECS = ["zlib"]
+
+NONE = 0
+FALSE = 1
+TRUE = 2
+INT = 3
+FLOAT = 4
+STR = 5
+BYTES = 6
+LIST = 7
+DICT = 8
+
+_FLOAT = struct.Struct(">d")
+_SEQUENCE = struct.Struct(">Q")
+
+
+class EventDecodeError(Exception):
+    """When an event's payload can't be decoded."""
+
+
+def encode_event(data: dict, sequence: int) -> list[bytes]:
+    """Encode a published event's data, which includes its topic.
+
+    Args:
+        data (dict): the event's data, with its topic under the key "topic"
+        sequence (int): the event's sequence number
+    Returns:
+        list[bytes]: the event's frames: topic, sequence, codec and payload
+    """
+    payload = encode_value(
+        {key: value for key, value in data.items() if key != "topic"}
+    )
+    codec, payload = compression.compress(payload, EVENT_CODECS)
+    codec_frame = codec.encode() if codec else b""
+    return [
+        data["topic"].encode(),
+        _SEQUENCE.pack(sequence),
+        codec_frame,
+        bytes(payload),
+    ]
+
+
+def decode_event(frames: list[bytes]) -> tuple[str, "LazyEventData"]:
+    """Decode an event's topic, and prepare its data for lazy decoding.
+
+    Args:
+        frames (list[bytes]): the event's frames: topic, sequence, codec and
+            payload
+    Returns:
+        tuple[str, LazyEventData]: the event's topic and data
+    """
+    if len(frames) != 4:
+        raise EventDecodeError(f"Expected 4 event frames, got {len(frames)}")
+    try:
+        sequence = _SEQUENCE.unpack(frames[1])[0]
+    except struct.error:
+        raise EventDecodeError("Invalid event sequence number") from None
+    return (
+        bytes(frames[0]).decode(),
+        LazyEventData(bytes(frames[2]).decode(), frames[3], sequence),
+    )
+
+
+def encode_value(value: Any) -> bytes:
+    """Encode a value, which may contain bytes."""
+    buffer = bytearray()
+    _encode(value, buffer)
+    return bytes(buffer)
+
+
+def decode_value(data: bytes | memoryview) -> Any:
+    """Decode a value encoded with `encode_value`."""
+    data = bytes(data)
+    try:
+        value, position = _decode(data, 0)
+    except (IndexError, ValueError, struct.error) as error:
+        raise EventDecodeError(f"Invalid event payload: {error}") from None
+    if position != len(data):
+        raise EventDecodeError("Invalid event payload: trailing data")
+    return value
+
+
+def _append_varint(buffer: bytearray, number: int) -> None:
+    while number >= 0x80:
+        buffer.append((number & 0x7F) | 0x80)
+        number >>= 7
+    buffer.append(number)
+
+
+def _decode_varint(data: bytes, position: int) -> tuple[int, int]:
+    number = 0
+    shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        number |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return (number, position)
+        shift += 7
+
+
+def _encode(value: Any, buffer: bytearray) -> None:
+    """Append the encoding of the given value to buffer."""
+    # checked by exact type first, as that is fastest for the common types
+    value_type = type(value)
+    if value_type is str:
+        content = value.encode()
+        buffer.append(STR)
+        _append_varint(buffer, len(content))
+        buffer += content
+    elif value_type is bytes:
+        buffer.append(BYTES)
+        _append_varint(buffer, len(value))
+        buffer += value
+    elif value_type is dict:
+        buffer.append(DICT)
+        _append_varint(buffer, len(value))
+        for key, item in value.items():
+            _encode(key, buffer)
+            _encode(item, buffer)
+    elif value_type is list or value_type is tuple:
+        buffer.append(LIST)
+        _append_varint(buffer, len(value))
+        for item in value:
+            _encode(item, buffer)
+    # bool before int, as bools are ints
+    elif value is None:
+        buffer.append(NONE)
+    elif value is True:
+        buffer.append(TRUE)
+    elif value is False:
+        buffer.append(FALSE)
+    elif isinstance(value, int):
+        content = value.to_bytes(
+            (value.bit_length() + 8) // 8, "big", signed=True
+        )
+        buffer.append(INT)
+        _append_varint(buffer, len(content))
+        buffer += content
+    elif isinstance(value, float):
+        buffer.append(FLOAT)
+        buffer += _FLOAT.pack(value)
+    elif isinstance(value, str):
+        _encode(str(value), buffer)
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        _encode(bytes(value), buffer)
+    elif isinstance(value, (list, tuple)):
+        _encode(list(value), buffer)
+    elif isinstance(value, dict):
+        _encode(dict(value), buffer)
+    else:
+        raise TypeError(
+            f"Can't encode values of type {type(value)} in events."
+        )
+
+
+def _decode(data: bytes, position: int) -> tuple[Any, int]:
+    """Decode the value at the given position.
+
+    Returns:
+        tuple[Any, int]: the value and the position after it
+    """
+    tag = data[position]
+    position += 1
+    if tag == STR or tag == BYTES or tag == INT:
+        length = data[position]
+        if length < 0x80:
+            position += 1
+        else:
+            length, position = _decode_varint(data, position)
+        end = position + length
+        if end > len(data):
+            raise ValueError("truncated value")
+        if tag == STR:
+            return (data[position:end].decode(), end)
+        if tag == BYTES:
+            return (data[position:end], end)
+        return (
+            int.from_bytes(data[position:end], "big", signed=True), end
+        )
+    if tag == DICT:
+        length, position = _decode_varint(data, position)
+        dictionary = {}
+        for _ in range(length):
+            key, position = _decode(data, position)
+            dictionary[key], position = _decode(data, position)
+        return (dictionary, position)
+    if tag == LIST:
+        length, position = _decode_varint(data, position)
+        items = []
+        for _ in range(length):
+            item, position = _decode(data, position)
+            items.append(item)
+        return (items, position)
+    if tag == NONE:
+        return (None, position)
+    if tag == TRUE:
+        return (True, position)
+    if tag == FALSE:
+        return (False, position)
+    if tag == FLOAT:
+        end = position + _FLOAT.size
+        return (_FLOAT.unpack(data[position:end])[0], end)
+    raise ValueError(f"unknown type tag {tag}")
+
+
+class LazyEventData:
+    """An event's encoded data, which is only decoded when it's needed.
+
+    EventListeners pass these on to their EventExecutor, decoding them just
+    before calling the eventhandler, so that events which are dropped or
+    arrive after the EventListener is terminated are never decoded, and so
+    that decoding doesn't hold up the receiving of further events.
+    """
+
+    def __init__(
+        self, codec: str, payload: bytes | memoryview, sequence: int
+    ):
+        """Create a LazyEventData from an event's frames."""
+        self.codec = codec
+        self.payload = payload
+        self.sequence = sequence
+        self._data: dict | None = None
+
+    def decode(self) -> dict:
+        """Get the event's data, decoding it on the first call."""
+        if self._data is None:
+            payload = self.payload
+            if self.codec:
+                payload = compression.decompress(self.codec, payload)
+            data = decode_value(payload)
+            if not isinstance(data, dict):
+                raise EventDecodeError("Event payload isn't a dictionary.")
+            self._data = data
+        return self._data
@@ -0,0 +1,337 @@
+"""Bounded, ordered execution of EventListeners' eventhandlers.
+
+An EventListener hands the events it receives to an EventExecutor, which
+calls the eventhandler for them on a fixed number of worker threads.
+Events of the same topic are handled one after the other in the order in
+which they were received, while events of different topics are handled in
+parallel.
+The number of events waiting to be handled is bounded: when an executor's
+queue is full, it applies its overflow policy to new events:
+- BLOCK: wait until there is space in the queue, i.e. stop receiving events,
+    leaving it to ZMQ to buffer them
+- DROP_OLDEST: discard the oldest queued event to make space for the new one
+- SPILL: store new events in a temporary file until there is space for them
+
+EventListeners use a process-wide default executor unless given their own,
+so that all their eventhandlers share its worker threads and queue bound.
+As EventListeners submit events from the thread on which all of a process'
+events are received, an executor which BLOCKs stops the delivery of events
+to all EventListeners, so the default executor SPILLs instead.
+"""
+
+import os
+import pickle
+import time
+from collections import deque
+from threading import Condition, Lock, Thread
+from typing import Any, BinaryIO, Callable
+
+from . import log
+
+# pylint: disable=unused-variable
+
+EVENT_EXECUTOR_WORKERS = 4
+EVENT_EXECUTOR_MAX_QUEUED = 10000
+
+# overflow policies
+BLOCK = "block"
+DROP_OLDEST = "drop_oldest"
+SPILL = "spill"
+OVERFLOW_POLICIES = [BLOCK, DROP_OLDEST, SPILL]
+
+
+class EventExecutor:
+    """Calls eventhandlers on a bounded pool of threads, ordered per topic."""
+
+    def __init__(
+        self,
+        n_workers: int = EVENT_EXECUTOR_WORKERS,
+        max_queued: int = EVENT_EXECUTOR_MAX_QUEUED,
+        overflow_policy: str = BLOCK,
+        name: str = "BrenthyAPI-EventExecutor",
+    ):
+        """Create an EventExecutor.
+
+        Args:
+            n_workers (int): the number of threads on which to call
+                eventhandlers, i.e. how many topics' events can be handled
+                in parallel
+            max_queued (int): the maximum number of events to hold in memory
+                while they wait to be handled
+            overflow_policy (str): what to do with new events while the queue
+                is full: BLOCK, DROP_OLDEST or SPILL
+            name (str): the name for the worker threads
+        """
+        self.n_workers = n_workers
+        self.max_queued = max_queued
+        self.overflow_policy = overflow_policy
+        self.name = name
+
+        self._lock = Lock()
+        self._work_available = Condition(self._lock)
+        self._space_available = Condition(self._lock)
+        # topic -> queued events: (sequence number, handler, args, time)
+        self._queues: dict[str, deque] = {}
+        # topics with queued events which no worker is handling
+        self._ready_topics: deque[str] = deque()
+        # topics whose events a worker is currently handling
+        self._busy_topics: set[str] = set()
+        self._n_queued = 0
+        self._sequence = 0
+        self._terminate = False
+        self._workers: list[Thread] = []
+
+        # events spilled to disk, in order of arrival
+        self._spill_file: BinaryIO | None = None
+        self._spill_read_position = 0
+        self._n_spilled = 0
+        # id -> [handler, number of spilled events], as handlers can't be
+        # written to the spill file
+        self._spilled_handlers: dict[int, list] = {}
+
+        # statistics
+        self.max_queue_depth = 0
+        self.handled = 0
+        self.dropped = 0
+        self.spilled = 0
+        self.errors = 0
+        self.total_wait_s = 0.0
+        self.max_wait_s = 0.0
+        self.total_handler_s = 0.0
+        self.max_handler_s = 0.0
+
+        if n_workers < 1 or max_queued < 1:
+            error_message = (
+                "EventExecutor: n_workers and max_queued must be positive, "
+                f"not {n_workers} and {max_queued}"
+            )
+            log.error(error_message)
+            raise ValueError(error_message)
+        if overflow_policy not in OVERFLOW_POLICIES:
+            error_message = (
+                f"EventExecutor: overflow_policy must be one of "
+                f"{OVERFLOW_POLICIES}, not {overflow_policy}"
+            )
+            log.error(error_message)
+            raise ValueError(error_message)
+
+    def submit(
+        self, topic: str, handler: Callable, args: tuple[Any, ...]
+    ) -> None:
+        """Call `handler(*args)` after the topic's earlier events' handlers.
+
+        Args:
+            topic (str): the event's topic, which determines its ordering
+            handler (Callable): the eventhandler to call
+            args (tuple): the arguments to pass to the eventhandler
+        """
+        with self._lock:
+            if self._terminate:
+                return
+            if not self._workers:
+                self._start_workers()
+            if self._n_spilled:
+                # queue behind the events already spilled, to keep order
+                self._spill(topic, handler, args)
+                return
+            while self._n_queued >= self.max_queued:
+                if self.overflow_policy == BLOCK:
+                    self._space_available.wait()
+                    if self._terminate:
+                        return
+                elif self.overflow_policy == DROP_OLDEST:
+                    self._drop_oldest()
+                else:
+                    self._spill(topic, handler, args)
+                    return
+            self._enqueue(topic, handler, args, time.perf_counter())
+
+    def _start_workers(self) -> None:
+        """Start the worker threads, called on first use."""
+        for _ in range(self.n_workers):
+            worker = Thread(target=self._work, name=self.name, daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def _enqueue(
+        self,
+        topic: str,
+        handler: Callable,
+        args: tuple[Any, ...],
+        submit_time: float,
+    ) -> None:
+        """Add an event to its topic's queue. Requires self._lock."""
+        queue = self._queues.setdefault(topic, deque())
+        if not queue and topic not in self._busy_topics:
+            self._ready_topics.append(topic)
+            self._work_available.notify()
+        queue.append((self._sequence, handler, args, submit_time))
+        self._sequence += 1
+        self._n_queued += 1
+        self.max_queue_depth = max(self.max_queue_depth, self._n_queued)
+
+    def _drop_oldest(self) -> None:
+        """Discard the oldest queued event. Requires self._lock."""
+        # the oldest event is at the head of one of the topics' queues
+        topic = min(
+            (topic for topic, queue in self._queues.items() if queue),
+            key=lambda topic: self._queues[topic][0][0],
+        )
+        queue = self._queues[topic]
+        queue.popleft()
+        self._n_queued -= 1
+        self.dropped += 1
+        if not queue and topic not in self._busy_topics:
+            self._ready_topics.remove(topic)
+            self._queues.pop(topic)
+
+    def _spill(
+        self, topic: str, handler: Callable, args: tuple[Any, ...]
+    ) -> None:
+        """Write an event to the spill file. Requires self._lock."""
+        if not self._spill_file:
+            # imported here as it is only needed when spilling
+            import tempfile  # pylint: disable=import-outside-toplevel
+
+            self._spill_file = tempfile.TemporaryFile()
+        try:
+            record = pickle.dumps(
+                (topic, id(handler), args, time.perf_counter())
+            )
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            log.error(f"EventExecutor: can't spill event, dropping: {error}")
+            self.dropped += 1
+            return
+        self._spill_file.seek(0, os.SEEK_END)
+        self._spill_file.write(record)
+        self._spilled_handlers.setdefault(id(handler), [handler, 0])[1] += 1
+        self._n_spilled += 1
+        self.spilled += 1
+
+    def _unspill(self) -> None:
+        """Move spilled events into the queue while there is space for them.
+
+        Requires self._lock.
+        """
+        while self._n_spilled and self._n_queued < self.max_queued:
+            self._spill_file.seek(self._spill_read_position)
+            topic, handler_id, args, submit_time = pickle.load(
+                self._spill_file
+            )
+            self._spill_read_position = self._spill_file.tell()
+            self._n_spilled -= 1
+            handler_entry = self._spilled_handlers[handler_id]
+            handler_entry[1] -= 1
+            if not handler_entry[1]:
+                self._spilled_handlers.pop(handler_id)
+            self._enqueue(topic, handler_entry[0], args, submit_time)
+        if not self._n_spilled and self._spill_read_position:
+            # reuse the file from the start
+            self._spill_file.seek(0)
+            self._spill_file.truncate()
+            self._spill_read_position = 0
+
+    def _work(self) -> None:
+        """Handle queued events until terminated, run by worker threads."""
+        while True:
+            with self._lock:
+                while not self._ready_topics and not self._terminate:
+                    self._work_available.wait()
+                if self._terminate:
+                    return
+                topic = self._ready_topics.popleft()
+                _, handler, args, submit_time = self._queues[topic].popleft()
+                self._n_queued -= 1
+                self._busy_topics.add(topic)
+                if self._n_spilled:
+                    self._unspill()
+                self._space_available.notify()
+
+            start_time = time.perf_counter()
+            try:
+                handler(*args)
+            except Exception as error:  # pylint:disable=broad-exception-caught
+                log.error(f"{self.name}: error in eventhandler: {error}")
+                error_raised = True
+            else:
+                error_raised = False
+            end_time = time.perf_counter()
+
+            with self._lock:
+                self.handled += 1
+                self.errors += error_raised
+                wait_s = start_time - submit_time
+                handler_s = end_time - start_time
+                self.total_wait_s += wait_s
+                self.max_wait_s = max(self.max_wait_s, wait_s)
+                self.total_handler_s += handler_s
+                self.max_handler_s = max(self.max_handler_s, handler_s)
+
+                self._busy_topics.discard(topic)
+                if self._queues[topic]:
+                    self._ready_topics.append(topic)
+                    self._work_available.notify()
+                else:
+                    self._queues.pop(topic)
+
+    def get_stats(self) -> dict:
+        """Get the executor's queue depth, handler latency and other stats.
+
+        Returns:
+            dict: for example: {"queued": 3, "spilled": 0,
+                "max_queue_depth": 120, "handled": 1000, "dropped": 0,
+                "total_spilled": 0, "errors": 0, "mean_wait_s": 0.002,
+                "max_wait_s": 0.05, "mean_handler_s": 0.001,
+                "max_handler_s": 0.01}
+        """
+        with self._lock:
+            return {
+                "queued": self._n_queued,
+                "spilled": self._n_spilled,
+                "max_queue_depth": self.max_queue_depth,
+                "handled": self.handled,
+                "dropped": self.dropped,
+                "total_spilled": self.spilled,
+                "errors": self.errors,
+                "mean_wait_s": (
+                    self.total_wait_s / self.handled if self.handled else None
+                ),
+                "max_wait_s": self.max_wait_s,
+                "mean_handler_s": (
+                    self.total_handler_s / self.handled
+                    if self.handled else None
+                ),
+                "max_handler_s": self.max_handler_s,
+            }
+
+    def terminate(self) -> None:
+        """Stop the worker threads, discarding events not yet handled."""
+        with self._lock:
+            if self._terminate:
+                return
+            self._terminate = True
+            self._work_available.notify_all()
+            self._space_available.notify_all()
+            if self._spill_file:
+                self._spill_file.close()
+                self._spill_file = None
+            self._spilled_handlers.clear()
+
+    def __del__(self):
+        """Stop the worker threads."""
+        self.terminate()
+
+
+_default_executor: EventExecutor | None = None
+_default_executor_lock = Lock()
+
+
+def get_default_executor() -> EventExecutor:
+    """Get the EventExecutor shared by EventListeners by default."""
+    global _default_executor  # pylint: disable=global-statement
+    with _default_executor_lock:
+        if not _default_executor or _default_executor._terminate:
+            _default_executor = EventExecutor(
+                overflow_policy=SPILL, name="EventListener.eventhandler"
+            )
+        return _default_executor
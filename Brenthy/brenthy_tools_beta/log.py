@@ -1,6 +1,5 @@
 """Custom logging manager for Brenthy."""
 
-from environs import Env
 import os
 import shutil
 import traceback
@@ -62,8 +61,6 @@ LOG_ERROR_TRACEBACK = True
 LOG_FATAL_TRACEBACK = True
 
 
-env = Env()
-# initialise IPFS
 LOG_DIR = os.environ.get("BRENTHY_LOG_DIR", ".")
 if not os.path.exists(LOG_DIR):
     os.makedirs(LOG_DIR)
@@ -0,0 +1,166 @@
+"""Caching of replies to read-only BrenthyAPI requests.
+
+Applications (or blockchain types' API libraries) which make the same
+read-only requests at high rates can opt into caching their replies by
+passing a time-to-live to `brenthy_api.send_request`, which then serves
+repeated requests from a ReplyCache instead of sending them to Brenthy Core.
+The cache holds a bounded number of replies, evicting the least recently used
+ones, and `brenthy_api`'s EventListeners invalidate a blockchain type's
+cached replies when it publishes an event, as its state may have changed.
+Replies to requests sent before an invalidation aren't cached after it, so
+that replies computed before the event can't be cached afterwards.
+Applications without an EventListener for a blockchain type don't learn of
+its events, so the staleness of its cached replies is only bounded by their
+time-to-live.
+Brenthy Core's api_terminal also caches replies in a ReplyCache, for the
+requests which blockchain types declare cacheable with their
+`api_request_cache_ttl` function, invalidating a blockchain type's replies
+whenever it publishes an event.
+"""
+
+import time
+from collections import OrderedDict
+from threading import Lock
+
+# pylint: disable=unused-variable
+
+REPLY_CACHE_MAX_ENTRIES = 1024
+# larger replies aren't cached, to bound the cache's memory usage
+REPLY_CACHE_MAX_REPLY_BYTES = 1_000_000
+
+
+class ReplyCache:
+    """A bounded LRU cache of replies to BrenthyAPI requests with TTLs."""
+
+    def __init__(
+        self,
+        max_entries: int = REPLY_CACHE_MAX_ENTRIES,
+        max_reply_bytes: int = REPLY_CACHE_MAX_REPLY_BYTES,
+    ):
+        """Create a ReplyCache.
+
+        Args:
+            max_entries (int): the maximum number of replies to hold
+            max_reply_bytes (int): the maximum size of a reply to cache
+        """
+        self.max_entries = max_entries
+        self.max_reply_bytes = max_reply_bytes
+        self._lock = Lock()
+        # (blockchain type, request) -> (expiry time, reply),
+        # least recently used first
+        self._entries: OrderedDict[tuple[str, bytes], tuple[float, bytes]] = (
+            OrderedDict()
+        )
+        # blockchain type -> number of times its replies were invalidated
+        self._generations: dict[str, int] = {}
+        # number of times all replies were invalidated
+        self._global_generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(
+        self, blockchain_type: str, request: bytes | bytearray
+    ) -> bytearray | None:
+        """Get the cached reply to a request, None if there is none."""
+        key = (blockchain_type, bytes(request))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                # a copy, as callers may modify the bytearray they get
+                return bytearray(entry[1])
+            if entry:
+                self._entries.pop(key)
+            self.misses += 1
+            return None
+
+    def get_generation(self, blockchain_type: str) -> int:
+        """Get a number which changes when a blockchain type is invalidated.
+
+        Pass it to `put` to only cache a reply if the blockchain type's
+        cached replies haven't been invalidated since getting it.
+        """
+        with self._lock:
+            return (
+                self._global_generation
+                + self._generations.get(blockchain_type, 0)
+            )
+
+    def put(
+        self,
+        blockchain_type: str,
+        request: bytes | bytearray,
+        reply: bytes | bytearray,
+        ttl: float,
+        generation: int | None = None,
+    ) -> None:
+        """Cache the reply to a request for `ttl` seconds.
+
+        Args:
+            blockchain_type (str): the blockchain type the request was for
+            request (bytes): the request
+            reply (bytes): the reply to cache
+            ttl (float): for how many seconds to cache the reply
+            generation (int): the result of `get_generation` from before the
+                request was sent, to not cache the reply if the blockchain
+                type's replies were invalidated since, None to cache it
+                regardless
+        """
+        if len(reply) > self.max_reply_bytes:
+            return
+        key = (blockchain_type, bytes(request))
+        with self._lock:
+            if generation is not None and generation != (
+                self._global_generation
+                + self._generations.get(blockchain_type, 0)
+            ):
+                return
+            self._entries[key] = (time.monotonic() + ttl, bytes(reply))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, blockchain_type: str | None = None) -> None:
+        """Remove the cached replies of a blockchain type, or all of them.
+
+        Args:
+            blockchain_type (str): the blockchain type whose cached replies
+                to remove, None to remove all cached replies
+        """
+        with self._lock:
+            if blockchain_type is None:
+                self._global_generation += 1
+                keys = list(self._entries.keys())
+            else:
+                self._generations[blockchain_type] = (
+                    self._generations.get(blockchain_type, 0) + 1
+                )
+                keys = [
+                    key for key in self._entries.keys()
+                    if key[0] == blockchain_type
+                ]
+            for key in keys:
+                self._entries.pop(key)
+            self.invalidations += len(keys)
+
+    def get_stats(self) -> dict:
+        """Get the cache's hit & miss counters and other statistics.
+
+        Returns:
+            dict: for example: {"hits": 90, "misses": 10, "evictions": 0,
+                "invalidations": 3, "entries": 7, "hit_ratio": 0.9}
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "hit_ratio": self.hits / lookups if lookups else None,
+            }
@@ -1,6 +1,5 @@
 """Various functions used by Brenthy Core and `brenthy_api`."""
 
-import pathspec
 from pathlib import Path
 import shutil
 import platform
@@ -194,6 +193,45 @@ def bytes_from_b255_no_0s(data: bytearray | bytes) -> bytearray:
     return result
 
 
+def encode_bytes_list(items: list[bytearray | bytes]) -> bytearray:
+    """Encode a list of binary items into a single bytearray.
+
+    Each item is prefixed with its length encoded with to_b255_no_0s and
+    a [0] separator.
+
+    Args:
+        items (list[bytearray]): the items to encode
+    Returns:
+        bytearray: the encoded list
+    """
+    data = bytearray()
+    for item in items:
+        data += to_b255_no_0s(len(item)) + bytearray([0])
+        data += item
+    return data
+
+
+def decode_bytes_list(data: bytearray | bytes) -> list[bytearray | bytes]:
+    """Decode a list of binary items encoded with encode_bytes_list.
+
+    Args:
+        data (bytearray): the encoded list
+    Returns:
+        list[bytearray]: the decoded items
+    """
+    items = []
+    position = 0
+    while position < len(data):
+        separator = data.index(0, position)
+        start = separator + 1
+        end = start + from_b255_no_0s(data[position:separator])
+        if end > len(data):
+            raise ValueError("Encoded item is longer than the data.")
+        items.append(data[start:end])
+        position = end
+    return items
+
+
 def print_bytearray(data: bytearray) -> None:
     """Print a bytearray as a list of each integer."""
     print(printable_bytearray(data))
@@ -286,7 +324,7 @@ def make_directory_readable(directory_path: str) -> None:
         raise NotImplementedError(f"Unsupported platform: {platform.system()}")
 
 
-def _find_tree_matches(spec: pathspec.GitIgnoreSpec, dir: str):
+def _find_tree_matches(spec: "pathspec.GitIgnoreSpec", dir: str):
     """Recursively traverse a file tree finding files or folders that match the spec.
 
     Doesn't traverse already ignored folders.
@@ -309,6 +347,9 @@ def clean_directory(
     """
     Given a directory and gitignore-style patterns, find and delete matches.
     """
+    # imported here as it is only needed by Brenthy Core, not brenthy_api
+    import pathspec  # pylint: disable=import-outside-toplevel
+
     root = Path(root_dir).resolve()
     spec = pathspec.GitIgnoreSpec.from_lines(patterns)
 
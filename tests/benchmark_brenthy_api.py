@@ -0,0 +1,1117 @@
+"""Benchmark BrenthyAPI's request/reply machinery.
+
+Runs ZMQ request receivers from api_terminal's bat_endpoints on local ports,
+as well as api_terminal's BrenthyAPI listeners with a dummy blockchain type,
+with trivial request handlers, so that the measurements reflect the
+communication machinery's overhead rather than any blockchain's.
+Brenthy itself must NOT be running, as api_terminal's listeners are run on
+their default addresses.
+
+Execute this script directly to run all benchmarks:
+    python3 benchmark_brenthy_api.py
+"""
+
+import asyncio
+import json
+import os
+import socket
+import sys
+import tempfile
+import time
+import tracemalloc
+from threading import Thread, active_count
+from types import ModuleType, SimpleNamespace
+from typing import Callable, Iterator
+
+if True:
+    brenthy_dir = os.path.join(
+        os.path.dirname(os.path.dirname(__file__)), "Brenthy"
+    )
+    sys.path.insert(0, brenthy_dir)
+    import api_terminal
+    import blockchain_manager
+    import zmq
+    from api_terminal import bat_endpoints
+    from api_terminal.async_endpoints import AsyncRequestsServer
+    from api_terminal.bat_endpoints import (
+        TcpMultiRequestsReceiver,
+        ZmqMultiRequestsReceiver,
+        ZmqPublisher,
+    )
+    from brenthy_tools_beta import brenthy_api, bt_endpoints, compression
+    from brenthy_tools_beta.event_encoding import decode_event, encode_event
+    from brenthy_tools_beta.utils import from_b255_no_0s, to_b255_no_0s
+
+BENCHMARK_IP_ADDRESS = "127.0.0.1"
+BENCHMARK_PORT = 29290
+BENCHMARK_IPC_ADDRESS = (
+    f"ipc://{os.path.join(tempfile.gettempdir(), 'brenthy_benchmark.ipc')}"
+)
+
+N_SEQUENTIAL_REQUESTS = 2000
+N_THREADS = 20
+N_REQUESTS_PER_THREAD = 200
+PAYLOAD = bytearray([1]) * 100
+BENCHMARK_BLOCKCHAIN_TYPE = "BenchmarkBlockchain"
+# a blockchain type which streams replies of the requested size
+BENCHMARK_STREAM_BLOCKCHAIN_TYPE = "BenchmarkStreamBlockchain"
+STREAM_CHUNK_SIZE = 1_000_000
+STREAMED_REPLY_SIZES = [10_000_000, 50_000_000, 200_000_000]
+N_BATCHED_REQUESTS = 2000
+BATCH_SIZE = 100
+N_TCP_REQUESTS = 500
+TCP_IDLE_S = 2
+TCP_LARGE_PAYLOAD_SIZE = 10_000_000
+LARGE_PAYLOAD_SIZES = [100_000, 1_000_000, 10_000_000, 100_000_000]
+COMPRESSION_PAYLOAD_SIZES = [10_000, 1_000_000, 10_000_000]
+N_CACHED_REQUESTS = 2000
+# how long the blockchain type of benchmark_server_reply_cache takes to
+# look up a reply, and after how many requests it publishes an event
+SERVER_CACHE_LOOKUP_S = 0.001
+SERVER_CACHE_EVENT_INTERVAL = 500
+# number of applications making the same request at once, and the time the
+# blockchain type takes to process it, for benchmark_request_coalescing
+N_COALESCED_CLIENTS = 50
+COALESCED_REQUEST_S = 0.2
+N_BURST_EVENTS = 5000
+BURST_TOPICS = ["NewBlocks", "NewMembers", "Messages"]
+N_LISTENERS = 1000
+N_ENCODED_EVENTS = 10000
+N_MISSED_EVENTS = 5000
+N_SLOW_SUBSCRIBER_EVENTS = 20000
+SLOW_SUBSCRIBER_HWM = 1000
+# large enough for the slow subscriber's OS socket buffers to fill up too
+SLOW_SUBSCRIBER_PAYLOAD = bytes(1000)
+N_SLOW_REQUESTS = 50
+SLOW_REQUEST_S = 0.2
+BENCHMARK_SLOW_BLOCKCHAIN_TYPE = "BenchmarkSlowBlockchain"
+N_CONCURRENT_CLIENTS = 1000
+N_FAST_REQUESTS = 200
+N_FLOOD_REQUESTS = 2000
+ROUTING_BLOCKCHAIN_TYPE_COUNTS = [1, 10, 100, 1000]
+N_ROUTED_REQUESTS = 20000
+PARSING_PAYLOAD_SIZES = [1_000_000, 10_000_000, 100_000_000]
+FAIRNESS_REQUEST_S = 0.01
+FAIRNESS_MAX_HANDLERS = 4
+# requests per second and burst size each client may make
+FAIRNESS_RATE_LIMIT = (100, 200)
+
+
+def echo(request: bytes) -> bytes:
+    """Request handler that replies with the request."""
+    return request
+
+
+def stream_zeros(request: bytes) -> Iterator[bytes]:
+    """Request handler that streams as many zeros as requested."""
+    remaining = int(request)
+    while remaining > 0:
+        chunk_size = min(remaining, STREAM_CHUNK_SIZE)
+        yield bytes(chunk_size)
+        remaining -= chunk_size
+
+
+def measure_latency(
+    send_request: Callable[[bytearray, tuple[str, int] | str], bytes],
+    address: tuple[str, int] | str,
+) -> float:
+    """Get the mean round-trip time of sequential requests in milliseconds."""
+    start = time.perf_counter()
+    for _ in range(N_SEQUENTIAL_REQUESTS):
+        send_request(PAYLOAD, address)
+    return (time.perf_counter() - start) / N_SEQUENTIAL_REQUESTS * 1000
+
+
+def measure_throughput(
+    send_request: Callable[[bytearray, tuple[str, int] | str], bytes],
+    address: tuple[str, int] | str,
+) -> float:
+    """Get the number of requests per second made by many threads."""
+    def send_requests() -> None:
+        for _ in range(N_REQUESTS_PER_THREAD):
+            send_request(PAYLOAD, address)
+
+    threads = [Thread(target=send_requests) for _ in range(N_THREADS)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - start
+    return N_THREADS * N_REQUESTS_PER_THREAD / duration
+
+
+def benchmark_zmq_clients() -> None:
+    """Compare per-request REQ sockets with the multiplexed connection.
+
+    Each client is measured both over TCP and over IPC (Unix domain sockets).
+    """
+    tcp_address = (BENCHMARK_IP_ADDRESS, BENCHMARK_PORT)
+    receivers = [ZmqMultiRequestsReceiver(tcp_address, echo)]
+    clients = {
+        "REQ socket per request, TCP (BAP-4)": (
+            bt_endpoints.send_request_zmq, tcp_address
+        ),
+        "multiplexed DEALER, TCP (BAP-5)": (
+            bt_endpoints.send_request_zmq_multiplexed, tcp_address
+        ),
+    }
+    if zmq.has("ipc"):
+        receivers.append(ZmqMultiRequestsReceiver(BENCHMARK_IPC_ADDRESS, echo))
+        clients.update({
+            "REQ socket per request, IPC": (
+                bt_endpoints.send_request_zmq, BENCHMARK_IPC_ADDRESS
+            ),
+            "multiplexed DEALER, IPC (BAP-6)": (
+                bt_endpoints.send_request_zmq_multiplexed,
+                BENCHMARK_IPC_ADDRESS
+            ),
+        })
+    time.sleep(0.5)
+    print(
+        f"{'client':<40}{'latency (ms)':>15}{'requests/s':>15}"
+    )
+    for name, (send_request, address) in clients.items():
+        send_request(PAYLOAD, address)  # warm up
+        latency = measure_latency(send_request, address)
+        throughput = measure_throughput(send_request, address)
+        print(f"{name:<40}{latency:>15.3f}{throughput:>15.0f}")
+    for receiver in receivers:
+        receiver.terminate()
+
+
+def start_api_terminal() -> None:
+    """Run api_terminal's listeners with a dummy blockchain type."""
+    blockchain_manager.blockchain_modules[BENCHMARK_BLOCKCHAIN_TYPE] = (
+        SimpleNamespace(
+            blockchain_type=BENCHMARK_BLOCKCHAIN_TYPE,
+            api_request_handler=echo,
+        )
+    )
+    blockchain_manager.blockchain_modules[
+        BENCHMARK_STREAM_BLOCKCHAIN_TYPE
+    ] = SimpleNamespace(
+        blockchain_type=BENCHMARK_STREAM_BLOCKCHAIN_TYPE,
+        api_request_handler=stream_zeros,
+    )
+    api_terminal.update_routing_table()
+    api_terminal.load_brenthy_api_protocols()
+    api_terminal.start_listening_for_requests()
+    time.sleep(0.5)
+
+
+def benchmark_batch_requests() -> None:
+    """Compare sequential requests with batch requests."""
+    def sequential() -> None:
+        for _ in range(N_BATCHED_REQUESTS):
+            brenthy_api.send_request(BENCHMARK_BLOCKCHAIN_TYPE, PAYLOAD)
+
+    def batched(parallel: bool) -> None:
+        for _ in range(N_BATCHED_REQUESTS // BATCH_SIZE):
+            brenthy_api.send_request_batch(
+                BENCHMARK_BLOCKCHAIN_TYPE, [PAYLOAD] * BATCH_SIZE,
+                parallel=parallel
+            )
+
+    modes = {
+        "sequential send_request": sequential,
+        f"send_request_batch ({BATCH_SIZE}/batch)": lambda: batched(False),
+        f"parallel send_request_batch ({BATCH_SIZE}/batch)": (
+            lambda: batched(True)
+        ),
+    }
+    print(f"{'mode':<45}{'requests/s':>15}")
+    for name, function in modes.items():
+        start = time.perf_counter()
+        function()
+        throughput = N_BATCHED_REQUESTS / (time.perf_counter() - start)
+        print(f"{name:<45}{throughput:>15.0f}")
+
+
+def benchmark_large_payloads() -> None:
+    """Compare concatenated with multipart (zero-copy) requests.
+
+    Measures the time a request with a large payload takes, echoed back in
+    the reply, and the peak amount of memory allocated by Python while
+    sending, handling and replying to it, which mostly consists of copies
+    of the payload.
+    """
+    bap_5 = get_bap_module(5)
+    # measure copying overhead, not compression
+    bap_5.COMPRESS_PAYLOADS = False
+
+    def concatenated(payload: bytearray) -> None:
+        request = bytearray([0]).join(
+            brenthy_api._encapsulate_request_frames(
+                BENCHMARK_BLOCKCHAIN_TYPE, payload
+            )
+        )
+        assert brenthy_api._decapsulate_reply(bap_5.send_request(request))
+
+    def multipart(payload: bytearray) -> None:
+        assert brenthy_api._send_via_protocol(
+            bap_5,
+            brenthy_api._encapsulate_request_frames(
+                BENCHMARK_BLOCKCHAIN_TYPE, payload
+            ),
+            None
+        )
+
+    modes = {
+        "concatenated (single frame)": concatenated,
+        "multipart (zero-copy)": multipart,
+    }
+    print(
+        f"{'payload':>10}  {'mode':<30}{'time (ms)':>12}"
+        f"{'peak memory (MB)':>20}"
+    )
+    for size in LARGE_PAYLOAD_SIZES:
+        payload = bytearray(size)
+        for name, function in modes.items():
+            function(payload)  # warm up
+            start = time.perf_counter()
+            function(payload)
+            duration = (time.perf_counter() - start) * 1000
+            tracemalloc.start()
+            function(payload)
+            peak = tracemalloc.get_traced_memory()[1] / 1_000_000
+            tracemalloc.stop()
+            print(
+                f"{size / 1_000_000:>8g}MB  {name:<30}{duration:>12.1f}"
+                f"{peak:>20.1f}"
+            )
+    bap_5.COMPRESS_PAYLOADS = True
+
+
+def get_bap_module(bap_version: int) -> ModuleType:
+    """Get brenthy_api's BAP module of the given version."""
+    return [
+        protocol for protocol in brenthy_api._get_bap_protocol_modules()
+        if protocol.BAP_VERSION == bap_version
+    ][0]
+
+
+def make_block_like_payload(size: int) -> bytes:
+    """Make a compressible payload, similar to a list of blocks in JSON."""
+    blocks = []
+    length = 0
+    while length < size:
+        block = (
+            '{"block_id": "%s", "content": "%s", "topics": ["chat"]},'
+            % (os.urandom(16).hex(), "message number %d " % len(blocks) * 8)
+        )
+        blocks.append(block)
+        length += len(block)
+    return "".join(blocks).encode()[:size]
+
+
+def benchmark_compression() -> None:
+    """Compare BAP-5 requests with and without payload compression.
+
+    Measures the time a request with a payload echoed back in the reply takes
+    and how many bytes of payload crossed the wire, for compressible and
+    incompressible payloads.
+    Note that over the loopback interface, bandwidth is practically free, so
+    this mainly shows the CPU cost of compression, which is what is traded
+    for the bandwidth saved on real (e.g. Docker bridge) networks.
+    """
+    bap_5 = get_bap_module(5)
+    payloads = {
+        "block-like": make_block_like_payload,
+        "random": os.urandom,
+    }
+
+    def send(payload: bytes) -> bytearray:
+        # Brenthy Core runs on this machine, so brenthy_api would use BAP-6
+        success, reply = brenthy_api._send_via_protocol(
+            bap_5,
+            brenthy_api._encapsulate_request_frames(
+                BENCHMARK_BLOCKCHAIN_TYPE, payload
+            ),
+            None
+        )
+        assert success
+        return reply
+
+    # learn which codecs Brenthy Core accepts
+    send(PAYLOAD)
+
+    def saved_bytes() -> int:
+        return sum(
+            stats["bytes_in"] - stats["bytes_out"]
+            for stats in compression.get_stats()["codecs"].values()
+        )
+
+    print(
+        f"{'payload':>18}  {'compression':<12}{'time (ms)':>12}"
+        f"{'wire (MB)':>12}"
+    )
+    for size in COMPRESSION_PAYLOAD_SIZES:
+        for payload_name, make_payload in payloads.items():
+            payload = make_payload(size)
+            for compress in [False, True]:
+                bap_5.COMPRESS_PAYLOADS = compress
+                send(payload)  # warm up
+                saved = saved_bytes()
+                start = time.perf_counter()
+                reply = send(payload)
+                duration = (time.perf_counter() - start) * 1000
+                assert reply == payload
+                # both the request and the reply contain the payload
+                wire = 2 * size - (saved_bytes() - saved)
+                print(
+                    f"{size / 1_000_000:>6g}MB {payload_name:<10}  "
+                    f"{'on' if compress else 'off':<12}{duration:>12.1f}"
+                    f"{wire / 1_000_000:>12.2f}"
+                )
+    bap_5.COMPRESS_PAYLOADS = True
+    print("Compression statistics:", compression.get_stats())
+
+
+def benchmark_reply_cache() -> None:
+    """Compare repeated read-only requests with and without reply caching."""
+    brenthy_api.clear_reply_cache()
+    print(f"{'cache_ttl':<12}{'latency (us)':>14}")
+    for cache_ttl in [None, 10]:
+        start = time.perf_counter()
+        for _ in range(N_CACHED_REQUESTS):
+            brenthy_api.get_brenthy_version(cache_ttl=cache_ttl)
+        duration = time.perf_counter() - start
+        print(
+            f"{str(cache_ttl):<12}"
+            f"{duration / N_CACHED_REQUESTS * 1_000_000:>14.1f}"
+        )
+    print("Reply cache statistics:", brenthy_api.get_reply_cache_stats())
+
+
+def benchmark_server_reply_cache() -> None:
+    """Compare polling a read-only blockchain request with & without caching.
+
+    Polls a blockchain type whose request handler takes
+    SERVER_CACHE_LOOKUP_S, once without and once with Brenthy Core's reply
+    cache enabled via `api_request_cache_ttl`, publishing an event every
+    SERVER_CACHE_EVENT_INTERVAL requests, which invalidates the cache.
+    """
+    cached_type = "CachedBenchmarkBlockchain"
+    handler_calls = 0
+
+    def lookup(request: bytes) -> bytes:
+        nonlocal handler_calls
+        handler_calls += 1
+        time.sleep(SERVER_CACHE_LOOKUP_S)
+        return request
+
+    print(f"{'cache':<8}{'latency (us)':>14}{'handler calls':>15}")
+    for cache_ttl in [None, 10]:
+        blockchain_manager.blockchain_modules[cached_type] = SimpleNamespace(
+            blockchain_type=cached_type,
+            api_request_handler=lookup,
+            api_request_cache_ttl=lambda request, ttl=cache_ttl: ttl,
+        )
+        api_terminal.update_routing_table()
+        handler_calls = 0
+        start = time.perf_counter()
+        for index in range(N_CACHED_REQUESTS):
+            if index % SERVER_CACHE_EVENT_INTERVAL == 0:
+                api_terminal.publish_event(cached_type, {}, ["NewBlocks"])
+            reply = brenthy_api.send_request(cached_type, PAYLOAD)
+            assert reply == PAYLOAD
+        duration = time.perf_counter() - start
+        print(
+            f"{str(cache_ttl):<8}"
+            f"{duration / N_CACHED_REQUESTS * 1_000_000:>14.1f}"
+            f"{handler_calls:>15}"
+        )
+    print(
+        "Brenthy Core reply cache statistics:",
+        brenthy_api.get_brenthy_reply_cache_stats()
+    )
+    blockchain_manager.blockchain_modules.pop(cached_type)
+    api_terminal.update_routing_table()
+
+
+def benchmark_request_coalescing() -> None:
+    """Compare identical concurrent requests with & without coalescing.
+
+    N_COALESCED_CLIENTS threads make the same request at once to a blockchain
+    type whose request handler takes COALESCED_REQUEST_S, once with the
+    request declared impure and once declared pure via
+    `api_request_is_pure`, reporting the number of handler calls.
+    """
+    pure_type = "PureBenchmarkBlockchain"
+    handler_calls = 0
+
+    def lookup(request: bytes) -> bytes:
+        nonlocal handler_calls
+        handler_calls += 1
+        time.sleep(COALESCED_REQUEST_S)
+        return request
+
+    def make_request() -> None:
+        reply = brenthy_api.send_request(pure_type, PAYLOAD)
+        assert reply == PAYLOAD
+
+    print(f"{'pure':<8}{'duration (s)':>14}{'handler calls':>15}")
+    for is_pure in [False, True]:
+        blockchain_manager.blockchain_modules[pure_type] = SimpleNamespace(
+            blockchain_type=pure_type,
+            api_request_handler=lookup,
+            api_request_is_pure=lambda request, pure=is_pure: pure,
+        )
+        api_terminal.update_routing_table()
+        handler_calls = 0
+        threads = [
+            Thread(target=make_request) for _ in range(N_COALESCED_CLIENTS)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duration = time.perf_counter() - start
+        print(f"{str(is_pure):<8}{duration:>14.2f}{handler_calls:>15}")
+    print(
+        "Brenthy Core coalescing statistics:",
+        brenthy_api.get_brenthy_coalescing_stats()
+    )
+    blockchain_manager.blockchain_modules.pop(pure_type)
+    api_terminal.update_routing_table()
+
+
+def benchmark_event_burst() -> None:
+    """Measure the delivery of a burst of events to an EventListener.
+
+    Checks that each topic's events are delivered in order, and reports
+    the number of threads used for it and the EventExecutor's statistics.
+    """
+    received: dict[str, list[int]] = {topic: [] for topic in BURST_TOPICS}
+    initial_threads = active_count()
+    max_threads = 0
+
+    def eventhandler(data: dict, topic: str) -> None:
+        nonlocal max_threads
+        max_threads = max(max_threads, active_count())
+        received[topic].append(data["index"])
+
+    listener = brenthy_api.EventListener(
+        BENCHMARK_BLOCKCHAIN_TYPE, eventhandler, BURST_TOPICS
+    )
+    time.sleep(0.5)  # wait for the subscription to be established
+    start = time.perf_counter()
+    for index in range(N_BURST_EVENTS):
+        api_terminal.publish_event(
+            BENCHMARK_BLOCKCHAIN_TYPE,
+            {"index": index},
+            [BURST_TOPICS[index % len(BURST_TOPICS)]],
+        )
+    while sum(len(indices) for indices in received.values()) < N_BURST_EVENTS:
+        if time.perf_counter() - start > 10:
+            break
+        time.sleep(0.01)
+    duration = time.perf_counter() - start
+    n_received = sum(len(indices) for indices in received.values())
+    ordered = all(indices == sorted(indices) for indices in received.values())
+    print(
+        f"{n_received}/{N_BURST_EVENTS} events in {duration:.2f}s, "
+        f"in order: {ordered}, "
+        f"threads used: {max_threads - initial_threads}"
+    )
+    print("EventExecutor statistics:", listener.get_stats())
+    listener.terminate()
+
+
+def benchmark_event_encoding() -> None:
+    """Compare the cost of BAP-4's JSON events with BAP-5/6's binary events.
+
+    Measures the time taken to encode a block-like event for publishing and
+    to decode it on a subscriber, both for an event whose payload is only
+    filtered by its topic and for one which is passed to an eventhandler,
+    as well as the event's size on the wire.
+    """
+    block_id = os.urandom(64)
+    data = {
+        "topic": f"{BENCHMARK_BLOCKCHAIN_TYPE}-NewBlocks",
+        "block_id": block_id,
+        "content": os.urandom(200),
+        "topics": ["chat"],
+        "index": 42,
+    }
+    # JSON can't contain bytes, so BAP-4 events carry them as hex strings
+    json_data = {
+        key: value.hex() if isinstance(value, bytes) else value
+        for key, value in data.items()
+    }
+
+    def measure(function: Callable, arg) -> float:
+        start = time.perf_counter()
+        for _ in range(N_ENCODED_EVENTS):
+            function(arg)
+        return (time.perf_counter() - start) / N_ENCODED_EVENTS * 1_000_000
+
+    json_message = json.dumps(json_data)
+    frames = encode_event(data, 1)
+    print(
+        f"{'format':<8}{'encode (us)':>13}{'filter (us)':>13}"
+        f"{'decode (us)':>13}{'size (B)':>10}"
+    )
+    # BAP-4 subscribers must parse the whole message to get at its topic
+    json_decode_time = measure(json.loads, json_message)
+    print(
+        f"{'JSON':<8}{measure(json.dumps, json_data):>13.2f}"
+        f"{json_decode_time:>13.2f}{json_decode_time:>13.2f}"
+        f"{len(json_message.encode()):>10}"
+    )
+    print(
+        f"{'binary':<8}{measure(lambda d: encode_event(d, 1), data):>13.2f}"
+        f"{measure(decode_event, frames):>13.2f}"
+        f"{measure(lambda f: decode_event(f)[1].decode(), frames):>13.2f}"
+        f"{sum(len(frame) for frame in frames):>10}"
+    )
+
+
+def benchmark_event_resume() -> None:
+    """Measure an EventListener catching up on events it missed.
+
+    Publishes N_MISSED_EVENTS events after an EventListener was terminated,
+    then measures how long a new EventListener resuming from the last
+    event the old one handled takes to handle them all, checking that it
+    received each exactly once and in order.
+    """
+    received: list[int] = []
+
+    def eventhandler(data: dict) -> None:
+        received.append(data["index"])
+
+    listener = brenthy_api.EventListener(
+        BENCHMARK_BLOCKCHAIN_TYPE, eventhandler, "Resume"
+    )
+    time.sleep(0.5)  # wait for the subscription to be established
+    api_terminal.publish_event(
+        BENCHMARK_BLOCKCHAIN_TYPE, {"index": -1}, ["Resume"]
+    )
+    while not received:
+        time.sleep(0.01)
+    last_sequence = listener.last_sequence
+    listener.terminate()
+    received.clear()
+
+    for index in range(N_MISSED_EVENTS):
+        api_terminal.publish_event(
+            BENCHMARK_BLOCKCHAIN_TYPE, {"index": index}, ["Resume"]
+        )
+    start = time.perf_counter()
+    listener = brenthy_api.EventListener(
+        BENCHMARK_BLOCKCHAIN_TYPE,
+        eventhandler,
+        "Resume",
+        resume_from=last_sequence,
+    )
+    while len(received) < N_MISSED_EVENTS:
+        if time.perf_counter() - start > 10:
+            break
+        time.sleep(0.01)
+    duration = time.perf_counter() - start
+    print(
+        f"Resumed {len(received)}/{N_MISSED_EVENTS} missed events in "
+        f"{duration:.2f}s, "
+        f"exactly once in order: {received == list(range(N_MISSED_EVENTS))}, "
+        f"missed_events: {listener.missed_events}"
+    )
+    listener.terminate()
+
+
+def benchmark_slow_subscriber() -> None:
+    """Measure the publishing of events to a fast and a slow subscriber.
+
+    The slow subscriber never receives the events, so once its queues are
+    full, the publisher drops events for it, counting the overflow.
+    """
+    address = (BENCHMARK_IP_ADDRESS, BENCHMARK_PORT + 1)
+    publisher = ZmqPublisher(address, sndhwm=SLOW_SUBSCRIBER_HWM)
+    zmq_context = zmq.Context()
+    subscribers = []
+    for _ in range(2):
+        subscriber = zmq_context.socket(zmq.SUB)
+        subscriber.setsockopt(zmq.RCVHWM, SLOW_SUBSCRIBER_HWM)
+        subscriber.setsockopt(zmq.LINGER, 0)
+        subscriber.subscribe(b"")
+        subscriber.connect(f"tcp://{address[0]}:{address[1]}")
+        subscribers.append(subscriber)
+    fast_subscriber = subscribers[0]
+    n_received = 0
+
+    def receive() -> None:
+        nonlocal n_received
+        while fast_subscriber.poll(2000):
+            fast_subscriber.recv_multipart()
+            n_received += 1
+
+    time.sleep(0.5)  # wait for the subscriptions to be established
+    thread = Thread(target=receive)
+    thread.start()
+    start = time.perf_counter()
+    for index in range(N_SLOW_SUBSCRIBER_EVENTS):
+        publisher.publish_multipart([b"Topic", SLOW_SUBSCRIBER_PAYLOAD])
+    duration = time.perf_counter() - start
+    thread.join()
+    stats = publisher.get_stats()
+    print(
+        f"Published {N_SLOW_SUBSCRIBER_EVENTS} events in {duration:.2f}s "
+        f"with SNDHWM & RCVHWM {SLOW_SUBSCRIBER_HWM}: "
+        f"fast subscriber received {n_received}, "
+        f"queue overflows: {stats['overflows']}, "
+        f"subscriptions: {stats['subscriptions']}"
+    )
+    for subscriber in subscribers:
+        subscriber.close()
+    zmq_context.term()
+    publisher.terminate()
+
+
+def benchmark_elastic_pool() -> None:
+    """Measure how the request handling threads adapt to slow requests.
+
+    Sends N_SLOW_REQUESTS requests in parallel, each of which takes
+    SLOW_REQUEST_S to process, and shows how many threads the receiver
+    started to process them and how long requests waited for one.
+    """
+    def slow_echo(request: bytes) -> bytes:
+        time.sleep(SLOW_REQUEST_S)
+        return request
+
+    address = (BENCHMARK_IP_ADDRESS, BENCHMARK_PORT + 2)
+    receiver = ZmqMultiRequestsReceiver(address, slow_echo)
+    time.sleep(0.5)
+    threads = [
+        Thread(
+            target=bt_endpoints.send_request_zmq_multiplexed,
+            args=(PAYLOAD, address)
+        )
+        for _ in range(N_SLOW_REQUESTS)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - start
+    stats = receiver.get_stats()[bat_endpoints.DEFAULT_LANE]
+    print(
+        f"Processed {N_SLOW_REQUESTS} parallel requests of {SLOW_REQUEST_S}s "
+        f"in {duration:.2f}s on up to {stats['max_workers_used']} threads, "
+        f"max wait {stats['max_wait_s']:.3f}s"
+    )
+    receiver.terminate()
+
+
+def benchmark_request_lanes() -> None:
+    """Measure the latency of fast requests while slow ones are queued.
+
+    Floods api_terminal with more slow blockchain requests than its slow
+    lane has threads for, and measures the latency of Brenthy RPCs, which
+    are processed in the fast lane, meanwhile.
+    """
+    def slow_echo(request: bytes) -> bytes:
+        time.sleep(SLOW_REQUEST_S)
+        return request
+
+    blockchain_manager.blockchain_modules[BENCHMARK_SLOW_BLOCKCHAIN_TYPE] = (
+        SimpleNamespace(
+            blockchain_type=BENCHMARK_SLOW_BLOCKCHAIN_TYPE,
+            api_request_handler=slow_echo,
+        )
+    )
+    n_slow_requests = api_terminal.REQUEST_LANES[api_terminal.SLOW_LANE][1] * 3
+    threads = [
+        Thread(
+            target=brenthy_api.send_request,
+            args=(BENCHMARK_SLOW_BLOCKCHAIN_TYPE, PAYLOAD)
+        )
+        for _ in range(n_slow_requests)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(SLOW_REQUEST_S / 2)
+    start = time.perf_counter()
+    for _ in range(N_FAST_REQUESTS):
+        brenthy_api.get_brenthy_version()
+    latency = (time.perf_counter() - start) / N_FAST_REQUESTS * 1000
+    for thread in threads:
+        thread.join()
+    print(
+        f"get_brenthy_version latency while {n_slow_requests} slow requests "
+        f"are processed: {latency:.3f}ms"
+    )
+    blockchain_manager.blockchain_modules.pop(BENCHMARK_SLOW_BLOCKCHAIN_TYPE)
+    api_terminal.update_routing_table()
+
+
+def benchmark_client_fairness() -> None:
+    """Measure a client's latency while another floods the receiver.
+
+    One client sends N_FLOOD_REQUESTS requests at once to a receiver with
+    few threads and a per-client rate limit, while another sends requests
+    one at a time and measures their latency, which with fair queuing
+    doesn't depend on how many of the flooding client's requests are queued.
+    """
+    def slow_echo(request: bytes) -> bytes:
+        time.sleep(FAIRNESS_REQUEST_S)
+        return request
+
+    address = (BENCHMARK_IP_ADDRESS, BENCHMARK_PORT + 5)
+    receiver = ZmqMultiRequestsReceiver(
+        address, slow_echo,
+        max_parallel_handlers=FAIRNESS_MAX_HANDLERS,
+        client_rate_limit=FAIRNESS_RATE_LIMIT,
+        make_busy_reply=api_terminal.busy_reply,
+    )
+    time.sleep(0.5)
+    context = zmq.Context()
+    flooder = context.socket(zmq.DEALER)
+    flooder.connect(bt_endpoints.get_zmq_address(address))
+    time.sleep(0.2)
+    for _ in range(N_FLOOD_REQUESTS):
+        flooder.send_multipart([b"", PAYLOAD])
+    latencies = []
+    for _ in range(N_FAST_REQUESTS // 10):
+        start = time.perf_counter()
+        bt_endpoints.send_request_zmq_multiplexed(PAYLOAD, address)
+        latencies.append((time.perf_counter() - start) * 1000)
+    throttled = 0
+    for _ in range(N_FLOOD_REQUESTS):
+        reply = flooder.recv_multipart()[-1]
+        throttled += brenthy_api.BRENTHY_BUSY.encode() in reply
+    stats = receiver.get_stats()
+    print(
+        f"Request latency while another client floods {N_FLOOD_REQUESTS} "
+        f"requests: mean {sum(latencies) / len(latencies):.1f}ms, "
+        f"max {max(latencies):.1f}ms "
+        f"(handler: {FAIRNESS_REQUEST_S * 1000:.0f}ms), "
+        f"{throttled} of the flood's requests throttled, "
+        f"max queued: {stats[bat_endpoints.DEFAULT_LANE]['max_queued']}"
+    )
+    flooder.close()
+    context.term()
+    receiver.terminate()
+
+
+def benchmark_routing() -> None:
+    """Measure api_terminal's overhead with many blockchain types loaded.
+
+    Calls `api_terminal.handle_request` directly, without any sockets,
+    for the last of ROUTING_BLOCKCHAIN_TYPE_COUNTS dummy blockchain types
+    and for a Brenthy RPC.
+    """
+    loaded_modules = dict(blockchain_manager.blockchain_modules)
+    encoded_version = brenthy_api.ENCODED_TOOLS_VERSION
+    print(
+        f"{'blockchain types':<20}{'blockchain (us)':>18}"
+        f"{'Brenthy (us)':>15}"
+    )
+    for n_types in ROUTING_BLOCKCHAIN_TYPE_COUNTS:
+        blockchain_manager.blockchain_modules.clear()
+        for index in range(n_types):
+            blockchain_manager.blockchain_modules[f"Routing{index}"] = (
+                SimpleNamespace(
+                    blockchain_type=f"Routing{index}",
+                    api_request_handler=echo,
+                )
+            )
+        api_terminal.update_routing_table()
+        durations = []
+        for request in [
+            encoded_version + f"\0Routing{n_types - 1}\0".encode() + PAYLOAD,
+            encoded_version + b"\0Brenthy\0get_brenthy_version\0",
+        ]:
+            start = time.perf_counter()
+            for _ in range(N_ROUTED_REQUESTS):
+                api_terminal.handle_request(request)
+            durations.append(
+                (time.perf_counter() - start) / N_ROUTED_REQUESTS * 1e6
+            )
+        print(f"{n_types:<20}{durations[0]:>18.2f}{durations[1]:>15.2f}")
+    blockchain_manager.blockchain_modules.clear()
+    blockchain_manager.blockchain_modules.update(loaded_modules)
+    api_terminal.update_routing_table()
+
+
+def benchmark_request_parsing() -> None:
+    """Measure the memory api_terminal allocates per request for large ones.
+
+    Calls `api_terminal.handle_request` directly with requests for an echo
+    blockchain type whose request handler expects bytes and for one which
+    accepts memoryviews (`api_request_zero_copy`), and measures the peak
+    memory allocated while handling each.
+    """
+    zero_copy_type = "ZeroCopyBenchmarkBlockchain"
+    blockchain_manager.blockchain_modules[zero_copy_type] = SimpleNamespace(
+        blockchain_type=zero_copy_type,
+        api_request_handler=echo,
+        api_request_zero_copy=True,
+    )
+    api_terminal.update_routing_table()
+    print(f"{'payload':<10}{'handler':<15}{'allocated per request':>25}")
+    for size in PARSING_PAYLOAD_SIZES:
+        for blockchain_type, handler in [
+            (BENCHMARK_BLOCKCHAIN_TYPE, "bytes"),
+            (zero_copy_type, "memoryview"),
+        ]:
+            request = (
+                brenthy_api.ENCODED_TOOLS_VERSION
+                + f"\0{blockchain_type}\0".encode() + bytes(size)
+            )
+            tracemalloc.start()
+            reply = api_terminal.handle_request(request)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            del reply
+            print(
+                f"{size // 1_000_000:>4}MB    {handler:<15}"
+                f"{peak / 1_000_000:>10.1f}MB ({peak / size:.1f}x payload)"
+            )
+    blockchain_manager.blockchain_modules.pop(zero_copy_type)
+    api_terminal.update_routing_table()
+
+
+def get_process_status() -> tuple[int, float]:
+    """Get the number of OS threads and resident memory in MB of this process.
+
+    Only supported on Linux.
+    """
+    status = {}
+    with open("/proc/self/status", "r") as file:
+        for line in file.readlines():
+            key, value = line.split(":", 1)
+            status[key] = value.split()
+    return (int(status["Threads"][0]), int(status["VmRSS"][0]) / 1000)
+
+
+def benchmark_many_listeners() -> None:
+    """Measure the resources used by many EventListeners.
+
+    Creates N_LISTENERS EventListeners, each for a different topic,
+    and checks that each receives its event.
+    """
+    received = set()
+
+    def eventhandler(data: dict) -> None:
+        received.add(data["index"])
+
+    initial_threads, initial_memory = get_process_status()
+    start = time.perf_counter()
+    listeners = [
+        brenthy_api.EventListener(
+            BENCHMARK_BLOCKCHAIN_TYPE, eventhandler, f"Topic{index}"
+        )
+        for index in range(N_LISTENERS)
+    ]
+    creation_time = time.perf_counter() - start
+    time.sleep(1)  # wait for the subscriptions to be established
+    for index in range(N_LISTENERS):
+        api_terminal.publish_event(
+            BENCHMARK_BLOCKCHAIN_TYPE, {"index": index}, [f"Topic{index}"]
+        )
+    start = time.perf_counter()
+    while len(received) < N_LISTENERS and time.perf_counter() - start < 10:
+        time.sleep(0.01)
+    threads, memory = get_process_status()
+    print(
+        f"{N_LISTENERS} EventListeners created in {creation_time:.2f}s, "
+        f"{len(received)} received their event, "
+        f"using {threads - initial_threads} OS threads and "
+        f"{memory - initial_memory:.1f}MB of memory"
+    )
+    for listener in listeners:
+        listener.terminate()
+
+
+def benchmark_tcp() -> None:
+    """Measure the CPU usage and throughput of BAP-3's TCP communication.
+
+    CPU time is measured for the whole process, i.e. client and server.
+    """
+    address = (BENCHMARK_IP_ADDRESS, BENCHMARK_PORT)
+    receiver = TcpMultiRequestsReceiver(address, echo)
+    time.sleep(0.5)
+    print(f"{'scenario':<40}{'CPU (%)':>10}{'throughput':>20}")
+
+    # an idle connection, on which the server is waiting for a request
+    sock = socket.create_connection(address)
+    start_cpu = time.process_time()
+    time.sleep(TCP_IDLE_S)
+    cpu = (time.process_time() - start_cpu) / TCP_IDLE_S * 100
+    sock.close()
+    print(f"{'idle connection':<40}{cpu:>10.1f}{'-':>20}")
+
+    # many small requests
+    start = time.perf_counter()
+    start_cpu = time.process_time()
+    for _ in range(N_TCP_REQUESTS):
+        bt_endpoints.send_request_tcp(PAYLOAD, address)
+    duration = time.perf_counter() - start
+    cpu = (time.process_time() - start_cpu) / duration * 100
+    throughput = f"{N_TCP_REQUESTS / duration:.0f} requests/s"
+    print(f"{'small requests':<40}{cpu:>10.1f}{throughput:>20}")
+
+    # a large request
+    payload = bytearray(TCP_LARGE_PAYLOAD_SIZE)
+    start = time.perf_counter()
+    start_cpu = time.process_time()
+    bt_endpoints.send_request_tcp(payload, address)
+    duration = time.perf_counter() - start
+    cpu = (time.process_time() - start_cpu) / duration * 100
+    # the payload is transmitted twice: request & reply
+    throughput = f"{2 * TCP_LARGE_PAYLOAD_SIZE / duration / 1e6:.0f} MB/s"
+    name = f"{TCP_LARGE_PAYLOAD_SIZE // 1_000_000}MB request"
+    print(f"{name:<40}{cpu:>10.1f}{throughput:>20}")
+    receiver.terminate()
+
+
+async def send_concurrent_tcp_requests(
+    address: tuple[str, int], n_clients: int
+) -> list[float]:
+    """Send a request from each of many concurrent TCP connections.
+
+    Returns:
+        list[float]: the sorted latencies of the requests in seconds
+    """
+    async def send_request() -> float:
+        start = time.perf_counter()
+        reader, writer = await asyncio.open_connection(*address)
+        writer.write(to_b255_no_0s(len(PAYLOAD)) + bytearray([0]) + PAYLOAD)
+        await writer.drain()
+        header = await reader.readuntil(b"\0")
+        reply = await reader.readexactly(from_b255_no_0s(header[:-1]))
+        assert reply == PAYLOAD
+        writer.close()
+        return time.perf_counter() - start
+
+    return sorted(await asyncio.gather(
+        *[send_request() for _ in range(n_clients)]
+    ))
+
+
+def benchmark_async_server() -> None:
+    """Compare the threaded TCP & ZMQ receivers with AsyncRequestsServer.
+
+    Measures the number of threads running while idle and at most while
+    N_CONCURRENT_CLIENTS TCP clients send requests at the same time, their
+    latencies, and the throughput of ZMQ requests from many threads.
+    """
+    tcp_address = (BENCHMARK_IP_ADDRESS, BENCHMARK_PORT + 3)
+    zmq_address = (BENCHMARK_IP_ADDRESS, BENCHMARK_PORT + 4)
+    print(
+        f"{'server':<25}{'idle threads':>14}{'max threads':>13}"
+        f"{'p50 (ms)':>10}{'p99 (ms)':>10}{'ZMQ requests/s':>16}"
+    )
+    for name in ["threaded receivers", "AsyncRequestsServer"]:
+        idle_threads = active_count()
+        if name == "AsyncRequestsServer":
+            server = AsyncRequestsServer()
+            tcp_receiver = server.listen_tcp(tcp_address, echo)
+            zmq_receiver = server.listen_zmq(zmq_address, echo)
+        else:
+            tcp_receiver = TcpMultiRequestsReceiver(tcp_address, echo)
+            zmq_receiver = ZmqMultiRequestsReceiver(zmq_address, echo)
+        time.sleep(0.5)
+        idle_threads = active_count() - idle_threads
+
+        max_threads = 0
+        sampling = True
+
+        def sample_threads() -> None:
+            nonlocal max_threads
+            while sampling:
+                max_threads = max(max_threads, active_count())
+                time.sleep(0.001)
+        sampler = Thread(target=sample_threads)
+        sampler.start()
+        latencies = asyncio.run(
+            send_concurrent_tcp_requests(tcp_address, N_CONCURRENT_CLIENTS)
+        )
+        sampling = False
+        sampler.join()
+        p50 = latencies[len(latencies) // 2] * 1000
+        p99 = latencies[int(len(latencies) * 0.99)] * 1000
+        throughput = measure_throughput(
+            bt_endpoints.send_request_zmq_multiplexed, zmq_address
+        )
+        print(
+            f"{name:<25}{idle_threads:>14}{max_threads:>13}"
+            f"{p50:>10.1f}{p99:>10.1f}{throughput:>16.0f}"
+        )
+        tcp_receiver.terminate()
+        zmq_receiver.terminate()
+
+
+def benchmark_streamed_replies() -> None:
+    """Compare receiving large replies whole with streaming them.
+
+    Measures the time taken to receive the whole reply and the peak amount
+    of memory allocated by Python while doing so, on both sides.
+    """
+    def whole(size: int) -> None:
+        reply = brenthy_api.send_request(
+            BENCHMARK_STREAM_BLOCKCHAIN_TYPE, str(size).encode()
+        )
+        assert len(reply) == size
+
+    def streamed(size: int) -> None:
+        received = 0
+        for chunk in brenthy_api.send_request_stream(
+            BENCHMARK_STREAM_BLOCKCHAIN_TYPE, str(size).encode()
+        ):
+            received += len(chunk)
+        assert received == size
+
+    modes = {
+        "send_request": whole,
+        "send_request_stream": streamed,
+    }
+    print(
+        f"{'reply':>10}  {'mode':<30}{'time (ms)':>12}"
+        f"{'peak memory (MB)':>20}"
+    )
+    for size in STREAMED_REPLY_SIZES:
+        for name, function in modes.items():
+            tracemalloc.start()
+            start = time.perf_counter()
+            function(size)
+            duration = (time.perf_counter() - start) * 1000
+            peak = tracemalloc.get_traced_memory()[1] / 1_000_000
+            tracemalloc.stop()
+            print(
+                f"{size / 1_000_000:>8g}MB  {name:<30}{duration:>12.1f}"
+                f"{peak:>20.1f}"
+            )
+
+
+def run_benchmarks() -> None:
+    """Run all benchmarks."""
+    benchmark_zmq_clients()
+    benchmark_elastic_pool()
+    benchmark_client_fairness()
+    benchmark_tcp()
+    benchmark_async_server()
+    start_api_terminal()
+    benchmark_batch_requests()
+    benchmark_request_lanes()
+    benchmark_routing()
+    benchmark_request_parsing()
+    benchmark_large_payloads()
+    benchmark_compression()
+    benchmark_reply_cache()
+    benchmark_server_reply_cache()
+    benchmark_request_coalescing()
+    benchmark_event_encoding()
+    benchmark_event_burst()
+    benchmark_event_resume()
+    benchmark_slow_subscriber()
+    benchmark_many_listeners()
+    benchmark_streamed_replies()
+    api_terminal.terminate()
+    bt_endpoints.terminate()
+
+
+if __name__ == "__main__":
+    run_benchmarks()
@@ -5,6 +5,19 @@ if True:
     import test_update
     import test_brenthy_api
     import test_brenthy_logs
+    import test_import_time
+    import test_api_terminal
+    import test_tcp_framing
+    import test_async_endpoints
+    import test_async_client
+    import test_event_executor
+    import test_publisher
+    import test_compression
+    import test_reply_cache
+    import test_worker_pool
+    import test_rate_limiter
+    import test_event_encoding
+    import test_bap_6_client
     import testing_utils
     from brenthy_docker import build_docker_image
 
@@ -18,5 +31,18 @@ if __name__ == "__main__":
     test_update.run_tests()
     test_brenthy_api.run_tests()
     test_brenthy_logs.run_tests()
+    test_import_time.run_tests()
+    test_api_terminal.run_tests()
+    test_tcp_framing.run_tests()
+    test_async_endpoints.run_tests()
+    test_async_client.run_tests()
+    test_event_executor.run_tests()
+    test_publisher.run_tests()
+    test_compression.run_tests()
+    test_reply_cache.run_tests()
+    test_worker_pool.run_tests()
+    test_rate_limiter.run_tests()
+    test_event_encoding.run_tests()
+    test_bap_6_client.run_tests()
 
     os._exit(0)
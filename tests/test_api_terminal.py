@@ -0,0 +1,509 @@
+"""Test api_terminal's request routing, caching, streaming and event replay.
+
+Registers dummy blockchain types and calls api_terminal's request routing
+directly, so these tests don't need Brenthy to be running.
+"""
+
+import os
+import sys
+import time
+from threading import Event, Thread
+from types import SimpleNamespace
+from typing import Callable
+
+import pytest
+
+if True:
+    brenthy_dir = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Brenthy"
+    )
+    sys.path.insert(0, brenthy_dir)
+    import api_terminal
+    import blockchain_manager
+    from brenthy_tools_beta import brenthy_api
+    from brenthy_tools_beta.event_encoding import decode_value, encode_value
+    from brenthy_tools_beta.utils import decode_bytes_list, encode_bytes_list
+
+TEST_BLOCKCHAIN_TYPE = "ApiTerminalTestBlockchain"
+# how long to wait for other threads to reach a certain point
+WAIT_S = 5
+
+
+def register_blockchain_type(
+    api_request_handler: Callable, **hooks: Callable
+) -> None:
+    """Register a dummy blockchain type with the given request handler."""
+    blockchain_manager.blockchain_modules[TEST_BLOCKCHAIN_TYPE] = (
+        SimpleNamespace(
+            blockchain_type=TEST_BLOCKCHAIN_TYPE,
+            api_request_handler=api_request_handler,
+            **hooks,
+        )
+    )
+    api_terminal.update_routing_table()
+
+
+def unregister_blockchain_type() -> None:
+    """Remove the dummy blockchain type, its cached replies and events."""
+    blockchain_manager.blockchain_modules.pop(TEST_BLOCKCHAIN_TYPE, None)
+    api_terminal.update_routing_table()
+    api_terminal.api_terminal._reply_cache.invalidate(TEST_BLOCKCHAIN_TYPE)
+    api_terminal.api_terminal._event_buffers.pop(TEST_BLOCKCHAIN_TYPE, None)
+
+
+def route_in_thread(request: bytes, replies: list) -> Thread:
+    """Route a request on a new thread, appending its result to `replies`."""
+    thread = Thread(
+        target=lambda: replies.append(
+            api_terminal.route_request(request, TEST_BLOCKCHAIN_TYPE)
+        )
+    )
+    thread.start()
+    return thread
+
+
+def wait_for_in_flight(n_waiting: int) -> None:
+    """Wait until `n_waiting` requests are coalesced into others."""
+    counts = api_terminal.api_terminal._coalescing_counts
+    start = time.monotonic()
+    while counts["coalesced"] < n_waiting:
+        assert time.monotonic() - start < WAIT_S
+        time.sleep(0.001)
+
+
+def test_parse_request() -> None:
+    """Test splitting a request into its version, type and payload."""
+    version, blockchain_type, payload = api_terminal.parse_request(
+        b"\x01\x02\x00Walytis_Beta\x00payload\x00with nulls"
+    )
+    assert bytes(version) == b"\x01\x02"
+    assert blockchain_type == "Walytis_Beta"
+    assert isinstance(payload, memoryview)
+    assert bytes(payload) == b"payload\x00with nulls"
+
+
+def test_reply_cache() -> None:
+    """Test that cacheable replies are cached until an event is published."""
+    calls = []
+
+    def handler(request: bytes) -> bytes:
+        calls.append(request)
+        return b"reply %d" % len(calls)
+
+    register_blockchain_type(handler, api_request_cache_ttl=lambda _: 60)
+    try:
+        assert api_terminal.route_request(b"q", TEST_BLOCKCHAIN_TYPE) == (
+            True, b"reply 1"
+        )
+        assert api_terminal.route_request(b"q", TEST_BLOCKCHAIN_TYPE) == (
+            True, b"reply 1"
+        )
+        api_terminal.publish_event(TEST_BLOCKCHAIN_TYPE, {})
+        assert api_terminal.route_request(b"q", TEST_BLOCKCHAIN_TYPE) == (
+            True, b"reply 2"
+        )
+        assert len(calls) == 2
+    finally:
+        unregister_blockchain_type()
+
+
+def test_reply_cache_generation_guard() -> None:
+    """Test that replies computed before an event aren't cached after it."""
+    started = Event()
+    release = Event()
+    replies: list = []
+
+    def handler(request: bytes) -> bytes:
+        if not started.is_set():
+            started.set()
+            release.wait(WAIT_S)
+            return b"old"
+        return b"new"
+
+    register_blockchain_type(handler, api_request_cache_ttl=lambda _: 60)
+    try:
+        thread = route_in_thread(b"q", replies)
+        assert started.wait(WAIT_S)
+        api_terminal.publish_event(TEST_BLOCKCHAIN_TYPE, {})
+        release.set()
+        thread.join()
+        assert replies == [(True, b"old")]
+        assert api_terminal.route_request(b"q", TEST_BLOCKCHAIN_TYPE) == (
+            True, b"new"
+        )
+    finally:
+        unregister_blockchain_type()
+
+
+def test_coalescing() -> None:
+    """Test that identical concurrent pure requests are processed once."""
+    calls = []
+    release = Event()
+
+    def handler(request: bytes) -> bytes:
+        calls.append(request)
+        release.wait(WAIT_S)
+        return request.upper()
+
+    register_blockchain_type(handler, api_request_is_pure=lambda _: True)
+    try:
+        coalesced = api_terminal.api_terminal._coalescing_counts["coalesced"]
+        replies: list = []
+        threads = [route_in_thread(b"q", replies) for _ in range(5)]
+        wait_for_in_flight(coalesced + 4)
+        other_replies: list = []
+        route_in_thread(b"other", other_replies).join(0.1)
+        release.set()
+        for thread in threads:
+            thread.join()
+        assert replies == [(True, b"Q")] * 5
+        assert calls.count(b"q") == 1
+        assert calls.count(b"other") == 1
+    finally:
+        release.set()
+        unregister_blockchain_type()
+
+
+def test_no_coalescing_of_impure_requests() -> None:
+    """Test that requests which aren't declared pure are all processed."""
+    calls = []
+    register_blockchain_type(
+        lambda request: calls.append(request) or request,
+        api_request_is_pure=lambda request: request != b"write",
+    )
+    try:
+        replies: list = []
+        threads = [route_in_thread(b"write", replies) for _ in range(5)]
+        for thread in threads:
+            thread.join()
+        assert replies == [(True, b"write")] * 5
+        assert len(calls) == 5
+    finally:
+        unregister_blockchain_type()
+
+
+def test_coalescing_shares_errors() -> None:
+    """Test that waiting requests get the error of the processed request."""
+    release = Event()
+
+    def handler(request: bytes) -> bytes:
+        release.wait(WAIT_S)
+        raise RuntimeError("lookup failed")
+
+    register_blockchain_type(handler, api_request_is_pure=lambda _: True)
+    errors = []
+
+    def route() -> None:
+        try:
+            api_terminal.route_request(b"q", TEST_BLOCKCHAIN_TYPE)
+        except RuntimeError as error:
+            errors.append(error)
+
+    try:
+        coalesced = api_terminal.api_terminal._coalescing_counts["coalesced"]
+        threads = [Thread(target=route) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        wait_for_in_flight(coalesced + 2)
+        release.set()
+        for thread in threads:
+            thread.join()
+        assert len(errors) == 3
+        assert not api_terminal.api_terminal._in_flight
+    finally:
+        release.set()
+        unregister_blockchain_type()
+
+
+def test_coalescing_bounded_wait() -> None:
+    """Test that requests stop waiting for a hung identical request."""
+    release = Event()
+    calls = []
+
+    def handler(request: bytes) -> bytes:
+        calls.append(request)
+        if len(calls) == 1:
+            release.wait(WAIT_S)
+            return b"hung"
+        return b"separate"
+
+    wait_timeout_s = api_terminal.api_terminal.COALESCED_WAIT_TIMEOUT_S
+    api_terminal.api_terminal.COALESCED_WAIT_TIMEOUT_S = 0.2
+    register_blockchain_type(handler, api_request_is_pure=lambda _: True)
+    replies: list = []
+    try:
+        coalesced = api_terminal.api_terminal._coalescing_counts["coalesced"]
+        first = route_in_thread(b"q", replies)
+        while not calls:
+            time.sleep(0.001)
+        second = route_in_thread(b"q", replies)
+        wait_for_in_flight(coalesced + 1)
+        second.join(WAIT_S)
+        assert replies == [(True, b"separate")]
+        release.set()
+        first.join()
+        assert replies == [(True, b"separate"), (True, b"hung")]
+    finally:
+        api_terminal.api_terminal.COALESCED_WAIT_TIMEOUT_S = wait_timeout_s
+        release.set()
+        unregister_blockchain_type()
+
+
+def test_coalescing_generation_guard() -> None:
+    """Test that requests made after an event don't get pre-event replies.
+
+    Regression test: a request arriving after an event used to wait for
+    an identical request which started before the event, and then cache
+    its stale reply.
+    """
+    started = Event()
+    release = Event()
+
+    def handler(request: bytes) -> bytes:
+        if not started.is_set():
+            started.set()
+            release.wait(WAIT_S)
+            return b"old"
+        return b"new"
+
+    register_blockchain_type(handler, api_request_cache_ttl=lambda _: 60)
+    try:
+        replies_before: list = []
+        replies_after: list = []
+        thread_before = route_in_thread(b"q", replies_before)
+        assert started.wait(WAIT_S)
+        api_terminal.publish_event(TEST_BLOCKCHAIN_TYPE, {})
+        thread_after = route_in_thread(b"q", replies_after)
+        thread_after.join(WAIT_S)
+        release.set()
+        thread_before.join()
+        thread_after.join()
+        assert replies_before == [(True, b"old")]
+        assert replies_after == [(True, b"new")]
+        assert api_terminal.route_request(b"q", TEST_BLOCKCHAIN_TYPE) == (
+            True, b"new"
+        )
+    finally:
+        release.set()
+        unregister_blockchain_type()
+
+
+def test_idle_streams_closed() -> None:
+    """Test that streams which aren't read from are closed eventually."""
+    closed = []
+
+    def handler(request: bytes):  # type: ignore
+        def chunks():  # type: ignore
+            try:
+                while True:
+                    yield bytes(request)
+            finally:
+                closed.append(bytes(request))
+
+        return chunks()
+
+    def open_stream(request: bytes) -> bytes:
+        reply = decode_bytes_list(api_terminal.stream_request(bytes(
+            encode_bytes_list([TEST_BLOCKCHAIN_TYPE.encode(), request, b"1"])
+        )))
+        assert reply[1:] == [api_terminal.api_terminal.STREAM_MORE, request]
+        return bytes(reply[0])
+
+    def make_idle(stream_id: bytes) -> None:
+        api_terminal.api_terminal._streams[stream_id].last_used -= (
+            api_terminal.api_terminal.STREAM_IDLE_TIMEOUT_S + 1
+        )
+
+    register_blockchain_type(handler)
+    try:
+        abandoned = open_stream(b"abandoned")
+        read = open_stream(b"read")
+        make_idle(abandoned)
+        # reading one stream closes the others which are idle
+        reply = decode_bytes_list(api_terminal.stream_next(
+            bytes(encode_bytes_list([read, b"1"]))
+        ))
+        assert reply[1:] == [api_terminal.api_terminal.STREAM_MORE, b"read"]
+        assert closed == [b"abandoned"]
+        assert abandoned not in api_terminal.api_terminal._streams
+
+        # so does getting the request statistics
+        make_idle(read)
+        api_terminal.get_request_stats(b"")
+        assert closed == [b"abandoned", b"read"]
+        assert not api_terminal.api_terminal._streams
+    finally:
+        unregister_blockchain_type()
+
+
+def test_open_streams_capped() -> None:
+    """Test that new streams are refused while too many are open."""
+    max_open = api_terminal.api_terminal.STREAM_MAX_OPEN
+
+    def handler(request: bytes):  # type: ignore
+        return iter([bytes(request), bytes(request)])
+
+    def open_stream(request: bytes) -> list:
+        return decode_bytes_list(api_terminal.stream_request(bytes(
+            encode_bytes_list([TEST_BLOCKCHAIN_TYPE.encode(), request, b"1"])
+        )))
+
+    register_blockchain_type(handler)
+    try:
+        api_terminal.api_terminal.STREAM_MAX_OPEN = 2
+        first = open_stream(b"first")
+        assert first[1] == api_terminal.api_terminal.STREAM_MORE
+        assert open_stream(b"second")[1] == (
+            api_terminal.api_terminal.STREAM_MORE
+        )
+        reply = open_stream(b"third")
+        assert reply[1] == api_terminal.api_terminal.STREAM_FAILED
+        with pytest.raises(brenthy_api.BrenthyBusyError):
+            raise brenthy_api._analyse_no_success_reply(reply[2])
+
+        # once a stream is closed, new ones are accepted again
+        api_terminal.stream_close(bytes(first[0]))
+        assert open_stream(b"third")[1] == (
+            api_terminal.api_terminal.STREAM_MORE
+        )
+    finally:
+        api_terminal.api_terminal.STREAM_MAX_OPEN = max_open
+        for stream_id in list(api_terminal.api_terminal._streams):
+            api_terminal.stream_close(stream_id)
+        unregister_blockchain_type()
+
+
+def publish_events(topics: list[str]) -> int:
+    """Publish an event for each topic, returning the first's sequence."""
+    first_sequence = api_terminal.api_terminal._event_sequences.get(
+        TEST_BLOCKCHAIN_TYPE, api_terminal.api_terminal._EVENT_SEQUENCE_START
+    )
+    for index, topic in enumerate(topics):
+        api_terminal.publish_event(
+            TEST_BLOCKCHAIN_TYPE, {"index": index}, topics=topic
+        )
+    return first_sequence
+
+
+def get_events_since(sequence: int, topics: list[str]) -> dict:
+    """Call the get_events_since Brenthy RPC."""
+    return decode_value(api_terminal.api_terminal.get_events_since(
+        encode_value({
+            "blockchain_type": TEST_BLOCKCHAIN_TYPE,
+            "topics": [f"{TEST_BLOCKCHAIN_TYPE}-{topic}" for topic in topics],
+            "sequence": sequence,
+        })
+    ))
+
+
+def test_get_events_since() -> None:
+    """Test replaying the events published after a given one."""
+    register_blockchain_type(lambda request: request)
+    try:
+        first = publish_events(["A", "B", "A", "B"])
+        reply = get_events_since(first, [])
+        assert reply == {
+            "events": [
+                [first + 1, f"{TEST_BLOCKCHAIN_TYPE}-B", {"index": 1}],
+                [first + 2, f"{TEST_BLOCKCHAIN_TYPE}-A", {"index": 2}],
+                [first + 3, f"{TEST_BLOCKCHAIN_TYPE}-B", {"index": 3}],
+            ],
+            "complete": True,
+            "more": False,
+        }
+        reply = get_events_since(first - 1, ["A"])
+        assert [event[0] for event in reply["events"]] == [first, first + 2]
+        assert reply["complete"]
+        assert get_events_since(first + 3, [])["events"] == []
+    finally:
+        unregister_blockchain_type()
+
+
+def test_get_events_since_dropped_events() -> None:
+    """Test that replays report events dropped from the replay buffer."""
+    buffer_size = api_terminal.api_terminal.EVENT_REPLAY_BUFFER_SIZE
+    api_terminal.api_terminal.EVENT_REPLAY_BUFFER_SIZE = 3
+    register_blockchain_type(lambda request: request)
+    try:
+        first = publish_events(["A"] * 5)
+        reply = get_events_since(first, [])
+        assert [event[0] for event in reply["events"]] == [
+            first + 2, first + 3, first + 4
+        ]
+        assert not reply["complete"]
+        assert get_events_since(first + 1, [])["complete"]
+    finally:
+        api_terminal.api_terminal.EVENT_REPLAY_BUFFER_SIZE = buffer_size
+        unregister_blockchain_type()
+
+
+def test_get_events_since_future_sequence() -> None:
+    """Test that replays from unreached sequence numbers are incomplete.
+
+    Such as those of an application resuming after Brenthy Core restarted
+    with lower sequence numbers.
+    """
+    register_blockchain_type(lambda request: request)
+    try:
+        first = publish_events(["A", "A"])
+        assert get_events_since(first + 1, [])["complete"]
+        reply = get_events_since(first + 1000, [])
+        assert reply["events"] == []
+        assert not reply["complete"]
+    finally:
+        unregister_blockchain_type()
+
+
+def test_resume_in_pages() -> None:
+    """Test that clients get replays larger than one reply page by page."""
+    max_events = api_terminal.api_terminal.EVENT_BACKFILL_MAX_EVENTS
+    api_terminal.api_terminal.EVENT_BACKFILL_MAX_EVENTS = 2
+    send_brenthy_request = brenthy_api.send_brenthy_request
+
+    def request_from_api_terminal(
+        function_name: str, payload: bytearray, timeout: int | None = None
+    ) -> bytes:
+        """Call api_terminal's Brenthy RPC instead of a running Core."""
+        assert function_name == "get_events_since"
+        return api_terminal.api_terminal.get_events_since(bytes(payload))
+
+    brenthy_api.send_brenthy_request = request_from_api_terminal
+    register_blockchain_type(lambda request: request)
+    try:
+        first = publish_events(["A", "B", "A", "A", "B", "A"])
+        events, complete = brenthy_api.get_events_since(
+            TEST_BLOCKCHAIN_TYPE, first, "A"
+        )
+        assert complete
+        assert events == [
+            (first + 2, "A", {"index": 2}),
+            (first + 3, "A", {"index": 3}),
+            (first + 5, "A", {"index": 5}),
+        ]
+    finally:
+        brenthy_api.send_brenthy_request = send_brenthy_request
+        api_terminal.api_terminal.EVENT_BACKFILL_MAX_EVENTS = max_events
+        unregister_blockchain_type()
+
+
+def run_tests() -> None:
+    """Run all tests."""
+    print("\nRunning tests for api_terminal's request routing...")
+    test_parse_request()
+    test_reply_cache()
+    test_reply_cache_generation_guard()
+    test_coalescing()
+    test_no_coalescing_of_impure_requests()
+    test_coalescing_shares_errors()
+    test_coalescing_bounded_wait()
+    test_coalescing_generation_guard()
+    test_idle_streams_closed()
+    test_open_streams_capped()
+    test_get_events_since()
+    test_get_events_since_dropped_events()
+    test_get_events_since_future_sequence()
+    test_resume_in_pages()
+
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,123 @@
+"""Test bt_endpoints' asyncio client for multiplexed ZMQ connections.
+
+Sends requests to a local ZmqMultiRequestsReceiver with an echoing request
+handler, so these tests don't need Brenthy to be running.
+"""
+
+import asyncio
+import gc
+import os
+import socket
+import sys
+from threading import Thread
+
+if True:
+    brenthy_dir = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Brenthy"
+    )
+    sys.path.insert(0, brenthy_dir)
+    from api_terminal.bat_endpoints import ZmqMultiRequestsReceiver
+    from brenthy_tools_beta import bt_endpoints
+
+IP_ADDRESS = "127.0.0.1"
+N_EVENT_LOOPS = 5
+
+
+def get_free_port() -> int:
+    """Get a TCP port number that is currently not in use."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((IP_ADDRESS, 0))
+        return sock.getsockname()[1]
+
+
+def echo(request: bytes) -> bytes:
+    """Reply with the request."""
+    return bytes(request)
+
+
+def test_clients_closed_with_event_loop() -> None:
+    """Test that clients don't outlive the event loops they were used in."""
+    address = (IP_ADDRESS, get_free_port())
+    receiver = ZmqMultiRequestsReceiver(address, echo)
+
+    async def make_request() -> bytes:
+        return await bt_endpoints.send_request_zmq_multiplexed_async(
+            b"hello", address, timeout=5
+        )
+
+    try:
+        for _ in range(N_EVENT_LOOPS):
+            assert asyncio.run(make_request()) == b"hello"
+        gc.collect()
+        assert len(bt_endpoints._ASYNC_MULTIPLEXED_CLIENTS) == 0
+    finally:
+        receiver.terminate()
+
+
+def test_dead_tasks_restarted() -> None:
+    """Test that the client restarts its reply-receiving task if it died."""
+    address = (IP_ADDRESS, get_free_port())
+    receiver = ZmqMultiRequestsReceiver(address, echo)
+
+    class FailingDict(dict):
+        """A dict whose first lookup raises an error."""
+
+        failed = False
+
+        def get(self, *args):  # type: ignore
+            if not self.failed:
+                self.failed = True
+                raise RuntimeError("failed looking up request")
+            return dict.get(self, *args)
+
+    async def make_requests() -> None:
+        client = bt_endpoints._get_async_multiplexed_client(address)
+        client._pending = FailingDict()
+        # the reply-receiving task dies on receiving the reply
+        try:
+            await client.send_request(b"first", timeout=1)
+        except bt_endpoints.CantConnectToSocketError:
+            pass
+        assert client._receive_task.done()
+        assert not client.closed
+        assert await client.send_request(b"second", timeout=5) == b"second"
+        client.close()
+
+    try:
+        asyncio.run(asyncio.wait_for(make_requests(), 10))
+    finally:
+        receiver.terminate()
+
+
+def test_terminate_with_open_event_loop() -> None:
+    """Test that terminate closes clients of event loops still open."""
+    address = (IP_ADDRESS, get_free_port())
+
+    async def get_client() -> bt_endpoints.AsyncZmqMultiplexedClient:
+        return bt_endpoints._get_async_multiplexed_client(address)
+
+    loop = asyncio.new_event_loop()
+    try:
+        client = loop.run_until_complete(get_client())
+        thread = Thread(target=bt_endpoints.terminate, daemon=True)
+        thread.start()
+        thread.join(5)
+        assert not thread.is_alive()
+        assert client.closed
+        assert not bt_endpoints._ASYNC_MULTIPLEXED_CLIENTS
+    finally:
+        loop.close()
+        # terminate closed the ZMQ context, which other tests need
+        bt_endpoints.initialise()
+
+
+def run_tests() -> None:
+    """Run all tests."""
+    print("\nRunning tests for the asyncio multiplexed ZMQ client...")
+    test_clients_closed_with_event_loop()
+    test_dead_tasks_restarted()
+    test_terminate_with_open_event_loop()
+
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,118 @@
+"""Test api_terminal's asyncio-based AsyncRequestsServer.
+
+Runs AsyncRequestsServers with echoing request handlers on free local
+ports, so these tests don't need Brenthy to be running.
+"""
+
+import os
+import socket
+import sys
+import time
+
+if True:
+    brenthy_dir = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Brenthy"
+    )
+    sys.path.insert(0, brenthy_dir)
+    from api_terminal import async_endpoints
+    from api_terminal.async_endpoints import AsyncRequestsServer
+    from brenthy_tools_beta import bt_endpoints
+    from brenthy_tools_beta.utils import to_b255_no_0s
+
+IP_ADDRESS = "127.0.0.1"
+# how long to wait for the server to start listening
+STARTUP_S = 0.3
+
+
+def get_free_port() -> int:
+    """Get a TCP port number that is currently not in use."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((IP_ADDRESS, 0))
+        return sock.getsockname()[1]
+
+
+def echo(request: bytes) -> bytes:
+    """Reply with the request."""
+    return bytes(request)
+
+
+def test_tcp_and_zmq_requests() -> None:
+    """Test serving TCP and ZMQ listeners from one server."""
+    tcp_address = (IP_ADDRESS, get_free_port())
+    zmq_address = (IP_ADDRESS, get_free_port())
+    server = AsyncRequestsServer()
+    try:
+        server.listen_tcp(tcp_address, echo)
+        server.listen_zmq(zmq_address, echo)
+        time.sleep(STARTUP_S)
+        large_request = os.urandom(3_000_000)
+        assert bt_endpoints.send_request_tcp(
+            large_request, tcp_address, timeout=5
+        ) == large_request
+        assert bt_endpoints.send_request_zmq(
+            b"hello", zmq_address, timeout=5
+        ) == b"hello"
+        assert sum(
+            stats["handled"] for stats in server.get_stats().values()
+        ) == 2
+    finally:
+        server.terminate()
+
+
+def test_oversized_tcp_header() -> None:
+    """Test that requests announcing too many bytes are rejected."""
+    tcp_address = (IP_ADDRESS, get_free_port())
+    server = AsyncRequestsServer()
+    try:
+        server.listen_tcp(tcp_address, echo)
+        time.sleep(STARTUP_S)
+        with socket.create_connection(tcp_address, timeout=5) as sock:
+            sock.sendall(
+                to_b255_no_0s(bt_endpoints.TCP_MAX_MESSAGE_SIZE + 1)
+                + b"\x00"
+            )
+            # the server closes the connection without replying
+            assert sock.recv(1) == b""
+    finally:
+        server.terminate()
+
+
+def test_tcp_request_deadline() -> None:
+    """Test that dripping a request doesn't extend the request timeout."""
+    tcp_address = (IP_ADDRESS, get_free_port())
+    request_timeout_s = async_endpoints.TCP_REQUEST_TIMEOUT_S
+    async_endpoints.TCP_REQUEST_TIMEOUT_S = 1
+    server = AsyncRequestsServer()
+    try:
+        server.listen_tcp(tcp_address, echo)
+        time.sleep(STARTUP_S)
+        with socket.create_connection(tcp_address, timeout=5) as sock:
+            sock.sendall(to_b255_no_0s(100) + b"\x00")
+            start = time.monotonic()
+            closed = False
+            while not closed and time.monotonic() - start < 5:
+                try:
+                    sock.sendall(b"x")
+                    sock.settimeout(0.2)
+                    closed = sock.recv(1) == b""
+                except socket.timeout:
+                    pass
+                except ConnectionError:
+                    closed = True
+            assert closed
+            assert time.monotonic() - start < 2
+    finally:
+        async_endpoints.TCP_REQUEST_TIMEOUT_S = request_timeout_s
+        server.terminate()
+
+
+def run_tests() -> None:
+    """Run all tests."""
+    print("\nRunning tests for AsyncRequestsServer...")
+    test_tcp_and_zmq_requests()
+    test_oversized_tcp_header()
+    test_tcp_request_deadline()
+
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,51 @@
+"""Test when brenthy_api's BAP-6 module offers to communicate via IPC.
+
+These tests don't need Brenthy to be running.
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+if True:
+    brenthy_dir = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Brenthy"
+    )
+    sys.path.insert(0, brenthy_dir)
+    from brenthy_tools_beta.brenthy_api_protocols import bap_6_brenthy_tools
+    from brenthy_tools_beta.bt_endpoints import CantConnectToSocketError
+
+
+def test_loopback_addresses() -> None:
+    """Test telling apart addresses of this machine from others."""
+    for address in ["127.94.21.1", "127.0.0.1", "localhost", "::1"]:
+        assert bap_6_brenthy_tools._is_loopback_address(address)
+    for address in ["192.168.1.20", "brenthy", "10.0.0.127", "::"]:
+        assert not bap_6_brenthy_tools._is_loopback_address(address)
+
+
+def test_ipc_only_for_local_core() -> None:
+    """Test that BAP-6 isn't used if Brenthy Core is configured elsewhere."""
+    use_ipc = bap_6_brenthy_tools.USE_IPC
+    with tempfile.NamedTemporaryFile() as socket_file:
+        try:
+            bap_6_brenthy_tools.USE_IPC = True
+            bap_6_brenthy_tools._assert_socket_exists(socket_file.name)
+            bap_6_brenthy_tools.USE_IPC = False
+            with pytest.raises(CantConnectToSocketError):
+                bap_6_brenthy_tools._assert_socket_exists(socket_file.name)
+        finally:
+            bap_6_brenthy_tools.USE_IPC = use_ipc
+
+
+def run_tests() -> None:
+    """Run all tests."""
+    print("\nRunning tests for BAP-6's client...")
+    test_loopback_addresses()
+    test_ipc_only_for_local_core()
+
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,83 @@
+"""Test the compression of BrenthyAPI payloads.
+
+These tests don't need Brenthy to be running.
+"""
+
+import os
+import sys
+
+import pytest
+
+if True:
+    brenthy_dir = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Brenthy"
+    )
+    sys.path.insert(0, brenthy_dir)
+    from brenthy_tools_beta import compression
+
+COMPRESSIBLE_DATA = b"BrenthyAPI payload " * 10000
+
+
+def test_round_trip() -> None:
+    """Test that each codec's compressed payloads decompress correctly."""
+    for codec_name in compression.get_codec_names():
+        codec, compressed = compression.compress(
+            COMPRESSIBLE_DATA, [codec_name]
+        )
+        assert codec == codec_name
+        assert len(compressed) < len(COMPRESSIBLE_DATA)
+        assert compression.decompress(codec, compressed) == COMPRESSIBLE_DATA
+
+
+def test_no_compression() -> None:
+    """Test that small & incompressible payloads aren't compressed."""
+    small_data = b"x" * (compression.COMPRESSION_THRESHOLD_BYTES - 1)
+    assert compression.compress(small_data, ["zlib"]) == (None, small_data)
+    random_data = os.urandom(compression.COMPRESSIBILITY_SAMPLE_BYTES * 3)
+    assert compression.compress(random_data, ["zlib"]) == (None, random_data)
+    assert compression.compress(COMPRESSIBLE_DATA, ["unknown"]) == (
+        None, COMPRESSIBLE_DATA
+    )
+
+
+def test_unsupported_codec() -> None:
+    """Test decompressing with an unknown codec."""
+    with pytest.raises(compression.UnsupportedCodecError):
+        compression.decompress("unknown", b"data")
+
+
+def test_decompression_bomb() -> None:
+    """Test that payloads decompressing to too much data are rejected."""
+    max_length = 1_000_000
+    data = bytes(max_length * 10)
+    for codec_name in compression.get_codec_names():
+        compressed = compression.CODECS[codec_name].compress(data)
+        with pytest.raises(compression.DecompressedTooLargeError):
+            compression.decompress(codec_name, compressed, max_length)
+        assert compression.decompress(
+            codec_name, compressed, max_length=None
+        ) == data
+
+
+def test_truncated_payload() -> None:
+    """Test that truncated compressed payloads are rejected."""
+    for codec_name in compression.get_codec_names():
+        compressed = compression.CODECS[codec_name].compress(
+            COMPRESSIBLE_DATA
+        )
+        with pytest.raises(Exception):
+            compression.decompress(codec_name, compressed[:-10])
+
+
+def run_tests() -> None:
+    """Run all tests."""
+    print("\nRunning tests for the compression of BrenthyAPI payloads...")
+    test_round_trip()
+    test_no_compression()
+    test_unsupported_codec()
+    test_decompression_bomb()
+    test_truncated_payload()
+
+
+if __name__ == "__main__":
+    run_tests()
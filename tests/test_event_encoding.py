@@ -0,0 +1,120 @@
+"""Test the binary encoding of events published via BAP-5 & BAP-6.
+
+These tests don't need Brenthy to be running.
+"""
+
+import os
+import sys
+
+import pytest
+
+if True:
+    brenthy_dir = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Brenthy"
+    )
+    sys.path.insert(0, brenthy_dir)
+    from brenthy_tools_beta.event_encoding import (
+        EventDecodeError,
+        decode_event,
+        decode_value,
+        encode_event,
+        encode_value,
+    )
+
+VALUES = [
+    None,
+    True,
+    False,
+    0,
+    1,
+    -1,
+    127,
+    128,
+    -129,
+    2**64,
+    -(2**200),
+    0.0,
+    -1.5,
+    1e300,
+    "",
+    "hello",
+    "ünïcödé ✓",
+    "x" * 300,
+    b"",
+    b"\x00\xff" * 200,
+    [],
+    [1, "two", b"three", [None, {}]],
+    {},
+    {"id": "abc", "nested": {"list": [1, 2.5], 3: None}},
+]
+
+
+def test_value_round_trip() -> None:
+    """Test that all supported values decode to what was encoded."""
+    for value in VALUES:
+        decoded = decode_value(encode_value(value))
+        assert decoded == value
+        assert type(decoded) is type(value)
+    assert decode_value(encode_value(VALUES)) == VALUES
+
+
+def test_normalised_types() -> None:
+    """Test that subtypes are encoded as the types they derive from."""
+    assert decode_value(encode_value((1, 2))) == [1, 2]
+    assert decode_value(encode_value(bytearray(b"ab"))) == b"ab"
+    assert decode_value(encode_value(memoryview(b"ab"))) == b"ab"
+    with pytest.raises(TypeError):
+        encode_value({1, 2})
+
+
+def test_invalid_payloads() -> None:
+    """Test that malformed payloads raise EventDecodeError."""
+    encoded = encode_value({"text": "x" * 300})
+    for payload in [b"", encoded[:-1], encoded + b"\x00", b"\xff"]:
+        with pytest.raises(EventDecodeError):
+            decode_value(payload)
+
+
+def test_event_round_trip() -> None:
+    """Test encoding and decoding whole events, small and compressed."""
+    for data in [
+        {"topic": "Walytis-Block", "block_id": b"\x01\x02"},
+        {"topic": "Walytis-Block", "block_id": b"\x00" * 100_000},
+    ]:
+        frames = encode_event(data, 42)
+        assert frames[0] == b"Walytis-Block"
+        topic, lazy_data = decode_event(frames)
+        assert topic == "Walytis-Block"
+        assert lazy_data.sequence == 42
+        assert lazy_data.decode() == {"block_id": data["block_id"]}
+    # the large event was compressed
+    assert frames[2] == b"zlib"
+    assert len(frames[3]) < 100_000
+
+
+def test_invalid_events() -> None:
+    """Test that malformed events raise EventDecodeError."""
+    frames = encode_event({"topic": "topic", "data": 1}, 0)
+    with pytest.raises(EventDecodeError):
+        decode_event(frames[:3])
+    with pytest.raises(EventDecodeError):
+        decode_event([frames[0], b"\x00", frames[2], frames[3]])
+    _, lazy_data = decode_event(
+        [frames[0], frames[1], b"", encode_value([1, 2])]
+    )
+    with pytest.raises(EventDecodeError):
+        lazy_data.decode()
+
+
+def run_tests() -> None:
+    """Run all tests."""
+    print("\nRunning tests for event_encoding...")
+    test_value_round_trip()
+    test_normalised_types()
+    test_invalid_payloads()
+    test_event_round_trip()
+    test_invalid_events()
+
+
+if __name__ == "__main__":
+    run_tests()
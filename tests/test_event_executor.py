@@ -0,0 +1,209 @@
+"""Test the EventExecutor, which calls EventListeners' eventhandlers.
+
+These tests don't need Brenthy to be running.
+"""
+
+import os
+import sys
+import time
+from threading import Event, Lock, Thread
+
+import pytest
+
+if True:
+    brenthy_dir = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Brenthy"
+    )
+    sys.path.insert(0, brenthy_dir)
+    from brenthy_tools_beta import event_executor
+    from brenthy_tools_beta.event_executor import EventExecutor
+
+# how long to wait for eventhandlers to be called
+WAIT_S = 5
+
+
+def wait_until(condition) -> bool:  # type: ignore
+    """Wait until `condition()` is true, returning False on timeout."""
+    start = time.monotonic()
+    while time.monotonic() - start < WAIT_S:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def fill_queue(
+    executor: EventExecutor, release: Event, handled: list
+) -> None:
+    """Occupy the executor's single worker and fill its queue."""
+
+    def blocker() -> None:
+        release.wait(WAIT_S)
+
+    executor.submit("blocker", blocker, ())
+    assert wait_until(lambda: executor.get_stats()["queued"] == 0)
+    for index in range(executor.max_queued):
+        executor.submit("topic", handled.append, (index,))
+
+
+def test_invalid_parameters() -> None:
+    """Test that invalid sizes and overflow policies are rejected."""
+    with pytest.raises(ValueError):
+        EventExecutor(n_workers=0)
+    with pytest.raises(ValueError):
+        EventExecutor(max_queued=0)
+    with pytest.raises(ValueError):
+        EventExecutor(overflow_policy="ignore")
+
+
+def test_ordered_per_topic_parallel_across_topics() -> None:
+    """Test that topics are handled in parallel, each topic in order."""
+    executor = EventExecutor(n_workers=2)
+    release = Event()
+    handled: dict[str, list] = {"slow": [], "fast": []}
+    lock = Lock()
+
+    def handler(topic: str, index: int) -> None:
+        if topic == "slow":
+            release.wait(WAIT_S)
+        with lock:
+            handled[topic].append(index)
+
+    try:
+        for index in range(10):
+            executor.submit("slow", handler, ("slow", index))
+            executor.submit("fast", handler, ("fast", index))
+        # the slow topic's events don't hold up the fast topic's
+        assert wait_until(lambda: len(handled["fast"]) == 10)
+        assert not handled["slow"]
+        release.set()
+        assert wait_until(lambda: len(handled["slow"]) == 10)
+        assert handled == {"slow": list(range(10)), "fast": list(range(10))}
+    finally:
+        release.set()
+        executor.terminate()
+
+
+def test_block() -> None:
+    """Test that BLOCK waits for space in the queue."""
+    executor = EventExecutor(
+        n_workers=1, max_queued=5, overflow_policy=event_executor.BLOCK
+    )
+    release = Event()
+    handled: list = []
+    try:
+        fill_queue(executor, release, handled)
+        submitter = Thread(
+            target=executor.submit, args=("topic", handled.append, (5,))
+        )
+        submitter.start()
+        submitter.join(0.2)
+        assert submitter.is_alive()
+        release.set()
+        submitter.join(WAIT_S)
+        assert not submitter.is_alive()
+        assert wait_until(lambda: len(handled) == 6)
+        assert handled == list(range(6))
+    finally:
+        release.set()
+        executor.terminate()
+
+
+def test_drop_oldest() -> None:
+    """Test that DROP_OLDEST discards the oldest queued events."""
+    executor = EventExecutor(
+        n_workers=1, max_queued=5, overflow_policy=event_executor.DROP_OLDEST
+    )
+    release = Event()
+    handled: list = []
+    try:
+        fill_queue(executor, release, handled)
+        for index in range(5, 8):
+            executor.submit("topic", handled.append, (index,))
+        assert executor.get_stats()["dropped"] == 3
+        release.set()
+        assert wait_until(lambda: len(handled) == 5)
+        assert handled == list(range(3, 8))
+    finally:
+        release.set()
+        executor.terminate()
+
+
+def test_spill() -> None:
+    """Test that SPILL keeps all events, in order, beyond the queue bound."""
+    executor = EventExecutor(
+        n_workers=1, max_queued=5, overflow_policy=event_executor.SPILL
+    )
+    release = Event()
+    handled: list = []
+    try:
+        fill_queue(executor, release, handled)
+        for index in range(5, 20):
+            executor.submit("topic", handled.append, (index,))
+        stats = executor.get_stats()
+        assert stats["queued"] == 5
+        assert stats["spilled"] == 15
+        release.set()
+        assert wait_until(lambda: len(handled) == 20)
+        assert handled == list(range(20))
+        assert executor.get_stats()["spilled"] == 0
+        assert not executor._spilled_handlers
+    finally:
+        release.set()
+        executor.terminate()
+
+
+def test_errors_counted() -> None:
+    """Test that eventhandlers raising errors don't kill the workers."""
+    executor = EventExecutor(n_workers=1)
+    done = Event()
+
+    def fail() -> None:
+        raise RuntimeError("eventhandler failed")
+
+    try:
+        executor.submit("topic", fail, ())
+        executor.submit("topic", done.set, ())
+        assert done.wait(WAIT_S)
+        assert wait_until(lambda: executor.get_stats()["handled"] == 2)
+        assert executor.get_stats()["errors"] == 1
+    finally:
+        executor.terminate()
+
+
+def test_default_executor_never_blocks() -> None:
+    """Test that a slow eventhandler can't block the receiving thread."""
+    executor = event_executor.get_default_executor()
+    assert executor.overflow_policy == event_executor.SPILL
+    release = Event()
+    handled = []
+
+    def slow_handler(index: int) -> None:
+        release.wait(WAIT_S)
+        handled.append(index)
+
+    n_events = executor.max_queued + 100
+    start = time.monotonic()
+    for index in range(n_events):
+        executor.submit("slow", slow_handler, (index,))
+    assert time.monotonic() - start < WAIT_S
+    release.set()
+    while len(handled) < n_events and time.monotonic() - start < WAIT_S:
+        time.sleep(0.01)
+    assert handled == list(range(n_events))
+
+
+def run_tests() -> None:
+    """Run all tests."""
+    print("\nRunning tests for EventExecutor...")
+    test_invalid_parameters()
+    test_ordered_per_topic_parallel_across_topics()
+    test_block()
+    test_drop_oldest()
+    test_spill()
+    test_errors_counted()
+    test_default_executor_never_blocks()
+
+
+if __name__ == "__main__":
+    run_tests()
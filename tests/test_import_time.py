@@ -0,0 +1,93 @@
+"""Test that importing brenthy_api stays fast.
+
+Short-lived applications pay for importing brenthy_api on every start,
+so it mustn't import heavy dependencies such as ZMQ or asyncio, or load the
+BrenthyAPI protocol modules, until they are actually needed.
+Uses `python -X importtime`, so this test doesn't need Brenthy to be running.
+"""
+
+import os
+import subprocess
+import sys
+
+from testing_utils import mark
+
+BRENTHY_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Brenthy"
+)
+MODULE = "brenthy_tools_beta.brenthy_api"
+# generous, to avoid failing on slow machines, but well below the ~250ms
+# importing brenthy_api used to take when it eagerly loaded everything
+IMPORT_TIME_BUDGET_MS = 150
+N_MEASUREMENTS = 5
+# modules which brenthy_api must only import when they are needed
+LAZY_MODULES = [
+    "zmq",
+    "asyncio",
+    "environs",
+    "pathspec",
+    "brenthy_tools_beta.brenthy_api_protocols.bap_3_brenthy_tools",
+]
+
+
+def measure_import() -> dict[str, int]:
+    """Import brenthy_api in a new interpreter, measuring import times.
+
+    Returns:
+        dict[str, int]: the cumulative import time in microseconds of each
+            module that was imported
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {MODULE}"],
+        cwd=BRENTHY_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    import_times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, module = line.split("|")
+        if cumulative.strip().isdigit():
+            import_times[module.strip()] = int(cumulative)
+    return import_times
+
+
+def test_import_time() -> None:
+    """Test that importing brenthy_api stays within the time budget."""
+    import_time_ms = min(
+        measure_import()[MODULE] for _ in range(N_MEASUREMENTS)
+    ) / 1000
+    success = import_time_ms < IMPORT_TIME_BUDGET_MS
+    print(
+        mark(success),
+        f"Importing brenthy_api takes {import_time_ms:.1f}ms "
+        f"(budget {IMPORT_TIME_BUDGET_MS}ms)",
+    )
+    assert success
+
+
+def test_lazy_imports() -> None:
+    """Test that brenthy_api doesn't import heavy modules on import."""
+    imported_modules = measure_import().keys()
+    eager_modules = [
+        module for module in LAZY_MODULES if module in imported_modules
+    ]
+    print(
+        mark(not eager_modules),
+        "Heavy dependencies are imported lazily",
+        eager_modules if eager_modules else "",
+    )
+    assert not eager_modules
+
+
+def run_tests() -> None:
+    """Run all tests."""
+    print("\nRunning tests for brenthy_api's import time...")
+    test_import_time()
+    test_lazy_imports()
+
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,103 @@
+"""Test api_terminal's ZmqPublisher's subscription accounting.
+
+Runs a ZmqPublisher on a free local port, so these tests don't need Brenthy
+to be running.
+"""
+
+import os
+import socket
+import sys
+import time
+
+if True:
+    brenthy_dir = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Brenthy"
+    )
+    sys.path.insert(0, brenthy_dir)
+    import zmq
+    from api_terminal import bat_endpoints
+    from api_terminal.bat_endpoints import ZmqPublisher
+
+IP_ADDRESS = "127.0.0.1"
+N_SUBSCRIBERS = 20
+# how long to wait for subscriptions to reach the publisher
+WAIT_S = 5
+
+
+def get_free_port() -> int:
+    """Get a TCP port number that is currently not in use."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((IP_ADDRESS, 0))
+        return sock.getsockname()[1]
+
+
+def subscribe_and_leave(
+    address: tuple[str, int], topic: bytes
+) -> tuple[zmq.Context, zmq.Socket]:
+    """Connect subscribers to the publisher, and disconnect all but one."""
+    context = zmq.Context()
+    sockets = []
+    for _ in range(N_SUBSCRIBERS):
+        sub_socket = context.socket(zmq.SUB)
+        sub_socket.connect(f"tcp://{address[0]}:{address[1]}")
+        sub_socket.setsockopt(zmq.SUBSCRIBE, topic)
+        sockets.append(sub_socket)
+    time.sleep(0.5)
+    for sub_socket in sockets[1:]:
+        sub_socket.setsockopt(zmq.UNSUBSCRIBE, topic)
+        sub_socket.close(linger=100)
+    time.sleep(0.5)
+    return context, sockets[0]
+
+
+def wait_for_subscriptions(publisher: ZmqPublisher, expected: dict) -> bool:
+    """Wait until the publisher has processed the expected subscriptions."""
+    start = time.monotonic()
+    while time.monotonic() - start < WAIT_S:
+        if publisher._subscriptions == expected:
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_subscriptions_processed_when_publishing() -> None:
+    """Test that publishing processes the queued (un)subscriptions."""
+    address = (IP_ADDRESS, get_free_port())
+    publisher = ZmqPublisher(address)
+    context, sub_socket = subscribe_and_leave(address, b"topic")
+    try:
+        publisher.publish({"topic": "topic"})
+        assert publisher._subscriptions == {b"topic": 1}
+    finally:
+        sub_socket.close(linger=0)
+        context.term()
+        publisher.terminate()
+
+
+def test_subscriptions_processed_periodically() -> None:
+    """Test that idle publishers process (un)subscriptions periodically."""
+    drain_interval_s = bat_endpoints.SUBSCRIPTIONS_DRAIN_INTERVAL_S
+    bat_endpoints.SUBSCRIPTIONS_DRAIN_INTERVAL_S = 0.1
+    address = (IP_ADDRESS, get_free_port())
+    try:
+        publisher = ZmqPublisher(address)
+    finally:
+        bat_endpoints.SUBSCRIPTIONS_DRAIN_INTERVAL_S = drain_interval_s
+    context, sub_socket = subscribe_and_leave(address, b"topic")
+    try:
+        assert wait_for_subscriptions(publisher, {b"topic": 1})
+    finally:
+        sub_socket.close(linger=0)
+        context.term()
+        publisher.terminate()
+
+
+def run_tests() -> None:
+    """Run all tests."""
+    print("\nRunning tests for ZmqPublisher...")
+    test_subscriptions_processed_when_publishing()
+    test_subscriptions_processed_periodically()
+
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,110 @@
+"""Test api_terminal's per-client ClientRateLimiter.
+
+These tests don't need Brenthy to be running.
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+if True:
+    brenthy_dir = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Brenthy"
+    )
+    sys.path.insert(0, brenthy_dir)
+    from api_terminal import rate_limiter
+    from api_terminal.rate_limiter import ClientRateLimiter
+
+
+class FakeClock:
+    """A replacement for time.monotonic which only advances when told to."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def use_fake_clock(monkeypatch: pytest.MonkeyPatch) -> FakeClock:
+    """Make rate_limiter use a FakeClock instead of the real time."""
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter, "time", SimpleNamespace(monotonic=clock))
+    return clock
+
+
+def test_invalid_limits() -> None:
+    """Test that invalid rates and bursts are rejected."""
+    with pytest.raises(ValueError):
+        ClientRateLimiter(0, 10)
+    with pytest.raises(ValueError):
+        ClientRateLimiter(10, 0.5)
+
+
+def test_burst_then_throttle(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that clients may make `burst` requests, then must wait."""
+    clock = use_fake_clock(monkeypatch)
+    limiter = ClientRateLimiter(rate=10, burst=5)
+    for _ in range(5):
+        assert limiter.acquire(b"client") == 0
+    assert limiter.acquire(b"client") == pytest.approx(0.1)
+
+    clock.now += 0.1
+    assert limiter.acquire(b"client") == 0
+    assert limiter.acquire(b"client") > 0
+
+    # the bucket refills to no more than burst
+    clock.now += 100
+    for _ in range(5):
+        assert limiter.acquire(b"client") == 0
+    assert limiter.acquire(b"client") > 0
+
+    stats = limiter.get_stats()
+    assert stats["allowed"] == 11
+    assert stats["throttled"] == 3
+
+
+def test_clients_independent(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that one client exhausting its bucket doesn't affect others."""
+    use_fake_clock(monkeypatch)
+    limiter = ClientRateLimiter(rate=1, burst=1)
+    assert limiter.acquire(b"flooder") == 0
+    assert limiter.acquire(b"flooder") > 0
+    assert limiter.acquire(b"other") == 0
+    assert limiter.get_stats()["clients"] == 2
+
+
+def test_refilled_buckets_forgotten(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that idle clients are forgotten once too many are tracked."""
+    clock = use_fake_clock(monkeypatch)
+    monkeypatch.setattr(rate_limiter, "MAX_TRACKED_CLIENTS", 3)
+    limiter = ClientRateLimiter(rate=1, burst=2)
+    for client in [b"a", b"b", b"c"]:
+        limiter.acquire(client)
+    clock.now += 1
+    limiter.acquire(b"c")
+    clock.now += 1.5
+    limiter.acquire(b"d")
+    # a and b have been idle for long enough to have refilled, c hasn't
+    assert limiter.get_stats()["clients"] == 2
+
+
+def run_tests() -> None:
+    """Run all tests."""
+    print("\nRunning tests for ClientRateLimiter...")
+    monkeypatch = pytest.MonkeyPatch()
+    try:
+        test_invalid_limits()
+        test_burst_then_throttle(monkeypatch)
+        monkeypatch.undo()
+        test_clients_independent(monkeypatch)
+        monkeypatch.undo()
+        test_refilled_buckets_forgotten(monkeypatch)
+    finally:
+        monkeypatch.undo()
+
+
+if __name__ == "__main__":
+    run_tests()
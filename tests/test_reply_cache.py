@@ -0,0 +1,119 @@
+"""Test ReplyCache, the LRU cache of BrenthyAPI replies with TTLs.
+
+These tests don't need Brenthy to be running.
+"""
+
+import os
+import sys
+import time
+
+if True:
+    brenthy_dir = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Brenthy"
+    )
+    sys.path.insert(0, brenthy_dir)
+    from brenthy_tools_beta import brenthy_api
+    from brenthy_tools_beta.reply_cache import ReplyCache
+
+BLOCKCHAIN_TYPE = "ReplyCacheTestBlockchain"
+
+
+def test_get_and_put() -> None:
+    """Test caching replies and their expiry."""
+    cache = ReplyCache()
+    assert cache.get(BLOCKCHAIN_TYPE, b"request") is None
+    cache.put(BLOCKCHAIN_TYPE, b"request", b"reply", ttl=60)
+    assert cache.get(BLOCKCHAIN_TYPE, b"request") == b"reply"
+    assert cache.get("OtherBlockchain", b"request") is None
+    cache.put(BLOCKCHAIN_TYPE, b"expiring", b"reply", ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get(BLOCKCHAIN_TYPE, b"expiring") is None
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 3, 1)
+
+
+def test_returns_copies() -> None:
+    """Test that modifying a returned reply doesn't modify the cache."""
+    cache = ReplyCache()
+    cache.put(BLOCKCHAIN_TYPE, b"request", bytearray(b"reply"), ttl=60)
+    reply = cache.get(BLOCKCHAIN_TYPE, b"request")
+    reply[0] = 0
+    assert cache.get(BLOCKCHAIN_TYPE, b"request") == b"reply"
+
+
+def test_bounds() -> None:
+    """Test evicting the least recently used replies and large replies."""
+    cache = ReplyCache(max_entries=2, max_reply_bytes=10)
+    cache.put(BLOCKCHAIN_TYPE, b"1", b"reply 1", ttl=60)
+    cache.put(BLOCKCHAIN_TYPE, b"2", b"reply 2", ttl=60)
+    cache.get(BLOCKCHAIN_TYPE, b"1")
+    cache.put(BLOCKCHAIN_TYPE, b"3", b"reply 3", ttl=60)
+    assert cache.get(BLOCKCHAIN_TYPE, b"2") is None
+    assert cache.get(BLOCKCHAIN_TYPE, b"1") == b"reply 1"
+    cache.put(BLOCKCHAIN_TYPE, b"large", b"x" * 11, ttl=60)
+    assert cache.get(BLOCKCHAIN_TYPE, b"large") is None
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_invalidate() -> None:
+    """Test removing a blockchain type's or all cached replies."""
+    cache = ReplyCache()
+    cache.put(BLOCKCHAIN_TYPE, b"request", b"reply", ttl=60)
+    cache.put("OtherBlockchain", b"request", b"reply", ttl=60)
+    cache.invalidate(BLOCKCHAIN_TYPE)
+    assert cache.get(BLOCKCHAIN_TYPE, b"request") is None
+    assert cache.get("OtherBlockchain", b"request") == b"reply"
+    cache.invalidate()
+    assert cache.get("OtherBlockchain", b"request") is None
+
+
+def test_generation_guard() -> None:
+    """Test that replies aren't cached if invalidated since the request."""
+    cache = ReplyCache()
+    generation = cache.get_generation(BLOCKCHAIN_TYPE)
+    cache.invalidate(BLOCKCHAIN_TYPE)
+    cache.put(BLOCKCHAIN_TYPE, b"request", b"stale", 60, generation)
+    assert cache.get(BLOCKCHAIN_TYPE, b"request") is None
+
+    generation = cache.get_generation(BLOCKCHAIN_TYPE)
+    cache.invalidate("OtherBlockchain")
+    cache.put(BLOCKCHAIN_TYPE, b"request", b"fresh", 60, generation)
+    assert cache.get(BLOCKCHAIN_TYPE, b"request") == b"fresh"
+
+    generation = cache.get_generation(BLOCKCHAIN_TYPE)
+    cache.invalidate()
+    cache.put(BLOCKCHAIN_TYPE, b"other", b"stale", 60, generation)
+    assert cache.get(BLOCKCHAIN_TYPE, b"other") is None
+
+
+def test_send_request_generation_guard() -> None:
+    """Test that send_request doesn't cache replies invalidated meanwhile."""
+    send_request_frames = brenthy_api._send_request_frames
+
+    def invalidate_while_sending(*_) -> bytearray:
+        brenthy_api.reply_cache.invalidate(BLOCKCHAIN_TYPE)
+        return bytearray(b"stale")
+
+    brenthy_api._send_request_frames = invalidate_while_sending
+    try:
+        assert brenthy_api.send_request(
+            BLOCKCHAIN_TYPE, b"request", cache_ttl=60
+        ) == b"stale"
+        assert brenthy_api.reply_cache.get(BLOCKCHAIN_TYPE, b"request") is None
+    finally:
+        brenthy_api._send_request_frames = send_request_frames
+
+
+def run_tests() -> None:
+    """Run all tests."""
+    print("\nRunning tests for ReplyCache...")
+    test_get_and_put()
+    test_returns_copies()
+    test_bounds()
+    test_invalidate()
+    test_generation_guard()
+    test_send_request_generation_guard()
+
+
+if __name__ == "__main__":
+    run_tests()
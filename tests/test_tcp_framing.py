@@ -0,0 +1,182 @@
+"""Test the length-prefixed framing of BAP-3's TCP messages.
+
+Uses local socket pairs and servers, so these tests don't need Brenthy to be
+running.
+"""
+
+import asyncio
+import os
+import socket
+import sys
+import time
+from threading import Thread
+
+import pytest
+
+if True:
+    brenthy_dir = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Brenthy"
+    )
+    sys.path.insert(0, brenthy_dir)
+    from brenthy_tools_beta import bt_endpoints
+    from brenthy_tools_beta.utils import to_b255_no_0s
+
+
+def test_round_trip() -> None:
+    """Test sending & receiving messages larger than the preallocation."""
+    message = os.urandom(bt_endpoints.TCP_MAX_PREALLOCATION * 3 + 5)
+    sender, receiver = socket.socketpair()
+    with sender, receiver:
+        thread = Thread(
+            target=bt_endpoints.tcp_send_counted, args=(sender, message)
+        )
+        thread.start()
+        assert bt_endpoints.tcp_recv_counted(receiver, timeout=5) == message
+        thread.join()
+
+        bt_endpoints.tcp_send_counted(sender, b"")
+        assert bt_endpoints.tcp_recv_counted(receiver, timeout=5) == b""
+
+
+def test_oversized_header() -> None:
+    """Test that headers announcing too large messages are rejected."""
+    sender, receiver = socket.socketpair()
+    with sender, receiver:
+        sender.sendall(
+            to_b255_no_0s(bt_endpoints.TCP_MAX_MESSAGE_SIZE + 1) + b"\x00"
+        )
+        with pytest.raises(ValueError):
+            bt_endpoints.tcp_recv_counted(receiver, timeout=5)
+
+
+def test_header_alone_allocates_little() -> None:
+    """Test that a header without data doesn't allocate its whole length."""
+    sender, receiver = socket.socketpair()
+    with sender, receiver:
+        sender.sendall(
+            to_b255_no_0s(bt_endpoints.TCP_MAX_MESSAGE_SIZE) + b"\x00"
+        )
+        sender.close()
+        with pytest.raises(ConnectionError):
+            bt_endpoints.tcp_recv_counted(receiver, timeout=5)
+
+
+def test_deadline_covers_whole_message() -> None:
+    """Test that dripping a message doesn't extend the timeout."""
+    sender, receiver = socket.socketpair()
+
+    def drip() -> None:
+        try:
+            sender.sendall(to_b255_no_0s(100) + b"\x00")
+            for _ in range(100):
+                sender.sendall(b"x")
+                time.sleep(0.1)
+        except OSError:
+            pass
+
+    with sender, receiver:
+        Thread(target=drip, daemon=True).start()
+        start = time.monotonic()
+        with pytest.raises(TimeoutError):
+            bt_endpoints.tcp_recv_counted(receiver, timeout=1)
+        assert time.monotonic() - start < 2
+
+
+def test_malformed_reply() -> None:
+    """Test that send_request_tcp reports malformed replies as failures."""
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(("127.0.0.1", 0))
+    server.listen()
+
+    def reply_malformed() -> None:
+        conn, _ = server.accept()
+        with conn:
+            bt_endpoints.tcp_recv_counted(conn, timeout=5)
+            conn.sendall(b"\x01" * bt_endpoints.TCP_MAX_HEADER_LENGTH)
+
+    with server:
+        thread = Thread(target=reply_malformed)
+        thread.start()
+        with pytest.raises(bt_endpoints.CantConnectToSocketError):
+            bt_endpoints.send_request_tcp(
+                b"request", server.getsockname(), timeout=5
+            )
+        thread.join()
+
+
+def serve_once(
+    reply: bytes, sleep_s: float = 0
+) -> tuple[socket.socket, Thread]:
+    """Serve one connection, replying with raw bytes after the request."""
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(("127.0.0.1", 0))
+    server.listen()
+
+    def serve() -> None:
+        conn, _ = server.accept()
+        with conn:
+            bt_endpoints.tcp_recv_counted(conn, timeout=5)
+            time.sleep(sleep_s)
+            conn.sendall(reply)
+
+    thread = Thread(target=serve, daemon=True)
+    thread.start()
+    return server, thread
+
+
+def send_async(address: tuple[str, int], timeout: int = 5) -> bytes:
+    """Send a request with send_request_tcp_async."""
+    return asyncio.run(bt_endpoints.send_request_tcp_async(
+        b"request", address, timeout=timeout
+    ))
+
+
+def test_async_round_trip() -> None:
+    """Test that send_request_tcp_async receives well-formed replies."""
+    server, thread = serve_once(to_b255_no_0s(5) + b"\x00hello")
+    with server:
+        assert send_async(server.getsockname()) == b"hello"
+        thread.join()
+
+
+def test_async_failures() -> None:
+    """Test that send_request_tcp_async reports failures like the sync one.
+
+    Truncated, malformed and oversized replies and timeouts all raise
+    CantConnectToSocketError, so that brenthy_api falls back to another
+    protocol.
+    """
+    for reply in [
+        to_b255_no_0s(100) + b"\x00truncated",
+        b"\x01" * bt_endpoints.TCP_MAX_HEADER_LENGTH + b"\x00",
+        to_b255_no_0s(bt_endpoints.TCP_MAX_MESSAGE_SIZE + 1) + b"\x00",
+    ]:
+        server, thread = serve_once(reply)
+        with server:
+            with pytest.raises(bt_endpoints.CantConnectToSocketError):
+                send_async(server.getsockname())
+            thread.join()
+
+    server, thread = serve_once(b"", sleep_s=3)
+    with server:
+        start = time.monotonic()
+        with pytest.raises(bt_endpoints.CantConnectToSocketError):
+            send_async(server.getsockname(), timeout=1)
+        assert time.monotonic() - start < 2
+        thread.join()
+
+
+def run_tests() -> None:
+    """Run all tests."""
+    print("\nRunning tests for BAP-3's TCP framing...")
+    test_round_trip()
+    test_oversized_header()
+    test_header_alone_allocates_little()
+    test_deadline_covers_whole_message()
+    test_malformed_reply()
+    test_async_round_trip()
+    test_async_failures()
+
+
+if __name__ == "__main__":
+    run_tests()
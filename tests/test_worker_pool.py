@@ -0,0 +1,164 @@
+"""Test api_terminal's ElasticWorkerPool.
+
+These tests don't need Brenthy to be running.
+"""
+
+import os
+import sys
+import time
+from threading import Event, Lock
+
+import pytest
+
+if True:
+    brenthy_dir = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Brenthy"
+    )
+    sys.path.insert(0, brenthy_dir)
+    from api_terminal.worker_pool import (
+        ElasticWorkerPool,
+        get_idle_timeout_from_env,
+        get_pool_size_from_env,
+    )
+
+# how long to wait for tasks to be processed
+WAIT_S = 5
+
+
+def wait_until(condition) -> bool:  # type: ignore
+    """Wait until `condition()` is true, returning False on timeout."""
+    start = time.monotonic()
+    while time.monotonic() - start < WAIT_S:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_invalid_sizes() -> None:
+    """Test that invalid numbers of workers are rejected."""
+    with pytest.raises(ValueError):
+        ElasticWorkerPool(-1, 4, 1)
+    with pytest.raises(ValueError):
+        ElasticWorkerPool(4, 2, 1)
+    with pytest.raises(ValueError):
+        ElasticWorkerPool(0, 0, 1)
+
+
+def test_grows_and_shrinks() -> None:
+    """Test that the pool grows under load and shrinks back when idle."""
+    pool = ElasticWorkerPool(1, 4, idle_timeout_s=0.2)
+    release = Event()
+    try:
+        assert pool.get_stats()["workers"] == 1
+        for _ in range(10):
+            pool.submit(release.wait, WAIT_S)
+        assert wait_until(lambda: pool.get_stats()["queued"] == 6)
+        stats = pool.get_stats()
+        assert stats["workers"] == 4
+        assert stats["active_workers"] == 4
+        release.set()
+        assert wait_until(lambda: pool.get_stats()["handled"] == 10)
+        assert wait_until(lambda: pool.get_stats()["workers"] == 1)
+        assert pool.get_stats()["max_workers_used"] == 4
+    finally:
+        release.set()
+        pool.terminate()
+
+
+def test_per_key_order_and_fairness() -> None:
+    """Test that keys take turns and each key's tasks stay in order."""
+    pool = ElasticWorkerPool(0, 1, idle_timeout_s=1)
+    release = Event()
+    processed = []
+    lock = Lock()
+
+    def record(key: str, index: int) -> None:
+        with lock:
+            processed.append((key, index))
+
+    try:
+        # keep the only worker busy while queueing the tasks
+        pool.submit(release.wait, WAIT_S, key="blocker")
+        assert wait_until(lambda: pool.get_stats()["active_workers"] == 1)
+        for index in range(3):
+            pool.submit(record, "a", index, key="a")
+        pool.submit(record, "b", 0, key="b")
+        release.set()
+        assert wait_until(lambda: len(processed) == 4)
+        assert processed == [("a", 0), ("b", 0), ("a", 1), ("a", 2)]
+    finally:
+        release.set()
+        pool.terminate()
+
+
+def test_errors_counted() -> None:
+    """Test that tasks raising errors don't kill the workers."""
+    pool = ElasticWorkerPool(1, 1, idle_timeout_s=1)
+    done = Event()
+
+    def fail() -> None:
+        raise RuntimeError("task failed")
+
+    try:
+        pool.submit(fail)
+        pool.submit(done.set)
+        assert done.wait(WAIT_S)
+        assert wait_until(lambda: pool.get_stats()["handled"] == 2)
+        assert pool.get_stats()["errors"] == 1
+    finally:
+        pool.terminate()
+
+
+def test_terminate_discards_queued_tasks() -> None:
+    """Test that terminating stops the workers and drops queued tasks."""
+    pool = ElasticWorkerPool(1, 1, idle_timeout_s=1)
+    release = Event()
+    ran = Event()
+    pool.submit(release.wait, WAIT_S)
+    assert wait_until(lambda: pool.get_stats()["active_workers"] == 1)
+    pool.submit(ran.set)
+    pool.terminate()
+    release.set()
+    assert wait_until(lambda: pool.get_stats()["workers"] == 0)
+    assert not ran.is_set()
+    pool.submit(ran.set)
+    assert pool.get_stats()["queued"] == 0
+
+
+def test_sizes_from_environment() -> None:
+    """Test reading pool sizes and idle timeouts from the environment."""
+    variable = "BRENTHY_API_TEST_POOL_SETTING"
+    try:
+        os.environ.pop(variable, None)
+        assert get_pool_size_from_env(variable, (2, 64)) == (2, 64)
+        assert get_idle_timeout_from_env(variable, 30) == 30
+        os.environ[variable] = "0,8"
+        assert get_pool_size_from_env(variable, (2, 64)) == (0, 8)
+        os.environ[variable] = "2.5"
+        assert get_idle_timeout_from_env(variable, 30) == 2.5
+        for value in ["8", "4,2", "-1,8", "a,b", "1,2,3"]:
+            os.environ[variable] = value
+            with pytest.raises(ValueError):
+                get_pool_size_from_env(variable, (2, 64))
+        for value in ["0", "-1", "soon"]:
+            os.environ[variable] = value
+            with pytest.raises(ValueError):
+                get_idle_timeout_from_env(variable, 30)
+    finally:
+        os.environ.pop(variable, None)
+
+
+def run_tests() -> None:
+    """Run all tests."""
+    print("\nRunning tests for ElasticWorkerPool...")
+    test_invalid_sizes()
+    test_grows_and_shrinks()
+    test_per_key_order_and_fairness()
+    test_errors_counted()
+    test_terminate_discards_queued_tasks()
+    test_sizes_from_environment()
+
+
+if __name__ == "__main__":
+    run_tests()